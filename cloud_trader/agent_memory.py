@@ -4,8 +4,11 @@ from __future__ import annotations
 
 import asyncio
 import hashlib
+import heapq
 import json
 import logging
+import time
+from bisect import bisect_left, insort
 from collections import defaultdict, deque
 from dataclasses import dataclass, field
 from enum import Enum
@@ -101,6 +104,65 @@ class AgentMemory:
         self.validation_count += 1
 
 
+class _MemoryIndex:
+    """
+    One agent's memory ids, indexed for retrieval without scanning.
+
+    Inverted indexes map tags, memory types and importance levels to ids;
+    ``ranked`` keeps every id sorted by importance then recency (both
+    descending), the order ``retrieve_memories`` returns.
+    """
+
+    def __init__(self) -> None:
+        self.by_tag: Dict[str, Set[str]] = defaultdict(set)
+        self.by_type: Dict[MemoryType, Set[str]] = defaultdict(set)
+        self.by_importance: Dict[int, Set[str]] = defaultdict(set)
+        self.ranked: List[Tuple[int, int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.ranked)
+
+    @staticmethod
+    def rank_key(memory: AgentMemory) -> Tuple[int, int, str]:
+        return (-memory.importance.value, -memory.timestamp_us, memory.memory_id)
+
+    def add(self, memory: AgentMemory) -> None:
+        insort(self.ranked, self.rank_key(memory))
+        for tag in memory.tags:
+            self.by_tag[tag].add(memory.memory_id)
+        self.by_type[memory.memory_type].add(memory.memory_id)
+        self.by_importance[memory.importance.value].add(memory.memory_id)
+
+    def remove(self, memory: AgentMemory) -> None:
+        key = self.rank_key(memory)
+        position = bisect_left(self.ranked, key)
+        if position < len(self.ranked) and self.ranked[position] == key:
+            del self.ranked[position]
+        else:  # Importance or timestamp was edited in place after indexing
+            self.ranked = [entry for entry in self.ranked if entry[2] != memory.memory_id]
+        for index, value in [(self.by_tag, tag) for tag in memory.tags] + [
+            (self.by_type, memory.memory_type),
+            (self.by_importance, memory.importance.value),
+        ]:
+            ids = index.get(value)
+            if ids is not None:
+                ids.discard(memory.memory_id)
+                if not ids:
+                    del index[value]
+
+    def candidates(
+        self, tags: Optional[List[str]], memory_types: Optional[List[MemoryType]]
+    ) -> Optional[Set[str]]:
+        """Ids with any of ``tags`` and any of ``memory_types``; None when unfiltered."""
+        matched: Optional[Set[str]] = None
+        if tags:
+            matched = set().union(*(self.by_tag.get(tag, ()) for tag in tags))
+        if memory_types:
+            of_type = set().union(*(self.by_type.get(kind, ()) for kind in memory_types))
+            matched = of_type if matched is None else matched & of_type
+        return matched
+
+
 @dataclass
 class SharedContext:
     """Shared context information that multiple agents can access."""
@@ -148,7 +210,12 @@ class AgentMemoryManager:
     - Cache-backed storage for performance
     """
 
-    def __init__(self, max_memories_per_agent: int = 1000, consolidation_interval: int = 3600):
+    def __init__(
+        self,
+        max_memories_per_agent: int = 1000,
+        consolidation_interval: int = 3600,
+        cache_refresh_seconds: float = 60.0,
+    ):
         self.max_memories_per_agent = max_memories_per_agent
         self.consolidation_interval = consolidation_interval  # seconds
 
@@ -156,10 +223,14 @@ class AgentMemoryManager:
         self.agent_memories: Dict[str, Dict[str, AgentMemory]] = defaultdict(dict)
         self.shared_contexts: Dict[str, SharedContext] = {}
         self.memory_index: Dict[str, Set[str]] = defaultdict(set)  # tag -> memory_ids
+        self._indexes: Dict[str, _MemoryIndex] = defaultdict(_MemoryIndex)
 
         # Cache for performance
         self._cache: Optional[BaseCache] = None
         self._cache_ready = False
+        # Memories written by other replicas are picked up at most this often
+        self.cache_refresh_seconds = cache_refresh_seconds
+        self._cache_refreshed_at: Dict[str, float] = {}
 
         # Memory consolidation
         self.last_consolidation = get_timestamp_us()
@@ -176,6 +247,7 @@ class AgentMemoryManager:
             "memory_hits": 0,
             "context_hits": 0,
             "consolidations_performed": 0,
+            "memories_loaded_from_cache": 0,
         }
 
     async def initialize(self) -> None:
@@ -215,12 +287,8 @@ class AgentMemoryManager:
         agent_id = memory.agent_id
         memory_id = memory.memory_id
 
-        # Store in memory
-        self.agent_memories[agent_id][memory_id] = memory
-
-        # Update index
-        for tag in memory.tags:
-            self.memory_index[tag].add(memory_id)
+        # Store in memory and indexes
+        self._index_memory(memory)
 
         # Cache if available
         if self._cache_ready:
@@ -251,62 +319,108 @@ class AgentMemoryManager:
         min_importance: MemoryImportance = MemoryImportance.LOW,
         limit: int = 50,
     ) -> List[AgentMemory]:
-        """Retrieve memories with filtering options."""
-        memories = []
-
-        # Get candidate memories
-        if agent_id in self.agent_memories:
-            candidate_memories = list(self.agent_memories[agent_id].values())
+        """
+        Retrieve memories with filtering options.
+
+        Matches any of ``tags`` and any of ``memory_types``, ordered by
+        importance then recency. Selective filters rank only their matches from
+        the inverted indexes; broad ones walk the ranked ids and stop after
+        ``limit``, so cost follows the result size rather than the agent's
+        memory count.
+        """
+        await self._load_cached_memories(agent_id)
+
+        index = self._indexes.get(agent_id)
+        if not index:
+            return []
+        memories = self.agent_memories[agent_id]
+        floor = -min_importance.value
+        candidates = index.candidates(tags, memory_types)
+
+        if candidates is not None and len(candidates) * 8 < len(index):
+            keys = (index.rank_key(memories[memory_id]) for memory_id in candidates)
+            ranked = heapq.nsmallest(limit, (key for key in keys if key[0] <= floor))
         else:
-            candidate_memories = []
+            ranked = []
+            for key in index.ranked:
+                if key[0] > floor or len(ranked) >= limit:
+                    break
+                if candidates is None or key[2] in candidates:
+                    ranked.append(key)
+
+        results = [memories[memory_id] for _, _, memory_id in ranked]
+        for memory in results:
+            memory.update_access()
 
-        # Also check cache for memories that might not be in memory
-        if self._cache_ready:
-            try:
-                # Get all memory keys for this agent
-                pattern = f"memory:{agent_id}:*"
-                cache_keys = await self._cache.scan_keys(pattern)
-                for cache_key in cache_keys:
-                    if cache_key not in [
-                        f"memory:{agent_id}:{m.memory_id}" for m in candidate_memories
-                    ]:
-                        cached_data = await self._cache.get(cache_key)
-                        if cached_data:
-                            try:
-                                memory = AgentMemory.from_dict(cached_data)
-                                candidate_memories.append(memory)
-                            except Exception as e:
-                                logger.warning(
-                                    f"Failed to deserialize cached memory {cache_key}: {e}"
-                                )
-            except Exception as e:
-                logger.warning(f"Error retrieving memories from cache: {e}")
+        self.stats["memory_hits"] += len(results)
+        return results
 
-        # Apply filters
-        for memory in candidate_memories:
-            # Tag filter
-            if tags and not any(tag in memory.tags for tag in tags):
-                continue
+    def _index_memory(self, memory: AgentMemory) -> None:
+        """Add (or replace) a memory in storage and every index."""
+        previous = self.agent_memories[memory.agent_id].get(memory.memory_id)
+        if previous is not None:
+            self._unindex_memory(memory.agent_id, memory.memory_id)
 
-            # Type filter
-            if memory_types and memory.memory_type not in memory_types:
-                continue
+        self.agent_memories[memory.agent_id][memory.memory_id] = memory
+        self._indexes[memory.agent_id].add(memory)
+        for tag in memory.tags:
+            self.memory_index[tag].add(memory.memory_id)
 
-            # Importance filter
-            if memory.importance.value < min_importance.value:
-                continue
+    def _unindex_memory(self, agent_id: str, memory_id: str) -> AgentMemory:
+        """Drop a memory from storage and every index."""
+        memory = self.agent_memories[agent_id].pop(memory_id)
+        self._indexes[agent_id].remove(memory)
+        for tag in memory.tags:
+            self.memory_index[tag].discard(memory_id)
+        return memory
+
+    async def _forget(self, agent_id: str, memory_ids: List[str]) -> None:
+        """Unindex memories and delete them from the cache concurrently."""
+        for memory_id in memory_ids:
+            self._unindex_memory(agent_id, memory_id)
+        if self._cache_ready and memory_ids:
+            await asyncio.gather(
+                *(self._cache.delete(f"memory:{agent_id}:{memory_id}") for memory_id in memory_ids),
+                return_exceptions=True,
+            )
 
-            memory.update_access()
-            memories.append(memory)
+    async def _load_cached_memories(self, agent_id: str) -> None:
+        """
+        Index memories that exist only in the shared cache (other replicas,
+        restarts): one key scan and one batched multi-get, at most every
+        ``cache_refresh_seconds`` per agent.
+        """
+        if not self._cache_ready:
+            return
+        now = time.monotonic()
+        last = self._cache_refreshed_at.get(agent_id)
+        if last is not None and now - last < self.cache_refresh_seconds:
+            return
+        self._cache_refreshed_at[agent_id] = now
 
-        # Sort by importance and recency
-        memories.sort(key=lambda m: (m.importance.value, m.timestamp_us), reverse=True)
+        prefix = f"memory:{agent_id}:"
+        known = self.agent_memories.get(agent_id, {})
+        try:
+            missing = [
+                key
+                for key in await self._cache.scan_keys(f"{prefix}*")
+                if key[len(prefix) :] not in known
+            ]
+            cached = await self._cache.get_many(missing) if missing else {}
+        except Exception as e:
+            logger.warning(f"Error retrieving memories from cache: {e}")
+            return
 
-        # Limit results
-        memories = memories[:limit]
+        for cache_key, cached_data in cached.items():
+            try:
+                self._index_memory(AgentMemory.from_dict(cached_data))
+            except Exception as e:
+                logger.warning(f"Failed to deserialize cached memory {cache_key}: {e}")
+                continue
+            self.stats["memories_loaded_from_cache"] += 1
 
-        self.stats["memory_hits"] += len(memories)
-        return memories
+        if cached:
+            await self._manage_memory_limits(agent_id)
 
     async def share_memory(
         self, from_agent: str, to_agents: List[str], memory_id: str, context: Optional[str] = None
@@ -511,31 +625,26 @@ class AgentMemoryManager:
 
     async def _manage_memory_limits(self, agent_id: str) -> None:
         """Manage memory limits by removing least important memories."""
-        memories = list(self.agent_memories[agent_id].values())
-
-        if len(memories) <= self.max_memories_per_agent:
+        memories = self.agent_memories[agent_id]
+        excess = len(memories) - self.max_memories_per_agent
+        if excess <= 0:
             return
 
-        # Sort by importance (descending) and access count (descending)
-        memories.sort(
-            key=lambda m: (m.importance.value, m.access_count, m.validation_count), reverse=True
-        )
-
-        # Remove excess memories
-        to_remove = memories[self.max_memories_per_agent :]
-        for memory in to_remove:
-            memory_id = memory.memory_id
-            del self.agent_memories[agent_id][memory_id]
-
-            # Remove from index
-            for tag in memory.tags:
-                self.memory_index[tag].discard(memory_id)
-
-            # Remove from cache
-            if self._cache_ready:
-                cache_key = f"memory:{agent_id}:{memory_id}"
-                await self._cache.delete(cache_key)
+        # Least important level first; within a level the least accessed/validated,
+        # newest first on ties
+        index = self._indexes[agent_id]
+        to_remove: List[str] = []
+        for level in sorted(index.by_importance):
+            victims = heapq.nsmallest(
+                excess - len(to_remove),
+                (memories[memory_id] for memory_id in index.by_importance[level]),
+                key=lambda m: (m.access_count, m.validation_count, -m.timestamp_us),
+            )
+            to_remove.extend(memory.memory_id for memory in victims)
+            if len(to_remove) >= excess:
+                break
 
+        await self._forget(agent_id, to_remove)
         logger.debug(f"Removed {len(to_remove)} memories for agent {agent_id} to maintain limit")
 
     async def _consolidation_loop(self) -> None:
@@ -567,33 +676,17 @@ class AgentMemoryManager:
                 await self._cache.delete(cache_key)
             total_cleaned += 1
 
-        # Clean old low-importance memories
-        for agent_id, memories in self.agent_memories.items():
-            to_remove = []
-            for memory_id, memory in memories.items():
-                # Remove memories that are:
-                # 1. Older than 7 days AND low importance AND rarely accessed
-                if (
-                    memory.timestamp_us < consolidation_cutoff
-                    and memory.importance == MemoryImportance.LOW
-                    and memory.access_count < 3
-                ):
-                    to_remove.append(memory_id)
-
-            for memory_id in to_remove:
-                memory = memories[memory_id]
-                del memories[memory_id]
-
-                # Clean up index
-                for tag in memory.tags:
-                    self.memory_index[tag].discard(memory_id)
-
-                # Clean up cache
-                if self._cache_ready:
-                    cache_key = f"memory:{agent_id}:{memory_id}"
-                    await self._cache.delete(cache_key)
-
-                total_cleaned += 1
+        # Clean old low-importance memories: older than 7 days AND rarely accessed
+        for agent_id, index in list(self._indexes.items()):
+            memories = self.agent_memories[agent_id]
+            to_remove = [
+                memory_id
+                for memory_id in index.by_importance.get(MemoryImportance.LOW.value, ())
+                if memories[memory_id].timestamp_us < consolidation_cutoff
+                and memories[memory_id].access_count < 3
+            ]
+            await self._forget(agent_id, to_remove)
+            total_cleaned += len(to_remove)
 
         self.stats["consolidations_performed"] += 1
         if total_cleaned > 0:
@@ -12,6 +12,8 @@ from collections import defaultdict
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
+from .journal import AppendOnlyJournal
+
 logger = logging.getLogger(__name__)
 
 # Import persistent storage
@@ -37,16 +39,19 @@ class PerformanceTracker:
     Now with GCS-backed persistence for durability across deployments.
     """
 
-    def __init__(self, use_gcs: bool = True):
+    def __init__(self, use_gcs: bool = True, cache_dir: str = "/tmp/sapphire_metrics"):
         """
         Initialize the performance tracker.
 
         Args:
             use_gcs: If True, use GCS-backed persistent storage
+            cache_dir: Local directory for the performance journal
         """
         self.use_gcs = use_gcs and GCS_AVAILABLE
-        self.cache_path = "/tmp/sapphire_metrics/agent_performance.json"
+        self.cache_path = os.path.join(cache_dir, "agent_performance.json")
+        self.journal_path = os.path.join(cache_dir, "agent_performance.journal")
         self.data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._journal: Optional[AppendOnlyJournal] = None
         self._initialized = False
         self._pending_save = False
 
@@ -57,7 +62,22 @@ class PerformanceTracker:
         self._load_sync()
 
     def _load_sync(self):
-        """Load data synchronously from local cache."""
+        """Load data synchronously: journal snapshot + replayed deltas, else the legacy cache."""
+        try:
+            self._journal = AppendOnlyJournal(self.journal_path, compact_after_records=500)
+            state, records = self._journal.replay()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to open performance journal: {e}")
+            self._journal = None
+            state, records = None, []
+
+        if state is not None or records:
+            self.data = state or {}
+            for record in records:
+                self.data.setdefault(record["agent_id"], {})[record["symbol"]] = record["stats"]
+            logger.info(f"📊 Replayed performance journal: {len(self.data)} agents")
+            return
+
         if os.path.exists(self.cache_path):
             try:
                 with open(self.cache_path, "r") as f:
@@ -71,6 +91,9 @@ class PerformanceTracker:
         else:
             self.data = {}
 
+        if self._journal and self.data:
+            self._journal.write_snapshot(self.data)  # Migrate the legacy cache
+
     async def initialize(self):
         """
         Async initialization - loads from GCS on startup.
@@ -108,12 +131,20 @@ class PerformanceTracker:
 
         self._initialized = True
 
-    def _save(self):
-        """Save performance data to local cache and queue GCS sync."""
+    def _save(self, agent_id: Optional[str] = None, symbol: Optional[str] = None):
+        """Journal the changed symbol stats (or snapshot everything) and queue GCS sync."""
         try:
-            # Save to local cache immediately
-            with open(self.cache_path, "w") as f:
-                json.dump(self.data, f, indent=2, default=str)
+            if self._journal is None:
+                with open(self.cache_path, "w") as f:
+                    json.dump(self.data, f, default=str)
+            elif agent_id is not None and symbol is not None:
+                self._journal.append(
+                    {"agent_id": agent_id, "symbol": symbol, "stats": self.data[agent_id][symbol]}
+                )
+                if self._journal.needs_compaction:
+                    self._journal.write_snapshot(self.data)
+            else:
+                self._journal.write_snapshot(self.data)
 
             # Schedule async GCS save
             if self.use_gcs:
@@ -172,7 +203,7 @@ class PerformanceTracker:
         stats["trade_count"] = stats["wins"] + stats["losses"]
         stats["last_trade"] = datetime.now().isoformat()
 
-        self._save()
+        self._save(agent_id, symbol)
 
         # Log significant trades
         win_rate = self.get_symbol_win_rate(agent_id, symbol)
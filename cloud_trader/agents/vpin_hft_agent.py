@@ -3,16 +3,17 @@ import math
 import statistics
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
 from ..time_sync import get_precision_clock, get_timestamp_us
+from ..vpin_engine import VPINEngine
 
 try:
-    import numpy as np
     from sklearn.ensemble import RandomForestClassifier
     from sklearn.preprocessing import StandardScaler
 
     ML_AVAILABLE = True
 except ImportError:
-    np = None
     RandomForestClassifier = None
     StandardScaler = None
     ML_AVAILABLE = False
@@ -45,6 +46,9 @@ class VpinHFTAgent:
         self.base_bucket_size = 1000  # Base volume bucket size
         self.volatility_multiplier = 1.0
 
+        # Volume-synchronized VPIN over streamed trade batches (all symbols at once)
+        self.vpin_engine = VPINEngine()
+
     def calculate_vpin(self, tick_data_batch: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Calculates VPIN from tick data batch with microsecond-precision timing.
@@ -61,28 +65,20 @@ class VpinHFTAgent:
                 "confidence": 0.0,
             }
 
-        buy_volume = 0.0
-        sell_volume = 0.0
-        total_volume = 0.0
-        microsecond_deltas = []
-
-        for tick in tick_data_batch:
-            price_change = tick["price"] - tick.get("prev_price", tick["price"])
-            volume = tick.get("volume", 0.0)
-            total_volume += volume
-
-            # Track microsecond timing precision
-            if "timestamp_us" in tick:
-                microsecond_deltas.append(tick["timestamp_us"])
-
-            if price_change > 0:
-                buy_volume += volume
-            elif price_change < 0:
-                sell_volume += volume
-            else:
-                # Neutral tick, split volume
-                buy_volume += volume / 2
-                sell_volume += volume / 2
+        prices = np.fromiter((tick["price"] for tick in tick_data_batch), dtype=np.float64)
+        prev_prices = np.fromiter(
+            (tick.get("prev_price", tick["price"]) for tick in tick_data_batch), dtype=np.float64
+        )
+        volumes = np.fromiter(
+            (tick.get("volume", 0.0) for tick in tick_data_batch), dtype=np.float64
+        )
+        timed = sum(1 for tick in tick_data_batch if "timestamp_us" in tick)
+
+        # Tick rule: up-ticks are buys, down-ticks sells, unchanged ticks split evenly
+        buy_share = 0.5 + 0.5 * np.sign(prices - prev_prices)
+        total_volume = float(volumes.sum())
+        buy_volume = float(volumes @ buy_share)
+        sell_volume = total_volume - buy_volume
 
         if total_volume == 0:
             return {
@@ -96,9 +92,7 @@ class VpinHFTAgent:
         vpin = (volume_imbalance / total_volume) * math.sqrt(len(tick_data_batch))
 
         # Calculate confidence based on timing precision and sample size
-        timing_precision = (
-            len(microsecond_deltas) / len(tick_data_batch) if microsecond_deltas else 0
-        )
+        timing_precision = timed / len(tick_data_batch)
         confidence = min(1.0, (len(tick_data_batch) / 50.0) * timing_precision)
 
         return {
@@ -118,67 +112,107 @@ class VpinHFTAgent:
         ML-based trade direction classification using neural network approach.
         Returns: 1 for buy, -1 for sell, 0 for neutral
         """
+        return int(self.ml_classify_trade_directions([tick], market_context)[0])
+
+    def ml_classify_trade_directions(
+        self, ticks: List[Dict[str, Any]], market_context: Dict[str, Any]
+    ) -> np.ndarray:
+        """
+        Classify a whole batch of ticks with one scaler/classifier call.
+        Returns an int array of 1 (buy), -1 (sell) or 0 (neutral) per tick.
+        """
+        if not ticks:
+            return np.zeros(0, dtype=np.int64)
         if not ML_AVAILABLE or not self.ml_classifier:
             # Fallback to basic classification
-            return self._basic_trade_classification(tick)
+            return self._basic_trade_classifications(ticks)
 
         try:
-            # Extract features for ML classification
-            features = self._extract_trade_features(tick, market_context)
-            features_scaled = self.scaler.transform([features])
-            prediction = self.ml_classifier.predict(features_scaled)[0]
+            # One feature matrix, one transform and one predict for the batch
+            features = self._extract_trade_feature_matrix(ticks, market_context)
+            predictions = np.asarray(
+                self.ml_classifier.predict(self.scaler.transform(features)), dtype=np.int64
+            )
 
             # Store for training feedback
-            self.classification_history.append(
+            now = get_timestamp_us()
+            self.classification_history.extend(
                 {
-                    "features": features,
-                    "prediction": prediction,
+                    "features": row,
+                    "prediction": int(prediction),
                     "actual": tick.get("direction", 0),  # Ground truth if available
-                    "timestamp": get_timestamp_us(),
+                    "timestamp": now,
                 }
+                for row, prediction, tick in zip(features.tolist(), predictions, ticks)
             )
 
-            return int(prediction)
+            return predictions
 
         except Exception as e:
             # Fallback on error
-            return self._basic_trade_classification(tick)
+            return self._basic_trade_classifications(ticks)
 
     def _basic_trade_classification(self, tick: Dict[str, Any]) -> int:
         """Basic rule-based trade classification."""
-        price_change = tick.get("price", 0) - tick.get("prev_price", tick.get("price", 0))
-        volume = tick.get("volume", 0)
+        return int(self._basic_trade_classifications([tick])[0])
 
-        if abs(price_change) < 0.0001:  # Neutral tick
-            return 0
-        elif price_change > 0:
-            return 1  # Buy
-        else:
-            return -1  # Sell
+    def _basic_trade_classifications(self, ticks: List[Dict[str, Any]]) -> np.ndarray:
+        """Rule-based classification of a batch: sign of the price change, 0 when flat."""
+        prices = np.fromiter((tick.get("price", 0) for tick in ticks), dtype=np.float64)
+        prev_prices = np.fromiter(
+            (tick.get("prev_price", tick.get("price", 0)) for tick in ticks), dtype=np.float64
+        )
+        change = prices - prev_prices
+        return np.where(np.abs(change) < 0.0001, 0, np.sign(change)).astype(np.int64)
 
     def _extract_trade_features(
         self, tick: Dict[str, Any], market_context: Dict[str, Any]
     ) -> List[float]:
         """Extract features for ML classification."""
-        return [
-            tick.get("price", 0),
-            tick.get("volume", 0),
-            tick.get("price", 0) - tick.get("prev_price", tick.get("price", 0)),  # Price change
-            market_context.get("bid_ask_spread", 0),
-            market_context.get("order_book_depth", 0),
-            market_context.get("recent_volatility", 0),
-            tick.get("timestamp_us", 0) % 86400000000,  # Time of day in microseconds
-        ]
-
-    def calculate_quote_imbalance(self, order_book: Dict[str, Any]) -> Dict[str, Any]:
+        return self._extract_trade_feature_matrix([tick], market_context)[0].tolist()
+
+    def _extract_trade_feature_matrix(
+        self, ticks: List[Dict[str, Any]], market_context: Dict[str, Any]
+    ) -> np.ndarray:
+        """Feature matrix (one row per tick) for ML classification."""
+        features = np.empty((len(ticks), 7))
+        features[:, 0] = [tick.get("price", 0) for tick in ticks]
+        features[:, 1] = [tick.get("volume", 0) for tick in ticks]
+        features[:, 2] = features[:, 0] - np.fromiter(  # Price change
+            (tick.get("prev_price", tick.get("price", 0)) for tick in ticks), dtype=np.float64
+        )
+        features[:, 3] = market_context.get("bid_ask_spread", 0)
+        features[:, 4] = market_context.get("order_book_depth", 0)
+        features[:, 5] = market_context.get("recent_volatility", 0)
+        # Time of day in microseconds
+        features[:, 6] = [tick.get("timestamp_us", 0) % 86400000000 for tick in ticks]
+        return features
+
+    def process_trade_batches(self, batches: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Volume-synchronized VPIN for many symbols at once.
+
+        ``batches`` maps symbol to ``TRADE_DTYPE`` arrays or tick dicts, e.g. the
+        ``{"symbol", "batch"}`` payloads of ``VPINDataStreamer`` collected per symbol.
+        """
+        results = self.vpin_engine.update_many(batches)
+        return {symbol: result.to_dict() for symbol, result in results.items()}
+
+    def calculate_quote_imbalance(self, order_book: Any) -> Dict[str, Any]:
         """
         Calculate Quote Imbalance metric.
         QI = (BidVolume - AskVolume) / (BidVolume + AskVolume)
+
+        ``order_book`` is either a dict of ``{"volume": ...}`` levels or a
+        ``LocalOrderBook`` kept in sync from the depth stream.
         """
-        bid_volume = sum(
-            level["volume"] for level in order_book.get("bids", [])[:5]
-        )  # Top 5 levels
-        ask_volume = sum(level["volume"] for level in order_book.get("asks", [])[:5])
+        if hasattr(order_book, "top_volumes"):
+            bid_volume, ask_volume = order_book.top_volumes(5)  # Top 5 levels
+        else:
+            bid_volume = sum(
+                level["volume"] for level in order_book.get("bids", [])[:5]
+            )  # Top 5 levels
+            ask_volume = sum(level["volume"] for level in order_book.get("asks", [])[:5])
 
         total_volume = bid_volume + ask_volume
         if total_volume == 0:
@@ -226,13 +260,11 @@ class VpinHFTAgent:
                 "timestamp_us": get_timestamp_us(),
             }
 
-        # Calculate empirical CDF
-        sorted_values = sorted(self.vpin_cdf_history)
-        cdf_value = sum(1 for x in sorted_values if x <= vpin_value) / len(sorted_values)
-
-        # Calculate z-score
-        mean = statistics.mean(self.vpin_cdf_history)
-        stdev = statistics.stdev(self.vpin_cdf_history) if len(self.vpin_cdf_history) > 1 else 1.0
+        # Empirical CDF and z-score in one pass over the history array
+        history = np.asarray(self.vpin_cdf_history, dtype=np.float64)
+        cdf_value = float(np.count_nonzero(history <= vpin_value)) / len(history)
+        mean = float(history.mean())
+        stdev = float(history.std(ddof=1))
         z_score = (vpin_value - mean) / stdev if stdev > 0 else 0.0
 
         return {
@@ -16,11 +16,19 @@ logger = logging.getLogger(__name__)
 
 
 class AnalysisEngine:
-    def __init__(self, exchange_client, feature_pipeline, swarm_manager, grok_manager=None):
+    def __init__(
+        self,
+        exchange_client,
+        feature_pipeline,
+        swarm_manager,
+        grok_manager=None,
+        ticker_book=None,
+    ):
         self.exchange_client = exchange_client
         self.feature_pipeline = feature_pipeline
         self.swarm_manager = swarm_manager
         self.grok_manager = grok_manager
+        self.ticker_book = ticker_book
 
     async def analyze_market(
         self, agent: MinimalAgentState, symbol: str, ticker_map: Dict[str, Any] = None
@@ -37,9 +45,12 @@ class AnalysisEngine:
         print(f"DEBUG: AnalysisEngine analyzing {symbol} for {agent.id}")
         try:
             # 1. Fetch market data
+            ticker = None
             if ticker_map and symbol in ticker_map:
                 ticker = ticker_map[symbol]
-            else:
+            elif self.ticker_book is not None and not self.ticker_book.is_stale:
+                ticker = self.ticker_book.get(symbol)
+            if ticker is None:
                 ticker = await self.exchange_client.get_ticker(symbol)
 
             if not ticker:
@@ -985,23 +985,30 @@ async def get_anomaly_stats() -> Dict[str, Any]:
 
 
 @app.get("/market-regime")
-async def get_market_regime() -> Dict[str, Any]:
-    """Get current market regime analysis."""
+async def get_market_regime(symbol: Optional[str] = None) -> Dict[str, Any]:
+    """Get current market regime analysis (per symbol when ``symbol`` is given)."""
     try:
-        from .market_regime import get_market_regime_detector
+        from .market_regime import get_market_regime_detector, get_regime_engine
+
+        # Served from the streaming engine's latest state; nothing is recomputed here
+        engine = get_regime_engine()
+        if symbol:
+            metrics = engine.get_metrics(symbol)
+            return {
+                "status": "active" if metrics else "warming_up",
+                "symbol": symbol,
+                "regime": metrics.to_dict() if metrics else None,
+                "regime_stats": engine.get_stats(symbol),
+                "timestamp_us": int(time.time() * 1_000_000),
+            }
 
         detector = await get_market_regime_detector()
         stats = detector.get_market_regime_stats()
 
-        # Get current regime if available
-        current_regime = None
-        if hasattr(trading_service, "_regime_detector") and trading_service._regime_detector:
-            # This would be populated by trading loop - for now return stats
-            pass
-
         return {
             "status": "active",
             "regime_stats": stats,
+            "symbol_regimes": engine.get_regimes(),
             "timestamp_us": int(time.time() * 1_000_000),
         }
     except Exception as e:
@@ -2133,7 +2140,11 @@ async def add_multitimeframe_data(request: Dict[str, Any]) -> Dict[str, Any]:
             indicators=request.get("indicators", {}),
         )
 
-        analyzer.add_market_data(data)
+        if timeframe == Timeframe.ONE_MINUTE:
+            # 1m bars are the base stream: also roll them up into every higher timeframe
+            analyzer.add_base_bar(data)
+        else:
+            analyzer.add_market_data(data)
 
         return {
             "status": "success",
@@ -2283,26 +2294,26 @@ async def stop_options():
 
 
 @app.get("/dashboard")
-async def dashboard() -> Dict[str, object]:
-    """Get comprehensive dashboard data"""
-    from fastapi.responses import JSONResponse
+async def dashboard(request: Request, since: Optional[str] = None) -> Dict[str, object]:
+    """
+    Get comprehensive dashboard data.
 
-    try:
-        import asyncio
+    Served from the service's materialized view: a matching ``If-None-Match``
+    gets 304, and ``?since=<ETag>`` gets the JSON patch from that ETag's version
+    when it is from the running process and still retained (the full document
+    otherwise).
+    """
+    from fastapi.responses import JSONResponse, Response
 
-        # Add timeout to prevent hanging
-        data = await asyncio.wait_for(trading_service.dashboard_snapshot(), timeout=10.0)
-        response = JSONResponse(content=data)
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        return response
-    except asyncio.TimeoutError:
-        logger.error("Dashboard snapshot timed out after 10 seconds")
-        response = JSONResponse(
-            content={"error": "Dashboard snapshot request timed out"}, status_code=504
-        )
+    try:
+        view = trading_service.dashboard_view()
+        status_code, body, media_type = view.respond(request.headers.get("if-none-match"), since)
+        response = Response(content=body, status_code=status_code, media_type=media_type)
+        response.headers["ETag"] = view.etag
+        response.headers["Cache-Control"] = "no-cache"
         response.headers["Access-Control-Allow-Origin"] = "*"
         response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.headers["Access-Control-Expose-Headers"] = "ETag"
         return response
     except Exception as exc:  # pragma: no cover - defensive logging
         logger.exception("Failed to build dashboard snapshot: %s", exc)
@@ -3,5 +3,14 @@
 from .agents import BacktestAgent
 from .data_loader import BacktestDataLoader
 from .engine import BacktestEngine, BacktestResults
+from .vectorized import MarketArrays, RuleBacktestAgent, VectorizedBacktestEngine
 
-__all__ = ["BacktestEngine", "BacktestResults", "BacktestDataLoader", "BacktestAgent"]
+__all__ = [
+    "BacktestEngine",
+    "BacktestResults",
+    "BacktestDataLoader",
+    "BacktestAgent",
+    "MarketArrays",
+    "RuleBacktestAgent",
+    "VectorizedBacktestEngine",
+]
@@ -7,21 +7,48 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
 import pandas as pd
-from google.cloud import bigquery
+
+try:
+    from google.cloud import bigquery
+except ImportError:
+    bigquery = None
 
 from ..config import Settings, get_settings
+from ..data.candle_store import interval_to_ms
+from ..data.history_store import HistoryStore
 
 logger = logging.getLogger(__name__)
 
 
+def _epoch_ms(value: datetime) -> int:
+    """Epoch milliseconds of a datetime (naive = UTC, as BigQuery reads it)."""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.timestamp() * 1000)
+
+
 class BacktestDataLoader:
     """Loads historical market data from BigQuery for backtesting."""
 
-    def __init__(self, settings: Optional[Settings] = None):
+    def __init__(
+        self,
+        settings: Optional[Settings] = None,
+        history_store: Optional[HistoryStore] = None,
+        allow_synthetic_data: bool = True,
+    ):
         self._settings = settings or get_settings()
-        self._bq_client: Optional[bigquery.Client] = None
+        self._bq_client: Optional["bigquery.Client"] = None
+        # Local partitioned history; consulted before BigQuery and filled from it
+        if history_store is None:
+            try:
+                history_store = HistoryStore(self._settings.market_history_dir)
+            except RuntimeError as e:
+                logger.info(f"Local market history disabled: {e}")
+        self._history_store = history_store
+        self._allow_synthetic_data = allow_synthetic_data
 
-        if self._settings.gcp_project_id:
+        if self._settings.gcp_project_id and bigquery is not None:
             try:
                 self._bq_client = bigquery.Client(project=self._settings.gcp_project_id)
                 logger.info("BigQuery client initialized for backtest data loading")
@@ -99,19 +126,32 @@ class BacktestDataLoader:
         end_date: datetime,
         interval: str = "1h",
     ) -> pd.DataFrame:
-        """Load historical market data (OHLCV) from BigQuery or exchange API.
+        """Load historical market data (OHLCV).
 
-        Note: This is a placeholder - in production, you would:
-        1. Query BigQuery market_data_stream table if available
-        2. Fall back to exchange API historical candles
-        3. Or use cached data from Redis
+        Order: complete local history store, then BigQuery market_data_stream
+        (rolled up into ``interval`` bars and written through to the store), then
+        partial local history, then synthetic data when ``allow_synthetic_data``
+        is set.
         """
+        # Exclusive upper bound that still includes a bar opening exactly at end_date
+        end_exclusive = end_date + timedelta(milliseconds=1)
+        if self._history_store is not None and self._history_store.is_complete(
+            symbol, interval, start_date, end_exclusive
+        ):
+            df = self._history_store.read_frame(symbol, interval, start_date, end_exclusive)
+            logger.info(f"Loaded {len(df)} market data points for {symbol} from local history")
+            return df
+
         if not self._bq_client:
-            logger.warning("BigQuery client not available, generating synthetic data")
-            return self._generate_synthetic_data(symbol, start_date, end_date, interval)
+            logger.warning("BigQuery client not available")
+            return self._fallback_data(symbol, start_date, end_date, interval)
 
         try:
-            # Try to load from BigQuery market_data_stream table
+            # market_data_stream holds snapshots, not bars: read one bar past the one
+            # opening at end_date, so rows after it show that bar is complete
+            step = interval_to_ms(interval)
+            start_ms = _epoch_ms(start_date)
+            end_ms = (_epoch_ms(end_date) // step + 1) * step
             query = f"""
             SELECT
                 TIMESTAMP(timestamp) as timestamp,
@@ -122,13 +162,22 @@ class BacktestDataLoader:
                 close,
                 volume
             FROM `{self._settings.gcp_project_id}.trading_analytics.market_data_stream`
-            WHERE symbol = '{symbol.upper()}'
-              AND TIMESTAMP(timestamp) >= TIMESTAMP('{start_date.isoformat()}')
-              AND TIMESTAMP(timestamp) <= TIMESTAMP('{end_date.isoformat()}')
+            WHERE symbol = @symbol
+              AND TIMESTAMP(timestamp) >= @start_date
+              AND TIMESTAMP(timestamp) < @end_date
             ORDER BY timestamp ASC
             """
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[
+                    bigquery.ScalarQueryParameter("symbol", "STRING", symbol.upper()),
+                    bigquery.ScalarQueryParameter("start_date", "TIMESTAMP", start_date),
+                    bigquery.ScalarQueryParameter(
+                        "end_date", "TIMESTAMP", pd.Timestamp(end_ms + step, unit="ms", tz="UTC")
+                    ),
+                ]
+            )
 
-            query_job = self._bq_client.query(query)
+            query_job = self._bq_client.query(query, job_config=job_config)
             results = query_job.result()
 
             rows = []
@@ -145,21 +194,94 @@ class BacktestDataLoader:
                     }
                 )
 
-            if rows:
-                df = pd.DataFrame(rows)
-                df.set_index("timestamp", inplace=True)
-                logger.info(f"Loaded {len(df)} market data points for {symbol}")
+            df = self._to_bars(symbol, interval, rows, start_ms, end_ms) if rows else None
+            if df is not None and not df.empty:
+                logger.info(
+                    f"Loaded {len(df)} {interval} bars for {symbol} from {len(rows)} stream rows"
+                )
+                self._store_history(symbol, interval, df)
                 return df
             else:
-                # Fall back to synthetic data if no data in BigQuery
-                logger.warning(f"No market data in BigQuery for {symbol}, generating synthetic")
-                return self._generate_synthetic_data(symbol, start_date, end_date, interval)
+                logger.warning(f"No market data in BigQuery for {symbol}")
+                return self._fallback_data(symbol, start_date, end_date, interval)
 
         except Exception as e:
-            logger.warning(
-                f"Failed to load market data from BigQuery for {symbol}: {e}, generating synthetic"
+            logger.warning(f"Failed to load market data from BigQuery for {symbol}: {e}")
+            return self._fallback_data(symbol, start_date, end_date, interval)
+
+    @staticmethod
+    def _to_bars(
+        symbol: str,
+        interval: str,
+        rows: List[Dict],
+        start_ms: int,
+        end_ms: int,
+    ) -> pd.DataFrame:
+        """
+        Roll market_data_stream rows up into ``interval`` OHLCV bars.
+
+        Only bars inside ``[start_ms, end_ms)`` that are followed by a later row are
+        kept; the last bar may be cut short (or still open) and would otherwise be
+        stored as complete.
+        """
+        step = interval_to_ms(interval)
+        df = pd.DataFrame(rows)
+        index = pd.DatetimeIndex(df["timestamp"])
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        open_ms = index.values.astype("datetime64[ms]").astype("int64")
+        frame = df[["open", "high", "low", "close", "volume"]].astype(float)
+        frame["bucket"] = open_ms // step * step
+        bars = frame.groupby("bucket").agg(  # Rows arrive in timestamp order
+            open=("open", "first"),
+            high=("high", "max"),
+            low=("low", "min"),
+            close=("close", "last"),
+            volume=("volume", "sum"),
+        )
+        last_complete = min(end_ms, int(frame["bucket"].max()))
+        keep = (bars.index >= start_ms) & (bars.index + step <= last_complete)
+        bars = bars[keep]
+        bars.index = pd.to_datetime(bars.index, unit="ms")
+        bars.index.name = "timestamp"
+        bars.insert(0, "symbol", symbol.upper())
+        return bars
+
+    def _store_history(self, symbol: str, interval: str, df: pd.DataFrame) -> None:
+        """Write BigQuery bars through to the local history store."""
+        if self._history_store is None:
+            return
+        try:
+            index = pd.DatetimeIndex(df.index)
+            if index.tz is not None:
+                index = index.tz_convert("UTC").tz_localize(None)
+            open_ms = index.values.astype("datetime64[ms]").astype("int64")
+            values = df[["open", "high", "low", "close", "volume"]].to_numpy(dtype=float)
+            klines = [[int(t), *row] for t, row in zip(open_ms, values.tolist())]
+            self._history_store.write_klines(symbol, interval, klines)
+        except Exception as e:
+            logger.warning(f"Failed to cache market data for {symbol} locally: {e}")
+
+    def _fallback_data(
+        self,
+        symbol: str,
+        start_date: datetime,
+        end_date: datetime,
+        interval: str,
+    ) -> pd.DataFrame:
+        """Partial local history, then synthetic data (if allowed) when nothing better exists."""
+        if self._history_store is not None:
+            df = self._history_store.read_frame(
+                symbol, interval, start_date, end_date + timedelta(milliseconds=1)
             )
-            return self._generate_synthetic_data(symbol, start_date, end_date, interval)
+            if not df.empty:
+                logger.warning(f"Using incomplete local history for {symbol} ({len(df)} bars)")
+                return df
+        if not self._allow_synthetic_data:
+            logger.warning(f"No market data for {symbol}; synthetic data disabled")
+            return pd.DataFrame()
+        logger.warning(f"Generating synthetic market data for {symbol}")
+        return self._generate_synthetic_data(symbol, start_date, end_date, interval)
 
     def _generate_synthetic_data(
         self,
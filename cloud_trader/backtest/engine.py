@@ -12,7 +12,7 @@ from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 import pandas as pd
 
-from ..service import AGENT_DEFINITIONS
+from ..definitions import AGENT_DEFINITIONS
 from .agents import BacktestAgent, BacktestAgentDecision, create_backtest_agent
 from .data_loader import BacktestDataLoader
 
@@ -46,6 +46,19 @@ class BacktestResults:
     timestamp: datetime = field(default_factory=datetime.utcnow)
 
 
+def backtest_agent_config(agent_def: Dict[str, Any]) -> Dict[str, Any]:
+    """Create a backtest agent config from an AGENT_DEFINITIONS entry."""
+    return {
+        "baseline_win_rate": agent_def.get("baseline_win_rate", 0.5),
+        "risk_multiplier": agent_def.get("risk_multiplier", 1.0),
+        "profit_target": agent_def.get("profit_target", 0.01),
+        "margin_allocation": agent_def.get("margin_allocation", 500.0),
+        "min_position_size_pct": agent_def.get("min_position_size_pct", 0.005),
+        "max_position_size_pct": agent_def.get("max_position_size_pct", 0.08),
+        "stop_loss": agent_def.get("profit_target", 0.01) * 0.5,  # SL at 50% of TP
+    }
+
+
 class BacktestEngine:
     """Backtesting engine for simulating trading strategies on historical data."""
 
@@ -64,17 +77,7 @@ class BacktestEngine:
         for agent_def in AGENT_DEFINITIONS:
             agent_id = agent_def["id"]
             agent_type = agent_def["id"]
-
-            # Create agent config from definition
-            agent_config = {
-                "baseline_win_rate": agent_def.get("baseline_win_rate", 0.5),
-                "risk_multiplier": agent_def.get("risk_multiplier", 1.0),
-                "profit_target": agent_def.get("profit_target", 0.01),
-                "margin_allocation": agent_def.get("margin_allocation", 500.0),
-                "min_position_size_pct": agent_def.get("min_position_size_pct", 0.005),
-                "max_position_size_pct": agent_def.get("max_position_size_pct", 0.08),
-                "stop_loss": agent_def.get("profit_target", 0.01) * 0.5,  # SL at 50% of TP
-            }
+            agent_config = backtest_agent_config(agent_def)
 
             agent = create_backtest_agent(agent_id, agent_type, agent_config)
             self.agents[agent_id] = agent
@@ -345,7 +348,6 @@ class BacktestEngine:
             change_24h = ((current_price - past_price) / past_price) * 100
 
         return MarketSnapshot(
-            symbol=symbol,
             price=row["close"],
             volume=row["volume"],
             change_24h=change_24h,
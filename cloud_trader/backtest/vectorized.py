@@ -0,0 +1,602 @@
+"""Vectorized multi-symbol backtest engine.
+
+Aligned OHLCV is held as contiguous ``(time, symbol)`` NumPy arrays, indicators
+are computed in bulk per symbol column, and agent entry rules are evaluated as
+array operations over the whole grid. The remaining path-dependent part of the
+simulation (capital, concurrent positions) only visits bars where something can
+happen: each position's exit bar is found with one forward array scan when it
+is opened, and the event loop jumps from entry bar to exit bar.
+
+The loop-based ``BacktestEngine`` is the reference implementation; with
+``RuleBacktestAgent`` it evaluates the same rules bar-by-bar, which is what the
+parity tests compare against.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..definitions import AGENT_DEFINITIONS
+from ..strategies import StrategySignal
+from ..strategy import MarketSnapshot
+from .agents import BacktestAgent, BacktestAgentDecision
+from .data_loader import BacktestDataLoader
+from .engine import BacktestEngine, BacktestResults, backtest_agent_config
+
+logger = logging.getLogger(__name__)
+
+# Mirrors BacktestEngine: history window handed to agents and the 24h lookback
+HISTORY_WINDOW = 30
+CHANGE_LOOKBACK = 24
+
+DIRECTIONS = {1: "BUY", -1: "SELL"}
+
+
+@dataclass
+class MarketArrays:
+    """Aligned OHLCV as ``(time, symbol)`` float64 arrays; NaN where a symbol has no bar."""
+
+    timestamps: pd.DatetimeIndex
+    symbols: List[str]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    @classmethod
+    def from_frames(cls, market_data: Dict[str, pd.DataFrame]) -> "MarketArrays":
+        symbols = list(market_data)
+        index = pd.DatetimeIndex([])
+        for df in market_data.values():
+            index = index.union(pd.DatetimeIndex(df.index))
+        index = index.sort_values()
+        columns = {}
+        for field in ("open", "high", "low", "close", "volume"):
+            grid = np.full((len(index), len(symbols)), np.nan, dtype=np.float64)
+            for j, symbol in enumerate(symbols):
+                grid[:, j] = market_data[symbol][field].reindex(index).to_numpy(dtype=np.float64)
+            columns[field] = grid
+        return cls(timestamps=index, symbols=symbols, **columns)
+
+    @property
+    def timestamps_ns(self) -> np.ndarray:
+        """Epoch nanoseconds (UTC) regardless of the index's datetime unit."""
+        return np.asarray(self.timestamps.values, dtype="datetime64[ns]").view(np.int64)
+
+    @property
+    def present(self) -> np.ndarray:
+        return ~np.isnan(self.close)
+
+
+def _rolling(values: np.ndarray, window: int, func: str) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+    view = np.lib.stride_tricks.sliding_window_view(values, window)
+    if func == "mean":
+        out[window - 1 :] = view.mean(axis=1)
+    else:
+        out[window - 1 :] = view.std(axis=1, ddof=1)
+    return out
+
+
+class IndicatorArrays:
+    """
+    Bulk indicators on the same ``(time, symbol)`` grid as ``MarketArrays``.
+
+    Rolling windows run over each symbol's own bars (gaps in the aligned grid
+    are skipped, as in the per-symbol history the loop engine hands to agents)
+    and are cached per (field, window, func) so rules can share them.
+    """
+
+    def __init__(self, arrays: MarketArrays):
+        self.close = arrays.close
+        self.volume = arrays.volume
+        shape = arrays.close.shape
+        # Grid rows where each symbol has a bar
+        self.rows = [np.flatnonzero(~np.isnan(arrays.close[:, j])) for j in range(shape[1])]
+        self._cache: Dict[Tuple[str, int, str], np.ndarray] = {}
+
+        # Percent change vs 23 bars back; 0.0 until 24 bars of history (as the loop engine)
+        self.change_24h = np.zeros(shape)
+        # Rows available in the agent history window
+        self.history = np.zeros(shape)
+        for j, rows in enumerate(self.rows):
+            n = len(rows)
+            self.history[rows, j] = np.minimum(np.arange(1, n + 1), HISTORY_WINDOW)
+            if n >= CHANGE_LOOKBACK:
+                closes = self.close[rows, j]
+                past = closes[: n - CHANGE_LOOKBACK + 1]
+                self.change_24h[rows[CHANGE_LOOKBACK - 1 :], j] = (
+                    (closes[CHANGE_LOOKBACK - 1 :] - past) / past
+                ) * 100
+
+    def rolling(self, field: str, window: int, func: str = "mean") -> np.ndarray:
+        """Rolling ``mean``/``std`` (ddof=1) of ``field``; NaN until ``window`` bars."""
+        key = (field, window, func)
+        if key not in self._cache:
+            source = getattr(self, field)
+            out = np.full(source.shape, np.nan)
+            for j, rows in enumerate(self.rows):
+                out[rows, j] = _rolling(source[rows, j], window, func)
+            self._cache[key] = out
+        return self._cache[key]
+
+
+class BollingerReversionRule:
+    """Deterministic form of ``MeanReversionStrategy`` (no cache, no AI)."""
+
+    name = "MeanReversion"
+
+    def __init__(self, period: int = 20, num_std: float = 2.0):
+        if period > HISTORY_WINDOW:
+            raise ValueError(f"period must be <= {HISTORY_WINDOW} (agent history window)")
+        self.period = period
+        self.num_std = num_std
+
+    def signals(self, ind: IndicatorArrays) -> Tuple[np.ndarray, np.ndarray]:
+        sma = ind.rolling("close", self.period, "mean")
+        std = ind.rolling("close", self.period, "std")
+        upper = sma + self.num_std * std
+        lower = sma - self.num_std * std
+        with np.errstate(invalid="ignore", divide="ignore"):
+            buy = ind.close < lower
+            sell = ind.close > upper
+            deviation = np.abs(ind.close - sma) / sma
+        direction = np.where(buy, 1, np.where(sell, -1, 0)).astype(np.int8)
+        confidence = np.where(direction != 0, np.minimum(deviation * 2, 0.8), 0.0)
+        return direction, confidence
+
+    def evaluate_bar(self, snapshot: MarketSnapshot, historical: pd.DataFrame) -> Tuple[str, float]:
+        if len(historical) < self.period:
+            return "HOLD", 0.0
+        closes = historical["close"].to_numpy(dtype=np.float64)[-self.period :]
+        sma = closes.mean()
+        std = closes.std(ddof=1)
+        price = snapshot.price
+        if price < sma - self.num_std * std:
+            return "BUY", min((sma - price) / sma * 2, 0.8)
+        if price > sma + self.num_std * std:
+            return "SELL", min((price - sma) / sma * 2, 0.8)
+        return "HOLD", 0.0
+
+
+class MomentumRule:
+    """``MomentumStrategy`` with a rolling volume average for the surge check."""
+
+    name = "Momentum"
+
+    def __init__(self, threshold: float = 0.3, volume_window: int = 24, volume_surge: float = 1.5):
+        if volume_window > HISTORY_WINDOW:
+            raise ValueError(f"volume_window must be <= {HISTORY_WINDOW} (agent history window)")
+        self.threshold_pct = threshold * 100
+        self.volume_window = volume_window
+        self.volume_surge = volume_surge
+
+    def signals(self, ind: IndicatorArrays) -> Tuple[np.ndarray, np.ndarray]:
+        with np.errstate(invalid="ignore"):
+            active = (np.abs(ind.change_24h) >= self.threshold_pct) & (
+                ind.volume > ind.rolling("volume", self.volume_window) * self.volume_surge
+            )
+        direction = np.where(active, np.sign(ind.change_24h), 0).astype(np.int8)
+        confidence = np.where(active, np.minimum(np.abs(ind.change_24h) / 100, 0.9), 0.0)
+        return direction, confidence
+
+    def evaluate_bar(self, snapshot: MarketSnapshot, historical: pd.DataFrame) -> Tuple[str, float]:
+        if len(historical) < self.volume_window:
+            return "HOLD", 0.0
+        volume_ma = historical["volume"].to_numpy(dtype=np.float64)[-self.volume_window :].mean()
+        change = snapshot.change_24h
+        if abs(change) >= self.threshold_pct and snapshot.volume > volume_ma * self.volume_surge:
+            return ("BUY" if change > 0 else "SELL"), min(abs(change) / 100, 0.9)
+        return "HOLD", 0.0
+
+
+def default_rules() -> List[Any]:
+    return [BollingerReversionRule(), MomentumRule()]
+
+
+def _position_size_pct(config: Dict[str, Any], confidence: Any, change_24h: Any) -> Any:
+    """Array form of ``BacktestAgent._calculate_position_size``."""
+    base_size = config.get("max_position_size_pct", 0.08)
+    min_size = config.get("min_position_size_pct", 0.005)
+    confidence_multiplier = np.minimum(confidence / 0.7, 1.5)
+    volatility_multiplier = np.maximum(0.5, 1.0 - np.abs(change_24h) / 0.1)
+    size = base_size * confidence_multiplier * volatility_multiplier
+    return np.maximum(min_size, np.minimum(size, base_size))
+
+
+class RuleBacktestAgent(BacktestAgent):
+    """Loop-engine agent that evaluates vectorizable rules one bar at a time."""
+
+    def __init__(
+        self,
+        agent_id: str,
+        agent_type: str,
+        config: Dict[str, Any],
+        rules: Optional[Sequence[Any]] = None,
+    ):
+        super().__init__(agent_id, agent_type, config)
+        self.rules = list(rules) if rules is not None else default_rules()
+
+    async def evaluate(
+        self,
+        symbol: str,
+        timestamp: datetime,
+        market_snapshot: MarketSnapshot,
+        historical_data: pd.DataFrame,
+    ) -> Optional[BacktestAgentDecision]:
+        best: Optional[Tuple[str, float, str]] = None
+        for rule in self.rules:
+            direction, confidence = rule.evaluate_bar(market_snapshot, historical_data)
+            if direction != "HOLD" and (best is None or confidence > best[1]):
+                best = (direction, confidence, rule.name)
+        if best is None or best[1] < 0.6:
+            return None
+
+        direction, confidence, rule_name = best
+        signal = StrategySignal(
+            strategy_name=rule_name,
+            symbol=symbol,
+            direction=direction,
+            confidence=confidence,
+            position_size=0.0,
+            reasoning=f"{rule_name} rule",
+            metadata={},
+        )
+        return BacktestAgentDecision(
+            timestamp=timestamp,
+            symbol=symbol,
+            agent_id=self.agent_id,
+            agent_type=self.agent_type,
+            signal=signal,
+            confidence=confidence,
+            position_size_pct=self._calculate_position_size(confidence, market_snapshot.change_24h),
+            take_profit_pct=self.config.get("profit_target", 0.01),
+            stop_loss_pct=self.config.get("stop_loss", 0.005),
+        )
+
+
+@dataclass
+class _Position:
+    seq: int
+    symbol_idx: int
+    side: int
+    entry_idx: int
+    entry_price: float
+    quantity: float
+    notional: float
+    agent_idx: int
+    take_profit_pct: float
+    stop_loss_pct: float
+    exit_idx: Optional[int] = None
+    exit_reason: Optional[str] = None
+
+    def pnl_abs(self, price: float) -> float:
+        if self.side > 0:
+            return (price - self.entry_price) * self.quantity
+        return (self.entry_price - price) * self.quantity
+
+    def pnl_pct(self, price: float) -> float:
+        if self.side > 0:
+            return (price - self.entry_price) / self.entry_price
+        return (self.entry_price - price) / self.entry_price
+
+
+class VectorizedBacktestEngine(BacktestEngine):
+    """
+    Array-based equivalent of ``BacktestEngine`` for the vectorizable rules.
+
+    Entry/exit semantics (one position per symbol, entries after exits on the
+    same bar, TP/SL/24h exits on close, 10% margin debit, max-position check
+    once per bar) follow the reference engine so results are directly comparable.
+    """
+
+    def __init__(
+        self,
+        initial_capital: float = 10000.0,
+        data_loader: Optional[BacktestDataLoader] = None,
+        rules: Optional[Sequence[Any]] = None,
+        agent_rules: Optional[Dict[str, Sequence[Any]]] = None,
+        max_positions: int = 5,
+        min_confidence: float = 0.6,
+        time_exit_seconds: float = 86400.0,
+    ):
+        self.rules = list(rules) if rules is not None else default_rules()
+        self.agent_rules = dict(agent_rules or {})
+        self.max_positions = max_positions
+        self.min_confidence = min_confidence
+        self.time_exit_seconds = time_exit_seconds
+        self.agent_configs: Dict[str, Dict[str, Any]] = {}
+        super().__init__(initial_capital=initial_capital, data_loader=data_loader)
+
+    def _initialize_agents(self) -> None:
+        for agent_def in AGENT_DEFINITIONS:
+            self.agent_configs[agent_def["id"]] = backtest_agent_config(agent_def)
+
+    def create_reference_agents(self) -> Dict[str, RuleBacktestAgent]:
+        """Loop-engine agents evaluating the same rules, for parity runs."""
+        return {
+            agent_id: RuleBacktestAgent(
+                agent_id, agent_id, config, self.agent_rules.get(agent_id, self.rules)
+            )
+            for agent_id, config in self.agent_configs.items()
+        }
+
+    async def run_backtest(
+        self,
+        symbols: List[str],
+        start_date: datetime,
+        end_date: datetime,
+        interval: str = "1h",
+    ) -> BacktestResults:
+        """Load history for ``symbols`` and run the vectorized simulation."""
+        market_data: Dict[str, pd.DataFrame] = {}
+        for symbol in symbols:
+            data = await self.data_loader.load_market_data(
+                symbol=symbol,
+                start_date=start_date,
+                end_date=end_date,
+                interval=interval,
+            )
+            if data is not None and not data.empty:
+                market_data[symbol] = data
+
+        run_id = str(uuid.uuid4())
+        if not market_data:
+            logger.error("No market data loaded for backtesting")
+            return self._calculate_results(
+                run_id=run_id,
+                start_date=start_date,
+                end_date=end_date,
+                initial_capital=self.initial_capital,
+                final_capital=self.initial_capital,
+                equity_curve=[],
+                closed_trades=[],
+            )
+
+        return self.run_arrays(
+            MarketArrays.from_frames(market_data), start_date, end_date, run_id=run_id
+        )
+
+    def _entry_signals(
+        self, ind: IndicatorArrays
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Best agent decision per bar/symbol: (confidence, direction, agent index, size pct)."""
+        shape = ind.close.shape
+        best_conf = np.zeros(shape)
+        best_dir = np.zeros(shape, dtype=np.int8)
+        best_agent = np.full(shape, -1, dtype=np.int32)
+        best_size = np.zeros(shape)
+
+        rule_cache: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        for agent_idx, (agent_id, config) in enumerate(self.agent_configs.items()):
+            rules = self.agent_rules.get(agent_id, self.rules)
+            conf = np.zeros(shape)
+            direction = np.zeros(shape, dtype=np.int8)
+            for rule in rules:
+                if id(rule) not in rule_cache:
+                    rule_cache[id(rule)] = rule.signals(ind)
+                rule_dir, rule_conf = rule_cache[id(rule)]
+                better = (rule_dir != 0) & (rule_conf > conf)
+                conf = np.where(better, rule_conf, conf)
+                direction = np.where(better, rule_dir, direction)
+
+            # An agent only speaks above the confidence floor; ties keep the earlier agent
+            wins = (direction != 0) & (conf >= self.min_confidence) & (conf > best_conf)
+            best_conf = np.where(wins, conf, best_conf)
+            best_dir = np.where(wins, direction, best_dir)
+            best_agent = np.where(wins, agent_idx, best_agent)
+            best_size = np.where(wins, _position_size_pct(config, conf, ind.change_24h), best_size)
+
+        return best_conf, best_dir, best_agent, best_size
+
+    def _find_exit(
+        self,
+        position: _Position,
+        columns: np.ndarray,
+        rows: List[np.ndarray],
+        ts_ns: np.ndarray,
+    ) -> None:
+        """Scan forward once from entry for the first TP/SL/time-exit bar."""
+        j = position.symbol_idx
+        start = position.entry_idx + 1
+        deadline = np.searchsorted(
+            ts_ns, ts_ns[position.entry_idx] + int(self.time_exit_seconds * 1e9), side="right"
+        )
+        # First bar at/after the deadline where this symbol trades ends the scan
+        k = np.searchsorted(rows[j], deadline)
+        timed_out = k < len(rows[j])
+        stop = int(rows[j][k]) + 1 if timed_out else len(ts_ns)
+
+        closes = columns[j, start:stop]
+        if not len(closes):
+            return
+        if position.side > 0:
+            pnl = (closes - position.entry_price) / position.entry_price
+        else:
+            pnl = (position.entry_price - closes) / position.entry_price
+        with np.errstate(invalid="ignore"):
+            tp = pnl >= position.take_profit_pct
+            sl = pnl <= -position.stop_loss_pct
+        timed = np.zeros(len(closes), dtype=bool)
+        timed[-1] = timed_out
+        hit = tp | sl | timed
+        if not hit.any():
+            return
+        k = int(np.argmax(hit))
+        position.exit_idx = start + k
+        position.exit_reason = "take_profit" if tp[k] else "stop_loss" if sl[k] else "time_exit"
+
+    def _trade_record(
+        self,
+        position: _Position,
+        arrays: MarketArrays,
+        exit_price: float,
+        exit_time: Any,
+        exit_reason: str,
+        agent_ids: List[str],
+    ) -> Dict[str, Any]:
+        return {
+            "symbol": arrays.symbols[position.symbol_idx],
+            "side": DIRECTIONS[position.side],
+            "entry_price": position.entry_price,
+            "exit_price": exit_price,
+            "entry_time": arrays.timestamps[position.entry_idx],
+            "exit_time": exit_time,
+            "quantity": position.quantity,
+            "notional": position.notional,
+            "pnl_abs": position.pnl_abs(exit_price),
+            "pnl_pct": position.pnl_pct(exit_price),
+            "agent_id": agent_ids[position.agent_idx],
+            "exit_reason": exit_reason,
+        }
+
+    def run_arrays(
+        self,
+        arrays: MarketArrays,
+        start_date: datetime,
+        end_date: datetime,
+        run_id: Optional[str] = None,
+    ) -> BacktestResults:
+        """Run the simulation on pre-aligned arrays."""
+        run_id = run_id or str(uuid.uuid4())
+        n_bars, n_symbols = arrays.close.shape
+        ts_ns = arrays.timestamps_ns
+        agent_ids = list(self.agent_configs)
+
+        ind = IndicatorArrays(arrays)
+        columns = np.ascontiguousarray(arrays.close.T)  # symbol-major for forward scans
+        _, best_dir, best_agent, best_size = self._entry_signals(ind)
+        entry_bars = np.flatnonzero((best_dir != 0).any(axis=1))
+
+        capital = self.initial_capital
+        capital_marks: List[Tuple[int, float]] = []
+        open_positions: Dict[int, _Position] = {}  # symbol index -> position, entry order
+        exits: List[Tuple[int, int, int]] = []  # heap of (exit bar, seq, symbol index)
+        all_positions: List[_Position] = []
+        closed_trades: List[Dict[str, Any]] = []
+        seq = 0
+        next_entry = 0
+
+        while True:
+            candidates = []
+            if next_entry < len(entry_bars):
+                candidates.append(int(entry_bars[next_entry]))
+            if exits:
+                candidates.append(exits[0][0])
+            if not candidates:
+                break
+            t = min(candidates)
+
+            while exits and exits[0][0] == t:
+                _, _, j = heapq.heappop(exits)
+                position = open_positions.pop(j)
+                exit_price = float(arrays.close[t, j])
+                capital += position.pnl_abs(exit_price)
+                closed_trades.append(
+                    self._trade_record(
+                        position,
+                        arrays,
+                        exit_price,
+                        arrays.timestamps[t],
+                        position.exit_reason,
+                        agent_ids,
+                    )
+                )
+
+            if next_entry < len(entry_bars) and entry_bars[next_entry] == t:
+                next_entry += 1
+                if len(open_positions) < self.max_positions:
+                    for j in np.flatnonzero(best_dir[t] != 0):
+                        j = int(j)
+                        if j in open_positions:
+                            continue
+                        price = float(arrays.close[t, j])
+                        position_size = capital * float(best_size[t, j])
+                        position = _Position(
+                            seq=seq,
+                            symbol_idx=j,
+                            side=int(best_dir[t, j]),
+                            entry_idx=t,
+                            entry_price=price,
+                            quantity=position_size / price,
+                            notional=position_size,
+                            agent_idx=int(best_agent[t, j]),
+                            take_profit_pct=self.agent_configs[
+                                agent_ids[int(best_agent[t, j])]
+                            ].get("profit_target", 0.01),
+                            stop_loss_pct=self.agent_configs[agent_ids[int(best_agent[t, j])]].get(
+                                "stop_loss", 0.005
+                            ),
+                        )
+                        seq += 1
+                        capital -= position_size * 0.1  # 10% margin requirement
+                        self._find_exit(position, columns, ind.rows, ts_ns)
+                        open_positions[j] = position
+                        all_positions.append(position)
+                        if position.exit_idx is not None:
+                            heapq.heappush(exits, (position.exit_idx, position.seq, j))
+
+            capital_marks.append((t, capital))
+
+        equity = self._equity_curve(arrays, capital_marks, all_positions)
+
+        last = n_bars - 1
+        for j, position in list(open_positions.items()):
+            if np.isnan(arrays.close[last, j]):
+                continue
+            exit_price = float(arrays.close[last, j])
+            capital += position.pnl_abs(exit_price)
+            closed_trades.append(
+                self._trade_record(
+                    position, arrays, exit_price, end_date, "end_of_backtest", agent_ids
+                )
+            )
+
+        results = self._calculate_results(
+            run_id=run_id,
+            start_date=start_date,
+            end_date=end_date,
+            initial_capital=self.initial_capital,
+            final_capital=capital,
+            equity_curve=equity,
+            closed_trades=closed_trades,
+        )
+        logger.info(
+            f"Vectorized backtest {run_id} completed: {results.total_return:.2%} return, "
+            f"{results.total_trades} trades over {n_bars} bars x {n_symbols} symbols"
+        )
+        return results
+
+    def _equity_curve(
+        self,
+        arrays: MarketArrays,
+        capital_marks: List[Tuple[int, float]],
+        positions: List[_Position],
+    ) -> List[float]:
+        n_bars = arrays.close.shape[0]
+        capital = np.full(n_bars, self.initial_capital)
+        if capital_marks:
+            mark_bars = np.array([t for t, _ in capital_marks])
+            mark_values = np.array([value for _, value in capital_marks])
+            latest = np.searchsorted(mark_bars, np.arange(n_bars), side="right") - 1
+            capital = np.where(latest >= 0, mark_values[np.maximum(latest, 0)], capital)
+
+        unrealized = np.zeros(n_bars)
+        for position in positions:
+            end = position.exit_idx if position.exit_idx is not None else n_bars
+            closes = arrays.close[position.entry_idx : end, position.symbol_idx]
+            pnl = (closes - position.entry_price) * position.quantity * position.side
+            unrealized[position.entry_idx : end] += np.nan_to_num(pnl)
+
+        return [self.initial_capital] + (capital + unrealized).tolist()
@@ -2,10 +2,16 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import os
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
 
 try:
     from google.cloud import bigquery
@@ -21,16 +27,222 @@ except ImportError:
 
 
 from .config import Settings, get_settings
+from .metrics import (
+    BIGQUERY_FLUSH_LATENCY,
+    BIGQUERY_QUEUE_DEPTH,
+    BIGQUERY_ROWS_DROPPED,
+    BIGQUERY_ROWS_SPILLED,
+    BIGQUERY_ROWS_WRITTEN,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _json_safe(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Serialize datetimes so rows are valid for ``insert_rows_json`` and the spill file."""
+    return {
+        key: value.isoformat() if isinstance(value, (datetime, date)) else value
+        for key, value in row.items()
+    }
+
+
+class BatchedRowWriter:
+    """Per-table row buffers flushed to BigQuery in batches from a background thread.
+
+    ``enqueue`` never touches the network: it appends to a bounded in-memory
+    queue and returns. The flush thread inserts a batch when a queue reaches
+    ``max_batch_rows`` or every ``flush_interval_seconds``. Rows that do not fit
+    in the queue, or whose batch insert fails, are appended to a JSONL spill
+    file that is replayed on the next ``start``.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        table_ids: Dict[str, str],
+        max_batch_rows: int = 500,
+        flush_interval_seconds: float = 2.0,
+        max_queue_rows: int = 20000,
+        spill_path: Optional[str] = None,
+    ):
+        self._client = client
+        self._table_ids = dict(table_ids)
+        self.max_batch_rows = max_batch_rows
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_queue_rows = max_queue_rows
+        self.spill_path = Path(spill_path) if spill_path else None
+
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = {key: deque() for key in table_ids}
+        self._table_refs: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._spill_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.stats = {"enqueued": 0, "written": 0, "spilled": 0, "dropped": 0, "flushes": 0}
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._replay_spill()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="bigquery-batch-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, table_key: str, row: Dict[str, Any]) -> bool:
+        """Buffer one row; returns False only if it had to be dropped."""
+        with self._lock:
+            queue = self._queues[table_key]
+            if len(queue) < self.max_queue_rows:
+                queue.append(row)
+                self.stats["enqueued"] += 1
+                BIGQUERY_QUEUE_DEPTH.labels(table=table_key).set(len(queue))
+                if len(queue) >= self.max_batch_rows:
+                    self._wakeup.notify()
+                return True
+        # Backpressure: keep the row on disk rather than growing memory or blocking
+        return self._spill(table_key, [row], reason="overflow")
+
+    def queue_depth(self, table_key: Optional[str] = None) -> int:
+        with self._lock:
+            if table_key is not None:
+                return len(self._queues[table_key])
+            return sum(len(q) for q in self._queues.values())
+
+    def flush(self, full_batches_only: bool = False) -> None:
+        """Synchronously insert what is buffered (only complete batches if asked)."""
+        for table_key in self._table_ids:
+            while True:
+                batch = self._take_batch(table_key, full_batches_only)
+                if not batch:
+                    break
+                self._insert_batch(table_key, batch)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stop the flush thread, insert what is buffered and spill anything left."""
+        thread = self._thread
+        if thread is not None:
+            with self._lock:
+                self._stopping = True
+                self._wakeup.notify()
+            thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        next_deadline = time.monotonic() + self.flush_interval_seconds
+        while True:
+            with self._lock:
+                remaining = next_deadline - time.monotonic()
+                if not self._stopping and remaining > 0 and not self._has_full_batch():
+                    self._wakeup.wait(remaining)
+                if self._stopping:
+                    return
+            interval_due = time.monotonic() >= next_deadline
+            try:
+                # Size-triggered wakeups ship full batches; the timer drains the remainder
+                self.flush(full_batches_only=not interval_due)
+            except Exception as exc:  # Never let the writer thread die
+                logger.warning(f"BigQuery batch flush failed: {exc}")
+            if interval_due:
+                next_deadline = time.monotonic() + self.flush_interval_seconds
+
+    def _has_full_batch(self) -> bool:
+        return any(len(q) >= self.max_batch_rows for q in self._queues.values())
+
+    def _take_batch(self, table_key: str, full_only: bool = False) -> List[Dict[str, Any]]:
+        with self._lock:
+            queue = self._queues[table_key]
+            if full_only and len(queue) < self.max_batch_rows:
+                return []
+            batch = [queue.popleft() for _ in range(min(len(queue), self.max_batch_rows))]
+            BIGQUERY_QUEUE_DEPTH.labels(table=table_key).set(len(queue))
+        return batch
+
+    def _table_ref(self, table_key: str) -> Any:
+        ref = self._table_refs.get(table_key)
+        if ref is None:
+            ref = self._client.get_table(self._table_ids[table_key])
+            self._table_refs[table_key] = ref
+        return ref
+
+    def _insert_batch(self, table_key: str, rows: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            errors = self._client.insert_rows_json(self._table_ref(table_key), rows)
+        except Exception as exc:
+            logger.warning(
+                f"BigQuery insert into {table_key} failed, spilling {len(rows)} rows: {exc}"
+            )
+            self._table_refs.pop(table_key, None)  # Re-resolve in case the table was recreated
+            self._spill(table_key, rows, reason="flush_error")
+            return
+        finally:
+            BIGQUERY_FLUSH_LATENCY.labels(table=table_key).observe(time.perf_counter() - started)
+
+        self.stats["flushes"] += 1
+        rejected = len(errors or [])
+        if rejected:
+            # Row-level rejections are schema/data problems; retrying them would loop forever
+            logger.warning(f"BigQuery rejected {rejected} rows in {table_key}: {errors[:3]}")
+            self.stats["dropped"] += rejected
+            BIGQUERY_ROWS_DROPPED.labels(table=table_key, reason="rejected").inc(rejected)
+        written = len(rows) - rejected
+        self.stats["written"] += written
+        BIGQUERY_ROWS_WRITTEN.labels(table=table_key).inc(written)
+
+    def _spill(self, table_key: str, rows: List[Dict[str, Any]], reason: str) -> bool:
+        if self.spill_path is None:
+            self.stats["dropped"] += len(rows)
+            BIGQUERY_ROWS_DROPPED.labels(table=table_key, reason=reason).inc(len(rows))
+            return False
+        try:
+            with self._spill_lock:
+                self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.spill_path, "a", encoding="utf-8") as handle:
+                    for row in rows:
+                        handle.write(json.dumps({"table": table_key, "row": row}, default=str))
+                        handle.write("\n")
+        except OSError as exc:
+            logger.error(f"Failed to spill {len(rows)} BigQuery rows for {table_key}: {exc}")
+            self.stats["dropped"] += len(rows)
+            BIGQUERY_ROWS_DROPPED.labels(table=table_key, reason=reason).inc(len(rows))
+            return False
+        self.stats["spilled"] += len(rows)
+        BIGQUERY_ROWS_SPILLED.labels(table=table_key, reason=reason).inc(len(rows))
+        return True
+
+    def _replay_spill(self) -> int:
+        """Move rows from a previous run's spill file back into the queues."""
+        if self.spill_path is None or not self.spill_path.exists():
+            return 0
+        replay_path = self.spill_path.with_suffix(self.spill_path.suffix + ".replay")
+        with self._spill_lock:
+            os.replace(self.spill_path, replay_path)  # Overflow during replay goes to a fresh file
+
+        replayed = 0
+        with open(replay_path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn final line from a crash mid-write
+                if record.get("table") in self._queues:
+                    self.enqueue(record["table"], record["row"])
+                    replayed += 1
+        replay_path.unlink()
+        if replayed:
+            logger.info(f"Replayed {replayed} spilled BigQuery rows")
+        return replayed
+
+
 class BigQueryStreamer:
     """Stream trading data to BigQuery for analytics."""
 
-    def __init__(self, settings: Optional[Settings] = None):
+    def __init__(self, settings: Optional[Settings] = None, client: Any = None):
         self._settings = settings or get_settings()
-        self._client: Optional[bigquery.Client] = None
+        self._client: Optional[bigquery.Client] = client
+        self._writer: Optional[BatchedRowWriter] = None
         self._initialized = False
         self._project_id = self._settings.gcp_project_id
         self._dataset_id = "trading_analytics"
@@ -54,6 +266,12 @@ class BigQueryStreamer:
             return
 
         try:
+            if self._client is not None:
+                # Injected client (tests, local emulators): dataset is managed by the caller
+                self._start_writer()
+                self._initialized = True
+                return
+
             self._client = bigquery.Client(project=self._project_id)
 
             # Ensure dataset exists
@@ -71,12 +289,34 @@ class BigQueryStreamer:
             # Ensure tables exist
             await self._ensure_tables()
 
+            self._start_writer()
             self._initialized = True
             logger.info("BigQuery streaming initialized")
         except Exception as e:
             logger.error(f"Failed to initialize BigQuery streaming: {e}")
             self._client = None
 
+    def _start_writer(self) -> None:
+        settings = self._settings
+        self._writer = BatchedRowWriter(
+            self._client,
+            {
+                key: f"{self._project_id}.{self._dataset_id}.{table_id}"
+                for key, table_id in self._tables.items()
+            },
+            max_batch_rows=settings.bigquery_batch_rows,
+            flush_interval_seconds=settings.bigquery_flush_interval_seconds,
+            max_queue_rows=settings.bigquery_max_queue_rows,
+            spill_path=settings.bigquery_spill_path,
+        )
+        self._writer.start()
+
+    async def _insert_row(self, table_key: str, row: Dict[str, Any]) -> bool:
+        """Hand a row to the batch writer; never blocks on the network."""
+        if self._writer is None:
+            return False
+        return self._writer.enqueue(table_key, _json_safe(row))
+
     async def _ensure_tables(self) -> None:
         """Create tables if they don't exist."""
         if not self._client:
@@ -269,39 +509,27 @@ class BigQueryStreamer:
         metadata: Optional[Dict[str, Any]] = None,
     ) -> bool:
         """Stream a trade to BigQuery."""
-        if not self._initialized or not self._client:
+        if not self.is_ready():
             return False
 
-        try:
-            table_id = self._tables["trades"]
-            table_ref = self._client.get_table(f"{self._project_id}.{self._dataset_id}.{table_id}")
-
-            row = {
-                "timestamp": (timestamp or datetime.utcnow()).isoformat(),
-                "symbol": symbol.upper(),
-                "side": side.upper(),
-                "price": price,
-                "quantity": quantity,
-                "notional": notional,
-                "agent_id": agent_id,
-                "agent_model": agent_model,
-                "strategy": strategy,
-                "order_id": order_id,
-                "fee": fee,
-                "slippage_bps": slippage_bps,
-                "mode": mode or "live",
-                "metadata": json.dumps(metadata) if metadata else None,
-            }
-
-            errors = self._client.insert_rows_json(table_ref, [row])
-            if errors:
-                logger.warning(f"BigQuery insert errors: {errors}")
-                return False
-
-            return True
-        except Exception as e:
-            logger.warning(f"Failed to stream trade to BigQuery: {e}")
-            return False
+        row = {
+            "timestamp": (timestamp or datetime.utcnow()).isoformat(),
+            "symbol": symbol.upper(),
+            "side": side.upper(),
+            "price": price,
+            "quantity": quantity,
+            "notional": notional,
+            "agent_id": agent_id,
+            "agent_model": agent_model,
+            "strategy": strategy,
+            "order_id": order_id,
+            "fee": fee,
+            "slippage_bps": slippage_bps,
+            "mode": mode or "live",
+            "metadata": json.dumps(metadata) if metadata else None,
+        }
+
+        return await self._insert_row("trades", row)
 
     async def stream_position(
         self,
@@ -320,38 +548,26 @@ class BigQueryStreamer:
         metadata: Optional[Dict[str, Any]] = None,
     ) -> bool:
         """Stream a position snapshot to BigQuery."""
-        if not self._initialized or not self._client:
+        if not self.is_ready():
             return False
 
-        try:
-            table_id = self._tables["positions"]
-            table_ref = self._client.get_table(f"{self._project_id}.{self._dataset_id}.{table_id}")
-
-            row = {
-                "timestamp": timestamp.isoformat(),
-                "symbol": symbol.upper(),
-                "agent_id": agent_id,
-                "side": side.upper(),
-                "size": size,
-                "entry_price": entry_price,
-                "current_price": current_price,
-                "notional": notional,
-                "unrealized_pnl": unrealized_pnl,
-                "unrealized_pnl_pct": unrealized_pnl_pct,
-                "leverage": leverage,
-                "status": status,
-                "metadata": json.dumps(metadata) if metadata else None,
-            }
-
-            errors = self._client.insert_rows_json(table_ref, [row])
-            if errors:
-                logger.warning(f"BigQuery insert errors: {errors}")
-                return False
-
-            return True
-        except Exception as e:
-            logger.warning(f"Failed to stream position to BigQuery: {e}")
-            return False
+        row = {
+            "timestamp": timestamp.isoformat(),
+            "symbol": symbol.upper(),
+            "agent_id": agent_id,
+            "side": side.upper(),
+            "size": size,
+            "entry_price": entry_price,
+            "current_price": current_price,
+            "notional": notional,
+            "unrealized_pnl": unrealized_pnl,
+            "unrealized_pnl_pct": unrealized_pnl_pct,
+            "leverage": leverage,
+            "status": status,
+            "metadata": json.dumps(metadata) if metadata else None,
+        }
+
+        return await self._insert_row("positions", row)
 
     async def stream_market_data(
         self,
@@ -367,35 +583,23 @@ class BigQueryStreamer:
         metadata: Optional[Dict[str, Any]] = None,
     ) -> bool:
         """Stream market data to BigQuery."""
-        if not self._initialized or not self._client:
+        if not self.is_ready():
             return False
 
-        try:
-            table_id = self._tables["market_data"]
-            table_ref = self._client.get_table(f"{self._project_id}.{self._dataset_id}.{table_id}")
-
-            row = {
-                "timestamp": timestamp.isoformat(),
-                "symbol": symbol.upper(),
-                "price": price,
-                "volume_24h": volume_24h,
-                "change_24h": change_24h,
-                "high_24h": high_24h,
-                "low_24h": low_24h,
-                "funding_rate": funding_rate,
-                "open_interest": open_interest,
-                "metadata": json.dumps(metadata) if metadata else None,
-            }
-
-            errors = self._client.insert_rows_json(table_ref, [row])
-            if errors:
-                logger.warning(f"BigQuery insert errors: {errors}")
-                return False
-
-            return True
-        except Exception as e:
-            logger.warning(f"Failed to stream market data to BigQuery: {e}")
-            return False
+        row = {
+            "timestamp": timestamp.isoformat(),
+            "symbol": symbol.upper(),
+            "price": price,
+            "volume_24h": volume_24h,
+            "change_24h": change_24h,
+            "high_24h": high_24h,
+            "low_24h": low_24h,
+            "funding_rate": funding_rate,
+            "open_interest": open_interest,
+            "metadata": json.dumps(metadata) if metadata else None,
+        }
+
+        return await self._insert_row("market_data", row)
 
     async def stream_agent_performance(
         self,
@@ -412,36 +616,24 @@ class BigQueryStreamer:
         metadata: Optional[Dict[str, Any]] = None,
     ) -> bool:
         """Stream agent performance to BigQuery."""
-        if not self._initialized or not self._client:
+        if not self.is_ready():
             return False
 
-        try:
-            table_id = self._tables["agent_performance"]
-            table_ref = self._client.get_table(f"{self._project_id}.{self._dataset_id}.{table_id}")
-
-            row = {
-                "timestamp": timestamp.isoformat(),
-                "agent_id": agent_id,
-                "total_trades": total_trades,
-                "total_pnl": total_pnl,
-                "exposure": exposure,
-                "equity": equity,
-                "win_rate": win_rate,
-                "sharpe_ratio": sharpe_ratio,
-                "max_drawdown": max_drawdown,
-                "active_positions": active_positions,
-                "metadata": json.dumps(metadata) if metadata else None,
-            }
-
-            errors = self._client.insert_rows_json(table_ref, [row])
-            if errors:
-                logger.warning(f"BigQuery insert errors: {errors}")
-                return False
-
-            return True
-        except Exception as e:
-            logger.warning(f"Failed to stream agent performance to BigQuery: {e}")
-            return False
+        row = {
+            "timestamp": timestamp.isoformat(),
+            "agent_id": agent_id,
+            "total_trades": total_trades,
+            "total_pnl": total_pnl,
+            "exposure": exposure,
+            "equity": equity,
+            "win_rate": win_rate,
+            "sharpe_ratio": sharpe_ratio,
+            "max_drawdown": max_drawdown,
+            "active_positions": active_positions,
+            "metadata": json.dumps(metadata) if metadata else None,
+        }
+
+        return await self._insert_row("agent_performance", row)
 
     async def stream_liquidity_update(
         self,
@@ -622,7 +814,10 @@ class BigQueryStreamer:
         return await self._insert_row("strategy_discussions", row)
 
     async def close(self) -> None:
-        """Close BigQuery client."""
+        """Flush buffered rows and close the BigQuery client."""
+        if self._writer is not None:
+            await asyncio.to_thread(self._writer.close)
+            self._writer = None
         if self._client:
             self._client.close()
         self._initialized = False
@@ -631,6 +826,15 @@ class BigQueryStreamer:
     def is_ready(self) -> bool:
         return self._initialized and self._client is not None
 
+    def get_stats(self) -> Dict[str, Any]:
+        if self._writer is None:
+            return {"ready": False}
+        return {
+            "ready": self.is_ready(),
+            "queued": self._writer.queue_depth(),
+            **self._writer.stats,
+        }
+
 
 # Global streamer instance
 _streamer: Optional[BigQueryStreamer] = None
@@ -3,14 +3,22 @@
 from __future__ import annotations
 
 import asyncio
+import heapq
 import json
 import logging
+import math
 import pickle
+import sys
 import time
+import uuid
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from enum import Enum
 from fnmatch import fnmatch
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import orjson
 
 try:  # pragma: no cover - optional dependency
     import redis.asyncio as redis
@@ -116,6 +124,28 @@ class BaseCache(ABC):
         }
         return await self.set(key, payload, self.ttls["market_snapshot"])
 
+    async def get_market_snapshots(self, symbols: Iterable[str]) -> Dict[str, MarketSnapshot]:
+        """Cached snapshots for many symbols in one ``get_many`` round trip."""
+        keys = {CacheKeys.MARKET_SNAPSHOT.format(symbol=symbol): symbol for symbol in symbols}
+        found = await self.get_many(keys)
+        return {
+            keys[key]: data if isinstance(data, MarketSnapshot) else MarketSnapshot(**data)
+            for key, data in found.items()
+            if data
+        }
+
+    async def set_market_snapshots(self, snapshots: Dict[str, MarketSnapshot]) -> bool:
+        payload = {
+            CacheKeys.MARKET_SNAPSHOT.format(symbol=symbol): {
+                "price": snapshot.price,
+                "volume": snapshot.volume,
+                "change_24h": snapshot.change_24h,
+                "atr": snapshot.atr,
+            }
+            for symbol, snapshot in snapshots.items()
+        }
+        return await self.set_many(payload, self.ttls["market_snapshot"])
+
     async def get_symbol_info(self, symbol: str) -> Optional[Dict[str, Any]]:
         key = CacheKeys.SYMBOL_INFO.format(symbol=symbol)
         return await self.get(key)
@@ -184,6 +214,31 @@ class BaseCache(ABC):
         key = CacheKeys.AGENT_PERFORMANCE.format(agent_id=agent_id)
         return await self.get(key)
 
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Values of the keys that are present; backends override with a batch read."""
+        keys = list(keys)
+        results = await asyncio.gather(*(self.get(key) for key in keys), return_exceptions=True)
+        return {
+            key: value
+            for key, value in zip(keys, results)
+            if value is not None and not isinstance(value, BaseException)
+        }
+
+    async def scan_keys(self, pattern: str) -> List[str]:
+        """Keys matching the glob ``pattern``; backends that can enumerate keys override this."""
+        return []
+
+    async def get_or_set(
+        self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int] = None
+    ) -> Any:
+        """Return the cached value, or compute it with ``loader`` and cache it."""
+        value = await self.get(key)
+        if value is None:
+            value = await loader()
+            if value is not None:
+                await self.set(key, value, ttl)
+        return value
+
     async def set_many(self, data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
         results = await asyncio.gather(
             *(self.set(key, value, ttl) for key, value in data.items()),
@@ -192,22 +247,98 @@ class BaseCache(ABC):
         return all(result is True for result in results)
 
 
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution."""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``factory`` once per key; concurrent callers await the same result."""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            result = await factory()
+        except BaseException as exc:
+            if isinstance(exc, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(exc)
+            raise
+        finally:
+            del self._inflight[key]
+        future.set_result(result)
+        return result
+
+
+def _approx_size(value: Any) -> int:
+    """Shallow-plus-one-level size estimate used for the byte bound."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(v) for v in value)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size")
+
+    def __init__(self, value: Any, expires_at: Optional[float], size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
 class InMemoryCache(BaseCache):
-    """Simple in-memory cache with TTL support."""
+    """
+    Bounded in-memory cache with TTL support.
+
+    Entries live in an ``OrderedDict`` kept in LRU order, so ``get`` and ``set``
+    are O(1); the least recently used entries are evicted past ``max_entries`` or
+    ``max_bytes`` (sizes are estimated with ``sizeof``). Expiry deadlines sit in a
+    min-heap that ``set`` drains as they come due, and ``get`` checks only the
+    entry it returns, so no operation scans the store.
+
+    No method awaits while touching the store, which makes each one atomic on
+    the event loop; the former ``asyncio.Lock`` only added overhead.
+    """
 
     backend = "memory"
 
-    def __init__(self, settings: Optional[Settings] = None) -> None:
+    def __init__(
+        self,
+        settings: Optional[Settings] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = _approx_size,
+    ) -> None:
         super().__init__(settings=settings)
-        self._store: Dict[str, Tuple[Any, Optional[float]]] = {}
-        self._lock = asyncio.Lock()
+        self.max_entries = max_entries or self._settings.cache_max_entries
+        self.max_bytes = max_bytes or self._settings.cache_max_bytes
+        self._sizeof = sizeof
+        self._store: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expirations": 0}
 
     async def connect(self) -> None:
         logger.info("Using in-memory cache backend")
 
     async def disconnect(self) -> None:
-        async with self._lock:
-            self._store.clear()
+        self._store.clear()
+        self._expiry_heap.clear()
+        self._bytes = 0
 
     def is_connected(self) -> bool:
         return True
@@ -216,47 +347,174 @@ class InMemoryCache(BaseCache):
         """Test connectivity to the cache backend."""
         return True  # In-memory cache is always available
 
-    def _purge_expired(self) -> None:
-        now = time.time()
-        expired = [key for key, (_, expiry) in self._store.items() if expiry and expiry <= now]
-        for key in expired:
-            self._store.pop(key, None)
+    # --- Store maintenance --------------------------------------------------------
 
-    async def get(self, key: str) -> Optional[Any]:
-        async with self._lock:
-            self._purge_expired()
+    def _remove(self, key: str) -> Optional[_Entry]:
+        entry = self._store.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def _purge_expired(self, now: float) -> None:
+        """Drop entries whose deadline has passed, oldest deadline first."""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
             entry = self._store.get(key)
-            if not entry:
-                return None
-            value, expiry = entry
-            if expiry and expiry <= time.time():
-                self._store.pop(key, None)
-                return None
-            return value
+            # Skip heap items left behind by an overwrite or delete
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(key)
+                self._stats["expirations"] += 1
+
+        if len(heap) > 2 * len(self._store) + 64:
+            # Mostly stale deadlines from rewritten keys: rebuild from live entries
+            self._expiry_heap = [
+                (entry.expires_at, key)
+                for key, entry in self._store.items()
+                if entry.expires_at is not None
+            ]
+            heapq.heapify(self._expiry_heap)
+
+    def _lookup(self, key: str, now: float) -> Optional[_Entry]:
+        entry = self._store.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        if entry.expires_at is not None and entry.expires_at <= now:
+            self._remove(key)
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return None
+        self._store.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry
+
+    def _store_value(self, key: str, value: Any, ttl: Optional[int], now: float) -> bool:
+        size = self._sizeof(value) + sys.getsizeof(key)
+        if size > self.max_bytes:
+            logger.debug("Cache value for %s (%d bytes) exceeds max_bytes", key, size)
+            self._remove(key)
+            return False
 
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        expires_at = time.time() + ttl if ttl and ttl > 0 else None
-        async with self._lock:
-            self._store[key] = (value, expires_at)
+        expires_at = now + ttl if ttl and ttl > 0 else None
+        self._remove(key)
+        self._store[key] = _Entry(value, expires_at, size)
+        self._bytes += size
+        if expires_at is not None:
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+        self._stats["sets"] += 1
+
+        while len(self._store) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._store.popitem(last=False)
+            self._bytes -= evicted.size
+            self._stats["evictions"] += 1
         return True
 
+    # --- Cache API ----------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._lookup(key, time.monotonic())
+        return entry.value if entry is not None else None
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            entry = self._lookup(key, now)
+            if entry is not None:
+                found[key] = entry.value
+        return found
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        now = time.monotonic()
+        self._purge_expired(now)
+        return self._store_value(key, value, ttl, now)
+
+    async def set_many(self, data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        now = time.monotonic()
+        self._purge_expired(now)
+        stored = [self._store_value(key, value, ttl, now) for key, value in data.items()]
+        return all(stored)
+
     async def delete(self, key: str) -> bool:
-        async with self._lock:
-            removed = self._store.pop(key, None) is not None
-        return removed
+        return self._remove(key) is not None
+
+    async def scan_keys(self, pattern: str) -> List[str]:
+        self._purge_expired(time.monotonic())
+        return [key for key in self._store if fnmatch(key, pattern)]
 
     async def clear_pattern(self, pattern: str) -> int:
-        async with self._lock:
-            self._purge_expired()
-            matched = [key for key in self._store if fnmatch(key, pattern)]
-            for key in matched:
-                self._store.pop(key, None)
+        self._purge_expired(time.monotonic())
+        matched = [key for key in self._store if fnmatch(key, pattern)]
+        for key in matched:
+            self._remove(key)
         return len(matched)
 
     async def get_stats(self) -> Optional[Dict[str, Any]]:
-        async with self._lock:
-            self._purge_expired()
-            return {"backend": "memory", "entries": len(self._store)}
+        self._purge_expired(time.monotonic())
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "backend": "memory",
+            "entries": len(self._store),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            **self._stats,
+            "hit_rate": self._stats["hits"] / max(lookups, 1),
+        }
+
+
+# Redis value encoding: one tag byte, then orjson (JSON-compatible values) or pickle.
+# Untagged values written by older releases (json text or raw pickle) still decode.
+_TAG_JSON = b"\x01"
+_TAG_PICKLE = b"\x02"
+# Types the stdlib json encoder rejected (so they were pickled and round-tripped
+# exactly) must keep going to pickle rather than come back as str/dict
+_ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def _has_flattened_types(value: Any) -> bool:
+    """True if ``value`` holds what orjson would not round-trip exactly.
+
+    That is a UUID or a plain Enum (serialized natively, so they come back as str)
+    and NaN/Infinity (written as ``null``).
+    """
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, float) and not math.isfinite(item):
+            return True
+        if isinstance(item, _JSON_SCALARS):  # Includes str/int enums, as json did
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, (uuid.UUID, Enum)):
+            return True
+    return False
+
+
+def encode_value(value: Any) -> bytes:
+    if not _has_flattened_types(value):
+        try:
+            return _TAG_JSON + orjson.dumps(value, option=_ORJSON_OPTIONS)
+        except TypeError:
+            pass
+    return _TAG_PICKLE + pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode_value(raw: bytes) -> Any:
+    tag = raw[:1]
+    if tag == _TAG_JSON:
+        return orjson.loads(raw[1:])
+    if tag == _TAG_PICKLE:
+        return pickle.loads(raw[1:])
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, TypeError, UnicodeDecodeError):
+        return pickle.loads(raw)
 
 
 class RedisCache(BaseCache):
@@ -264,12 +522,22 @@ class RedisCache(BaseCache):
 
     backend = "redis"
 
-    def __init__(self, settings: Optional[Settings] = None) -> None:
+    def __init__(self, settings: Optional[Settings] = None, client: Any = None) -> None:
         super().__init__(settings=settings)
+        self._client = client  # Pre-built client (e.g. fakeredis in tests)
         self._redis: Optional[redis.Redis] = None  # type: ignore[attr-defined]
         self._pool: Optional[ConnectionPool] = None  # type: ignore[attr-defined]
 
+    @property
+    def client(self) -> Any:
+        return self._redis
+
     async def connect(self) -> None:
+        if self._client is not None:
+            await self._client.ping()
+            self._redis = self._client
+            return
+
         if not REDIS_AVAILABLE:
             logger.warning("Redis backend requested but redis client is unavailable.")
             return
@@ -296,7 +564,7 @@ class RedisCache(BaseCache):
             self._pool = None
 
     async def disconnect(self) -> None:
-        if self._redis:
+        if self._redis and self._redis is not self._client:
             await self._redis.close()
         if self._pool:
             await self._pool.disconnect()  # type: ignore[attr-defined]
@@ -318,30 +586,97 @@ class RedisCache(BaseCache):
             return False
 
     async def get(self, key: str) -> Optional[Any]:
+        raw = await self.get_raw(key)
+        if raw is None:
+            return None
+        try:
+            return decode_value(raw)
+        except Exception as exc:
+            logger.debug("Cache decode error for %s: %s", key, exc)
+            return None
+
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        """The stored encoding of ``key`` (see ``decode_value``), or None."""
         if not self._redis:
             return None
         try:
-            value = await self._redis.get(key)
-            if value is None:
-                return None
-            try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                return pickle.loads(value)
+            return await self._redis.get(key)
         except Exception as exc:  # pragma: no cover - redis failure
             logger.debug("Cache get error for %s: %s", key, exc)
             return None
 
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """One MGET round trip for all keys."""
+        found = {}
+        for key, raw in (await self.get_many_raw(keys)).items():
+            try:
+                found[key] = decode_value(raw)
+            except Exception as exc:
+                logger.debug("Cache decode error for %s: %s", key, exc)
+        return found
+
+    async def get_many_raw(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(keys)
+        if not self._redis or not keys:
+            return {}
+        try:
+            values = await self._redis.mget(keys)
+        except Exception as exc:  # pragma: no cover - redis failure
+            logger.debug("Cache mget error: %s", exc)
+            return {}
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    async def set_many(self, data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Write every key in one pipelined round trip (MSET, or SET EX per key)."""
+        try:
+            encoded = {key: encode_value(value) for key, value in data.items()}
+        except Exception as exc:
+            logger.debug("Cache encode error: %s", exc)
+            return False
+        return await self.set_many_raw(encoded, ttl)
+
+    async def set_many_raw(self, encoded: Dict[str, bytes], ttl: Optional[int] = None) -> bool:
+        if not self._redis:
+            return False
+        if not encoded:
+            return True
+        try:
+            if ttl is not None and ttl > 0:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    for key, value in encoded.items():
+                        pipe.set(key, value, ex=ttl)
+                    await pipe.execute()
+            else:
+                await self._redis.mset(encoded)
+            return True
+        except Exception as exc:  # pragma: no cover - redis failure
+            logger.debug("Cache set_many error: %s", exc)
+            return False
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        if not self._redis or not keys:
+            return 0
+        try:
+            return int(await self._redis.delete(*keys))
+        except Exception as exc:  # pragma: no cover - redis failure
+            logger.debug("Cache delete error: %s", exc)
+            return 0
+
     async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        try:
+            serialized = encode_value(value)
+        except Exception as exc:
+            logger.debug("Cache encode error for %s: %s", key, exc)
+            return False
+        return await self.set_raw(key, serialized, ttl)
+
+    async def set_raw(self, key: str, serialized: bytes, ttl: Optional[int] = None) -> bool:
         if not self._redis:
             return False
         try:
-            try:
-                serialized = json.dumps(value)
-            except (TypeError, ValueError):
-                serialized = pickle.dumps(value)
             if ttl is not None and ttl > 0:
-                await self._redis.setex(key, ttl, serialized)
+                await self._redis.set(key, serialized, ex=ttl)
             else:
                 await self._redis.set(key, serialized)
             return True
@@ -359,6 +694,19 @@ class RedisCache(BaseCache):
             logger.debug("Cache delete error for %s: %s", key, exc)
             return False
 
+    async def scan_keys(self, pattern: str) -> List[str]:
+        """Incremental SCAN, so large keyspaces never block the server like KEYS."""
+        if not self._redis:
+            return []
+        try:
+            return [
+                key.decode() if isinstance(key, bytes) else key
+                async for key in self._redis.scan_iter(match=pattern, count=500)
+            ]
+        except Exception as exc:  # pragma: no cover - redis failure
+            logger.debug("Cache scan error for %s: %s", pattern, exc)
+            return []
+
     async def clear_pattern(self, pattern: str) -> int:
         if not self._redis:
             return 0
@@ -393,6 +741,309 @@ class RedisCache(BaseCache):
             return None
 
 
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class TieredCache(BaseCache):
+    """
+    In-process L1 (``InMemoryCache``) in front of a shared L2 (``RedisCache``).
+
+    Reads hit L1 first; L2 misses for the same key are coalesced into one
+    request, and ``get_many`` fetches everything L1 lacks in a single MGET.
+    Writes go to L2 (pipelined for ``set_many``), then L1, then a message on
+    ``INVALIDATION_CHANNEL`` tells the other replicas to drop their L1 copies.
+    L1 holds the same encoded bytes as L2 and every read decodes its own copy, so
+    callers never share (or mutate) one object and get the types any replica would.
+    L1 copies never live longer than ``l1_ttl`` seconds, which bounds staleness
+    if an invalidation is lost.
+
+    ``get_or_set`` adds stampede protection for hot keys: one loader per
+    process, and across replicas a short Redis lease (``SET NX PX``) so only
+    one replica recomputes while the others wait for its result.
+    """
+
+    backend = "tiered"
+
+    def __init__(
+        self,
+        l2: RedisCache,
+        settings: Optional[Settings] = None,
+        l1_ttl: Optional[float] = None,
+        l1_max_entries: Optional[int] = None,
+        channel: str = INVALIDATION_CHANNEL,
+        lock_timeout: float = 5.0,
+    ) -> None:
+        super().__init__(settings=settings or l2._settings)
+        self.l2 = l2
+        self.l1 = InMemoryCache(
+            settings=self._settings,
+            max_entries=l1_max_entries or self._settings.cache_l1_max_entries,
+        )
+        self.l1_ttl = self._settings.cache_l1_ttl_seconds if l1_ttl is None else l1_ttl
+        self.channel = channel
+        self.lock_timeout = lock_timeout
+        self.instance_id = uuid.uuid4().hex
+        self._flight = SingleFlight()
+        self._pubsub: Any = None
+        self._listener: Optional[asyncio.Task[None]] = None
+        self._stats = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "invalidations_sent": 0,
+            "invalidations_received": 0,
+        }
+
+    # --- Lifecycle ----------------------------------------------------------------
+
+    async def connect(self) -> None:
+        if not self.l2.is_connected():
+            await self.l2.connect()
+        await self.l1.connect()
+        if self.l2.is_connected() and self._listener is None:
+            await self._subscribe()
+            self._listener = asyncio.create_task(self._listen())
+            logger.info("Tiered cache: L1 in front of Redis, invalidations on %s", self.channel)
+
+    async def disconnect(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        await self._close_pubsub()
+        await self.l2.disconnect()
+        await self.l1.disconnect()
+
+    def is_connected(self) -> bool:
+        return self.l2.is_connected()
+
+    async def ping(self) -> bool:
+        return await self.l2.ping()
+
+    # --- Invalidation -------------------------------------------------------------
+
+    async def _subscribe(self) -> None:
+        self._pubsub = self.l2.client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+
+    async def _close_pubsub(self) -> None:
+        if self._pubsub is None:
+            return
+        try:
+            await self._pubsub.unsubscribe()
+            await self._pubsub.aclose()
+        except Exception as exc:  # pragma: no cover - redis failure
+            logger.debug("Error closing cache invalidation subscription: %s", exc)
+        self._pubsub = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Invalidations may have been missed: drop every L1 copy, resubscribe
+                logger.warning("Cache invalidation listener error: %s", exc)
+                await self.l1.clear_pattern("*")
+                await asyncio.sleep(1.0)
+                try:
+                    await self._close_pubsub()
+                    await self._subscribe()
+                except Exception as resubscribe_exc:
+                    logger.debug("Cache invalidation resubscribe failed: %s", resubscribe_exc)
+
+    async def _apply_invalidation(self, data: bytes) -> None:
+        payload = orjson.loads(data)
+        if payload.get("origin") == self.instance_id:
+            return
+        self._stats["invalidations_received"] += 1
+        for key in payload.get("keys", ()):
+            await self.l1.delete(key)
+        if payload.get("pattern"):
+            await self.l1.clear_pattern(payload["pattern"])
+
+    async def _publish(self, keys: Iterable[str] = (), pattern: Optional[str] = None) -> None:
+        message = {"origin": self.instance_id, "keys": list(keys)}
+        if pattern:
+            message["pattern"] = pattern
+        try:
+            await self.l2.client.publish(self.channel, orjson.dumps(message))
+            self._stats["invalidations_sent"] += 1
+        except Exception as exc:  # pragma: no cover - redis failure
+            logger.debug("Cache invalidation publish failed: %s", exc)
+
+    # --- Reads --------------------------------------------------------------------
+
+    @staticmethod
+    def _decode(key: str, raw: Optional[bytes]) -> Optional[Any]:
+        if raw is None:
+            return None
+        try:
+            return decode_value(raw)
+        except Exception as exc:
+            logger.debug("Cache decode error for %s: %s", key, exc)
+            return None
+
+    async def _fetch(self, key: str) -> Optional[bytes]:
+        raw = await self.l2.get_raw(key)
+        if raw is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["l2_hits"] += 1
+        await self.l1.set(key, raw, ttl=self.l1_ttl)
+        return raw
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.l1.get(key)
+        if raw is not None:
+            self._stats["l1_hits"] += 1
+        else:
+            raw = await self._flight.do(key, lambda: self._fetch(key))
+        return self._decode(key, raw)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        found = await self.l1.get_many(keys)
+        self._stats["l1_hits"] += len(found)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            fetched = await self.l2.get_many_raw(missing)
+            self._stats["l2_hits"] += len(fetched)
+            self._stats["misses"] += len(missing) - len(fetched)
+            if fetched:
+                await self.l1.set_many(fetched, ttl=self.l1_ttl)
+                found.update(fetched)
+        decoded = {key: self._decode(key, raw) for key, raw in found.items()}
+        return {key: value for key, value in decoded.items() if value is not None}
+
+    async def get_or_set(
+        self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int] = None
+    ) -> Any:
+        value = await self.get(key)
+        if value is not None:
+            return value
+        raw = await self._flight.do(f"load:{key}", lambda: self._load(key, loader, ttl))
+        return self._decode(key, raw)
+
+    async def _load(
+        self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int]
+    ) -> Optional[bytes]:
+        lock_key = f"lock:{key}"
+        client = self.l2.client
+        leased = False
+        try:
+            leased = bool(
+                await client.set(
+                    lock_key, self.instance_id, nx=True, px=int(self.lock_timeout * 1000)
+                )
+            )
+        except Exception as exc:  # pragma: no cover - redis failure
+            logger.debug("Cache lease error for %s: %s", key, exc)
+
+        if not leased:
+            # Another replica is computing it: wait for its write, up to the lease
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                raw = await self._fetch(key)
+                if raw is not None:
+                    return raw
+
+        try:
+            self._stats["loads"] += 1
+            value = await loader()
+            if value is None:
+                return None
+            raw = encode_value(value)
+            await self._set_raw({key: raw}, ttl)
+            return raw
+        finally:
+            if leased:
+                await self._release_lease(lock_key)
+
+    async def _release_lease(self, lock_key: str) -> None:
+        """Delete the lease only while it is still ours.
+
+        A loader that outlives ``lock_timeout`` loses the lease, and another replica
+        may hold a fresh one by now. WATCH makes GET + DELETE one compare-and-delete:
+        the transaction aborts if the lease changes hands in between.
+        """
+        try:
+            async with self.l2.client.pipeline(transaction=True) as pipe:
+                await pipe.watch(lock_key)
+                owner = await pipe.get(lock_key)
+                if isinstance(owner, bytes):
+                    owner = owner.decode()
+                if owner != self.instance_id:
+                    return
+                pipe.multi()
+                pipe.delete(lock_key)
+                await pipe.execute()
+        except Exception as exc:  # WatchError: re-taken meanwhile, so no longer ours
+            logger.debug("Cache lease release skipped for %s: %s", lock_key, exc)
+
+    # --- Writes -------------------------------------------------------------------
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        return await self.set_many({key: value}, ttl)
+
+    async def set_many(self, data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        if not data:
+            return True
+        try:
+            encoded = {key: encode_value(value) for key, value in data.items()}
+        except Exception as exc:
+            logger.debug("Cache encode error: %s", exc)
+            for key in data:
+                await self.l1.delete(key)
+            return False
+        return await self._set_raw(encoded, ttl)
+
+    async def _set_raw(self, encoded: Dict[str, bytes], ttl: Optional[int]) -> bool:
+        if len(encoded) == 1:
+            written = await self.l2.set_raw(*next(iter(encoded.items())), ttl)
+        else:
+            written = await self.l2.set_many_raw(encoded, ttl)
+        if not written:
+            for key in encoded:
+                await self.l1.delete(key)
+            return False
+        await self.l1.set_many(encoded, ttl=self._l1_ttl(ttl))
+        await self._publish(encoded.keys())
+        return True
+
+    def _l1_ttl(self, ttl: Optional[float]) -> float:
+        return min(ttl, self.l1_ttl) if ttl and ttl > 0 else self.l1_ttl
+
+    async def delete(self, key: str) -> bool:
+        removed = await self.l2.delete(key)
+        await self.l1.delete(key)
+        await self._publish([key])
+        return removed
+
+    async def scan_keys(self, pattern: str) -> List[str]:
+        return await self.l2.scan_keys(pattern)
+
+    async def clear_pattern(self, pattern: str) -> int:
+        cleared = await self.l2.clear_pattern(pattern)
+        await self.l1.clear_pattern(pattern)
+        await self._publish(pattern=pattern)
+        return cleared
+
+    async def get_stats(self) -> Optional[Dict[str, Any]]:
+        return {
+            "backend": "tiered",
+            **self._stats,
+            "coalesced": self._flight.coalesced,
+            "l1": await self.l1.get_stats(),
+            "l2": await self.l2.get_stats(),
+        }
+
+
 _cache: Optional[BaseCache] = None
 
 
@@ -412,6 +1063,9 @@ async def get_cache() -> BaseCache:
             logger.warning("Redis backend unavailable, falling back to in-memory cache.")
             cache = InMemoryCache(settings=settings)
             await cache.connect()
+        elif settings.cache_l1_ttl_seconds > 0:
+            cache = TieredCache(cache, settings=settings)
+            await cache.connect()
     else:
         cache = InMemoryCache(settings=settings)
         await cache.connect()
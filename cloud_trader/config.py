@@ -54,6 +54,80 @@ class Settings(BaseSettings):
         default="https://fapi.asterdex.com", validation_alias="ASTER_REST_URL"
     )
     ws_base_url: str = Field(default="wss://fstream.asterdex.com", validation_alias="ASTER_WS_URL")
+    enable_ticker_stream: bool = Field(
+        default=True,
+        validation_alias="ENABLE_TICKER_STREAM",
+        description="Maintain a live ticker book from websocket streams instead of REST polling",
+    )
+    aster_get_cache_ttl_seconds: float = Field(
+        default=0.5,
+        ge=0,
+        le=10,
+        validation_alias="ASTER_GET_CACHE_TTL_SECONDS",
+        description="Micro-TTL for reusing identical unsigned GET responses (0 disables)",
+    )
+    market_history_dir: str = Field(
+        default="data/history",
+        validation_alias="MARKET_HISTORY_DIR",
+        description="Root of the local partitioned market-history store",
+    )
+    aster_request_weight_per_minute: int = Field(
+        default=2400,
+        ge=1,
+        validation_alias="ASTER_REQUEST_WEIGHT_PER_MINUTE",
+        description="Request-weight budget per minute enforced by the client-side rate limiter",
+    )
+    market_structure_refresh_seconds: float = Field(
+        default=3600.0,
+        gt=0,
+        validation_alias="MARKET_STRUCTURE_REFRESH_SECONDS",
+        description="Cadence of the exchangeInfo refresh stage of the trading loop",
+    )
+    position_sync_interval_seconds: float = Field(
+        default=60.0,
+        gt=0,
+        validation_alias="POSITION_SYNC_INTERVAL_SECONDS",
+        description="Cadence of exchange position reconciliation",
+    )
+    trading_cycle_interval_seconds: float = Field(
+        default=5.0,
+        gt=0,
+        validation_alias="TRADING_CYCLE_INTERVAL_SECONDS",
+        description="Cadence of the agent trading cycle (entries, adds, re-entries)",
+    )
+    enable_depth_stream: bool = Field(
+        default=True,
+        validation_alias="ENABLE_DEPTH_STREAM",
+        description="Maintain local L2 order books from diff-depth streams for tracked symbols",
+    )
+    stream_symbols_max: int = Field(
+        default=100,
+        ge=1,
+        validation_alias="STREAM_SYMBOLS_MAX",
+        description="Most-traded symbols of the market structure given kline and depth streams",
+    )
+    stream_seed_concurrency: int = Field(
+        default=4,
+        ge=1,
+        validation_alias="STREAM_SEED_CONCURRENCY",
+        description="Concurrent REST candle seeds for symbols joining the kline streams",
+    )
+    enable_user_data_stream: bool = Field(
+        default=True,
+        validation_alias="ENABLE_USER_DATA_STREAM",
+        description="Track orders and balances from the listenKey user data stream (live only)",
+    )
+    user_stream_reconcile_seconds: float = Field(
+        default=30.0,
+        validation_alias="USER_STREAM_RECONCILE_SECONDS",
+        description="Max age of the streamed account snapshot before a REST reconciliation",
+    )
+    ticker_stale_seconds: float = Field(
+        default=10.0,
+        gt=0,
+        validation_alias="TICKER_STALE_SECONDS",
+        description="Age after which the ticker stream is stale and REST fallback is used",
+    )
 
     @field_validator("rest_base_url", "ws_base_url", "model_endpoint", "llm_endpoint")
     @classmethod
@@ -103,6 +177,28 @@ class Settings(BaseSettings):
     model_endpoint: str = Field(default="http://localhost:8000", validation_alias="MODEL_ENDPOINT")
     bot_id: str = Field(default="cloud_trader", validation_alias="BOT_ID")
     gcp_project_id: str | None = Field(default=None, validation_alias="GCP_PROJECT_ID")
+    state_journal_path: str = Field(
+        default="/tmp/logs/trading_state.journal",
+        validation_alias="STATE_JOURNAL_PATH",
+        description="Append-only journal holding recent trades and open positions",
+    )
+    bigquery_batch_rows: int = Field(
+        default=500, ge=1, le=10000, validation_alias="BIGQUERY_BATCH_ROWS"
+    )
+    bigquery_flush_interval_seconds: float = Field(
+        default=2.0, gt=0, validation_alias="BIGQUERY_FLUSH_INTERVAL_SECONDS"
+    )
+    bigquery_max_queue_rows: int = Field(
+        default=20000,
+        ge=1,
+        validation_alias="BIGQUERY_MAX_QUEUE_ROWS",
+        description="Rows buffered per table before new rows spill to disk",
+    )
+    bigquery_spill_path: str = Field(
+        default="data/bigquery_spill.jsonl",
+        validation_alias="BIGQUERY_SPILL_PATH",
+        description="Local JSONL file for rows that could not be buffered or inserted",
+    )
     orchestrator_url: str | None = Field(default=None, validation_alias="ORCHESTRATOR_URL")
     mcp_url: str | None = Field(default=None, validation_alias="MCP_URL")
     mcp_session_id: str | None = Field(default=None, validation_alias="MCP_SESSION_ID")
@@ -169,6 +265,54 @@ class Settings(BaseSettings):
         default="https://api.sapphiretrade.xyz", validation_alias="LLM_ENDPOINT"
     )
     llm_timeout_seconds: int = Field(default=30, ge=5, le=120)
+    llm_cache_enabled: bool = Field(
+        default=True,
+        validation_alias="LLM_CACHE_ENABLED",
+        description="Reuse model responses for unchanged prompts and market state",
+    )
+    llm_cache_ttl_seconds: float = Field(
+        default=60.0,
+        ge=0,
+        validation_alias="LLM_CACHE_TTL_SECONDS",
+        description="Default response cache TTL for agents without their own",
+    )
+    llm_cache_price_resolution: float = Field(
+        default=0.001,
+        gt=0,
+        lt=1,
+        validation_alias="LLM_CACHE_PRICE_RESOLUTION",
+        description="Price tick of the response cache key, as a fraction of the price",
+    )
+    llm_max_concurrency_per_model: int = Field(
+        default=4,
+        ge=1,
+        validation_alias="LLM_MAX_CONCURRENCY_PER_MODEL",
+        description="In-flight inference requests allowed per model",
+    )
+    llm_decision_budget_seconds: float = Field(
+        default=20.0,
+        gt=0,
+        validation_alias="LLM_DECISION_BUDGET_SECONDS",
+        description="Latency budget for one inference decision, hedged fallback included",
+    )
+    llm_hedge_delay_seconds: float = Field(
+        default=4.0,
+        gt=0,
+        validation_alias="LLM_HEDGE_DELAY_SECONDS",
+        description="Hedge to the fallback model after this long until a p95 is known",
+    )
+    llm_hedge_min_samples: int = Field(
+        default=20,
+        ge=1,
+        validation_alias="LLM_HEDGE_MIN_SAMPLES",
+        description="Latency samples needed before hedging at the agent's p95",
+    )
+    llm_prefetch_max_inflight: int = Field(
+        default=2,
+        ge=0,
+        validation_alias="LLM_PREFETCH_MAX_INFLIGHT",
+        description="Speculative prefetches allowed in flight (0 disables prefetch)",
+    )
 
     # Open-source analyst endpoints removed - now using Google Cloud AI
     max_position_pct: float = Field(
@@ -316,6 +460,26 @@ class Settings(BaseSettings):
         validation_alias="CACHE_BACKEND",
         description="Cache backend to use ('memory' or 'redis')",
     )
+    cache_max_entries: int = Field(
+        default=50_000,
+        validation_alias="CACHE_MAX_ENTRIES",
+        description="Entry bound of the in-memory cache before LRU eviction",
+    )
+    cache_max_bytes: int = Field(
+        default=256 * 1024 * 1024,
+        validation_alias="CACHE_MAX_BYTES",
+        description="Approximate size bound (bytes) of the in-memory cache",
+    )
+    cache_l1_ttl_seconds: float = Field(
+        default=5.0,
+        validation_alias="CACHE_L1_TTL_SECONDS",
+        description="Max lifetime of in-process copies in front of Redis (0 disables the L1)",
+    )
+    cache_l1_max_entries: int = Field(
+        default=10_000,
+        validation_alias="CACHE_L1_MAX_ENTRIES",
+        description="Entry bound of the in-process L1 in front of Redis",
+    )
     database_url: str | None = Field(
         default=None,
         validation_alias="DATABASE_URL",
@@ -0,0 +1,219 @@
+"""
+Materialized dashboard state with versioned JSON-patch deltas.
+
+The dashboard payload is kept as a document of top-level fields. Each field
+belongs to a section whose builder is rerun only when the section is
+invalidated (a fill, a position change, an agent update) or has aged past its
+``max_age``. Append-only fields such as the agent chat are maintained
+incrementally. Every change bumps ``version`` and records the RFC 6902 patch
+that produced it, so pollers can be answered with 304 or with the ops since
+their last version instead of a full rebuild. Versions restart with the
+process, so pollers name their base version by its ETag (``<epoch>-<version>``)
+and a base from another epoch gets the full document.
+"""
+
+from __future__ import annotations
+
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+
+PATCH_MEDIA_TYPE = "application/json-patch+json"
+
+
+def _pointer(*parts: Any) -> str:
+    """RFC 6901 JSON pointer for a path of keys/indices."""
+    return "".join("/" + str(p).replace("~", "~0").replace("/", "~1") for p in parts)
+
+
+@dataclass
+class _Section:
+    builder: Callable[[], Dict[str, Any]]
+    max_age: float
+    dependents: List[str] = field(default_factory=list)
+    built_at: float = 0.0
+    dirty: bool = True
+
+
+class DashboardView:
+    """
+    Versioned, incrementally maintained dashboard document.
+
+    Usage:
+        view = DashboardView()
+        view.register("positions", build_positions, max_age=1.0)
+        view.register("summary", build_summary, depends_on=("positions",))
+        view.invalidate("positions")  # From a fill or position listener
+        view.append("messages", row, maxlen=100)
+        status, body, media_type = view.respond(if_none_match, since=etag_of_last_response)
+
+    Single-threaded by design: builders run synchronously inside ``refresh`` on
+    the event loop, so concurrent requests can never rebuild the same section
+    twice.
+    """
+
+    def __init__(self, max_age: float = 1.0, history: int = 256):
+        self.max_age = max_age
+        self.version = 0
+        self._epoch = uuid.uuid4().hex[:8]  # ETags never match across restarts
+        self._document: Dict[str, Any] = {}
+        self._sections: Dict[str, _Section] = {}
+        self._patches: Deque[Tuple[int, List[Dict[str, Any]]]] = deque(maxlen=history)
+        self._pending_ops: List[Dict[str, Any]] = []
+        self._encoded: Optional[Tuple[int, bytes]] = None
+        self.stats = {"refreshes": 0, "rebuilds": 0, "not_modified": 0, "patches_served": 0}
+
+    # --- Maintenance --------------------------------------------------------------
+
+    def register(
+        self,
+        section: str,
+        builder: Callable[[], Dict[str, Any]],
+        max_age: Optional[float] = None,
+        depends_on: Sequence[str] = (),
+    ) -> None:
+        """
+        Add a section whose ``builder`` returns its top-level fields.
+
+        Sections rebuild in registration order, so a builder may read fields of
+        the sections it depends on via ``get``. ``max_age`` defaults to the view's;
+        pass ``math.inf`` for sections that change only through ``invalidate``.
+        """
+        self._sections[section] = _Section(builder, self.max_age if max_age is None else max_age)
+        for parent in depends_on:
+            self._sections[parent].dependents.append(section)
+
+    def invalidate(self, *sections: str) -> None:
+        for name in sections:
+            section = self._sections.get(name)
+            if section is not None:
+                section.dirty = True
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._document.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        """Set one field directly, recording a patch if it changed."""
+        if key in self._document:
+            if self._document[key] == value:
+                return
+            self._pending_ops.append({"op": "replace", "path": _pointer(key), "value": value})
+        else:
+            self._pending_ops.append({"op": "add", "path": _pointer(key), "value": value})
+        self._document[key] = value
+
+    def append(self, key: str, item: Any, maxlen: Optional[int] = None) -> None:
+        """Append to a list field, trimming from the front beyond ``maxlen``."""
+        items = self._document.get(key)
+        if items is None:
+            self.set(key, [item])
+            return
+        # Copy-on-write: snapshots already handed out keep their list
+        items = items + [item]
+        self._pending_ops.append({"op": "add", "path": _pointer(key, "-"), "value": item})
+        if maxlen is not None:
+            while len(items) > maxlen:
+                items.pop(0)
+                self._pending_ops.append({"op": "remove", "path": _pointer(key, 0)})
+        self._document[key] = items
+
+    def refresh(self) -> int:
+        """Rebuild dirty or stale sections and commit pending changes as one version."""
+        self.stats["refreshes"] += 1
+        now = time.monotonic()
+        for name, section in self._sections.items():
+            if not section.dirty and now - section.built_at < section.max_age:
+                continue
+            section.dirty = False
+            section.built_at = now
+            self.stats["rebuilds"] += 1
+            before = len(self._pending_ops)
+            for key, value in section.builder().items():
+                self.set(key, value)
+            if len(self._pending_ops) > before:
+                self.invalidate(*section.dependents)
+
+        if self._pending_ops:
+            self.version += 1
+            self.set("timestamp", time.time())
+            self._patches.append((self.version, self._pending_ops))
+            self._pending_ops = []
+        return self.version
+
+    # --- Reads --------------------------------------------------------------------
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._epoch}-{self.version}"'
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The current document (shallow copy) plus its version."""
+        return {**self._document, "version": self.version}
+
+    def encoded(self) -> bytes:
+        """The snapshot serialized once per version."""
+        if self._encoded is None or self._encoded[0] != self.version:
+            self._encoded = (self.version, orjson.dumps(self.snapshot(), default=str))
+        return self._encoded[1]
+
+    def patch_since(self, version: int) -> Optional[List[Dict[str, Any]]]:
+        """Ops turning ``version`` into the current one, or None if no longer retained."""
+        if version == self.version:
+            return []
+        if version > self.version or not self._patches or self._patches[0][0] > version + 1:
+            return None
+        ops: List[Dict[str, Any]] = []
+        for patch_version, patch in self._patches:
+            if patch_version > version:
+                ops.extend(patch)
+        ops.append({"op": "replace", "path": _pointer("version"), "value": self.version})
+        return ops
+
+    def since_version(self, since: Optional[str]) -> Optional[int]:
+        """The version a ``since`` ETag names, or None if it is from another epoch."""
+        if not since:
+            return None
+        epoch, _, version = since.strip().removeprefix("W/").strip('"').rpartition("-")
+        if epoch != self._epoch or not version.isdigit():
+            return None
+        return int(version)
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+    def respond(
+        self, if_none_match: Optional[str] = None, since: Optional[str] = None
+    ) -> Tuple[int, bytes, str]:
+        """
+        Refresh, then pick the cheapest answer for a poller.
+
+        Returns ``(status, body, media_type)``: 304 with an empty body when the
+        client's ETag is current, a JSON patch when the ETag in ``since`` is from
+        this epoch and its version is still retained, otherwise the full document.
+        """
+        self.refresh()
+        if self.matches(if_none_match):
+            self.stats["not_modified"] += 1
+            return 304, b"", "application/json"
+        version = self.since_version(since)
+        if version is not None:
+            ops = self.patch_since(version)
+            if ops is not None:
+                self.stats["patches_served"] += 1
+                return 200, orjson.dumps(ops, default=str), PATCH_MEDIA_TYPE
+        return 200, self.encoded(), "application/json"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "version": self.version,
+            "sections": len(self._sections),
+            "retained_patches": len(self._patches),
+        }
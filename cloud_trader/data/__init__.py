@@ -1,7 +1,13 @@
 """Data ingestion and feature-preparation utilities for the trading stack."""
 
+from .candle_store import CandleSeries, CandleStore
 from .feature_pipeline import FeaturePipeline
+from .history_store import HistoryBackfiller, HistoryStore
 
 __all__ = [
+    "CandleSeries",
+    "CandleStore",
     "FeaturePipeline",
+    "HistoryBackfiller",
+    "HistoryStore",
 ]
@@ -0,0 +1,328 @@
+"""
+Incremental OHLCV candle store with streaming indicator state.
+
+Every (symbol, interval) pair owns a fixed-size ring buffer of candles plus
+EMA20/EMA50, Wilder RSI14 and Wilder ATR14 state that advances in O(1) when a
+bar closes. The still-forming bar is applied on top of the committed state when
+a snapshot is taken, so kline stream updates to the live bar never require a
+recompute over history.
+
+Series are seeded once from REST (concurrent seeders share a single download)
+and afterwards extended from kline stream events or REST deltas sized to the
+intervals missed since the last stored bar.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_INTERVAL_UNITS_MS = {
+    "m": 60_000,
+    "h": 3_600_000,
+    "d": 86_400_000,
+    "w": 604_800_000,
+}
+
+
+def interval_to_ms(interval: str) -> int:
+    """Convert an exchange interval string such as ``"15m"`` to milliseconds."""
+    try:
+        return int(interval[:-1]) * _INTERVAL_UNITS_MS[interval[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Unsupported kline interval: {interval}")
+
+
+@dataclass
+class IndicatorState:
+    """Committed streaming indicator state (everything up to the last closed bar)."""
+
+    ema_fast_period: int = 20
+    ema_slow_period: int = 50
+    rsi_period: int = 14
+    atr_period: int = 14
+
+    bars: int = 0
+    prev_close: float = 0.0
+    ema_fast: float = 0.0
+    ema_slow: float = 0.0
+    avg_gain: float = 0.0
+    avg_loss: float = 0.0
+    atr: float = 0.0
+
+    def step(self, high: float, low: float, close: float) -> "IndicatorState":
+        """Return the state after one more bar; does not mutate ``self``."""
+        nxt = IndicatorState(
+            self.ema_fast_period, self.ema_slow_period, self.rsi_period, self.atr_period
+        )
+        nxt.bars = self.bars + 1
+
+        if self.bars == 0:
+            # Match pandas ewm(adjust=False): the first close seeds the EMA
+            nxt.ema_fast = close
+            nxt.ema_slow = close
+            nxt.atr = high - low
+            nxt.prev_close = close
+            return nxt
+
+        alpha_fast = 2.0 / (self.ema_fast_period + 1)
+        alpha_slow = 2.0 / (self.ema_slow_period + 1)
+        nxt.ema_fast = self.ema_fast + alpha_fast * (close - self.ema_fast)
+        nxt.ema_slow = self.ema_slow + alpha_slow * (close - self.ema_slow)
+
+        delta = close - self.prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+        # Wilder smoothing; during warm-up this is a plain running mean
+        n_rsi = min(self.bars, self.rsi_period)  # close-to-close changes incl. this one
+        nxt.avg_gain = self.avg_gain + (gain - self.avg_gain) / n_rsi
+        nxt.avg_loss = self.avg_loss + (loss - self.avg_loss) / n_rsi
+
+        n_atr = min(self.bars + 1, self.atr_period)
+        nxt.atr = self.atr + (true_range - self.atr) / n_atr
+
+        nxt.prev_close = close
+        return nxt
+
+    @property
+    def rsi(self) -> float:
+        if self.bars < 2:
+            return 50.0
+        if self.avg_loss == 0:
+            return 100.0 if self.avg_gain > 0 else 50.0
+        rs = self.avg_gain / self.avg_loss
+        return 100.0 - (100.0 / (1.0 + rs))
+
+
+class CandleSeries:
+    """Ring buffer of OHLCV bars for one (symbol, interval)."""
+
+    FIELDS = ("open_time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, symbol: str, interval: str, capacity: int = 500):
+        self.symbol = symbol
+        self.interval = interval
+        self.interval_ms = interval_to_ms(interval)
+        self.capacity = capacity
+        self._data = np.zeros((capacity, len(self.FIELDS)), dtype=np.float64)
+        self._head = 0  # index where the next new bar is written
+        self._size = 0
+        self.state = IndicatorState()
+        self.last_update = 0.0
+        # Called with (symbol, interval, row) each time a bar closes
+        self.on_close: Optional[Callable[[str, str, np.ndarray], None]] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        if self._size == 0:
+            return None
+        return int(self._data[(self._head - 1) % self.capacity, 0])
+
+    def _last_row(self) -> np.ndarray:
+        return self._data[(self._head - 1) % self.capacity]
+
+    def upsert(
+        self,
+        open_time: int,
+        open_: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float,
+    ) -> None:
+        """Append a new bar or replace the still-forming last bar."""
+        last = self.last_open_time
+        if last is not None and open_time < last:
+            return  # Stale/out-of-order update
+
+        if last is not None and open_time == last:
+            self._last_row()[:] = (open_time, open_, high, low, close, volume)
+        else:
+            if last is not None:
+                # The previous last bar is now closed: commit it to indicator state
+                row = self._last_row()
+                self.state = self.state.step(row[2], row[3], row[4])
+                if self.on_close is not None:
+                    self.on_close(self.symbol, self.interval, row)
+            self._data[self._head] = (open_time, open_, high, low, close, volume)
+            self._head = (self._head + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+        self.last_update = time.time()
+
+    def extend(self, rows: Iterable[Sequence[Any]]) -> None:
+        """Upsert REST-format klines ``[openTime, open, high, low, close, volume, ...]``."""
+        for row in rows:
+            self.upsert(
+                int(row[0]),
+                float(row[1]),
+                float(row[2]),
+                float(row[3]),
+                float(row[4]),
+                float(row[5]),
+            )
+
+    def to_array(self) -> np.ndarray:
+        """Return bars oldest-first as an ``(n, 6)`` array copy."""
+        if self._size < self.capacity:
+            return self._data[: self._size].copy()
+        return np.roll(self._data, -self._head, axis=0)
+
+    def is_current(self, now_ms: Optional[int] = None) -> bool:
+        """True when the last bar covers the current interval."""
+        last = self.last_open_time
+        if last is None:
+            return False
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        return now_ms < last + self.interval_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Indicator snapshot including the still-forming bar, computed in O(1)."""
+        if self._size == 0:
+            return {}
+        row = self._last_row()
+        close = float(row[4])
+        live = self.state.step(row[2], row[3], close)
+        return {
+            "close": close,
+            "rsi": live.rsi,
+            "atr": live.atr,
+            "ema_20": live.ema_fast,
+            "ema_50": live.ema_slow,
+            "trend": "BULLISH" if close > live.ema_slow else "BEARISH",
+            "volatility_state": "HIGH" if live.atr > close * 0.02 else "LOW",
+            "bars": self._size,
+        }
+
+
+class CandleStore:
+    """Per-(symbol, interval) candle series shared by every analysis caller."""
+
+    def __init__(
+        self,
+        exchange_client: Any = None,
+        capacity: int = 500,
+        seed_limit: int = 100,
+        delta_limit: int = 2,
+        refresh_after_seconds: float = 60.0,
+        history_store: Any = None,
+    ):
+        self.exchange_client = exchange_client
+        # Optional on-disk HistoryStore used to seed series when offline
+        self.history_store = history_store
+        self.capacity = capacity
+        self.seed_limit = seed_limit
+        self.delta_limit = delta_limit
+        self.refresh_after_seconds = refresh_after_seconds
+        self._series: Dict[Tuple[str, str], CandleSeries] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._close_listeners: List[Callable[[str, str, np.ndarray], None]] = []
+        self.rest_fetches = 0
+
+    def add_bar_close_listener(self, listener: Callable[[str, str, np.ndarray], None]) -> None:
+        """``listener(symbol, interval, row)`` runs inline whenever a bar closes."""
+        self._close_listeners.append(listener)
+
+    def _emit_bar_close(self, symbol: str, interval: str, row: np.ndarray) -> None:
+        for listener in self._close_listeners:
+            try:
+                listener(symbol, interval, row)
+            except Exception as e:
+                logger.warning(f"Bar close listener failed for {symbol} {interval}: {e}")
+
+    def series(self, symbol: str, interval: str) -> Optional[CandleSeries]:
+        return self._series.get((symbol, interval))
+
+    def _get_or_create(self, symbol: str, interval: str) -> CandleSeries:
+        key = (symbol, interval)
+        series = self._series.get(key)
+        if series is None:
+            series = CandleSeries(symbol, interval, self.capacity)
+            series.on_close = self._emit_bar_close
+            self._series[key] = series
+        return series
+
+    def apply_kline_event(self, event: Dict[str, Any]) -> None:
+        """Apply a websocket ``kline`` event (``{"e": "kline", "k": {...}}``)."""
+        if isinstance(event, dict) and "data" in event:
+            event = event["data"]
+        kline = event.get("k") if isinstance(event, dict) else None
+        if not kline:
+            return
+        series = self._get_or_create(kline.get("s") or event.get("s"), kline["i"])
+        series.upsert(
+            int(kline["t"]),
+            float(kline["o"]),
+            float(kline["h"]),
+            float(kline["l"]),
+            float(kline["c"]),
+            float(kline["v"]),
+        )
+
+    def append_klines(self, symbol: str, interval: str, klines: List[Sequence[Any]]) -> None:
+        """Apply REST-format klines (seed or delta) to a series."""
+        self._get_or_create(symbol, interval).extend(klines or [])
+
+    async def get_series(self, symbol: str, interval: str = "1h") -> Optional[CandleSeries]:
+        """
+        Return an up-to-date series. REST is only hit to seed the series, or
+        for the missed bars when no kline stream has updated it recently.
+        """
+        series = self._series.get((symbol, interval))
+        if (
+            series is not None
+            and len(series)
+            and series.is_current()
+            and (time.time() - series.last_update) < self.refresh_after_seconds
+        ):
+            return series
+
+        await self._fetch(symbol, interval, self._refresh_limit(series))
+        return self._series.get((symbol, interval))
+
+    def _refresh_limit(self, series: Optional[CandleSeries]) -> int:
+        """Bars to request: a full seed, or every interval since the last stored bar."""
+        if series is None or not len(series):
+            return self.seed_limit
+        elapsed_ms = int(time.time() * 1000) - series.last_open_time
+        # +1 re-reads the last stored bar, which may have kept trading after it was stored
+        missed = elapsed_ms // series.interval_ms + 1
+        return int(min(max(missed, self.delta_limit), self.seed_limit))
+
+    async def _fetch(self, symbol: str, interval: str, limit: int) -> None:
+        key = (symbol, interval)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._download(symbol, interval, limit))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        await asyncio.shield(task)
+
+    async def _download(self, symbol: str, interval: str, limit: int) -> None:
+        if self.exchange_client is None:
+            if self.history_store is not None and not len(self._get_or_create(symbol, interval)):
+                stored = self.history_store.tail(symbol, interval, limit)
+                self.append_klines(symbol, interval, stored)
+            return
+        try:
+            klines = await self.exchange_client.get_historical_klines(symbol, interval, limit)
+            self.rest_fetches += 1
+            if klines:
+                self.append_klines(symbol, interval, klines)
+        except Exception as e:
+            logger.warning(f"Candle fetch failed for {symbol} {interval}: {e}")
+
+    async def get_snapshot(self, symbol: str, interval: str = "1h") -> Dict[str, Any]:
+        series = await self.get_series(symbol, interval)
+        return series.snapshot() if series is not None else {}
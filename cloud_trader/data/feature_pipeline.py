@@ -10,13 +10,26 @@ except ImportError:
     pd = None
     print("⚠️ Pandas not found. FeaturePipeline will be disabled.")
 
+from ..order_book import book_features, levels_to_arrays
+from .candle_store import CandleStore
+
 # Mocking Aster Client dependency to avoid circular imports if possible,
 # but in real app we inject it.
 
 
 class FeaturePipeline:
-    def __init__(self, exchange_client):
+    def __init__(
+        self,
+        exchange_client,
+        candle_store: CandleStore | None = None,
+        history_store: Any = None,
+        order_books: Any = None,
+    ):
         self.client = exchange_client
+        self.order_books = order_books  # Optional OrderBookManager fed by depth streams
+        self.candle_store = candle_store or CandleStore(
+            exchange_client, history_store=history_store
+        )
 
     async def fetch_candles(self, symbol: str, interval: str = "1h", limit: int = 100) -> Any:
         """Fetch OHLCV data and return as DataFrame."""
@@ -86,48 +99,32 @@ class FeaturePipeline:
     async def get_market_analysis(self, symbol: str) -> Dict[str, Any]:
         """Get full analysis snapshot for an agent."""
 
-        # Parallel fetch for speed
-        candles_task = self.fetch_candles(symbol, interval="1h", limit=100)
-        orderbook_task = self.client.get_order_book(symbol, limit=20)
-
-        results = await asyncio.gather(candles_task, orderbook_task, return_exceptions=True)
-        df, orderbook = results[0], results[1]
+        # Candles come from the shared incremental store, which only touches the
+        # network to seed or top up a series. Book features come from the local
+        # depth-stream book when it is in sync; REST depth is only the fallback.
+        snapshot_task = self.candle_store.get_snapshot(symbol, "1h")
+        ob_data = self.order_books.get_features(symbol) if self.order_books else None
+        if ob_data is not None or self.client is None:
+            # Offline (history store only) has no live order book
+            snapshot, orderbook = await snapshot_task, None
+        else:
+            orderbook_task = self.client.get_order_book(symbol, limit=20)
+            results = await asyncio.gather(snapshot_task, orderbook_task, return_exceptions=True)
+            snapshot, orderbook = results[0], results[1]
 
         # 1. Technical Analysis
-        ta_data = {}
-        if pd is not None and isinstance(df, pd.DataFrame) and not df.empty:
-            df = self.calculate_indicators(df)
-            latest = df.iloc[-1]
-            ta_data = {
-                "rsi": float(latest.get("RSI_14", 50)),
-                "atr": float(latest.get("ATRr_14", 0)),
-                "ema_20": float(latest.get("EMA_20", 0)),
-                "ema_50": float(latest.get("EMA_50", 0)),
-                "trend": "BULLISH" if latest["close"] > latest.get("EMA_50", 0) else "BEARISH",
-                "volatility_state": (
-                    "HIGH" if latest.get("ATRr_14", 0) > (latest["close"] * 0.02) else "LOW"
-                ),
-            }
+        ta_data = snapshot if isinstance(snapshot, dict) else {}
 
         # 2. Order Book Analysis (Depth & Pressure)
-        ob_data = {"bid_pressure": 0.0, "spread_pct": 0.0}
-        if isinstance(orderbook, dict) and "bids" in orderbook:
-            try:
-                bids = [float(x[1]) for x in orderbook["bids"]]
-                asks = [float(x[1]) for x in orderbook["asks"]]
-                bid_vol = sum(bids)
-                ask_vol = sum(asks)
-                total_vol = bid_vol + ask_vol
-
-                if total_vol > 0:
-                    ob_data["bid_pressure"] = bid_vol / total_vol  # >0.5 means buying pressure
-
-                best_bid = float(orderbook["bids"][0][0])
-                best_ask = float(orderbook["asks"][0][0])
-                if best_ask > 0:
-                    ob_data["spread_pct"] = (best_ask - best_bid) / best_ask
-            except Exception:
-                pass
+        if ob_data is None:
+            ob_data = {"bid_pressure": 0.0, "spread_pct": 0.0}
+            if isinstance(orderbook, dict) and "bids" in orderbook:
+                try:
+                    bid_prices, bid_sizes = levels_to_arrays(orderbook["bids"])
+                    ask_prices, ask_sizes = levels_to_arrays(orderbook["asks"])
+                    ob_data = book_features(bid_prices, bid_sizes, ask_prices, ask_sizes)
+                except Exception:
+                    pass
 
         return {
             "symbol": symbol,
@@ -0,0 +1,257 @@
+"""
+Local columnar market-history store.
+
+Closed klines are kept as uncompressed Arrow IPC files partitioned by
+``{root}/{symbol}/{interval}/{YYYY-MM-DD}.arrow``. Reads memory-map the day
+files, so columns are zero-copy views of the page cache; only the final
+concatenation/filter materializes what the caller asked for.
+
+``HistoryBackfiller`` pages through the exchange's kline endpoint for just the
+ranges the store does not cover yet, so repeated backfills are incremental.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pc = None
+
+from .candle_store import interval_to_ms
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86_400_000
+COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def _to_ms(value: Any) -> int:
+    """Epoch milliseconds from an int (ms), datetime (naive = UTC) or pandas Timestamp."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.timestamp() * 1000)
+
+
+def _day_of(ms: int) -> date:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).date()
+
+
+def _day_start_ms(day: date) -> int:
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+class HistoryStore:
+    """Partitioned on-disk OHLCV history keyed by symbol / interval / UTC day."""
+
+    def __init__(self, root: str = "data/history"):
+        if pa is None:
+            raise RuntimeError("Install pyarrow to use the market history store")
+        self.root = Path(root)
+        self.schema = pa.schema(
+            [("open_time", pa.int64())] + [(name, pa.float64()) for name in COLUMNS]
+        )
+
+    def _dir(self, symbol: str, interval: str) -> Path:
+        return self.root / symbol.upper() / interval
+
+    def _path(self, symbol: str, interval: str, day: date) -> Path:
+        return self._dir(symbol, interval) / f"{day.isoformat()}.arrow"
+
+    def days(self, symbol: str, interval: str) -> List[date]:
+        directory = self._dir(symbol, interval)
+        if not directory.exists():
+            return []
+        return sorted(date.fromisoformat(p.stem) for p in directory.glob("*.arrow"))
+
+    def _read_day(self, path: Path) -> "pa.Table":
+        with pa.memory_map(str(path), "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def _write_day(self, path: Path, table: "pa.Table") -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".arrow.tmp")
+        with pa.OSFile(str(tmp), "wb") as sink:
+            with pa.ipc.new_file(sink, self.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)  # Readers holding the old mapping keep a valid file
+
+    def write_klines(self, symbol: str, interval: str, klines: Sequence[Sequence[Any]]) -> int:
+        """Merge REST-format klines ``[openTime, o, h, l, c, v, ...]`` into day partitions."""
+        if not klines:
+            return 0
+        rows = np.array([[float(v) for v in k[:6]] for k in klines], dtype=np.float64)
+        open_time = rows[:, 0].astype(np.int64)
+        day_index = open_time // DAY_MS
+
+        written = 0
+        for day_number in np.unique(day_index):
+            mask = day_index == day_number
+            day = _day_of(int(day_number) * DAY_MS)
+            path = self._path(symbol, interval, day)
+
+            times = open_time[mask]
+            values = rows[mask, 1:]
+            if path.exists():
+                existing = self._read_day(path)
+                old_times = existing.column("open_time").to_numpy()
+                keep = ~np.isin(old_times, times)  # New rows win over stored ones
+                times = np.concatenate([old_times[keep], times])
+                old_values = np.column_stack(
+                    [existing.column(name).to_numpy()[keep] for name in COLUMNS]
+                )
+                values = np.vstack([old_values, values])
+
+            order = np.argsort(times, kind="stable")
+            table = pa.table(
+                [pa.array(times[order])] + [pa.array(values[order, i]) for i in range(5)],
+                schema=self.schema,
+            )
+            self._write_day(path, table)
+            written += int(mask.sum())
+        return written
+
+    def read_table(
+        self, symbol: str, interval: str, start: Any = None, end: Any = None
+    ) -> "pa.Table":
+        """Rows with ``start <= open_time < end`` as an Arrow table backed by memory maps."""
+        start_ms = _to_ms(start) if start is not None else None
+        end_ms = _to_ms(end) if end is not None else None
+        tables = []
+        for day in self.days(symbol, interval):
+            day_start = _day_start_ms(day)
+            if start_ms is not None and day_start + DAY_MS <= start_ms:
+                continue
+            if end_ms is not None and day_start >= end_ms:
+                break
+            tables.append(self._read_day(self._path(symbol, interval, day)))
+        if not tables:
+            return self.schema.empty_table()
+
+        table = pa.concat_tables(tables)
+        if start_ms is not None or end_ms is not None:
+            open_time = table.column("open_time")
+            mask = None
+            if start_ms is not None:
+                mask = pc.greater_equal(open_time, start_ms)
+            if end_ms is not None:
+                upper = pc.less(open_time, end_ms)
+                mask = upper if mask is None else pc.and_(mask, upper)
+            table = table.filter(mask)
+        return table
+
+    def read_frame(
+        self, symbol: str, interval: str, start: Any = None, end: Any = None
+    ) -> pd.DataFrame:
+        """OHLCV frame indexed by (naive UTC) ``timestamp``, as the backtest loaders return."""
+        table = self.read_table(symbol, interval, start, end)
+        df = pd.DataFrame(
+            {name: table.column(name).to_numpy() for name in COLUMNS},
+            index=pd.to_datetime(table.column("open_time").to_numpy(), unit="ms"),
+        )
+        df.index.name = "timestamp"
+        df.insert(0, "symbol", symbol.upper())
+        return df
+
+    def tail(self, symbol: str, interval: str, limit: int) -> List[List[float]]:
+        """Last ``limit`` stored bars in REST kline format (for offline candle seeding)."""
+        rows: List[List[float]] = []
+        for day in reversed(self.days(symbol, interval)):
+            table = self._read_day(self._path(symbol, interval, day))
+            columns = [table.column("open_time").to_numpy()] + [
+                table.column(name).to_numpy() for name in COLUMNS
+            ]
+            day_rows = [[int(r[0]), *map(float, r[1:])] for r in zip(*columns)]
+            rows = day_rows + rows
+            if len(rows) >= limit:
+                break
+        return rows[-limit:]
+
+    def missing_ranges(
+        self, symbol: str, interval: str, start: Any, end: Any
+    ) -> List[Tuple[int, int]]:
+        """Half-open ``[start_ms, end_ms)`` ranges of bar open times not yet stored."""
+        step = interval_to_ms(interval)
+        start_ms = -(-_to_ms(start) // step) * step  # First bar boundary at/after start
+        end_ms = _to_ms(end)
+        if end_ms <= start_ms:
+            return []
+
+        expected = np.arange(start_ms, end_ms, step, dtype=np.int64)
+        have = self.read_table(symbol, interval, start_ms, end_ms).column("open_time").to_numpy()
+        missing = expected[~np.isin(expected, have)]
+        if not len(missing):
+            return []
+
+        # Coalesce consecutive missing bars into ranges
+        breaks = np.flatnonzero(np.diff(missing) != step)
+        starts = np.concatenate([[missing[0]], missing[breaks + 1]])
+        ends = np.concatenate([missing[breaks], [missing[-1]]]) + step
+        return [(int(s), int(e)) for s, e in zip(starts, ends)]
+
+    def is_complete(self, symbol: str, interval: str, start: Any, end: Any) -> bool:
+        return not self.missing_ranges(symbol, interval, start, end)
+
+
+class HistoryBackfiller:
+    """Paginated, incremental kline backfill from the exchange into a ``HistoryStore``."""
+
+    def __init__(
+        self,
+        exchange_client: Any,
+        store: HistoryStore,
+        page_limit: int = 1000,
+        page_delay_seconds: float = 0.0,
+    ):
+        self.client = exchange_client
+        self.store = store
+        self.page_limit = page_limit
+        self.page_delay_seconds = page_delay_seconds
+
+    async def backfill(self, symbol: str, interval: str, start: Any, end: Any = None) -> int:
+        """Fetch every missing closed bar in ``[start, end)``; returns bars written."""
+        step = interval_to_ms(interval)
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        last_closed_open = (now_ms // step) * step  # Bars opening here or later are still forming
+        end_ms = min(_to_ms(end) if end is not None else last_closed_open, last_closed_open)
+
+        written = 0
+        for range_start, range_end in self.store.missing_ranges(symbol, interval, start, end_ms):
+            cursor = range_start
+            while cursor < range_end:
+                page = await self.client.get_klines(
+                    symbol,
+                    interval,
+                    limit=self.page_limit,
+                    start_time=cursor,
+                    end_time=range_end - 1,
+                )
+                page = [k for k in (page or []) if cursor <= int(k[0]) < range_end]
+                if not page:
+                    break  # Nothing listed in the rest of this range
+                written += self.store.write_klines(symbol, interval, page)
+                cursor = int(page[-1][0]) + step
+                if self.page_delay_seconds:
+                    await asyncio.sleep(self.page_delay_seconds)
+
+        if written:
+            logger.info(f"Backfilled {written} {interval} bars for {symbol}")
+        return written
+
+    async def backfill_days(self, symbol: str, interval: str, days: int) -> int:
+        start = datetime.now(timezone.utc) - timedelta(days=days)
+        return await self.backfill(symbol, interval, start)
@@ -16,6 +16,7 @@ All trading logic uses only verified, documented API capabilities.
 from __future__ import annotations
 
 import asyncio
+import copy
 import hashlib
 import hmac
 import json
@@ -30,6 +31,8 @@ from pydantic import BaseModel, Field
 
 from .credentials import Credentials
 from .enums import MarginType, OrderType, PositionSide, ResponseType, TimeInForce, WorkingType
+from .metrics import ASTER_API_REQUESTS, RATE_LIMIT_EVENTS
+from .rate_limit_manager import WeightedRateLimiter
 
 
 class AsterAPIError(Exception):
@@ -100,6 +103,10 @@ ASTER_ERROR_CODES = {
 }
 
 
+# Unsigned endpoints that still authenticate with the API key header (USER_STREAM)
+API_KEY_ONLY_ENDPOINTS = {"/fapi/v1/listenKey"}
+
+
 class Ticker(BaseModel):
     symbol: str
     price: float
@@ -212,6 +219,9 @@ class AsterClient:
         self,
         credentials: Optional[Credentials] = None,
         base_url: str = "https://fapi.asterdex.com",
+        coalesce_gets: bool = True,
+        get_cache_ttl: float = 0.5,
+        rate_limiter: Optional[WeightedRateLimiter] = None,
     ):
         self._credentials = credentials
         self._base_url = base_url
@@ -219,6 +229,18 @@ class AsterClient:
         self._filter_cache: Dict[str, Dict[str, Any]] = {}
         self._filter_cache_time: Dict[str, float] = {}
 
+        # Single-flight for unsigned GETs: identical concurrent requests share one
+        # in-flight HTTP call, and results are reused for ``get_cache_ttl`` seconds.
+        self._coalesce_gets = coalesce_gets
+        self._get_cache_ttl = get_cache_ttl
+        self._inflight_gets: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._get_cache: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        self.coalesce_stats = {"sent": 0, "merged": 0, "cached": 0}
+
+        # Every request that actually goes on the wire draws its endpoint weight
+        # from this limiter; pass one instance to clients sharing an IP budget.
+        self._rate_limiter = rate_limiter or WeightedRateLimiter()
+
     async def close(self) -> None:
         await self._client.aclose()
 
@@ -237,6 +259,10 @@ class AsterClient:
         params["signature"] = signature
         return params
 
+    def _record_request(self, endpoint: str, method: str, result: str) -> None:
+        self.coalesce_stats[result] += 1
+        ASTER_API_REQUESTS.labels(endpoint=endpoint, method=method, result=result).inc()
+
     async def _make_request(
         self,
         method: str,
@@ -244,8 +270,52 @@ class AsterClient:
         params: Optional[Dict[str, Any]] = None,
         signed: bool = False,
     ) -> Dict[str, Any]:
-        params = params or {}
+        method = method.upper()
+        if signed or method != "GET" or not self._coalesce_gets:
+            self._record_request(endpoint, method, "sent")
+            return await self._send_request(method, endpoint, params, signed)
+
+        key = (endpoint, urlencode(sorted((params or {}).items()), doseq=True))
+        now = time.monotonic()
+
+        cached = self._get_cache.get(key)
+        if cached is not None:
+            if cached[0] > now:
+                self._record_request(endpoint, method, "cached")
+                return copy.deepcopy(cached[1])
+            del self._get_cache[key]
+
+        task = self._inflight_gets.get(key)
+        if task is not None:
+            self._record_request(endpoint, method, "merged")
+            return copy.deepcopy(await asyncio.shield(task))
+
+        self._record_request(endpoint, method, "sent")
+        task = asyncio.create_task(self._send_request(method, endpoint, params, signed))
+        self._inflight_gets[key] = task
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            if self._inflight_gets.get(key) is task:
+                del self._inflight_gets[key]
+
+        if self._get_cache_ttl > 0:
+            if len(self._get_cache) > 1024:
+                self._get_cache = {k: v for k, v in self._get_cache.items() if v[0] > now}
+            self._get_cache[key] = (time.monotonic() + self._get_cache_ttl, result)
+        # Callers may mutate responses; never hand out the shared object
+        return copy.deepcopy(result)
+
+    async def _send_request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        signed: bool = False,
+    ) -> Dict[str, Any]:
+        params = dict(params or {})
         print("DEBUG: VERSION 2.0 - GET URL FIX")
+        lane = await self._rate_limiter.acquire(method, endpoint, params, signed)
         # Send params in body for state-changing methods, query string for GET
         if method.upper() in ["POST", "PUT", "DELETE"]:
             if signed:
@@ -303,6 +373,10 @@ class AsterClient:
                 response = await self._client.request(method, url, headers=headers)
         else:
             headers = {}
+            if endpoint in API_KEY_ONLY_ENDPOINTS:
+                if not self._credentials or not self._credentials.api_key:
+                    raise ValueError("API key is not configured for a user stream request")
+                headers["X-MBX-APIKEY"] = self._credentials.api_key
             if method.upper() in ["POST", "PUT", "DELETE"]:
                 response = await self._client.request(
                     method, endpoint, data=params, headers=headers
@@ -312,6 +386,16 @@ class AsterClient:
                     method, endpoint, params=params, headers=headers
                 )
 
+        self._rate_limiter.update_from_headers(response.headers)
+        if response.status_code in (418, 429):
+            retry_after = response.headers.get("Retry-After")
+            try:
+                retry_after_seconds = float(retry_after) if retry_after else 60.0
+            except ValueError:
+                retry_after_seconds = 60.0
+            self._rate_limiter.penalize(retry_after_seconds)
+            RATE_LIMIT_EVENTS.labels(service=f"aster_{lane}").inc()
+
         try:
             response.raise_for_status()
         except HTTPStatusError as exc:
@@ -342,13 +426,19 @@ class AsterClient:
         return response.json()
 
     async def get_klines(
-        self, symbol: str, interval: str, limit: int = 100
+        self,
+        symbol: str,
+        interval: str,
+        limit: int = 100,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
-        return await self._make_request(
-            "GET",
-            "/fapi/v1/klines",
-            params={"symbol": symbol, "interval": interval, "limit": limit},
-        )
+        params: Dict[str, Any] = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start_time is not None:
+            params["startTime"] = int(start_time)
+        if end_time is not None:
+            params["endTime"] = int(end_time)
+        return await self._make_request("GET", "/fapi/v1/klines", params=params)
 
     async def get_historical_klines(
         self, symbol: str, interval: str = "1h", limit: int = 100
@@ -845,6 +935,22 @@ class AsterClient:
             "GET", "/fapi/v1/commissionRate", params=params, signed=True
         )
 
+    # User data stream (listenKey)
+    async def start_user_stream(self) -> str:
+        """Create (or return the active) listenKey for the user data stream."""
+        data = await self._make_request("POST", "/fapi/v1/listenKey")
+        return data["listenKey"]
+
+    async def keepalive_user_stream(self) -> Dict[str, Any]:
+        """Extend the listenKey validity by 60 minutes."""
+        return await self._make_request("PUT", "/fapi/v1/listenKey")
+
+    async def close_user_stream(self) -> Dict[str, Any]:
+        return await self._make_request("DELETE", "/fapi/v1/listenKey")
+
+
+MAX_STREAMS_PER_CONNECTION = 200  # Exchange limit on streams per combined connection
+
 
 class AsterWebSocketClient:
     """WebSocket client for Aster futures streams."""
@@ -855,12 +961,12 @@ class AsterWebSocketClient:
         self._subscriptions: Dict[str, Any] = {}
         self._running = False
 
-    async def connect(self) -> None:
-        """Connect to the WebSocket."""
+    async def connect(self, path: str = "/ws/") -> None:
+        """Connect to the WebSocket (``path`` is e.g. ``/ws/<listenKey>`` for user data)."""
         try:
             import websockets
 
-            self._websocket = await websockets.connect(self.base_url + "/ws/")
+            self._websocket = await websockets.connect(self.base_url + path)
             self._running = True
         except ImportError:
             raise RuntimeError("websockets library is required for WebSocket support")
@@ -1221,6 +1327,10 @@ def create_exchange_clients(
     live_client = AsterClient(
         credentials=live_credentials,
         base_url=settings.rest_base_url,
+        get_cache_ttl=getattr(settings, "aster_get_cache_ttl_seconds", 0.5),
+        rate_limiter=WeightedRateLimiter(
+            weight_per_minute=getattr(settings, "aster_request_weight_per_minute", 2400)
+        ),
     )
 
     # Create paper trading client if enabled
@@ -0,0 +1,174 @@
+"""
+Append-only write-ahead journal for small pieces of durable trading state.
+
+Each record is a compact JSON payload framed as::
+
+    [u32 length][u32 crc32][u64 seq][payload]
+
+Appends are a single ``os.write`` to an ``O_APPEND`` descriptor, so the caller
+only pays for a page-cache copy; ``fsync`` is batched on a background thread
+every ``fsync_interval_seconds`` (or done inline when the interval is 0).
+
+A snapshot (``{path}.snapshot``) holds the caller's full state and the last
+sequence number it covers. Writing one truncates the journal, so replay is
+always "snapshot + records with a higher seq". A crash between the snapshot
+rename and the truncate is harmless because stale records are skipped by seq,
+and a torn final record is detected by its length/CRC and cut off.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">IIQ")
+
+
+class AppendOnlyJournal:
+    """Length-prefixed, CRC-checked record log with snapshot compaction."""
+
+    def __init__(
+        self,
+        path: str,
+        fsync_interval_seconds: float = 0.05,
+        compact_after_records: int = 1000,
+    ):
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot"
+        self.fsync_interval_seconds = fsync_interval_seconds
+        self.compact_after_records = compact_after_records
+        self.stats = {"appended": 0, "fsyncs": 0, "snapshots": 0, "truncated_bytes": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed = threading.Event()
+        self._snapshot_state, self._records, self._seq = self._recover()
+        self.records_since_snapshot = len(self._records)
+        self._fd: Optional[int] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+        self._syncer: Optional[threading.Thread] = None
+        if fsync_interval_seconds > 0:
+            self._syncer = threading.Thread(
+                target=self._sync_loop, name="journal-fsync", daemon=True
+            )
+            self._syncer.start()
+
+    # --- Recovery -----------------------------------------------------------------
+
+    def _recover(self) -> Tuple[Any, List[Dict[str, Any]], int]:
+        state = None
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            state = snapshot.get("state")
+            snapshot_seq = int(snapshot.get("seq", 0))
+
+        records: List[Dict[str, Any]] = []
+        last_seq = snapshot_seq
+        if not os.path.exists(self.path):
+            return state, records, last_seq
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            length, crc, seq = _HEADER.unpack_from(data, offset)
+            start = offset + _HEADER.size
+            payload = data[start : start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break  # Torn or corrupt tail: everything after it is unusable
+            if seq > snapshot_seq:
+                records.append(json.loads(payload))
+                last_seq = seq
+            offset = start + length
+
+        if offset < len(data):
+            logger.warning(f"Journal {self.path}: dropping {len(data) - offset} bytes of torn tail")
+            self.stats["truncated_bytes"] = len(data) - offset
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+        return state, records, last_seq
+
+    def replay(self) -> Tuple[Any, List[Dict[str, Any]]]:
+        """Snapshot state (or None) and the records appended after it, oldest first."""
+        state, records = self._snapshot_state, self._records
+        self._snapshot_state, self._records = None, []
+        return state, records
+
+    # --- Writing ------------------------------------------------------------------
+
+    def append(self, record: Dict[str, Any]) -> int:
+        payload = json.dumps(record, separators=(",", ":"), default=str).encode("utf-8")
+        with self._lock:
+            if self._fd is None:
+                raise RuntimeError(f"Journal {self.path} is closed")
+            self._seq += 1
+            header = _HEADER.pack(len(payload), zlib.crc32(payload), self._seq)
+            os.write(self._fd, header + payload)
+            seq = self._seq
+        self.records_since_snapshot += 1
+        self.stats["appended"] += 1
+        if self._syncer is None:
+            self.sync()
+        else:
+            self._dirty.set()
+        return seq
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self.records_since_snapshot >= self.compact_after_records
+
+    def write_snapshot(self, state: Any) -> None:
+        """Persist ``state`` atomically and drop the records it supersedes."""
+        with self._lock:
+            tmp = f"{self.snapshot_path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"seq": self._seq, "state": state}, f, separators=(",", ":"), default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+            if self._fd is not None:
+                os.ftruncate(self._fd, 0)
+        self.records_since_snapshot = 0
+        self.stats["snapshots"] += 1
+
+    def sync(self) -> None:
+        self._dirty.clear()
+        fd = self._fd
+        if fd is None:
+            return
+        try:
+            os.fsync(fd)
+            self.stats["fsyncs"] += 1
+        except OSError as e:
+            logger.warning(f"Journal fsync failed for {self.path}: {e}")
+
+    def _sync_loop(self) -> None:
+        while not self._closed.is_set():
+            if self._dirty.wait(timeout=1.0):
+                self._closed.wait(self.fsync_interval_seconds)  # Group commit window
+                self.sync()  # Not under the lock: appends keep flowing during fsync
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._syncer is not None:
+            self._syncer.join(timeout=2.0)
+            self._syncer = None
+        with self._lock:
+            self.sync()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
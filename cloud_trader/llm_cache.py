@@ -0,0 +1,216 @@
+"""
+Response cache for LLM inference.
+
+Agents re-ask the same question about the same symbol every few minutes, and
+the prompt usually differs only in live numbers (price, volume) that have not
+moved materially. A cache key is therefore built from:
+
+- the asking agent, the model and generation parameters,
+- the prompt with whitespace collapsed and, when the caller supplies the
+  market state separately, its numbers masked out,
+- the market state quantized per feature: price-denominated features
+  (price, SMA, ATR) snap to a tick sized to the price level, bounded ones
+  (RSI, confidence, % change) to a fixed step, anything else to a few
+  significant digits, so small ticks map to the same key.
+
+Because the prompt's numbers are masked, the state must carry every number
+the prompt renders; a feature left out would be ignored by the key.
+
+Identical requests already in flight are deduplicated, so a burst of agents
+asking the same thing costs one model call.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+
+import orjson
+
+from .cache import InMemoryCache, SingleFlight
+from .metrics import LLM_CACHE_LOOKUPS, LLM_CACHE_SAVED_SECONDS
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"[-+]?\$?\d[\d,]*(?:\.\d+)?%?")
+
+# Generation parameters that change the answer; everything else is ignored
+KEY_PARAMS = ("max_tokens", "temperature", "top_p", "top_k")
+
+# Fixed quantization steps for bounded features, at roughly their rendered precision
+DEFAULT_STEPS = {"rsi": 1.0, "confidence": 0.05, "change_24h": 0.1}
+
+# Features in price units; they share the tick derived from the state's price
+PRICE_FEATURES = ("price", "sma_20", "atr")
+
+
+def canonicalize_prompt(prompt: str, mask_numbers: bool = False) -> str:
+    """Collapse whitespace and, optionally, replace numbers with a placeholder."""
+    text = _WHITESPACE.sub(" ", prompt).strip()
+    if mask_numbers:
+        text = _NUMBER.sub("#", text)
+    return text
+
+
+def quantize(value: float, step: Optional[float] = None, significant_digits: int = 2) -> float:
+    """Snap ``value`` to a multiple of ``step``, or round it to significant digits."""
+    if not math.isfinite(value) or value == 0:
+        return value
+    if step:
+        return round(round(value / step) * step, 12)
+    magnitude = math.floor(math.log10(abs(value)))
+    return round(value, significant_digits - 1 - magnitude)
+
+
+def price_tick(price: float, resolution: float = 1e-3) -> Optional[float]:
+    """Largest power of ten no coarser than ``resolution`` of ``price``."""
+    if not math.isfinite(price) or price <= 0:
+        return None
+    return 10.0 ** math.floor(math.log10(price * resolution))
+
+
+def quantize_state(
+    state: Mapping[str, Any],
+    steps: Optional[Mapping[str, float]] = None,
+    significant_digits: int = 2,
+) -> Tuple[Tuple[str, Any], ...]:
+    """Sorted, hashable market state with numeric features quantized."""
+    steps = steps or {}
+    items = []
+    for name, value in sorted(state.items()):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = quantize(float(value), steps.get(name), significant_digits)
+        elif isinstance(value, Mapping):
+            value = quantize_state(value, steps, significant_digits)
+        items.append((name, value))
+    return tuple(items)
+
+
+class InferenceCache:
+    """
+    TTL cache plus in-flight deduplication for model responses.
+
+    Entries live in a bounded ``InMemoryCache``. ``get_or_compute`` returns the
+    cached response, joins an identical request already running, or runs
+    ``compute``; only non-empty responses are stored. Hit, join and miss counts
+    and the model latency saved are tracked per agent.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        significant_digits: int = 2,
+        price_resolution: float = 1e-3,
+    ):
+        self.significant_digits = significant_digits
+        self.price_resolution = price_resolution
+        self._store = InMemoryCache(max_entries=max_entries)
+        self._flight = SingleFlight()
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"hits": 0, "joined": 0, "misses": 0, "saved_latency_seconds": 0.0}
+        )
+
+    def make_key(
+        self,
+        agent_id: str,
+        model: str,
+        prompt: str,
+        params: Optional[Mapping[str, Any]] = None,
+        market_state: Optional[Mapping[str, Any]] = None,
+        steps: Optional[Mapping[str, float]] = None,
+    ) -> str:
+        """Stable digest of everything that determines the response.
+
+        ``steps`` overrides the per-feature quantization steps of ``state_steps``.
+        """
+        params = params or {}
+        material = {
+            "agent": agent_id,
+            "model": model,
+            # Numbers in the prompt are covered by the quantized state when given
+            "prompt": canonicalize_prompt(prompt, mask_numbers=market_state is not None),
+            "params": [(name, params.get(name)) for name in KEY_PARAMS],
+            "state": (
+                quantize_state(
+                    market_state,
+                    {**self.state_steps(market_state), **(steps or {})},
+                    self.significant_digits,
+                )
+                if market_state is not None
+                else None
+            ),
+        }
+        digest = hashlib.blake2b(orjson.dumps(material, default=str), digest_size=16)
+        return f"llm:{agent_id}:{digest.hexdigest()}"
+
+    def state_steps(self, market_state: Mapping[str, Any]) -> Dict[str, float]:
+        """Default steps: fixed ones plus a price tick for price-denominated features."""
+        steps = dict(DEFAULT_STEPS)
+        price = market_state.get("price")
+        if isinstance(price, (int, float)) and not isinstance(price, bool):
+            tick = price_tick(float(price), self.price_resolution)
+            if tick:
+                steps.update({name: tick for name in PRICE_FEATURES})
+        return steps
+
+    async def get_or_compute(
+        self,
+        agent_id: str,
+        key: str,
+        ttl: float,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], str]:
+        """Return ``(response, source)`` where source is ``hit``, ``joined`` or ``miss``."""
+        stats = self._stats[agent_id]
+        entry = await self._store.get(key)
+        if entry is not None:
+            result, inference_time = entry
+            stats["hits"] += 1
+            stats["saved_latency_seconds"] += inference_time
+            LLM_CACHE_LOOKUPS.labels(agent=agent_id, result="hit").inc()
+            LLM_CACHE_SAVED_SECONDS.labels(agent=agent_id).inc(inference_time)
+            return result, "hit"
+
+        if self._flight.in_flight(key):
+            source = "joined"
+            stats["joined"] += 1
+        else:
+            source = "miss"
+            stats["misses"] += 1
+        LLM_CACHE_LOOKUPS.labels(agent=agent_id, result=source).inc()
+        result = await self._flight.do(key, lambda: self._compute(key, ttl, compute))
+        return result, source
+
+    async def _compute(
+        self, key: str, ttl: float, compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result = await compute()
+        elapsed = float(result.get("metadata", {}).get("inference_time") or 0.0)
+        if result.get("response"):
+            await self._store.set(key, (result, elapsed or time.perf_counter() - start), ttl=ttl)
+        return result
+
+    async def contains(self, key: str) -> bool:
+        """True if ``key`` is cached or being computed; does not count as a lookup."""
+        return self._flight.in_flight(key) or await self._store.get(key) is not None
+
+    async def invalidate(self, pattern: str = "llm:*") -> int:
+        return await self._store.clear_pattern(pattern)
+
+    def get_stats(self, agent_id: Optional[str] = None) -> Dict[str, Any]:
+        """Per-agent counters (or totals across agents) with the hit rate."""
+        if agent_id is not None:
+            rows = [self._stats[agent_id]] if agent_id in self._stats else []
+        else:
+            rows = list(self._stats.values())
+        totals: Dict[str, Any] = {
+            name: sum(row[name] for row in rows)
+            for name in ("hits", "joined", "misses", "saved_latency_seconds")
+        }
+        lookups = totals["hits"] + totals["joined"] + totals["misses"]
+        totals["hit_rate"] = (totals["hits"] + totals["joined"]) / lookups if lookups else 0.0
+        return totals
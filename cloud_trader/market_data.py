@@ -1,4 +1,6 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+from .symbol_registry import SymbolRegistry
 
 
 class MarketDataManager:
@@ -7,46 +9,30 @@ class MarketDataManager:
     and potentially ticker data.
     """
 
-    def __init__(self, exchange_client):
+    def __init__(self, exchange_client, symbols: Optional[SymbolRegistry] = None):
         self.exchange_client = exchange_client
-        self.market_structure: Dict[str, Dict[str, Any]] = {}
+        self.symbols = symbols if symbols is not None else SymbolRegistry()
+        self._structure_override: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @property
+    def market_structure(self) -> Dict[str, Dict[str, Any]]:
+        if self._structure_override is not None:
+            return self._structure_override
+        return self.symbols.market_structure
+
+    @market_structure.setter
+    def market_structure(self, value: Dict[str, Dict[str, Any]]):
+        self._structure_override = value
 
     async def fetch_structure(self):
         """Fetch all available symbols and their precision/filters from exchange."""
         try:
-            print("🌍 Fetching global market structure (all symbols)...")
-            # Assuming get_exchange_info returns raw exchange info dict
-            # AsterClient.get_exchange_info() usually returns dict with 'symbols' list
-            info = await self.exchange_client.get_exchange_info()
-
-            count = 0
-            if info and "symbols" in info:
-                for s in info["symbols"]:
-                    symbol = s["symbol"]
-                    if not symbol.endswith("USDT"):  # Focus on USDT pairs for now
-                        continue
-
-                    # Extract precision
-                    precision = s.get("quantityPrecision", 0)
-                    price_precision = s.get("pricePrecision", 2)
-
-                    # Extract Min Qty if available (filters)
-                    min_qty = 0.1  # Default safe fallback
-                    step_size = 0.1
-                    for f in s.get("filters", []):
-                        if f["filterType"] == "LOT_SIZE":
-                            min_qty = float(f.get("minQty", 0))
-                            step_size = float(f.get("stepSize", 0))
-
-                    self.market_structure[symbol] = {
-                        "precision": precision,
-                        "price_precision": price_precision,
-                        "min_qty": min_qty,
-                        "step_size": step_size,
-                    }
-                    count += 1
-
-            print(f"✅ Loaded market structure for {count} pairs.")
+            first_load = not len(self.symbols)
+            if first_load:
+                print("🌍 Fetching global market structure (all symbols)...")
+            changed = await self.symbols.refresh(self.exchange_client)
+            if first_load or changed:
+                print(f"✅ Market structure: {len(self.symbols)} pairs, {changed} changed")
 
         except Exception as e:
             print(f"⚠️ Failed to fetch market structure: {e}. Falling back to config.")
@@ -4,11 +4,12 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import statistics
 from dataclasses import dataclass
 from enum import Enum
 from typing import Deque, Dict, List, Optional, Tuple
 
+import numpy as np
+
 from .time_sync import get_timestamp_us
 
 logger = logging.getLogger(__name__)
@@ -60,6 +61,399 @@ class RegimeMetrics:
         }
 
 
+_REGIMES: List[MarketRegime] = list(MarketRegime)
+_CODE = {regime: i for i, regime in enumerate(_REGIMES)}
+_UP = _CODE[MarketRegime.TRENDING_UP]
+_DOWN = _CODE[MarketRegime.TRENDING_DOWN]
+_RANGING = _CODE[MarketRegime.RANGING]
+_VOLATILE = _CODE[MarketRegime.VOLATILE]
+_CALM = _CODE[MarketRegime.CALM]
+_UNKNOWN = _CODE[MarketRegime.UNKNOWN]
+
+
+class RegimeEngine:
+    """
+    Streaming regime classifier for many symbols at once.
+
+    Indicator state lives in per-symbol rows of compact arrays and advances in
+    O(1) per bar: running-sum SMA20/SMA50, recursive EMA12/EMA26, Wilder RSI14
+    and ADX14 (a plain running mean during warm-up), rolling-variance Bollinger
+    bands and a sliding least-squares volume slope. ``update_rows`` advances any
+    set of symbols in one vectorized step; ``queue_bar`` + ``flush`` batch bars
+    that arrive one event at a time (e.g. kline closes across the universe). A
+    queued bar schedules a flush ``flush_delay_seconds`` later, so the bars that
+    close together at an interval boundary are applied as one batch and the
+    queue never outgrows one such burst.
+    """
+
+    SMA_FAST = 20
+    SMA_SLOW = 50
+    EMA_FAST = 12
+    EMA_SLOW = 26
+    WILDER_PERIOD = 14
+    BB_STD = 2.0
+    VOLUME_WINDOW = 20
+    # Running sums are recomputed exactly from the rings this often to cap float drift
+    RESYNC_BARS = 1000
+
+    def __init__(self, min_periods: int = 20, capacity: int = 64, flush_delay_seconds: float = 1.0):
+        self.min_periods = max(min_periods, self.SMA_FAST)
+        self.flush_delay_seconds = flush_delay_seconds
+        self.symbols: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._pending: Dict[str, Deque[Tuple[float, float, float, float]]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._alloc(capacity)
+
+    # --- State --------------------------------------------------------------------
+
+    def _alloc(self, capacity: int) -> None:
+        def grow(name: str, shape: Tuple[int, ...], fill: float = 0.0, dtype=np.float64):
+            current = getattr(self, name, None)
+            fresh = np.full(shape, fill, dtype=dtype)
+            if current is not None:
+                fresh[: len(current)] = current
+            setattr(self, name, fresh)
+
+        for name in (
+            "anchor",
+            "sum20",
+            "sumsq20",
+            "sum50",
+            "ema12",
+            "ema26",
+            "macd_prev",
+            "prev_close",
+            "prev_high",
+            "prev_low",
+            "avg_gain",
+            "avg_loss",
+            "avg_tr",
+            "avg_pdm",
+            "avg_mdm",
+            "adx",
+            "vol_sum",
+            "vol_xsum",
+            "close",
+            "rsi",
+            "trend_strength",
+            "volatility_level",
+            "range_bound_score",
+            "momentum_score",
+            "bb_position",
+            "volume_trend",
+            "confidence",
+        ):
+            grow(name, (capacity,))
+        grow("count", (capacity,), dtype=np.int64)
+        grow("regime", (capacity,), _UNKNOWN, dtype=np.int64)
+        grow("closes", (capacity, self.SMA_SLOW))  # Shifted by anchor for stable variance
+        grow("volumes", (capacity, self.VOLUME_WINDOW))
+        grow("stability", (capacity, len(_REGIMES)))
+        grow("regime_counts", (capacity, len(_REGIMES)), dtype=np.int64)
+        grow("transitions", (capacity, len(_REGIMES), len(_REGIMES)), dtype=np.int64)
+
+    def row(self, symbol: str) -> int:
+        row = self._rows.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            if row == len(self.count):
+                self._alloc(2 * len(self.count))
+            self.symbols.append(symbol)
+            self._rows[symbol] = row
+        return row
+
+    # --- Updates ------------------------------------------------------------------
+
+    def queue_bar(self, symbol: str, close: float, high: float, low: float, volume: float):
+        """Buffer one closed bar; applied by the scheduled ``flush`` or the next read."""
+        self._pending.setdefault(symbol, Deque()).append((close, high, low, volume))
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()  # No loop to batch on
+            return
+        self._flush_handle = loop.call_later(self.flush_delay_seconds, self.flush)
+
+    def flush(self) -> int:
+        """Apply queued bars, one vectorized step per wave of at most one bar per symbol."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        applied = 0
+        while self._pending:
+            wave = [(symbol, bars.popleft()) for symbol, bars in self._pending.items()]
+            self._pending = {s: b for s, b in self._pending.items() if b}
+            rows = np.fromiter((self.row(s) for s, _ in wave), dtype=np.int64, count=len(wave))
+            bars = np.array([bar for _, bar in wave], dtype=np.float64)
+            self.update_rows(rows, bars[:, 0], bars[:, 1], bars[:, 2], bars[:, 3])
+            applied += len(wave)
+        return applied
+
+    def update(self, bars: Dict[str, Tuple[float, float, float, float]]) -> None:
+        """Advance ``{symbol: (close, high, low, volume)}`` by one bar each."""
+        rows = np.fromiter((self.row(s) for s in bars), dtype=np.int64, count=len(bars))
+        values = np.array(list(bars.values()), dtype=np.float64).reshape(-1, 4)
+        self.update_rows(rows, values[:, 0], values[:, 1], values[:, 2], values[:, 3])
+
+    def update_rows(
+        self,
+        rows: np.ndarray,
+        close: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        volume: np.ndarray,
+    ) -> None:
+        """Advance the given (unique) rows by one bar in a single vectorized step."""
+        n = self.count[rows]  # Bars seen before this one
+        k = n + 1
+        has_prev = n > 0
+
+        # SMA / Bollinger running sums over a ring of anchor-shifted closes
+        anchor = np.where(has_prev, self.anchor[rows], close)
+        self.anchor[rows] = anchor
+        x = close - anchor
+        slow_slot = n % self.SMA_SLOW
+        leaving_slow = np.where(n >= self.SMA_SLOW, self.closes[rows, slow_slot], 0.0)
+        leaving_fast = np.where(
+            n >= self.SMA_FAST, self.closes[rows, (n - self.SMA_FAST) % self.SMA_SLOW], 0.0
+        )
+        self.closes[rows, slow_slot] = x
+        self.sum50[rows] += x - leaving_slow
+        self.sum20[rows] += x - leaving_fast
+        self.sumsq20[rows] += x * x - leaving_fast * leaving_fast
+
+        # EMAs seeded by the SMA of their first period (running mean until then)
+        for name, period in (("ema12", self.EMA_FAST), ("ema26", self.EMA_SLOW)):
+            ema = getattr(self, name)
+            weight = np.where(k <= period, 1.0 / k, 2.0 / (period + 1))
+            ema[rows] += (close - ema[rows]) * weight
+        macd = self.ema12[rows] - self.ema26[rows]
+        ema26 = self.ema26[rows]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            momentum = np.where(
+                (k > self.EMA_SLOW) & (ema26 != 0),
+                (macd - self.macd_prev[rows]) / np.abs(ema26),
+                0.0,
+            )
+        self.macd_prev[rows] = macd
+
+        # Wilder RSI / ADX inputs (need a previous bar)
+        prev_close = np.where(has_prev, self.prev_close[rows], close)
+        prev_high = np.where(has_prev, self.prev_high[rows], high)
+        prev_low = np.where(has_prev, self.prev_low[rows], low)
+        delta = close - prev_close
+        true_range = np.maximum.reduce(
+            [high - low, np.abs(high - prev_close), np.abs(low - prev_close)]
+        )
+        move_up = high - prev_high
+        move_down = prev_low - low
+        plus_dm = np.where((move_up > move_down) & (move_up > 0), move_up, 0.0)
+        minus_dm = np.where((move_down > move_up) & (move_down > 0), move_down, 0.0)
+
+        weight = np.where(has_prev, 1.0 / np.minimum(np.maximum(n, 1), self.WILDER_PERIOD), 0.0)
+        for name, value in (
+            ("avg_gain", np.maximum(delta, 0.0)),
+            ("avg_loss", np.maximum(-delta, 0.0)),
+            ("avg_tr", true_range),
+            ("avg_pdm", plus_dm),
+            ("avg_mdm", minus_dm),
+        ):
+            avg = getattr(self, name)
+            avg[rows] += (value - avg[rows]) * weight
+
+        avg_tr = self.avg_tr[rows]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            plus_di = np.where(avg_tr > 0, self.avg_pdm[rows] / avg_tr * 100, 0.0)
+            minus_di = np.where(avg_tr > 0, self.avg_mdm[rows] / avg_tr * 100, 0.0)
+            di_sum = plus_di + minus_di
+            dx = np.where(di_sum > 0, np.abs(plus_di - minus_di) / di_sum * 100, 0.0)
+            avg_loss = self.avg_loss[rows]
+            rsi = np.where(avg_loss > 0, 100 - 100 / (1 + self.avg_gain[rows] / avg_loss), 100.0)
+        self.adx[rows] += (dx - self.adx[rows]) * weight
+
+        # Sliding least-squares slope of the last VOLUME_WINDOW volumes
+        window = self.VOLUME_WINDOW
+        vol_slot = n % window
+        full = n >= window
+        leaving_vol = np.where(full, self.volumes[rows, vol_slot], 0.0)
+        self.volumes[rows, vol_slot] = volume
+        vol_sum = self.vol_sum[rows]
+        self.vol_xsum[rows] = np.where(
+            full,
+            self.vol_xsum[rows] - (vol_sum - leaving_vol) + (window - 1) * volume,
+            self.vol_xsum[rows] + n * volume,
+        )
+        self.vol_sum[rows] = vol_sum - leaving_vol + volume
+
+        self.count[rows] = k
+        self.prev_close[rows] = close
+        self.prev_high[rows] = high
+        self.prev_low[rows] = low
+        self.close[rows] = close
+        self.rsi[rows] = rsi
+        self.momentum_score[rows] = momentum
+
+        resync = rows[k % self.RESYNC_BARS == 0]
+        if len(resync):
+            self._resync(resync)
+        self._classify(rows)
+
+    def _resync(self, rows: np.ndarray) -> None:
+        k = self.count[rows]
+        fast = (k[:, None] + np.arange(-self.SMA_FAST, 0)) % self.SMA_SLOW
+        recent = self.closes[rows[:, None], fast]
+        self.sum20[rows] = recent.sum(axis=1)
+        self.sumsq20[rows] = (recent * recent).sum(axis=1)
+        self.sum50[rows] = self.closes[rows].sum(axis=1)
+        ordered = (k[:, None] + np.arange(-self.VOLUME_WINDOW, 0)) % self.VOLUME_WINDOW
+        volumes = self.volumes[rows[:, None], ordered]
+        self.vol_sum[rows] = volumes.sum(axis=1)
+        self.vol_xsum[rows] = volumes @ np.arange(self.VOLUME_WINDOW, dtype=np.float64)
+
+    def _classify(self, rows: np.ndarray) -> None:
+        k = self.count[rows]
+        close = self.close[rows]
+        ready = k >= self.min_periods
+
+        fast = self.SMA_FAST
+        mean = self.sum20[rows] / fast
+        variance = np.maximum((self.sumsq20[rows] - fast * mean * mean) / (fast - 1), 0.0)
+        std = np.sqrt(variance)
+        middle = mean + self.anchor[rows]
+        upper = middle + self.BB_STD * std
+        lower = middle - self.BB_STD * std
+        with np.errstate(invalid="ignore", divide="ignore"):
+            bb_position = np.where(
+                upper > lower, np.clip((close - lower) / (upper - lower), 0.0, 1.0), 0.5
+            )
+            volatility = np.minimum(np.where(middle > 0, (upper - lower) / middle, 0.0) * 100, 1.0)
+
+            m = np.minimum(k, self.VOLUME_WINDOW).astype(np.float64)
+            sx = m * (m - 1) / 2
+            sxx = (m - 1) * m * (2 * m - 1) / 6
+            vol_sum = self.vol_sum[rows]
+            slope = (m * self.vol_xsum[rows] - sx * vol_sum) / (m * sxx - sx * sx)
+            volume_trend = np.where((m >= 10) & (vol_sum > 0), slope / (vol_sum / m), 0.0)
+
+        trend_strength = np.minimum(self.adx[rows] / 25.0, 1.0)
+        range_bound = (1 - trend_strength) * (1 - np.abs(bb_position - 0.5) * 2)
+        momentum = self.momentum_score[rows]
+
+        strong = trend_strength > 0.6
+        conditions = [
+            strong & (momentum > 0.001),
+            strong & (momentum < -0.001),
+            strong & (bb_position > 0.6),
+            strong & (bb_position < 0.4),
+            strong,
+            volatility > 0.7,
+            (volatility < 0.3) & (range_bound > 0.6),
+            (range_bound > 0.5) & (trend_strength < 0.4),
+        ]
+        regime = np.select(
+            conditions, [_UP, _DOWN, _UP, _DOWN, _RANGING, _VOLATILE, _CALM, _RANGING], _RANGING
+        )
+        confidence = np.select(
+            conditions,
+            [
+                np.minimum(trend_strength, 0.95),
+                np.minimum(trend_strength, 0.95),
+                trend_strength * 0.8,
+                trend_strength * 0.8,
+                0.6,
+                np.minimum(volatility, 0.9),
+                np.minimum((1 - volatility) * range_bound, 0.85),
+                np.minimum(range_bound, 0.8),
+            ],
+            0.5,
+        )
+
+        self.trend_strength[rows] = trend_strength
+        self.volatility_level[rows] = volatility
+        self.range_bound_score[rows] = range_bound
+        self.bb_position[rows] = bb_position
+        self.volume_trend[rows] = volume_trend
+        self.confidence[rows] = np.where(ready, confidence, 0.0)
+
+        # Stability (decayed counts), distribution and transitions for classified rows
+        live = rows[ready]
+        code = regime[ready]
+        previous = self.regime[live]
+        self.stability[live] *= 0.99
+        self.stability[live, code] += 1
+        self.regime_counts[live, code] += 1
+        seen = previous != _UNKNOWN
+        self.transitions[live[seen], previous[seen], code[seen]] += 1
+        self.regime[rows] = np.where(ready, regime, _UNKNOWN)
+
+    # --- Readers (no recomputation) -------------------------------------------------
+
+    def get_metrics(self, symbol: str) -> Optional[RegimeMetrics]:
+        if self._pending:
+            self.flush()
+        row = self._rows.get(symbol)
+        if row is None or self.regime[row] == _UNKNOWN:
+            return None
+        return RegimeMetrics(
+            regime=_REGIMES[self.regime[row]],
+            confidence=float(self.confidence[row]),
+            trend_strength=float(self.trend_strength[row]),
+            volatility_level=float(self.volatility_level[row]),
+            range_bound_score=float(self.range_bound_score[row]),
+            momentum_score=float(self.momentum_score[row]),
+            timestamp_us=get_timestamp_us(),
+            adx_score=float(self.adx[row]),
+            rsi_score=abs(50 - float(self.rsi[row])) / 50.0,
+            bb_position=float(self.bb_position[row]),
+            volume_trend=float(self.volume_trend[row]),
+        )
+
+    def get_regimes(self) -> Dict[str, str]:
+        """Current regime of every tracked symbol."""
+        if self._pending:
+            self.flush()
+        codes = self.regime[: len(self.symbols)].tolist()
+        return {symbol: _REGIMES[code].value for symbol, code in zip(self.symbols, codes)}
+
+    def get_stability_score(self, symbol: str, regime: MarketRegime) -> float:
+        row = self._rows.get(symbol)
+        if row is None:
+            return 0.0
+        total = float(self.stability[row].sum())
+        return float(self.stability[row, _CODE[regime]]) / total if total else 0.0
+
+    def get_transition_probability(
+        self, symbol: str, from_regime: MarketRegime, to_regime: MarketRegime
+    ) -> float:
+        row = self._rows.get(symbol)
+        if row is None:
+            return 0.1
+        outgoing = self.transitions[row, _CODE[from_regime]]
+        total = int(outgoing.sum())
+        return float(outgoing[_CODE[to_regime]]) / total if total else 0.1
+
+    def get_stats(self, symbol: str) -> Dict:
+        metrics = self.get_metrics(symbol)
+        row = self._rows.get(symbol)
+        if row is None or not self.regime_counts[row].any():
+            return {"total_regimes": 0}
+        counts = dict(zip((r.value for r in _REGIMES), self.regime_counts[row].tolist()))
+        total = float(self.stability[row].sum())
+        return {
+            "total_regimes": int(sum(counts.values())),
+            "regime_distribution": counts,
+            "most_common_regime": max(counts, key=counts.get),
+            "regime_stability": dict(
+                zip((r.value for r in _REGIMES), (self.stability[row] / total).tolist())
+            ),
+            "current_regime": metrics.regime.value if metrics else None,
+            "current_confidence": metrics.confidence if metrics else 0.0,
+        }
+
+
 class MarketRegimeDetector:
     """Advanced market regime detector using multiple technical indicators."""
 
@@ -67,24 +461,10 @@ class MarketRegimeDetector:
         self.window_size = window_size
         self.min_periods = min_periods
 
-        # Price and volume data buffers
-        self.prices: Deque[float] = Deque(maxlen=window_size)
-        self.volumes: Deque[float] = Deque(maxlen=window_size)
-        self.highs: Deque[float] = Deque(maxlen=window_size)
-        self.lows: Deque[float] = Deque(maxlen=window_size)
-
-        # Indicator buffers
-        self.sma_20: Deque[float] = Deque(maxlen=window_size)
-        self.sma_50: Deque[float] = Deque(maxlen=window_size)
-        self.ema_12: Deque[float] = Deque(maxlen=window_size)
-        self.ema_26: Deque[float] = Deque(maxlen=window_size)
-        self.rsi_values: Deque[float] = Deque(maxlen=window_size)
-        self.adx_values: Deque[float] = Deque(maxlen=window_size)
-
-        # Bollinger Bands
-        self.bb_upper: Deque[float] = Deque(maxlen=window_size)
-        self.bb_lower: Deque[float] = Deque(maxlen=window_size)
-        self.bb_middle: Deque[float] = Deque(maxlen=window_size)
+        # Single-series view on the streaming engine
+        self._engine = RegimeEngine(min_periods=min_periods, capacity=1)
+        self._rows = np.zeros(1, dtype=np.int64)
+        self._engine.row("_")
 
         # Historical regime tracking
         self.regime_history: Deque[RegimeMetrics] = Deque(maxlen=1000)
@@ -97,19 +477,14 @@ class MarketRegimeDetector:
         Add new price/volume data and return current regime analysis.
         Returns None if insufficient data for analysis.
         """
-        self.prices.append(price)
-        self.volumes.append(volume)
-        self.highs.append(high)
-        self.lows.append(low)
-
-        if len(self.prices) < self.min_periods:
-            return None
-
-        # Calculate all indicators
-        self._calculate_indicators()
-
-        # Determine regime
-        regime_metrics = self._analyze_regime()
+        self._engine.update_rows(
+            self._rows,
+            np.array([price], dtype=np.float64),
+            np.array([high], dtype=np.float64),
+            np.array([low], dtype=np.float64),
+            np.array([volume], dtype=np.float64),
+        )
+        regime_metrics = self._engine.get_metrics("_")
 
         # Update stability tracking
         if regime_metrics:
@@ -118,278 +493,6 @@ class MarketRegimeDetector:
 
         return regime_metrics
 
-    def _calculate_indicators(self):
-        """Calculate all technical indicators."""
-        prices_list = list(self.prices)
-
-        # Simple Moving Averages
-        if len(prices_list) >= 20:
-            self.sma_20.append(statistics.mean(prices_list[-20:]))
-        if len(prices_list) >= 50:
-            self.sma_50.append(statistics.mean(prices_list[-50:]))
-
-        # Exponential Moving Averages
-        self._calculate_ema(prices_list, 12, self.ema_12)
-        self._calculate_ema(prices_list, 26, self.ema_26)
-
-        # RSI
-        self._calculate_rsi(prices_list)
-
-        # ADX (Average Directional Index)
-        self._calculate_adx()
-
-        # Bollinger Bands
-        self._calculate_bollinger_bands(prices_list)
-
-    def _calculate_ema(self, prices: List[float], period: int, target_buffer: Deque):
-        """Calculate Exponential Moving Average."""
-        if len(prices) < period:
-            return
-
-        multiplier = 2 / (period + 1)
-
-        if not target_buffer:
-            # Initialize with SMA
-            target_buffer.append(statistics.mean(prices[:period]))
-        else:
-            # Calculate EMA
-            current_ema = target_buffer[-1]
-            ema_value = (prices[-1] - current_ema) * multiplier + current_ema
-            target_buffer.append(ema_value)
-
-    def _calculate_rsi(self, prices: List[float], period: int = 14):
-        """Calculate Relative Strength Index."""
-        if len(prices) < period + 1:
-            return
-
-        gains = []
-        losses = []
-
-        for i in range(1, len(prices)):
-            change = prices[i] - prices[i - 1]
-            gains.append(max(change, 0))
-            losses.append(max(-change, 0))
-
-        if len(gains) >= period:
-            avg_gain = statistics.mean(gains[-period:])
-            avg_loss = statistics.mean(losses[-period:])
-
-            if avg_loss == 0:
-                rsi = 100.0
-            else:
-                rs = avg_gain / avg_loss
-                rsi = 100 - (100 / (1 + rs))
-
-            self.rsi_values.append(rsi)
-
-    def _calculate_adx(self, period: int = 14):
-        """Calculate Average Directional Index."""
-        if len(self.highs) < period or len(self.lows) < period or len(self.prices) < period:
-            return
-
-        highs = list(self.highs)[-period:]
-        lows = list(self.lows)[-period:]
-        closes = list(self.prices)[-period:]
-
-        # Calculate True Range, +DI, -DI
-        tr_values = []
-        plus_dm_values = []
-        minus_dm_values = []
-
-        for i in range(1, len(highs)):
-            # True Range
-            tr = max(
-                highs[i] - lows[i], abs(highs[i] - closes[i - 1]), abs(lows[i] - closes[i - 1])
-            )
-            tr_values.append(tr)
-
-            # Directional Movement
-            move_up = highs[i] - highs[i - 1]
-            move_down = lows[i - 1] - lows[i]
-
-            plus_dm = move_up if move_up > move_down and move_up > 0 else 0
-            minus_dm = move_down if move_down > move_up and move_down > 0 else 0
-
-            plus_dm_values.append(plus_dm)
-            minus_dm_values.append(minus_dm)
-
-        if len(tr_values) >= period - 1:
-            # Average TR, +DI, -DI
-            avg_tr = statistics.mean(tr_values)
-            avg_plus_dm = statistics.mean(plus_dm_values)
-            avg_minus_dm = statistics.mean(minus_dm_values)
-
-            plus_di = (avg_plus_dm / avg_tr) * 100 if avg_tr > 0 else 0
-            minus_di = (avg_minus_dm / avg_tr) * 100 if avg_tr > 0 else 0
-
-            # DX and ADX
-            dx = (
-                abs(plus_di - minus_di) / (plus_di + minus_di) * 100
-                if (plus_di + minus_di) > 0
-                else 0
-            )
-            self.adx_values.append(dx)
-
-    def _calculate_bollinger_bands(
-        self, prices: List[float], period: int = 20, std_dev: float = 2.0
-    ):
-        """Calculate Bollinger Bands."""
-        if len(prices) < period:
-            return
-
-        recent_prices = prices[-period:]
-        sma = statistics.mean(recent_prices)
-        std = statistics.stdev(recent_prices) if len(recent_prices) > 1 else 0
-
-        self.bb_middle.append(sma)
-        self.bb_upper.append(sma + std_dev * std)
-        self.bb_lower.append(sma - std_dev * std)
-
-    def _analyze_regime(self) -> Optional[RegimeMetrics]:
-        """Analyze current market regime using all indicators."""
-        if (
-            len(self.prices) < self.min_periods
-            or not self.adx_values
-            or not self.rsi_values
-            or not self.bb_upper
-        ):
-            return None
-
-        current_price = self.prices[-1]
-
-        # Calculate component scores
-        adx_score = self.adx_values[-1] if self.adx_values else 0
-
-        # Trend strength (ADX > 25 indicates trending market)
-        trend_strength = min(adx_score / 25.0, 1.0)
-
-        # RSI divergence (extreme RSI can indicate regime changes)
-        rsi_score = abs(50 - self.rsi_values[-1]) / 50.0 if self.rsi_values else 0
-
-        # Bollinger Band position (how far price is from middle band)
-        bb_middle = self.bb_middle[-1] if self.bb_middle else current_price
-        bb_upper = self.bb_upper[-1] if self.bb_upper else current_price
-        bb_lower = self.bb_lower[-1] if self.bb_lower else current_price
-
-        if bb_upper > bb_lower:
-            bb_position = (current_price - bb_lower) / (bb_upper - bb_lower)
-            bb_position = max(0, min(1, bb_position))  # Clamp to [0,1]
-        else:
-            bb_position = 0.5
-
-        # Volume trend analysis
-        volume_trend = self._analyze_volume_trend()
-
-        # Volatility level (BB width relative to price)
-        bb_width = (bb_upper - bb_lower) / bb_middle if bb_middle > 0 else 0
-        volatility_level = min(bb_width * 100, 1.0)  # Scale and cap
-
-        # Range-bound score (low ADX + price near BB middle)
-        range_bound_score = (1 - trend_strength) * (1 - abs(bb_position - 0.5) * 2)
-
-        # Momentum score (MACD-like signal)
-        momentum_score = self._calculate_momentum_score()
-
-        # Regime classification logic
-        regime, confidence = self._classify_regime(
-            trend_strength,
-            volatility_level,
-            range_bound_score,
-            momentum_score,
-            adx_score,
-            bb_position,
-        )
-
-        return RegimeMetrics(
-            regime=regime,
-            confidence=confidence,
-            trend_strength=trend_strength,
-            volatility_level=volatility_level,
-            range_bound_score=range_bound_score,
-            momentum_score=momentum_score,
-            timestamp_us=get_timestamp_us(),
-            adx_score=adx_score,
-            rsi_score=rsi_score,
-            bb_position=bb_position,
-            volume_trend=volume_trend,
-        )
-
-    def _analyze_volume_trend(self) -> float:
-        """Analyze volume trend (increasing/decreasing volume)."""
-        if len(self.volumes) < 10:
-            return 0.0
-
-        recent_volumes = list(self.volumes)[-20:]
-        if len(recent_volumes) < 10:
-            return 0.0
-
-        # Simple linear regression slope
-        x = list(range(len(recent_volumes)))
-        y = recent_volumes
-
-        try:
-            slope = statistics.linear_regression(x, y).slope
-            avg_volume = statistics.mean(recent_volumes)
-            return slope / avg_volume if avg_volume > 0 else 0.0
-        except:
-            return 0.0
-
-    def _calculate_momentum_score(self) -> float:
-        """Calculate momentum score using EMA crossover."""
-        if len(self.ema_12) < 2 or len(self.ema_26) < 2:
-            return 0.0
-
-        ema12_current = self.ema_12[-1]
-        ema26_current = self.ema_26[-1]
-        ema12_prev = self.ema_12[-2]
-        ema26_prev = self.ema_26[-2]
-
-        # MACD-like momentum
-        momentum = (ema12_current - ema26_current) - (ema12_prev - ema26_prev)
-        return momentum / abs(ema26_current) if ema26_current != 0 else 0.0
-
-    def _classify_regime(
-        self,
-        trend_strength: float,
-        volatility_level: float,
-        range_bound_score: float,
-        momentum_score: float,
-        adx_score: float,
-        bb_position: float,
-    ) -> Tuple[MarketRegime, float]:
-        """Classify market regime based on indicator scores."""
-
-        # Trending regimes
-        if trend_strength > 0.6:  # Strong trend (ADX > 15)
-            if momentum_score > 0.001:
-                return MarketRegime.TRENDING_UP, min(trend_strength, 0.95)
-            elif momentum_score < -0.001:
-                return MarketRegime.TRENDING_DOWN, min(trend_strength, 0.95)
-            else:
-                # Neutral trend - check direction
-                if bb_position > 0.6:
-                    return MarketRegime.TRENDING_UP, trend_strength * 0.8
-                elif bb_position < 0.4:
-                    return MarketRegime.TRENDING_DOWN, trend_strength * 0.8
-                else:
-                    return MarketRegime.RANGING, 0.6
-
-        # Volatile regime
-        elif volatility_level > 0.7:  # High volatility (wide BB)
-            return MarketRegime.VOLATILE, min(volatility_level, 0.9)
-
-        # Calm regime
-        elif volatility_level < 0.3 and range_bound_score > 0.6:
-            return MarketRegime.CALM, min((1 - volatility_level) * range_bound_score, 0.85)
-
-        # Ranging regime
-        elif range_bound_score > 0.5 and trend_strength < 0.4:
-            return MarketRegime.RANGING, min(range_bound_score, 0.8)
-
-        # Default to ranging if unclear
-        else:
-            return MarketRegime.RANGING, 0.5
-
     def _update_regime_stability(self, regime: MarketRegime):
         """Update regime stability counters."""
         # Decay all counters
@@ -466,3 +569,15 @@ async def get_market_regime_detector() -> MarketRegimeDetector:
     if _market_regime_detector is None:
         _market_regime_detector = MarketRegimeDetector()
     return _market_regime_detector
+
+
+# Global multi-symbol regime engine (fed by closed klines from the candle store)
+_regime_engine: Optional[RegimeEngine] = None
+
+
+def get_regime_engine() -> RegimeEngine:
+    """Get global multi-symbol regime engine instance."""
+    global _regime_engine
+    if _regime_engine is None:
+        _regime_engine = RegimeEngine()
+    return _regime_engine
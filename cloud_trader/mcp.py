@@ -4,12 +4,14 @@ import asyncio
 import json
 import logging
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 import httpx
 from httpx import HTTPStatusError
 from pydantic import BaseModel, Field
 
+from .config import get_settings
+
 
 class MCPMessageType(str, Enum):
     OBSERVATION = "observation"
@@ -177,6 +179,7 @@ class MCPClient:
         self._session_id = session_id
         self._client = httpx.AsyncClient(timeout=timeout)
         self._lock = asyncio.Lock()
+        self._late_queries: Set[asyncio.Task] = set()
 
         # Vertex AI integration
         self._vertex_enabled = False
@@ -280,6 +283,7 @@ class MCPClient:
             enhanced_query = self._enhance_query_with_context(query, context or {})
 
             # Query the Vertex AI agent
+            kwargs.setdefault("market_state", self._context_state(query, context or {}))
             response = await self._vertex_client.predict_with_fallback(
                 agent_id, enhanced_query, **kwargs
             )
@@ -297,6 +301,19 @@ class MCPClient:
 
             raise
 
+    @staticmethod
+    def _context_state(query: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Inference cache key inputs: the raw query verbatim (numbers in the
+        enhanced prompt are masked) plus the context fields rendered into it.
+        """
+        state = {"query": query}
+        state.update({key: context[key] for key in ("symbol", "side", "price") if key in context})
+        market = context.get("market_data")
+        if isinstance(market, dict):
+            state.update({key: market[key] for key in ("change_24h", "volume") if key in market})
+        return state
+
     def _enhance_query_with_context(self, query: str, context: Dict[str, Any]) -> str:
         """Enhance query with additional context for better agent responses."""
         context_parts = []
@@ -443,26 +460,52 @@ class MCPClient:
             return "unhealthy"
 
     async def query_multiple_agents(
-        self, agent_ids: list[str], query: str, context: Optional[Dict[str, Any]] = None, **kwargs
+        self,
+        agent_ids: list[str],
+        query: str,
+        context: Optional[Dict[str, Any]] = None,
+        budget: Optional[float] = None,
+        **kwargs,
     ) -> Dict[str, Any]:
-        """Query multiple Vertex AI agents and return consensus."""
+        """
+        Query multiple Vertex AI agents and return consensus.
+
+        Consensus is built from the agents that answer within ``budget`` seconds
+        (default ``llm_decision_budget_seconds``), so one slow model cannot stall
+        the decision. Stragglers are reported as late and left to finish in the
+        background, where their answers still warm the response cache.
+        """
         if not self._vertex_enabled or not self._vertex_client:
             raise RuntimeError("Vertex AI integration not available")
 
-        # Query all agents concurrently
+        budget = get_settings().llm_decision_budget_seconds if budget is None else budget
+
+        # Query all agents concurrently, each hedged within the same budget
         tasks = [
-            self.query_vertex_agent(agent_id, query, context, **kwargs) for agent_id in agent_ids
+            asyncio.ensure_future(
+                self.query_vertex_agent(agent_id, query, context, budget=budget, **kwargs)
+            )
+            for agent_id in agent_ids
         ]
-
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        _, pending = await asyncio.wait(tasks, timeout=budget)
+        for task in pending:
+            self._late_queries.add(task)
+            task.add_done_callback(self._late_query_done)
 
         # Process results
         responses = {}
         errors = []
         confidences = []
 
-        for i, result in enumerate(results):
-            agent_id = agent_ids[i]
+        late = 0
+        for agent_id, task in zip(agent_ids, tasks):
+            if task in pending or isinstance(task.exception(), asyncio.TimeoutError):
+                late += 1
+                error = f"no answer within {budget:.1f}s budget"
+                errors.append({"agent_id": agent_id, "error": error})
+                responses[agent_id] = {"success": False, "error": error, "late": True}
+                continue
+            result = task.exception() or task.result()
             if isinstance(result, Exception):
                 errors.append({"agent_id": agent_id, "error": str(result)})
                 responses[agent_id] = {"success": False, "error": str(result)}
@@ -480,6 +523,7 @@ class MCPClient:
             "responses": responses,
             "consensus_confidence": consensus_confidence,
             "total_agents": len(agent_ids),
+            "late_agents": late,
             "successful_responses": len([r for r in responses.values() if r.get("success", True)]),
             "errors": errors,
             "timestamp": asyncio.get_event_loop().time(),
@@ -498,7 +542,14 @@ class MCPClient:
 
         return consensus_result
 
+    def _late_query_done(self, task: asyncio.Task) -> None:
+        self._late_queries.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Late agent query failed: {task.exception()}")
+
     async def close(self) -> None:
+        for task in self._late_queries:
+            task.cancel()
         await self._client.aclose()
 
 
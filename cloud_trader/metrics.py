@@ -5,8 +5,8 @@ from prometheus_client import Counter, Gauge, Histogram
 # General API metrics
 ASTER_API_REQUESTS = Counter(
     "aster_api_requests_total",
-    "Total requests to the Aster API",
-    ["endpoint", "method"],
+    "Total requests to the Aster API (result: sent, merged into an in-flight call, or cached)",
+    ["endpoint", "method", "result"],
 )
 
 ASTER_API_LATENCY = Histogram(
@@ -232,6 +232,67 @@ REDIS_STREAM_FAILURES = Counter(
     ["stream_name"],
 )
 
+BIGQUERY_QUEUE_DEPTH = Gauge(
+    "bigquery_queue_depth_rows",
+    "Rows buffered in memory waiting for a BigQuery batch insert",
+    ["table"],
+)
+
+BIGQUERY_ROWS_WRITTEN = Counter(
+    "bigquery_rows_written_total",
+    "Rows accepted by BigQuery batch inserts",
+    ["table"],
+)
+
+BIGQUERY_ROWS_SPILLED = Counter(
+    "bigquery_rows_spilled_total",
+    "Rows written to the local spill file instead of BigQuery",
+    ["table", "reason"],
+)
+
+BIGQUERY_ROWS_DROPPED = Counter(
+    "bigquery_rows_dropped_total",
+    "Rows lost because they were rejected or could not be spilled",
+    ["table", "reason"],
+)
+
+BIGQUERY_FLUSH_LATENCY = Histogram(
+    "bigquery_flush_latency_seconds",
+    "Latency of one BigQuery batch insert",
+    ["table"],
+    buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0],
+)
+
+TRADE_STREAM_MESSAGES = Counter(
+    "trade_stream_messages_total",
+    "aggTrade messages received per websocket shard",
+    ["shard"],
+)
+
+TRADE_STREAM_LAG = Gauge(
+    "trade_stream_lag_seconds",
+    "Smoothed delay between exchange event time and receipt, per websocket shard",
+    ["shard"],
+)
+
+TRADE_STREAM_GAPS = Counter(
+    "trade_stream_gap_trades_total",
+    "aggTrade ids skipped (missed trades) per websocket shard",
+    ["shard"],
+)
+
+TRADE_STREAM_RECONNECTS = Counter(
+    "trade_stream_reconnects_total",
+    "Reconnects per websocket shard",
+    ["shard"],
+)
+
+TRADE_STREAM_DROPPED = Counter(
+    "trade_stream_dropped_trades_total",
+    "Trades dropped because the batch queue was full",
+    ["policy"],
+)
+
 MARKET_FEED_LATENCY = Histogram(
     "market_feed_latency_seconds",
     "Latency of the market data feed",
@@ -245,6 +306,26 @@ MARKET_FEED_ERRORS = Counter(
     ["symbol", "error_type"],
 )
 
+# Trading loop stage metrics
+STAGE_LATENCY = Histogram(
+    "trading_stage_latency_seconds",
+    "Wall time of one run of a trading loop stage",
+    ["stage"],
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0],
+)
+
+STAGE_OVERRUNS = Counter(
+    "trading_stage_overruns_total",
+    "Stage runs that exceeded their deadline or skipped scheduled slots",
+    ["stage", "kind"],
+)
+
+STAGE_ERRORS = Counter(
+    "trading_stage_errors_total",
+    "Stage runs that raised an exception",
+    ["stage"],
+)
+
 # Order execution metrics
 POSITION_VERIFICATION_TIME = Histogram(
     "position_verification_time_seconds",
@@ -328,3 +409,16 @@ AGENT_CONFLICT_SCORE = Histogram(
     "Disagreement score between agents",
     buckets=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
 )
+
+# LLM inference cache metrics
+LLM_CACHE_LOOKUPS = Counter(
+    "llm_cache_lookups_total",
+    "Inference cache lookups by outcome (hit, joined, miss)",
+    ["agent", "result"],
+)
+
+LLM_CACHE_SAVED_SECONDS = Counter(
+    "llm_cache_saved_seconds_total",
+    "Model latency avoided by serving cached responses",
+    ["agent"],
+)
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import math
 from collections import defaultdict, deque
 from dataclasses import dataclass, field
 from enum import Enum
@@ -106,6 +107,267 @@ class MultiTimeframeSignal:
         }
 
 
+# Bar lengths for rolling the 1m base stream up. Weeks start on Monday, four days after the
+# epoch (a Thursday), so the weekly bucket is offset to line up with exchange weekly klines.
+TIMEFRAME_MS: Dict[Timeframe, int] = {
+    Timeframe.ONE_MINUTE: 60_000,
+    Timeframe.FIVE_MINUTES: 5 * 60_000,
+    Timeframe.FIFTEEN_MINUTES: 15 * 60_000,
+    Timeframe.THIRTY_MINUTES: 30 * 60_000,
+    Timeframe.ONE_HOUR: 3_600_000,
+    Timeframe.FOUR_HOURS: 4 * 3_600_000,
+    Timeframe.ONE_DAY: 86_400_000,
+    Timeframe.ONE_WEEK: 7 * 86_400_000,
+}
+_BUCKET_OFFSET_MS: Dict[Timeframe, int] = {Timeframe.ONE_WEEK: 4 * 86_400_000}
+
+RESYNC_BARS = 1000  # Recompute running sums from their window this often to cancel float drift
+
+
+class _SlidingSlope:
+    """Least-squares slope and mean of the last ``window`` values, O(1) per value."""
+
+    __slots__ = ("window", "values", "sum_y", "sum_xy", "_pushes")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque(maxlen=window)
+        self.sum_y = 0.0
+        self.sum_xy = 0.0  # x is the position in the window: 0 (oldest) .. n-1 (newest)
+        self._pushes = 0
+
+    def push(self, y: float) -> None:
+        n = len(self.values)
+        if n == self.window:
+            oldest = self.values[0]
+            self.sum_xy -= self.sum_y - oldest  # Every remaining value moves down one x
+            self.sum_y -= oldest
+            n -= 1
+        self.values.append(y)
+        self.sum_xy += n * y
+        self.sum_y += y
+        self._pushes += 1
+        if self._pushes % RESYNC_BARS == 0:
+            self.sum_y = math.fsum(self.values)
+            self.sum_xy = math.fsum(i * v for i, v in enumerate(self.values))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def mean(self) -> float:
+        return self.sum_y / len(self.values) if self.values else 0.0
+
+    @property
+    def slope(self) -> float:
+        n = len(self.values)
+        if n < 2:
+            return 0.0
+        sum_x = n * (n - 1) / 2
+        sum_x2 = (n - 1) * n * (2 * n - 1) / 6
+        return (n * self.sum_xy - sum_x * self.sum_y) / (n * sum_x2 - sum_x**2)
+
+
+class TimeframeStats:
+    """
+    Streaming statistics for one (symbol, timeframe) series.
+
+    Updated once per closed bar so the analysis passes read a handful of floats
+    instead of copying and rescanning the bar history on every call.
+    """
+
+    TREND_WINDOW = 10  # Closes in the trend-alignment slope
+    VOLUME_WINDOW = 15  # Bars in the volume-confirmation slopes and average
+    VOLATILITY_WINDOW = 30  # Closes (29 returns) in the volatility estimate
+    LEVEL_WINDOW = 20  # Highs/lows used for support/resistance and patterns
+    RSI_PERIOD = 14
+
+    def __init__(self):
+        self.count = 0
+        self.last: Optional[TimeframeData] = None
+        self.trend = _SlidingSlope(self.TREND_WINDOW)
+        self.price = _SlidingSlope(self.VOLUME_WINDOW)
+        self.volume = _SlidingSlope(self.VOLUME_WINDOW)
+        self.returns_sq: deque = deque(maxlen=self.VOLATILITY_WINDOW - 1)
+        self.sum_returns_sq = 0.0
+        self.highs: deque = deque(maxlen=self.LEVEL_WINDOW)
+        self.lows: deque = deque(maxlen=self.LEVEL_WINDOW)
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.rsi: Optional[float] = None
+        self.prev_rsi: Optional[float] = None
+
+    def update(self, data: TimeframeData) -> None:
+        close = data.close_price
+        if self.last is not None:
+            prev_close = self.last.close_price
+            change = close - prev_close
+
+            # Wilder RSI; a plain running mean until RSI_PERIOD changes have been seen
+            k = min(self.count, self.RSI_PERIOD)
+            self.avg_gain += (max(change, 0.0) - self.avg_gain) / k
+            self.avg_loss += (max(-change, 0.0) - self.avg_loss) / k
+            if self.count >= self.RSI_PERIOD:
+                if self.avg_loss == 0:
+                    rsi = 100.0
+                else:
+                    rsi = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+                self.prev_rsi = self.rsi if self.rsi is not None else rsi
+                self.rsi = rsi
+
+            ret_sq = (change / prev_close) ** 2 if prev_close else 0.0
+            if len(self.returns_sq) == self.returns_sq.maxlen:
+                self.sum_returns_sq -= self.returns_sq[0]
+            self.returns_sq.append(ret_sq)
+            self.sum_returns_sq += ret_sq
+            if self.count % RESYNC_BARS == 0:
+                self.sum_returns_sq = math.fsum(self.returns_sq)
+
+        self.trend.push(close)
+        self.price.push(close)
+        self.volume.push(data.volume)
+        self.highs.append(data.high_price)
+        self.lows.append(data.low_price)
+        self.last = data
+        self.count += 1
+
+    @property
+    def volatility(self) -> Optional[float]:
+        """Root mean square of the recent returns."""
+        if not self.returns_sq:
+            return None
+        return (max(self.sum_returns_sq, 0.0) / len(self.returns_sq)) ** 0.5
+
+
+class BarAggregator:
+    """
+    Roll a single 1m base stream (bars or trades) up into every higher timeframe.
+
+    Each base bar is folded into the open bucket of every target timeframe; a bucket is
+    emitted to the analyzer as soon as the 1m bar that ends it arrives, so a 4h bar closes
+    on the same tick as its last minute instead of waiting for the next bucket to open.
+    Gaps in the base stream close whatever partial bucket was open.
+    """
+
+    def __init__(
+        self,
+        analyzer: "MultiTimeframeAnalyzer",
+        timeframes: Optional[List[Timeframe]] = None,
+    ):
+        self.analyzer = analyzer
+        if timeframes is None:
+            timeframes = [tf for tf in Timeframe if tf != Timeframe.ONE_MINUTE]
+        self.timeframes = sorted(
+            (tf for tf in timeframes if tf != Timeframe.ONE_MINUTE), key=TIMEFRAME_MS.get
+        )
+        # (symbol, timeframe) -> [open_time_ms, open, high, low, close, volume]
+        self._partial: Dict[Tuple[str, Timeframe], List[float]] = {}
+        self._trade_bars: Dict[str, List[float]] = {}
+        self._last_base: Dict[str, int] = {}
+        self.stats = {"base_bars": 0, "trades": 0, "emitted": 0, "stale": 0}
+
+    def add_bar(
+        self,
+        symbol: str,
+        open_time_ms: int,
+        open_price: float,
+        high_price: float,
+        low_price: float,
+        close_price: float,
+        volume: float,
+    ) -> List[TimeframeData]:
+        """Feed one closed 1m bar; returns every bar it closed, the 1m bar first."""
+        last = self._last_base.get(symbol)
+        if last is not None and open_time_ms <= last:
+            self.stats["stale"] += 1
+            return []
+        self._last_base[symbol] = open_time_ms
+        self.stats["base_bars"] += 1
+
+        base = [open_time_ms, open_price, high_price, low_price, close_price, volume]
+        closed = [self._emit(symbol, Timeframe.ONE_MINUTE, base)]
+        end = open_time_ms + TIMEFRAME_MS[Timeframe.ONE_MINUTE]
+        for timeframe in self.timeframes:
+            size = TIMEFRAME_MS[timeframe]
+            offset = _BUCKET_OFFSET_MS.get(timeframe, 0)
+            bucket = (open_time_ms - offset) // size * size + offset
+            key = (symbol, timeframe)
+
+            bar = self._partial.get(key)
+            if bar is not None and bar[0] != bucket:
+                closed.append(self._emit(symbol, timeframe, bar))  # Base stream skipped ahead
+                bar = None
+            if bar is None:
+                bar = self._partial[key] = list(base)
+                bar[0] = bucket
+            else:
+                bar[2] = max(bar[2], high_price)
+                bar[3] = min(bar[3], low_price)
+                bar[4] = close_price
+                bar[5] += volume
+
+            if end >= bucket + size:
+                closed.append(self._emit(symbol, timeframe, bar))
+                del self._partial[key]
+        return closed
+
+    def add_data(self, data: TimeframeData) -> List[TimeframeData]:
+        """Feed a 1m ``TimeframeData`` (``timestamp_us`` is the bar open time)."""
+        if data.timeframe != Timeframe.ONE_MINUTE:
+            raise ValueError(f"Base stream must be 1m bars, got {data.timeframe.value}")
+        return self.add_bar(
+            data.symbol,
+            data.timestamp_us // 1000,
+            data.open_price,
+            data.high_price,
+            data.low_price,
+            data.close_price,
+            data.volume,
+        )
+
+    def add_trade(
+        self, symbol: str, timestamp_ms: int, price: float, quantity: float
+    ) -> List[TimeframeData]:
+        """
+        Fold a trade into the current 1m bar.
+
+        The minute is closed (and rolled up) by the first trade of a later minute;
+        returns the bars that trade closed.
+        """
+        self.stats["trades"] += 1
+        minute = timestamp_ms // 60_000 * 60_000
+        bar = self._trade_bars.get(symbol)
+        closed: List[TimeframeData] = []
+        if bar is not None:
+            if minute < bar[0]:
+                self.stats["stale"] += 1
+                return closed
+            if minute == bar[0]:
+                bar[2] = max(bar[2], price)
+                bar[3] = min(bar[3], price)
+                bar[4] = price
+                bar[5] += quantity
+                return closed
+            closed = self.add_bar(symbol, *bar)
+        self._trade_bars[symbol] = [minute, price, price, price, price, quantity]
+        return closed
+
+    def _emit(self, symbol: str, timeframe: Timeframe, bar: List[float]) -> TimeframeData:
+        data = TimeframeData(
+            timeframe=timeframe,
+            symbol=symbol,
+            timestamp_us=int(bar[0]) * 1000,
+            open_price=bar[1],
+            high_price=bar[2],
+            low_price=bar[3],
+            close_price=bar[4],
+            volume=bar[5],
+        )
+        self.analyzer.add_market_data(data)
+        self.stats["emitted"] += 1
+        return data
+
+
 class MultiTimeframeAnalyzer:
     """
     Advanced multi-timeframe analysis system.
@@ -114,13 +376,20 @@ class MultiTimeframeAnalyzer:
     by considering alignment, divergence, and confirmation patterns.
     """
 
-    def __init__(self, max_history: int = 1000):
+    def __init__(self, max_history: int = 1000, cache_flush_interval: float = 5.0):
         self.max_history = max_history
+        self.cache_flush_interval = cache_flush_interval
 
         # Data storage: symbol -> timeframe -> deque of TimeframeData
         self.market_data: Dict[str, Dict[Timeframe, deque]] = defaultdict(
             lambda: defaultdict(lambda: deque(maxlen=max_history))
         )
+        # Streaming statistics read by the analysis passes: symbol -> timeframe -> stats
+        self.stats: Dict[str, Dict[Timeframe, TimeframeStats]] = defaultdict(
+            lambda: defaultdict(TimeframeStats)
+        )
+        # Rolls a 1m base stream up into the higher timeframes
+        self.aggregator = BarAggregator(self)
 
         # Analysis weights for different timeframes
         self.timeframe_weights = {
@@ -137,6 +406,10 @@ class MultiTimeframeAnalyzer:
         # Cache for performance
         self._cache: Optional[BaseCache] = None
         self._cache_ready = False
+        # Cache writes are batched into one set_many per flush interval
+        self._pending_cache: Dict[str, TimeframeData] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._cache_flushes = 0
 
         # Analysis functions
         self.analysis_functions: Dict[AnalysisType, Callable] = {
@@ -159,17 +432,47 @@ class MultiTimeframeAnalyzer:
             logger.warning(f"Failed to initialize analyzer cache: {e}")
 
     def add_market_data(self, data: TimeframeData) -> None:
-        """Add market data for a specific timeframe."""
+        """Add a closed bar for a specific timeframe."""
         symbol_data = self.market_data[data.symbol]
         symbol_data[data.timeframe].append(data)
+        self.stats[data.symbol][data.timeframe].update(data)
 
-        # Cache if available
+        # Cache if available (written by the next coalesced flush)
         if self._cache_ready:
             cache_key = f"mtf_data:{data.symbol}:{data.timeframe.value}:{data.timestamp_us}"
-            try:
-                asyncio.create_task(self._cache.set(cache_key, data.to_dict(), ttl=3600))  # 1 hour
-            except Exception as e:
-                logger.debug(f"Failed to cache market data: {e}")
+            self._pending_cache[cache_key] = data
+            self._schedule_cache_flush()
+
+    def add_base_bar(self, data: TimeframeData) -> List[TimeframeData]:
+        """Add a 1m bar and every higher-timeframe bar it closes."""
+        return self.aggregator.add_data(data)
+
+    def _schedule_cache_flush(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop yet: the pending writes go out with the next flush
+        self._flush_task = loop.create_task(self._flush_after_interval())
+
+    async def _flush_after_interval(self) -> None:
+        await asyncio.sleep(self.cache_flush_interval)
+        await self.flush_cache()
+
+    async def flush_cache(self) -> int:
+        """Write all pending bars to the cache in one batch; returns how many were written."""
+        if not self._pending_cache or self._cache is None:
+            return 0
+        pending, self._pending_cache = self._pending_cache, {}
+        try:
+            await self._cache.set_many(
+                {key: data.to_dict() for key, data in pending.items()}, ttl=3600  # 1 hour
+            )
+            self._cache_flushes += 1
+        except Exception as e:
+            logger.debug(f"Failed to cache market data: {e}")
+        return len(pending)
 
     async def analyze_symbol(
         self,
@@ -198,12 +501,33 @@ class MultiTimeframeAnalyzer:
 
         return signals
 
+    async def analyze_all(
+        self,
+        primary_timeframe: Timeframe = Timeframe.ONE_HOUR,
+        analysis_types: Optional[List[AnalysisType]] = None,
+        symbols: Optional[List[str]] = None,
+    ) -> Dict[str, List[MultiTimeframeSignal]]:
+        """
+        Run the analysis passes for every tracked symbol (or ``symbols``) in one sweep.
+
+        Each pass only reads the streaming ``TimeframeStats``, so this costs a few
+        float comparisons per symbol and timeframe.
+        """
+        if symbols is None:
+            symbols = list(self.stats)
+        results = {}
+        for symbol in symbols:
+            signals = await self.analyze_symbol(symbol, primary_timeframe, analysis_types)
+            if signals:
+                results[symbol] = signals
+        return results
+
     async def _analyze_trend_alignment(
         self, symbol: str, primary_timeframe: Timeframe
     ) -> Optional[MultiTimeframeSignal]:
         """Analyze trend alignment across timeframes."""
-        symbol_data = self.market_data.get(symbol)
-        if not symbol_data:
+        symbol_stats = self.stats.get(symbol)
+        if not symbol_stats:
             return None
 
         # Get trend direction for each timeframe
@@ -211,15 +535,13 @@ class MultiTimeframeAnalyzer:
         contributions = {}
 
         for timeframe in Timeframe:
-            data_queue = symbol_data.get(timeframe)
-            if not data_queue or len(data_queue) < 5:
+            stats = symbol_stats.get(timeframe)
+            if stats is None or stats.count < 5:
                 continue
 
-            # Calculate simple trend (slope of closing prices)
-            recent_data = list(data_queue)[-10:]  # Last 10 candles
-            if len(recent_data) >= 5:
-                closes = [d.close_price for d in recent_data]
-                trend_slope = self._calculate_trend_slope(closes)
+            # Simple trend: slope of the last 10 closes
+            if len(stats.trend) >= 5:
+                trend_slope = stats.trend.slope
 
                 # Classify trend
                 if trend_slope > 0.001:
@@ -234,7 +556,7 @@ class MultiTimeframeAnalyzer:
                     "trend_slope": trend_slope,
                     "direction": trend_direction,
                     "weight": self.timeframe_weights[timeframe],
-                    "data_points": len(recent_data),
+                    "data_points": len(stats.trend),
                 }
 
         if not timeframe_trends:
@@ -289,50 +611,46 @@ class MultiTimeframeAnalyzer:
         self, symbol: str, primary_timeframe: Timeframe
     ) -> Optional[MultiTimeframeSignal]:
         """Analyze momentum divergence across timeframes."""
-        symbol_data = self.market_data.get(symbol)
-        if not symbol_data:
+        symbol_stats = self.stats.get(symbol)
+        if not symbol_stats:
             return None
 
-        # Calculate RSI for different timeframes
+        # Streaming Wilder RSI for each timeframe
         timeframe_momentum = {}
         contributions = {}
 
         for timeframe in Timeframe:
-            data_queue = symbol_data.get(timeframe)
-            if not data_queue or len(data_queue) < 14:  # Need at least 14 periods for RSI
+            stats = symbol_stats.get(timeframe)
+            if stats is None or stats.rsi is None:  # Needs RSI_PERIOD price changes
                 continue
 
-            recent_data = list(data_queue)[-20:]  # Last 20 candles
-            rsi_values = self._calculate_rsi([d.close_price for d in recent_data])
-
-            if rsi_values:
-                current_rsi = rsi_values[-1]
-                prev_rsi = rsi_values[-2] if len(rsi_values) > 1 else current_rsi
-
-                # Classify momentum
-                if current_rsi > 70:
-                    momentum = "OVERBOUGHT"
-                elif current_rsi < 30:
-                    momentum = "OVERSOLD"
-                elif current_rsi > prev_rsi:
-                    momentum = "INCREASING"
-                elif current_rsi < prev_rsi:
-                    momentum = "DECREASING"
-                else:
-                    momentum = "NEUTRAL"
+            current_rsi = stats.rsi
+            prev_rsi = stats.prev_rsi
+
+            # Classify momentum
+            if current_rsi > 70:
+                momentum = "OVERBOUGHT"
+            elif current_rsi < 30:
+                momentum = "OVERSOLD"
+            elif current_rsi > prev_rsi:
+                momentum = "INCREASING"
+            elif current_rsi < prev_rsi:
+                momentum = "DECREASING"
+            else:
+                momentum = "NEUTRAL"
 
-                timeframe_momentum[timeframe] = {
-                    "rsi": current_rsi,
-                    "momentum": momentum,
-                    "change": current_rsi - prev_rsi,
-                }
+            timeframe_momentum[timeframe] = {
+                "rsi": current_rsi,
+                "momentum": momentum,
+                "change": current_rsi - prev_rsi,
+            }
 
-                contributions[timeframe] = {
-                    "rsi": current_rsi,
-                    "momentum": momentum,
-                    "rsi_change": current_rsi - prev_rsi,
-                    "weight": self.timeframe_weights[timeframe],
-                }
+            contributions[timeframe] = {
+                "rsi": current_rsi,
+                "momentum": momentum,
+                "rsi_change": current_rsi - prev_rsi,
+                "weight": self.timeframe_weights[timeframe],
+            }
 
         if len(timeframe_momentum) < 2:
             return None
@@ -401,8 +719,8 @@ class MultiTimeframeAnalyzer:
         self, symbol: str, primary_timeframe: Timeframe
     ) -> Optional[MultiTimeframeSignal]:
         """Analyze volume confirmation across timeframes."""
-        symbol_data = self.market_data.get(symbol)
-        if not symbol_data:
+        symbol_stats = self.stats.get(symbol)
+        if not symbol_stats:
             return None
 
         # Analyze volume trends
@@ -410,24 +728,20 @@ class MultiTimeframeAnalyzer:
         contributions = {}
 
         for timeframe in Timeframe:
-            data_queue = symbol_data.get(timeframe)
-            if not data_queue or len(data_queue) < 10:
+            stats = symbol_stats.get(timeframe)
+            if stats is None or stats.count < 10:
                 continue
 
-            recent_data = list(data_queue)[-15:]  # Last 15 candles
-            volumes = [d.volume for d in recent_data]
-            closes = [d.close_price for d in recent_data]
-
-            # Calculate volume trend and price-volume relationship
-            volume_trend = self._calculate_trend_slope(volumes)
-            price_trend = self._calculate_trend_slope(closes)
+            # Volume trend and price-volume relationship over the last 15 bars
+            volume_trend = stats.volume.slope
+            price_trend = stats.price.slope
 
             # Volume confirmation (price and volume moving in same direction)
             confirmation = 1.0 if (volume_trend * price_trend) > 0 else -1.0
 
             # Volume intensity (relative to average)
-            avg_volume = sum(volumes) / len(volumes)
-            current_volume = volumes[-1]
+            avg_volume = stats.volume.mean
+            current_volume = stats.last.volume
             intensity = current_volume / avg_volume if avg_volume > 0 else 1.0
 
             timeframe_volume[timeframe] = {
@@ -496,28 +810,21 @@ class MultiTimeframeAnalyzer:
     ) -> Optional[MultiTimeframeSignal]:
         """Analyze support and resistance levels across timeframes."""
         # This is a simplified implementation - in practice would use more sophisticated SR detection
-        symbol_data = self.market_data.get(symbol)
-        if not symbol_data:
+        symbol_stats = self.stats.get(symbol)
+        if not symbol_stats:
             return None
 
-        primary_data = symbol_data.get(primary_timeframe)
-        if not primary_data or len(primary_data) < 20:
+        stats = symbol_stats.get(primary_timeframe)
+        if stats is None or stats.count < 20:
             return None
 
-        recent_data = list(primary_data)[-50:]  # Last 50 candles
-        current_price = recent_data[-1].close_price
+        current_price = stats.last.close_price
 
-        # Simple SR detection based on swing highs/lows
-        highs = [d.high_price for d in recent_data]
-        lows = [d.low_price for d in recent_data]
-
-        # Find potential resistance (recent highs above current price)
-        resistance_levels = [h for h in highs[-20:] if h > current_price]  # Last 20 periods
-        resistance = max(resistance_levels) if resistance_levels else None
-
-        # Find potential support (recent lows below current price)
-        support_levels = [l for l in lows[-20:] if l < current_price]  # Last 20 periods
-        support = min(support_levels) if support_levels else None
+        # Potential resistance/support: extreme high/low of the last 20 periods
+        highest = max(stats.highs)
+        lowest = min(stats.lows)
+        resistance = highest if highest > current_price else None
+        support = lowest if lowest < current_price else None
 
         if not resistance and not support:
             return None
@@ -570,19 +877,17 @@ class MultiTimeframeAnalyzer:
     ) -> Optional[MultiTimeframeSignal]:
         """Analyze chart patterns across timeframes."""
         # Simplified pattern recognition - in practice would use more sophisticated algorithms
-        symbol_data = self.market_data.get(symbol)
-        if not symbol_data:
+        symbol_stats = self.stats.get(symbol)
+        if not symbol_stats:
             return None
 
-        primary_data = symbol_data.get(primary_timeframe)
-        if not primary_data or len(primary_data) < 20:
+        stats = symbol_stats.get(primary_timeframe)
+        if stats is None or stats.count < 20:
             return None
 
-        recent_data = list(primary_data)[-20:]
-
-        # Simple double bottom/top detection
-        lows = [d.low_price for d in recent_data]
-        highs = [d.high_price for d in recent_data]
+        # Simple double bottom/top detection over the last 20 periods
+        lows = list(stats.lows)
+        highs = list(stats.highs)
 
         # Look for double bottom pattern
         min_indices = []
@@ -646,8 +951,8 @@ class MultiTimeframeAnalyzer:
         self, symbol: str, primary_timeframe: Timeframe
     ) -> Optional[MultiTimeframeSignal]:
         """Analyze volatility regime across timeframes."""
-        symbol_data = self.market_data.get(symbol)
-        if not symbol_data:
+        symbol_stats = self.stats.get(symbol)
+        if not symbol_stats:
             return None
 
         # Calculate volatility for each timeframe
@@ -655,39 +960,29 @@ class MultiTimeframeAnalyzer:
         contributions = {}
 
         for timeframe in Timeframe:
-            data_queue = symbol_data.get(timeframe)
-            if not data_queue or len(data_queue) < 20:
+            stats = symbol_stats.get(timeframe)
+            if stats is None or stats.count < 20:
                 continue
 
-            recent_data = list(data_queue)[-30:]  # Last 30 candles
-            closes = [d.close_price for d in recent_data]
+            # Volatility: RMS of the returns over the last 30 closes
+            volatility = stats.volatility
 
-            # Calculate volatility (standard deviation of returns)
-            returns = []
-            for i in range(1, len(closes)):
-                ret = (closes[i] - closes[i - 1]) / closes[i - 1]
-                returns.append(ret)
+            # Classify volatility regime
+            if volatility > 0.05:  # High volatility
+                regime = "HIGH"
+            elif volatility > 0.02:  # Medium volatility
+                regime = "MEDIUM"
+            else:  # Low volatility
+                regime = "LOW"
 
-            if returns:
-                volatility = sum(r**2 for r in returns) / len(returns)  # Variance
-                volatility = volatility**0.5  # Standard deviation
+            timeframe_volatility[timeframe] = {"volatility": volatility, "regime": regime}
 
-                # Classify volatility regime
-                if volatility > 0.05:  # High volatility
-                    regime = "HIGH"
-                elif volatility > 0.02:  # Medium volatility
-                    regime = "MEDIUM"
-                else:  # Low volatility
-                    regime = "LOW"
-
-                timeframe_volatility[timeframe] = {"volatility": volatility, "regime": regime}
-
-                contributions[timeframe] = {
-                    "volatility": volatility,
-                    "regime": regime,
-                    "returns_count": len(returns),
-                    "weight": self.timeframe_weights[timeframe],
-                }
+            contributions[timeframe] = {
+                "volatility": volatility,
+                "regime": regime,
+                "returns_count": len(stats.returns_sq),
+                "weight": self.timeframe_weights[timeframe],
+            }
 
         if not timeframe_volatility:
             return None
@@ -725,68 +1020,6 @@ class MultiTimeframeAnalyzer:
             reasoning=reasoning,
         )
 
-    def _calculate_trend_slope(self, values: List[float]) -> float:
-        """Calculate linear trend slope for a series of values."""
-        if len(values) < 2:
-            return 0.0
-
-        n = len(values)
-        x = list(range(n))
-        y = values
-
-        sum_x = sum(x)
-        sum_y = sum(y)
-        sum_xy = sum(xi * yi for xi, yi in zip(x, y))
-        sum_x2 = sum(xi**2 for xi in x)
-
-        if n * sum_x2 - sum_x**2 == 0:
-            return 0.0
-
-        slope = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x**2)
-        return slope
-
-    def _calculate_rsi(self, prices: List[float], period: int = 14) -> List[float]:
-        """Calculate RSI for a series of prices."""
-        if len(prices) < period + 1:
-            return []
-
-        rsi_values = []
-        gains = []
-        losses = []
-
-        # Calculate price changes
-        for i in range(1, len(prices)):
-            change = prices[i] - prices[i - 1]
-            gains.append(max(change, 0))
-            losses.append(max(-change, 0))
-
-        # Calculate initial averages
-        avg_gain = sum(gains[:period]) / period
-        avg_loss = sum(losses[:period]) / period
-
-        # Calculate RSI
-        if avg_loss == 0:
-            rsi_values.append(100.0)
-        else:
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-            rsi_values.append(rsi)
-
-        # Calculate subsequent values using smoothed averages
-        for i in range(period, len(gains)):
-            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-
-            if avg_loss == 0:
-                rsi = 100.0
-            else:
-                rs = avg_gain / avg_loss
-                rsi = 100 - (100 / (1 + rs))
-
-            rsi_values.append(rsi)
-
-        return rsi_values
-
     def get_analysis_stats(self) -> Dict[str, Any]:
         """Get comprehensive analysis statistics."""
         symbols_analyzed = len(self.market_data)
@@ -805,6 +1038,9 @@ class MultiTimeframeAnalyzer:
             "total_data_points": total_data_points,
             "timeframe_distribution": {tf.value: count for tf, count in timeframe_counts.items()},
             "cache_enabled": self._cache_ready,
+            "pending_cache_writes": len(self._pending_cache),
+            "cache_flushes": self._cache_flushes,
+            "aggregator": dict(self.aggregator.stats),
             "timestamp_us": get_timestamp_us(),
         }
 
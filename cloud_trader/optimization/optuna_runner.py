@@ -4,19 +4,38 @@ from __future__ import annotations
 
 import argparse
 from pathlib import Path
+from typing import Dict, Tuple
 
+import numpy as np
 import pandas as pd
 
 from .trailing import TrailingConfig, optimise_trailing_stop
 
+# path -> ((mtime_ns, size), pnl); one entry per file, reloaded when the file changes
+_PNL_CACHE: Dict[Path, Tuple[Tuple[int, int], np.ndarray]] = {}
+
+
+def load_pnl(path: Path) -> np.ndarray:
+    """Read the PnL column once per file version; trials reuse the array."""
+    path = path.resolve()
+    stat = path.stat()
+    identity = (stat.st_mtime_ns, stat.st_size)
+    cached = _PNL_CACHE.get(path)
+    if cached is None or cached[0] != identity:
+        df = pd.read_csv(path)
+        pnl = df["pnl"] if "pnl" in df else pd.Series(0.0, index=df.index)
+        cached = (identity, pnl.fillna(0.0).to_numpy(dtype=np.float64))
+        _PNL_CACHE[path] = cached
+    return cached[1]
+
+
+def clear_pnl_cache() -> None:
+    _PNL_CACHE.clear()
+
 
 def evaluate_from_csv(path: Path, config: TrailingConfig) -> float:
-    df = pd.read_csv(path)
-    pnl = 0.0
-    for _, row in df.iterrows():
-        reward = row.get("pnl", 0.0)
-        pnl += reward - config.stop_buffer * abs(reward)
-    return pnl
+    rewards = load_pnl(path)
+    return float(rewards.sum() - config.stop_buffer * np.abs(rewards).sum())
 
 
 def main() -> None:
@@ -28,7 +47,10 @@ def main() -> None:
     def evaluate(config: TrailingConfig) -> float:
         return evaluate_from_csv(args.csv, config)
 
-    best = optimise_trailing_stop(evaluate, n_trials=args.trials)
+    try:
+        best = optimise_trailing_stop(evaluate, n_trials=args.trials)
+    finally:
+        clear_pnl_cache()  # Arrays only live for one study
     print(f"Best trailing config: stop_buffer={best.stop_buffer:.4f}, step={best.trail_step:.4f}")
 
 
@@ -0,0 +1,458 @@
+"""Parallel parameter sweeps and walk-forward runs for the vectorized backtester.
+
+Market data is written once as memory-mapped ``.npy`` arrays; every worker in
+the ``ProcessPoolExecutor`` maps the same files read-only instead of receiving
+pickled frames per task. Each (params, window) evaluation is stored in an
+append-only JSONL cache keyed by a hash of the params, the window and a data
+fingerprint, so an interrupted grid or Optuna study resumes where it stopped.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..backtest.engine import BacktestResults
+from ..backtest.vectorized import (
+    BollingerReversionRule,
+    MarketArrays,
+    MomentumRule,
+    VectorizedBacktestEngine,
+)
+
+logger = logging.getLogger(__name__)
+
+_FIELDS = ("open", "high", "low", "close", "volume")
+
+# Per-process market data, loaded once by the pool initializer
+_WORKER_DATA: Optional[MarketArrays] = None
+
+
+@dataclass(frozen=True)
+class WalkForwardWindow:
+    """Half-open bar ranges ``[train_start, train_end)`` / ``[test_start, test_end)``."""
+
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.train_start}:{self.train_end}:{self.test_start}:{self.test_end}"
+
+
+def walk_forward_windows(
+    n_bars: int, train_bars: int, test_bars: int, step_bars: Optional[int] = None
+) -> List[WalkForwardWindow]:
+    """Rolling train/test windows; the train window slides by ``step_bars`` (default test size)."""
+    step = step_bars or test_bars
+    windows = []
+    start = 0
+    while start + train_bars + test_bars <= n_bars:
+        train_end = start + train_bars
+        windows.append(WalkForwardWindow(start, train_end, train_end, train_end + test_bars))
+        start += step
+    return windows
+
+
+@dataclass
+class SharedMarketData:
+    """Picklable handle to market arrays stored as memory-mapped ``.npy`` files."""
+
+    directory: str
+    symbols: List[str]
+    tz: Optional[str] = None
+
+    @classmethod
+    def create(cls, arrays: MarketArrays, directory: str) -> "SharedMarketData":
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "timestamps.npy", arrays.timestamps_ns)
+        for name in _FIELDS:
+            np.save(path / f"{name}.npy", np.ascontiguousarray(getattr(arrays, name)))
+        tz = str(arrays.timestamps.tz) if arrays.timestamps.tz is not None else None
+        return cls(directory=str(path), symbols=list(arrays.symbols), tz=tz)
+
+    def load(self) -> MarketArrays:
+        path = Path(self.directory)
+        timestamps = pd.DatetimeIndex(np.load(path / "timestamps.npy").view("datetime64[ns]"))
+        if self.tz:
+            timestamps = timestamps.tz_localize("UTC").tz_convert(self.tz)
+        columns = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in _FIELDS}
+        return MarketArrays(timestamps=timestamps, symbols=list(self.symbols), **columns)
+
+
+def slice_arrays(arrays: MarketArrays, start: int, end: int) -> MarketArrays:
+    """Bar range view of ``arrays`` (no copy for memory-mapped inputs)."""
+    return MarketArrays(
+        timestamps=arrays.timestamps[start:end],
+        symbols=arrays.symbols,
+        **{name: getattr(arrays, name)[start:end] for name in _FIELDS},
+    )
+
+
+def data_fingerprint(arrays: MarketArrays) -> str:
+    """Cheap identity of a dataset so cached results are never reused across data."""
+    ts = arrays.timestamps_ns
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(arrays.symbols)).encode())
+    bounds = [len(ts), ts[0], ts[-1]] if len(ts) else [0, 0, 0]
+    digest.update(np.array(bounds, dtype=np.int64).tobytes())
+    digest.update(np.float64(np.nansum(arrays.close)).tobytes())
+    digest.update(np.float64(np.nansum(arrays.volume)).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class _ArraysOnlyLoader:
+    """Sweeps run on preloaded arrays; never touch BigQuery from a worker."""
+
+    async def load_market_data(self, *args: Any, **kwargs: Any) -> None:
+        return None
+
+
+def build_engine(params: Dict[str, Any]) -> VectorizedBacktestEngine:
+    """Default engine factory mapping flat sweep params onto the vectorized engine."""
+    rules = [
+        BollingerReversionRule(
+            period=int(params.get("bb_period", 20)), num_std=float(params.get("bb_std", 2.0))
+        ),
+        MomentumRule(
+            threshold=float(params.get("momentum_threshold", 0.3)),
+            volume_window=int(params.get("volume_window", 24)),
+            volume_surge=float(params.get("volume_surge", 1.5)),
+        ),
+    ]
+    engine = VectorizedBacktestEngine(
+        initial_capital=float(params.get("initial_capital", 10000.0)),
+        data_loader=_ArraysOnlyLoader(),
+        rules=rules,
+        max_positions=int(params.get("max_positions", 5)),
+        min_confidence=float(params.get("min_confidence", 0.6)),
+        time_exit_seconds=float(params.get("time_exit_hours", 24)) * 3600,
+    )
+    for config in engine.agent_configs.values():
+        if "take_profit_pct" in params:
+            config["profit_target"] = float(params["take_profit_pct"])
+        if "stop_loss_pct" in params:
+            config["stop_loss"] = float(params["stop_loss_pct"])
+    return engine
+
+
+def summarize(results: BacktestResults) -> Dict[str, float]:
+    """Small, JSON-friendly metric set returned from workers and cached."""
+
+    def clean(value: float) -> Optional[float]:
+        value = float(value)
+        return value if math.isfinite(value) else None
+
+    return {
+        "total_return": clean(results.total_return),
+        "annualized_return": clean(results.annualized_return),
+        "sharpe_ratio": clean(results.sharpe_ratio),
+        "sortino_ratio": clean(results.sortino_ratio),
+        "max_drawdown": clean(results.max_drawdown),
+        "profit_factor": clean(results.profit_factor),
+        "win_rate": clean(results.win_rate),
+        "total_trades": results.total_trades,
+        "final_capital": clean(results.final_capital),
+    }
+
+
+def _init_worker(shared: SharedMarketData) -> None:
+    global _WORKER_DATA
+    _WORKER_DATA = shared.load()
+
+
+def evaluate_params(
+    arrays: MarketArrays,
+    params: Dict[str, Any],
+    bar_range: Optional[Tuple[int, int]],
+    engine_factory: Callable[[Dict[str, Any]], VectorizedBacktestEngine] = build_engine,
+) -> Dict[str, float]:
+    """Run one backtest over ``bar_range`` (whole dataset when None)."""
+    if bar_range is not None:
+        arrays = slice_arrays(arrays, *bar_range)
+    if len(arrays.timestamps) == 0:
+        raise ValueError(f"Empty bar range {bar_range}")
+    engine = engine_factory(params)
+    results = engine.run_arrays(
+        arrays,
+        arrays.timestamps[0].to_pydatetime(),
+        arrays.timestamps[-1].to_pydatetime(),
+    )
+    return summarize(results)
+
+
+def _worker_evaluate(
+    params: Dict[str, Any],
+    bar_range: Optional[Tuple[int, int]],
+    engine_factory: Callable[[Dict[str, Any]], VectorizedBacktestEngine],
+) -> Dict[str, float]:
+    return evaluate_params(_WORKER_DATA, params, bar_range, engine_factory)
+
+
+@dataclass
+class SweepResult:
+    params: Dict[str, Any]
+    bar_range: Optional[Tuple[int, int]]
+    metrics: Dict[str, float]
+    cached: bool = False
+    key: str = ""
+
+
+class SweepResultCache:
+    """Append-only JSONL store of evaluated (params, window) results."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._results: Dict[str, Dict[str, float]] = {}
+        if self.path and self.path.exists():
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self._results[record["key"]] = record["metrics"]
+                    except (json.JSONDecodeError, KeyError):
+                        continue  # Torn last line from an interrupted run
+
+    @staticmethod
+    def make_key(params: Dict[str, Any], bar_range: Optional[Tuple[int, int]], data_id: str) -> str:
+        payload = json.dumps(
+            {"params": params, "range": list(bar_range) if bar_range else None, "data": data_id},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, float]]:
+        return self._results.get(key)
+
+    def put(self, key: str, params: Dict[str, Any], metrics: Dict[str, float]) -> None:
+        self._results[key] = metrics
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"key": key, "params": params, "metrics": metrics}, default=str))
+                f.write("\n")
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+class ParameterSweepRunner:
+    """
+    Fan backtests out over a process pool sharing memory-mapped market data.
+
+    Use as a context manager (or call ``close``) so the pool and the temporary
+    array directory are cleaned up.
+    """
+
+    def __init__(
+        self,
+        arrays: MarketArrays,
+        cache_path: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        data_dir: Optional[str] = None,
+        engine_factory: Callable[[Dict[str, Any]], VectorizedBacktestEngine] = build_engine,
+        objective: str = "sharpe_ratio",
+    ):
+        self.arrays = arrays
+        self.cache = SweepResultCache(cache_path)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.engine_factory = engine_factory
+        self.objective = objective
+        self.data_id = data_fingerprint(arrays)
+        self._own_data_dir = data_dir is None
+        self._data_dir = data_dir or tempfile.mkdtemp(prefix="sweep-data-")
+        self._shared: Optional[SharedMarketData] = None
+        self._pool: Optional[Executor] = None
+
+    def __enter__(self) -> "ParameterSweepRunner":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        if self._own_data_dir:
+            shutil.rmtree(self._data_dir, ignore_errors=True)
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            self._shared = SharedMarketData.create(self.arrays, self._data_dir)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self._shared,),
+            )
+        return self._pool
+
+    def evaluate(
+        self, tasks: Iterable[Tuple[Dict[str, Any], Optional[Tuple[int, int]]]]
+    ) -> List[SweepResult]:
+        """Evaluate (params, bar_range) pairs, skipping anything already cached."""
+        results: List[SweepResult] = []
+        pending = {}
+        for params, bar_range in tasks:
+            key = self.cache.make_key(params, bar_range, self.data_id)
+            result = SweepResult(params=params, bar_range=bar_range, metrics={}, key=key)
+            results.append(result)
+            cached = self.cache.get(key)
+            if cached is not None:
+                result.metrics, result.cached = cached, True
+            elif key not in pending:
+                pending[key] = (params, bar_range)
+
+        if pending:
+            pool = self._get_pool()
+            futures = {
+                pool.submit(_worker_evaluate, params, bar_range, self.engine_factory): key
+                for key, (params, bar_range) in pending.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                metrics = future.result()
+                self.cache.put(key, pending[key][0], metrics)
+
+        for result in results:
+            if not result.cached:
+                result.metrics = self.cache.get(result.key)
+        logger.info(
+            f"Sweep evaluated {len(pending)} new / {len(results) - len(pending)} cached runs"
+        )
+        return results
+
+    def score(self, metrics: Dict[str, float]) -> float:
+        value = metrics.get(self.objective)
+        return float(value) if value is not None else float("-inf")
+
+    def run_grid(
+        self,
+        grid: Dict[str, Sequence[Any]],
+        windows: Optional[Sequence[WalkForwardWindow]] = None,
+        use_test_range: bool = False,
+    ) -> List[SweepResult]:
+        """Evaluate the cartesian product of ``grid`` (per window when given)."""
+        names = list(grid)
+        points = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+        if not windows:
+            return self.evaluate((params, None) for params in points)
+        ranges = [
+            (w.test_start, w.test_end) if use_test_range else (w.train_start, w.train_end)
+            for w in windows
+        ]
+        return self.evaluate((params, r) for params in points for r in ranges)
+
+    def walk_forward(
+        self,
+        grid: Dict[str, Sequence[Any]],
+        windows: Sequence[WalkForwardWindow],
+    ) -> List[Dict[str, Any]]:
+        """Pick the best grid point on each train window and score it out of sample."""
+        train_results = self.run_grid(grid, windows)
+        best: Dict[Tuple[int, int], SweepResult] = {}
+        for result in train_results:
+            current = best.get(result.bar_range)
+            if current is None or self.score(result.metrics) > self.score(current.metrics):
+                best[result.bar_range] = result
+
+        chosen = [(w, best[(w.train_start, w.train_end)]) for w in windows]
+        test_results = self.evaluate(
+            (result.params, (w.test_start, w.test_end)) for w, result in chosen
+        )
+        return [
+            {
+                "window": asdict(w),
+                "params": train.params,
+                "train": train.metrics,
+                "test": test.metrics,
+            }
+            for (w, train), test in zip(chosen, test_results)
+        ]
+
+    def run_optuna(
+        self,
+        search_space: Dict[str, Any],
+        n_trials: int = 50,
+        windows: Optional[Sequence[WalkForwardWindow]] = None,
+        batch_size: Optional[int] = None,
+        seed: int = 42,
+        storage: Optional[str] = None,
+        study_name: Optional[str] = None,
+    ) -> Any:
+        """
+        Optuna ask/tell study; each batch of trials runs in parallel on the pool.
+
+        ``search_space`` maps names to ``(low, high)`` (int or float) or a list of
+        choices. With ``windows`` a trial's value is the mean objective over the
+        train windows.
+        """
+        try:
+            import optuna
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("Install optuna to run Optuna sweeps") from exc
+
+        study = optuna.create_study(
+            direction="maximize",
+            sampler=optuna.samplers.TPESampler(seed=seed),
+            storage=storage,
+            study_name=study_name,
+            load_if_exists=storage is not None,
+        )
+        ranges: List[Optional[Tuple[int, int]]] = (
+            [(w.train_start, w.train_end) for w in windows] if windows else [None]
+        )
+        batch = batch_size or self.max_workers
+        remaining = n_trials
+        while remaining > 0:
+            trials = [study.ask() for _ in range(min(batch, remaining))]
+            params = [_suggest(trial, search_space) for trial in trials]
+            results = self.evaluate((p, r) for p in params for r in ranges)
+            for i, trial in enumerate(trials):
+                trial_results = results[i * len(ranges) : (i + 1) * len(ranges)]
+                scores = [self.score(r.metrics) for r in trial_results]
+                finite = [s for s in scores if math.isfinite(s)]
+                study.tell(trial, float(np.mean(finite)) if finite else float("-inf"))
+            remaining -= len(trials)
+        return study
+
+
+def _suggest(trial: Any, search_space: Dict[str, Any]) -> Dict[str, Any]:
+    params = {}
+    for name, spec in search_space.items():
+        if isinstance(spec, list):
+            params[name] = trial.suggest_categorical(name, spec)
+        elif all(isinstance(v, int) for v in spec):
+            params[name] = trial.suggest_int(name, spec[0], spec[1])
+        else:
+            params[name] = trial.suggest_float(name, float(spec[0]), float(spec[1]))
+    return params
+
+
+__all__ = [
+    "ParameterSweepRunner",
+    "SharedMarketData",
+    "SweepResult",
+    "SweepResultCache",
+    "WalkForwardWindow",
+    "build_engine",
+    "evaluate_params",
+    "walk_forward_windows",
+]
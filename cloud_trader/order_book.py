@@ -0,0 +1,326 @@
+"""
+Local L2 order books maintained from the exchange's diff-depth streams.
+
+``OrderBookManager`` follows the standard futures sync procedure: buffer
+``depthUpdate`` events, fetch a REST snapshot, drop events older than the
+snapshot, then require every event's ``pu`` to equal the previous event's
+``u``. Any gap triggers a fresh snapshot while new events keep buffering.
+
+A reconnect or stream set change gaps every tracked book at once, so snapshots
+are small (the features only read the top levels) and spaced
+``snapshot_interval_seconds`` apart across symbols instead of bursting the
+request weight budget. Until its resync lands a gapped symbol keeps serving its
+last good book, which readers still see as stale after ``stale_after_seconds``.
+
+Each side is stored as sorted numeric NumPy arrays (bids descending, asks
+ascending). A diff is merged in one vectorized pass, and the microstructure
+features (top-N imbalance, spread, microprice, depth-weighted mid) are
+recomputed once per event so readers get a cached dict with no network call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_EMPTY = np.empty(0, dtype=np.float64)
+
+
+def levels_to_arrays(levels: Sequence[Sequence[Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    if not levels:
+        return _EMPTY, _EMPTY
+    arr = np.asarray(levels, dtype=np.float64).reshape(-1, 2)
+    return arr[:, 0], arr[:, 1]
+
+
+def book_features(
+    bid_prices: np.ndarray,
+    bid_sizes: np.ndarray,
+    ask_prices: np.ndarray,
+    ask_sizes: np.ndarray,
+    depth: int = 20,
+) -> Dict[str, float]:
+    """Microstructure features from sorted level arrays (bids desc, asks asc)."""
+    features = {
+        "bid_pressure": 0.0,
+        "spread_pct": 0.0,
+        "book_imbalance": 0.0,
+        "best_bid": 0.0,
+        "best_ask": 0.0,
+        "spread": 0.0,
+        "mid_price": 0.0,
+        "microprice": 0.0,
+        "depth_weighted_mid": 0.0,
+    }
+    if not len(bid_prices) or not len(ask_prices):
+        return features
+
+    bp, bq = bid_prices[:depth], bid_sizes[:depth]
+    ap, aq = ask_prices[:depth], ask_sizes[:depth]
+    bid_vol = float(bq.sum())
+    ask_vol = float(aq.sum())
+    total_vol = bid_vol + ask_vol
+
+    best_bid, best_ask = float(bp[0]), float(ap[0])
+    top_bid_qty, top_ask_qty = float(bq[0]), float(aq[0])
+    features["best_bid"] = best_bid
+    features["best_ask"] = best_ask
+    features["spread"] = best_ask - best_bid
+    features["mid_price"] = (best_bid + best_ask) / 2
+    if best_ask > 0:
+        features["spread_pct"] = (best_ask - best_bid) / best_ask
+    if total_vol > 0:
+        features["bid_pressure"] = bid_vol / total_vol  # >0.5 means buying pressure
+        features["book_imbalance"] = (bid_vol - ask_vol) / total_vol
+    top_qty = top_bid_qty + top_ask_qty
+    # Microprice leans toward the side with less resting size (where price is likely to go)
+    features["microprice"] = (
+        (best_bid * top_ask_qty + best_ask * top_bid_qty) / top_qty
+        if top_qty > 0
+        else features["mid_price"]
+    )
+    if bid_vol > 0 and ask_vol > 0:
+        bid_vwap = float(bp @ bq) / bid_vol
+        ask_vwap = float(ap @ aq) / ask_vol
+        features["depth_weighted_mid"] = (bid_vwap + ask_vwap) / 2
+    else:
+        features["depth_weighted_mid"] = features["mid_price"]
+    return features
+
+
+class LocalOrderBook:
+    """One symbol's L2 book as sorted price/size arrays plus cached features."""
+
+    def __init__(self, symbol: str, feature_depth: int = 20, max_levels: int = 1000):
+        self.symbol = symbol
+        self.feature_depth = feature_depth
+        self.max_levels = max_levels
+        self.bid_prices = _EMPTY
+        self.bid_sizes = _EMPTY
+        self.ask_prices = _EMPTY
+        self.ask_sizes = _EMPTY
+        self.last_update_id: int = 0
+        self.last_event_time: int = 0
+        self.updated_at: float = 0.0
+        self._features: Dict[str, float] = book_features(_EMPTY, _EMPTY, _EMPTY, _EMPTY)
+
+    def apply_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        bp, bq = levels_to_arrays(snapshot.get("bids", []))
+        ap, aq = levels_to_arrays(snapshot.get("asks", []))
+        self.bid_prices, self.bid_sizes = self._sorted(bp, bq, descending=True)
+        self.ask_prices, self.ask_sizes = self._sorted(ap, aq, descending=False)
+        self.last_update_id = int(snapshot.get("lastUpdateId", 0))
+        self._refresh()
+
+    def apply_diff(self, event: Dict[str, Any]) -> None:
+        """Merge one ``depthUpdate`` (absolute sizes; size 0 removes the level)."""
+        bp, bq = levels_to_arrays(event.get("b", []))
+        ap, aq = levels_to_arrays(event.get("a", []))
+        if len(bp):
+            self.bid_prices, self.bid_sizes = self._merge(
+                self.bid_prices, self.bid_sizes, bp, bq, descending=True
+            )
+        if len(ap):
+            self.ask_prices, self.ask_sizes = self._merge(
+                self.ask_prices, self.ask_sizes, ap, aq, descending=False
+            )
+        self.last_update_id = int(event.get("u", self.last_update_id))
+        self.last_event_time = int(event.get("E", 0))
+        self._refresh()
+
+    def _sorted(
+        self, prices: np.ndarray, sizes: np.ndarray, descending: bool
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        live = sizes > 0
+        prices, sizes = prices[live], sizes[live]
+        order = np.argsort(-prices if descending else prices, kind="stable")[: self.max_levels]
+        return prices[order], sizes[order]
+
+    def _merge(
+        self,
+        prices: np.ndarray,
+        sizes: np.ndarray,
+        upd_prices: np.ndarray,
+        upd_sizes: np.ndarray,
+        descending: bool,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Updated levels replace existing ones at the same price
+        keep = ~np.isin(prices, upd_prices)
+        return self._sorted(
+            np.concatenate([prices[keep], upd_prices]),
+            np.concatenate([sizes[keep], upd_sizes]),
+            descending,
+        )
+
+    def _refresh(self) -> None:
+        self._features = book_features(
+            self.bid_prices, self.bid_sizes, self.ask_prices, self.ask_sizes, self.feature_depth
+        )
+        self.updated_at = time.time()
+
+    @property
+    def features(self) -> Dict[str, float]:
+        return self._features
+
+    def top_volumes(self, levels: int = 5) -> Tuple[float, float]:
+        return float(self.bid_sizes[:levels].sum()), float(self.ask_sizes[:levels].sum())
+
+    def to_levels(self, levels: int = 20) -> Dict[str, List[List[float]]]:
+        """REST-shaped (numeric) ``bids``/``asks`` for code that expects a depth response."""
+        return {
+            "lastUpdateId": self.last_update_id,
+            "bids": np.column_stack([self.bid_prices[:levels], self.bid_sizes[:levels]]).tolist(),
+            "asks": np.column_stack([self.ask_prices[:levels], self.ask_sizes[:levels]]).tolist(),
+        }
+
+
+class OrderBookManager:
+    """Keeps ``LocalOrderBook`` instances in sync with diff-depth streams."""
+
+    def __init__(
+        self,
+        exchange_client: Any,
+        feature_depth: int = 20,
+        snapshot_limit: int = 100,
+        stale_after_seconds: float = 10.0,
+        max_buffered_events: int = 1000,
+        resync_backoff_seconds: float = 1.0,
+        snapshot_interval_seconds: float = 0.5,
+    ):
+        self.exchange_client = exchange_client
+        self.feature_depth = feature_depth
+        self.snapshot_limit = snapshot_limit
+        self.stale_after_seconds = stale_after_seconds
+        self.max_buffered_events = max_buffered_events
+        self.resync_backoff_seconds = resync_backoff_seconds
+        self.snapshot_interval_seconds = snapshot_interval_seconds
+        self._last_resync: Dict[str, float] = {}
+        self._next_snapshot_at = 0.0
+        self._books: Dict[str, LocalOrderBook] = {}
+        self._synced: Dict[str, bool] = {}
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._resyncs: Dict[str, asyncio.Task] = {}
+        self.stats = {"events": 0, "resyncs": 0, "gaps": 0, "stale_reads": 0}
+
+    # ------------------------------------------------------------------
+    # Stream handling
+    # ------------------------------------------------------------------
+    @staticmethod
+    def streams(symbols: Iterable[str], speed: str = "100ms") -> List[str]:
+        return [f"{symbol.lower()}@depth@{speed}" for symbol in symbols]
+
+    async def handle_stream_message(self, message: Any) -> None:
+        """Callback for ``AsterWebSocketClient.listen`` / stream dispatchers."""
+        if isinstance(message, dict) and "data" in message:
+            message = message["data"]
+        if isinstance(message, dict) and message.get("e") == "depthUpdate":
+            self.apply_event(message)
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        symbol = event.get("s")
+        if not symbol:
+            return
+        self.stats["events"] += 1
+        if not self._synced.get(symbol):
+            self._buffer(symbol, event)
+            return
+
+        book = self._books[symbol]
+        if int(event.get("u", 0)) <= book.last_update_id:
+            return  # Already covered
+        if int(event.get("pu", -1)) != book.last_update_id:
+            self.stats["gaps"] += 1
+            logger.warning(f"Depth gap on {symbol}: pu={event.get('pu')} != {book.last_update_id}")
+            self._synced[symbol] = False
+            self._buffer(symbol, event)
+            return
+        book.apply_diff(event)
+
+    def _buffer(self, symbol: str, event: Dict[str, Any]) -> None:
+        buffer = self._buffers.setdefault(symbol, [])
+        buffer.append(event)
+        if len(buffer) > self.max_buffered_events:
+            del buffer[: len(buffer) - self.max_buffered_events]
+        task = self._resyncs.get(symbol)
+        if task is None or task.done():
+            self._resyncs[symbol] = asyncio.ensure_future(self.resync(symbol))
+
+    async def resync(self, symbol: str) -> bool:
+        """Load a REST snapshot and replay the buffered diffs on top of it."""
+        # Snapshots carry request weight; don't hammer them on repeated gaps
+        wait = self._last_resync.get(symbol, 0.0) + self.resync_backoff_seconds - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        await self._snapshot_turn()
+        self._last_resync[symbol] = time.monotonic()
+        self.stats["resyncs"] += 1
+        try:
+            snapshot = await self.exchange_client.get_order_book(symbol, limit=self.snapshot_limit)
+        except Exception as e:
+            logger.warning(f"Order book snapshot for {symbol} failed: {e}")
+            return False
+
+        # Built aside: the last good book keeps serving readers until this one is in sync
+        book = LocalOrderBook(symbol, self.feature_depth)
+        book.apply_snapshot(snapshot)
+        buffered = self._buffers.pop(symbol, [])
+        last_id = book.last_update_id
+
+        first = True
+        for event in buffered:
+            if int(event.get("u", 0)) < last_id:
+                continue  # Older than the snapshot
+            if first:
+                # The first applied event must straddle (or directly follow) the snapshot id
+                if int(event.get("U", 0)) > last_id + 1:
+                    logger.info(f"Depth snapshot for {symbol} predates buffered diffs; retrying")
+                    self._buffers[symbol] = buffered
+                    return False
+                first = False
+            elif int(event.get("pu", -1)) != book.last_update_id:
+                self.stats["gaps"] += 1
+                self._buffers[symbol] = [e for e in buffered if e["u"] > book.last_update_id]
+                return False
+            book.apply_diff(event)
+
+        self._books[symbol] = book
+        self._synced[symbol] = True
+        return True
+
+    async def _snapshot_turn(self) -> None:
+        """Wait for a snapshot slot; slots are ``snapshot_interval_seconds`` apart."""
+        now = time.monotonic()
+        turn = max(now, self._next_snapshot_at)
+        self._next_snapshot_at = turn + self.snapshot_interval_seconds
+        if turn > now:
+            await asyncio.sleep(turn - now)
+
+    # ------------------------------------------------------------------
+    # Readers (no network)
+    # ------------------------------------------------------------------
+    def get_book(self, symbol: str) -> Optional[LocalOrderBook]:
+        # Only books that synced at least once are stored; a gapped one stays readable
+        # until it goes stale or its resync replaces it
+        book = self._books.get(symbol)
+        if book is None or (time.time() - book.updated_at) > self.stale_after_seconds:
+            if book is not None:
+                self.stats["stale_reads"] += 1
+            return None
+        return book
+
+    def get_features(self, symbol: str) -> Optional[Dict[str, float]]:
+        book = self.get_book(symbol)
+        return book.features if book is not None else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "books": len(self._books),
+            "synced": sum(1 for synced in self._synced.values() if synced),
+        }
@@ -1,11 +1,12 @@
 import asyncio
 import logging
 import time
-from decimal import ROUND_DOWN, Decimal
 from typing import Any, Dict, List, Optional, Tuple
 
 from .definitions import SYMBOL_CONFIG, MinimalAgentState
 from .exchange import OrderType
+from .symbol_registry import SymbolRegistry
+from .ticker_book import TickerBook
 
 logger = logging.getLogger(__name__)
 
@@ -16,56 +17,31 @@ class PositionManager:
     monitoring for TP/SL, and tracking state.
     """
 
-    def __init__(self, exchange_client, agent_states: Dict[str, MinimalAgentState]):
+    def __init__(
+        self,
+        exchange_client,
+        agent_states: Dict[str, MinimalAgentState],
+        ticker_book: Optional[TickerBook] = None,
+        symbols: Optional[SymbolRegistry] = None,
+    ):
         self.exchange_client = exchange_client
         self.agent_states = agent_states
+        self.ticker_book = ticker_book
+        self.symbols = symbols if symbols is not None else SymbolRegistry()
         self.open_positions: Dict[str, Dict[str, Any]] = {}
         self._tpsl_placed: set = set()  # Track which symbols have TP/SL already placed
-        self._symbol_precision_cache: Dict[str, int] = {}  # Cache price precision
-
-    async def _round_price(self, symbol: str, price: float) -> str:
-        """Round price to tickSize and return formatted string."""
-        try:
-            filters = await self.exchange_client.get_symbol_filters(symbol)
-            tick_size = filters.get("tick_size", Decimal("0.01"))
-            price_precision = filters.get("price_precision", 2)
-
-            price_dec = Decimal(str(price))
-            rounded = (price_dec / tick_size).quantize(
-                Decimal("1"), rounding=ROUND_DOWN
-            ) * tick_size
-
-            # Format with exact decimal places
-            format_str = f"{{:.{price_precision}f}}"
-            return format_str.format(float(rounded))
-        except Exception as e:
-            logger.warning(f"Price rounding failed for {symbol}: {e}")
-            return f"{price:.2f}"
 
-    async def _round_quantity(self, symbol: str, quantity: float) -> str:
-        """Round quantity to stepSize and return formatted string."""
-        try:
-            filters = await self.exchange_client.get_symbol_filters(symbol)
-            step_size = filters.get("step_size", Decimal("0.001"))
-            min_qty = filters.get("min_qty", Decimal("0.001"))
-            quantity_precision = filters.get("quantity_precision", 3)
+    async def ensure_symbol(self, symbol: str) -> bool:
+        """Make sure ``symbol``'s filters are loaded, fetching them once on a miss."""
+        return await self.symbols.ensure(self.exchange_client, symbol) is not None
 
-            qty_dec = Decimal(str(quantity))
+    def round_price(self, symbol: str, price: float) -> Optional[str]:
+        """Round price down to tickSize; None if the symbol's filters are not loaded."""
+        return self.symbols.round_price(symbol, price)
 
-            # Floor to step_size
-            rounded = (qty_dec / step_size).quantize(Decimal("1"), rounding=ROUND_DOWN) * step_size
-
-            # Ensure at least min_qty
-            if rounded < min_qty and quantity > 0:
-                rounded = min_qty
-
-            # Format with exact decimal places
-            format_str = f"{{:.{quantity_precision}f}}"
-            result = format_str.format(float(rounded))
-            return result
-        except Exception as e:
-            logger.warning(f"Quantity rounding failed for {symbol}: {e}")
-            return f"{quantity:.3f}"
+    def round_quantity(self, symbol: str, quantity: float) -> Optional[str]:
+        """Round quantity down to stepSize (at least minQty); None without filters."""
+        return self.symbols.round_quantity(symbol, quantity)
 
     async def sync_from_exchange(self):
         """Sync positions from exchange to inherit existing positions on startup."""
@@ -109,8 +85,9 @@ class PositionManager:
 
                 # Round prices for inherited sync
                 entry_price = float(pos.get("entryPrice", 0))
-                tp_price = await self._round_price(symbol, entry_price * 1.05)
-                sl_price = await self._round_price(symbol, entry_price * 0.95)
+                await self.ensure_symbol(symbol)
+                tp_price = self.round_price(symbol, entry_price * 1.05) or entry_price * 1.05
+                sl_price = self.round_price(symbol, entry_price * 0.95) or entry_price * 0.95
 
                 self.open_positions[symbol] = {
                     "symbol": symbol,
@@ -168,21 +145,8 @@ class PositionManager:
 
     async def monitor_positions(self) -> Dict[str, Any]:
         """Monitor open positions for TP/SL hits and return current ticker map."""
-        ticker_map = {}
         try:
-            # Always fetch all tickers in SYMBOL_CONFIG to support both monitoring AND new trade analysis
-            # This acts as a cache for this tick
-            symbols_to_fetch = list(SYMBOL_CONFIG.keys())
-            tasks = [self.exchange_client.get_ticker(sym) for sym in symbols_to_fetch]
-            tickers = await asyncio.gather(*tasks, return_exceptions=True)
-
-            for sym, res in zip(symbols_to_fetch, tickers):
-                if isinstance(res, dict):
-                    ticker_map[sym] = res
-                else:
-                    # print(f"⚠️ Failed to fetch ticker for {sym}: {res}")
-                    pass
-
+            ticker_map = await self.get_ticker_map()
         except Exception as e:
             print(f"⚠️ Error fetching batched tickers: {e}")
             return {}
@@ -220,6 +184,27 @@ class PositionManager:
 
         return ticker_map
 
+    async def get_ticker_map(self) -> Dict[str, Any]:
+        """
+        Return tickers for SYMBOL_CONFIG plus every open position.
+
+        Served from the live ticker book when one is attached (one bulk REST
+        call only if the stream is stale), otherwise via per-symbol REST calls.
+        """
+        symbols_to_fetch = list(SYMBOL_CONFIG.keys())
+        symbols_to_fetch.extend(s for s in self.open_positions if s not in SYMBOL_CONFIG)
+
+        if self.ticker_book is not None:
+            return await self.ticker_book.get_ticker_map(symbols_to_fetch)
+
+        ticker_map = {}
+        tasks = [self.exchange_client.get_ticker(sym) for sym in symbols_to_fetch]
+        tickers = await asyncio.gather(*tasks, return_exceptions=True)
+        for sym, res in zip(symbols_to_fetch, tickers):
+            if isinstance(res, dict):
+                ticker_map[sym] = res
+        return ticker_map
+
     def _update_trailing_stop(
         self, symbol: str, pos: Dict[str, Any], current_price: float, agent: MinimalAgentState
     ):
@@ -260,13 +245,16 @@ class PositionManager:
         """
         try:
             # Round price to symbol's precision to avoid -1111 error
-            rounded_sl = await self._round_price(symbol, sl_price)
+            if not await self.ensure_symbol(symbol):
+                print(f"⚠️ No exchange filters for {symbol}; not placing SL")
+                return
+            rounded_sl = self.round_price(symbol, sl_price)
 
             # Determine order side (Closing logic)
             order_side = "SELL" if side == "BUY" else "BUY"
 
             # Round quantity to symbol's step size
-            rounded_qty = await self._round_quantity(symbol, abs(quantity))
+            rounded_qty = self.round_quantity(symbol, abs(quantity))
 
             # Place STOP_MARKET order
             print(f"🛡️ Syncing Hard Stop for {symbol}: {order_side} {rounded_qty} @ {rounded_sl}")
@@ -290,13 +278,16 @@ class PositionManager:
         """
         try:
             # Round price to symbol's precision to avoid -1111 error
-            rounded_tp = await self._round_price(symbol, tp_price)
+            if not await self.ensure_symbol(symbol):
+                print(f"⚠️ No exchange filters for {symbol}; not placing TP")
+                return
+            rounded_tp = self.round_price(symbol, tp_price)
 
             # Determine order side (Closing logic)
             order_side = "SELL" if side == "BUY" else "BUY"
 
             # Round quantity to symbol's step size
-            rounded_qty = await self._round_quantity(symbol, abs(quantity))
+            rounded_qty = self.round_quantity(symbol, abs(quantity))
 
             # Place TAKE_PROFIT_MARKET order
             print(f"💰 Syncing Take Profit for {symbol}: {order_side} {rounded_qty} @ {rounded_tp}")
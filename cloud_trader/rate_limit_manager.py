@@ -124,3 +124,242 @@ class RateLimitManager:
             if time.time() - start_time > timeout:
                 raise TimeoutError(f"Timeout waiting for rate limit capacity for agent {agent_id}")
             await asyncio.sleep(0.1)  # Wait a short period before re-checking
+
+
+class TokenBucket:
+    """Lazily refilled token bucket with O(1) state (tokens + last refill time)."""
+
+    __slots__ = ("capacity", "refill_rate", "tokens", "_last_refill")
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_per_second)
+        self.tokens = float(capacity)
+        self._last_refill = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self._last_refill = now
+
+    def available(self, now: float = None) -> float:
+        self._refill(now if now is not None else time.monotonic())
+        return self.tokens
+
+    def try_consume(self, amount: float, reserve: float = 0.0, now: float = None) -> bool:
+        """Consume ``amount`` tokens if at least ``reserve`` would remain afterwards."""
+        self._refill(now if now is not None else time.monotonic())
+        if self.tokens - amount >= reserve:
+            self.tokens -= amount
+            return True
+        return False
+
+    def seconds_until(self, amount: float, reserve: float = 0.0) -> float:
+        deficit = amount + reserve - self.available()
+        if deficit <= 0:
+            return 0.0
+        return deficit / self.refill_rate if self.refill_rate > 0 else float("inf")
+
+    def cap_tokens(self, remaining: float) -> None:
+        """Tighten the bucket to the exchange-reported remaining budget."""
+        self._refill(time.monotonic())
+        self.tokens = max(0.0, min(self.tokens, remaining))
+
+
+# Request weights for Aster futures endpoints (Binance-compatible weight table).
+# Callables receive the request params.
+def _depth_weight(params: Dict[str, Any]) -> int:
+    limit = int(params.get("limit", 500))
+    if limit <= 50:
+        return 2
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 10
+    return 20
+
+
+def _klines_weight(params: Dict[str, Any]) -> int:
+    limit = int(params.get("limit", 500))
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+ENDPOINT_WEIGHTS: Dict[str, Any] = {
+    "/fapi/v1/depth": _depth_weight,
+    "/fapi/v1/klines": _klines_weight,
+    "/fapi/v1/markPriceKlines": _klines_weight,
+    "/fapi/v1/indexPriceKlines": _klines_weight,
+    "/fapi/v1/ticker/24hr": lambda p: 1 if p.get("symbol") else 40,
+    "/fapi/v1/ticker/price": lambda p: 1 if p.get("symbol") else 2,
+    "/fapi/v1/ticker/bookTicker": lambda p: 1 if p.get("symbol") else 2,
+    "/fapi/v1/openOrders": lambda p: 1 if p.get("symbol") else 40,
+    "/fapi/v1/trades": lambda p: 5,
+    "/fapi/v1/userTrades": lambda p: 5,
+    "/fapi/v1/income": lambda p: 30,
+    "/fapi/v1/batchOrders": lambda p: 5,
+    "/fapi/v2/account": lambda p: 5,
+    "/fapi/v4/account": lambda p: 5,
+    "/fapi/v2/balance": lambda p: 5,
+    "/fapi/v2/positionRisk": lambda p: 5,
+}
+
+# Lanes in priority order: earlier lanes are never queued behind later ones
+LANE_ORDER = "order"
+LANE_ACCOUNT = "account"
+LANE_MARKET = "market"
+_LANE_PRIORITY = (LANE_ORDER, LANE_ACCOUNT, LANE_MARKET)
+
+
+class WeightedRateLimiter:
+    """
+    Weight-aware token-bucket limiter for Aster REST calls.
+
+    Every request draws its endpoint weight from a shared request-weight bucket;
+    order placement/cancellation additionally draws from an order-count bucket.
+    Requests are classified into lanes (order, account, market data). Market-data
+    requests may not dip into a reserved slice of the weight budget and yield to
+    any waiting order/account request, so polling never delays order placement.
+    The exchange's ``X-MBX-USED-WEIGHT-1M`` / ``X-MBX-ORDER-COUNT-*`` response
+    headers tighten the local buckets to the server's view.
+    """
+
+    def __init__(
+        self,
+        weight_per_minute: int = 2400,
+        orders_per_minute: int = 1200,
+        orders_burst: int = 300,
+        market_reserve_fraction: float = 0.2,
+        max_wait_seconds: float = 30.0,
+    ):
+        self.weight_bucket = TokenBucket(weight_per_minute, weight_per_minute / 60.0)
+        self.order_bucket = TokenBucket(orders_burst, orders_per_minute / 60.0)
+        self.market_reserve = weight_per_minute * market_reserve_fraction
+        self.max_wait_seconds = max_wait_seconds
+        self._waiting: Dict[str, int] = {lane: 0 for lane in _LANE_PRIORITY}
+        self._blocked_until = 0.0
+        self.stats: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def classify(method: str, endpoint: str, signed: bool) -> str:
+        if method.upper() != "GET" and signed:
+            return LANE_ORDER
+        if signed:
+            return LANE_ACCOUNT
+        return LANE_MARKET
+
+    @staticmethod
+    def weight_for(endpoint: str, params: Dict[str, Any] = None) -> int:
+        rule = ENDPOINT_WEIGHTS.get(endpoint)
+        if rule is None:
+            return 1
+        try:
+            return int(rule(params or {}))
+        except (TypeError, ValueError):
+            return 1
+
+    def _higher_priority_waiting(self, lane: str) -> bool:
+        for other in _LANE_PRIORITY:
+            if other == lane:
+                return False
+            if self._waiting[other]:
+                return True
+        return False
+
+    def _try_acquire(self, lane: str, weight: int) -> bool:
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return False
+        if self._higher_priority_waiting(lane):
+            return False
+
+        reserve = self.market_reserve if lane == LANE_MARKET else 0.0
+        if lane == LANE_ORDER:
+            if self.order_bucket.available(now) < 1:
+                return False
+            if not self.weight_bucket.try_consume(weight, now=now):
+                return False
+            self.order_bucket.try_consume(1, now=now)
+            return True
+        return self.weight_bucket.try_consume(weight, reserve=reserve, now=now)
+
+    def _wait_hint(self, lane: str, weight: int) -> float:
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        reserve = self.market_reserve if lane == LANE_MARKET else 0.0
+        hint = self.weight_bucket.seconds_until(weight, reserve)
+        if lane == LANE_ORDER:
+            hint = max(hint, self.order_bucket.seconds_until(1))
+        return min(max(hint, 0.005), 1.0)
+
+    async def acquire(
+        self,
+        method: str,
+        endpoint: str,
+        params: Dict[str, Any] = None,
+        signed: bool = False,
+    ) -> str:
+        """Wait until the request may be sent; returns the lane it was charged to."""
+        lane = self.classify(method, endpoint, signed)
+        weight = self.weight_for(endpoint, params)
+
+        if self._try_acquire(lane, weight):
+            self.stats[f"{lane}_immediate"] += 1
+            return lane
+
+        self.stats[f"{lane}_queued"] += 1
+        self._waiting[lane] += 1
+        start = time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(self._wait_hint(lane, weight))
+                # Stop counting ourselves as waiting while checking priority of others
+                self._waiting[lane] -= 1
+                acquired = self._try_acquire(lane, weight)
+                self._waiting[lane] += 1
+                if acquired:
+                    return lane
+                if time.monotonic() - start > self.max_wait_seconds:
+                    raise TimeoutError(
+                        f"Timeout waiting for {lane} rate limit capacity on {endpoint}"
+                    )
+        finally:
+            self._waiting[lane] -= 1
+
+    def update_from_headers(self, headers: Any) -> None:
+        """Sync buckets with the exchange's used-weight / order-count headers."""
+        if not headers:
+            return
+        used_weight = headers.get("x-mbx-used-weight-1m") or headers.get("X-MBX-USED-WEIGHT-1M")
+        if used_weight is not None:
+            try:
+                self.weight_bucket.cap_tokens(self.weight_bucket.capacity - float(used_weight))
+            except ValueError:
+                pass
+        order_count = headers.get("x-mbx-order-count-10s") or headers.get("X-MBX-ORDER-COUNT-10S")
+        if order_count is not None:
+            try:
+                self.order_bucket.cap_tokens(self.order_bucket.capacity - float(order_count))
+            except ValueError:
+                pass
+
+    def penalize(self, retry_after_seconds: float) -> None:
+        """Block every lane after a 429/418 until the exchange's Retry-After elapses."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after_seconds)
+        self.stats["penalties"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "weight_available": round(self.weight_bucket.available(), 2),
+            "orders_available": round(self.order_bucket.available(), 2),
+            "waiting": dict(self._waiting),
+            "blocked_for_seconds": max(0.0, self._blocked_until - time.monotonic()),
+            **self.stats,
+        }
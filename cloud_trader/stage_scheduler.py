@@ -0,0 +1,196 @@
+"""
+Per-stage scheduler for the trading loop.
+
+Each stage (order checks, TP/SL protection, position sync, market structure,
+the trading cycle, ...) runs as its own task at its own cadence, so a slow
+``exchangeInfo`` download or a long LLM-driven trading cycle can no longer
+delay stop-loss handling. Stages can also be woken early by ``trigger`` (e.g.
+on a price update), with ``min_interval_seconds`` coalescing bursts.
+
+Every run is timed into a per-stage latency histogram. A run that exceeds its
+deadline is counted as an overrun and, for stages that opt in, cancelled;
+scheduled slots missed because a run took longer than the interval are counted
+as skipped rather than replayed back-to-back.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .metrics import STAGE_ERRORS, STAGE_LATENCY, STAGE_OVERRUNS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Stage:
+    """One independently scheduled step of the trading loop."""
+
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    interval_seconds: float
+    deadline_seconds: float
+    jitter_fraction: float = 0.1
+    min_interval_seconds: float = 0.0  # Floor between triggered runs
+    cancel_on_deadline: bool = False  # Only for stages that are safe to abort mid-way
+    run_on_start: bool = True
+    max_consecutive_errors: int = 5
+    error_backoff_seconds: float = 30.0
+
+    runs: int = 0
+    errors: int = 0
+    deadline_overruns: int = 0
+    skipped_slots: int = 0
+    triggered_runs: int = 0
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+    total_duration: float = 0.0
+    last_started: float = 0.0
+    consecutive_errors: int = 0
+    _trigger: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "deadline_seconds": self.deadline_seconds,
+            "runs": self.runs,
+            "triggered_runs": self.triggered_runs,
+            "errors": self.errors,
+            "deadline_overruns": self.deadline_overruns,
+            "skipped_slots": self.skipped_slots,
+            "last_duration": round(self.last_duration, 4),
+            "max_duration": round(self.max_duration, 4),
+            "avg_duration": round(self.total_duration / self.runs, 4) if self.runs else 0.0,
+        }
+
+
+class StageScheduler:
+    """Runs a set of ``Stage`` objects concurrently until cancelled or stopped."""
+
+    def __init__(self, stop_event: Optional[asyncio.Event] = None):
+        self.stages: Dict[str, Stage] = {}
+        self._stop_event = stop_event or asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def add(self, stage: Stage) -> Stage:
+        self.stages[stage.name] = stage
+        return stage
+
+    def trigger(self, name: str) -> None:
+        """Wake a stage early; repeated triggers before it runs coalesce."""
+        stage = self.stages.get(name)
+        if stage is not None:
+            stage._trigger.set()
+
+    async def run(self) -> None:
+        """Run every stage until the stop event is set (or this task is cancelled)."""
+        self._tasks = [
+            asyncio.create_task(self._run_stage(stage), name=f"stage:{stage.name}")
+            for stage in self.stages.values()
+        ]
+        try:
+            await self._stop_event.wait()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _jittered(self, stage: Stage) -> float:
+        spread = stage.interval_seconds * stage.jitter_fraction
+        return max(0.0, stage.interval_seconds + random.uniform(-spread, spread))
+
+    async def _run_stage(self, stage: Stage) -> None:
+        loop = asyncio.get_running_loop()
+        if stage.run_on_start:
+            # Spread first runs so stages sharing a cadence don't fire in lockstep
+            spread = stage.interval_seconds * stage.jitter_fraction
+            next_due = loop.time() + random.uniform(0, spread)
+        else:
+            next_due = loop.time() + self._jittered(stage)
+
+        while not self._stop_event.is_set():
+            triggered = await self._wait_until(stage, next_due)
+            if triggered:
+                floor = stage.last_started + stage.min_interval_seconds
+                if loop.time() < floor:
+                    await asyncio.sleep(floor - loop.time())
+                stage.triggered_runs += 1
+
+            await self._execute(stage)
+
+            if stage.consecutive_errors >= stage.max_consecutive_errors:
+                logger.error(
+                    f"Stage {stage.name} failed {stage.consecutive_errors} times in a row; "
+                    f"backing off {stage.error_backoff_seconds:.0f}s"
+                )
+                await asyncio.sleep(stage.error_backoff_seconds)
+                stage.consecutive_errors = 0
+
+            # Fixed-rate schedule; slots that passed while we were running are skipped
+            now = loop.time()
+            next_due = (now if triggered else next_due) + self._jittered(stage)
+            if next_due <= now:
+                missed = int((now - next_due) // max(stage.interval_seconds, 1e-9)) + 1
+                stage.skipped_slots += missed
+                STAGE_OVERRUNS.labels(stage=stage.name, kind="skipped").inc(missed)
+                next_due = now + self._jittered(stage)
+
+    async def _wait_until(self, stage: Stage, due: float) -> bool:
+        """Sleep until ``due`` or a trigger; returns True if woken by a trigger."""
+        timeout = due - asyncio.get_running_loop().time()
+        if timeout <= 0 and not stage._trigger.is_set():
+            return False
+        try:
+            await asyncio.wait_for(stage._trigger.wait(), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            return False
+        stage._trigger.clear()
+        return True
+
+    async def _execute(self, stage: Stage) -> None:
+        loop = asyncio.get_running_loop()
+        stage.last_started = loop.time()
+        started = time.perf_counter()
+        task = asyncio.ensure_future(stage.func())
+        try:
+            done, _ = await asyncio.wait({task}, timeout=stage.deadline_seconds)
+            if not done:
+                stage.deadline_overruns += 1
+                STAGE_OVERRUNS.labels(stage=stage.name, kind="deadline").inc()
+                logger.warning(
+                    f"Stage {stage.name} exceeded its {stage.deadline_seconds:.1f}s deadline"
+                )
+                if stage.cancel_on_deadline:
+                    task.cancel()
+                # Either way, wait for it: stages never overlap with themselves
+                await asyncio.gather(task, return_exceptions=True)
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+            stage.consecutive_errors = 0
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        except Exception as e:
+            stage.errors += 1
+            stage.consecutive_errors += 1
+            STAGE_ERRORS.labels(stage=stage.name).inc()
+            logger.warning(f"Stage {stage.name} failed: {e}")
+        finally:
+            duration = time.perf_counter() - started
+            stage.runs += 1
+            stage.last_duration = duration
+            stage.total_duration += duration
+            stage.max_duration = max(stage.max_duration, duration)
+            STAGE_LATENCY.labels(stage=stage.name).observe(duration)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stage.stats() for name, stage in self.stages.items()}
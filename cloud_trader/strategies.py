@@ -623,6 +623,104 @@ class StrategySelector:
 
         return best_signal
 
+    def _ai_analysis_request(
+        self,
+        symbol: str,
+        market_data: MarketSnapshot,
+        historical_data: Optional[pd.DataFrame],
+        existing_signals: List[StrategySignal],
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Prompt and market state for the AI analysis of ``symbol``."""
+        from .prompt_engineer import PromptBuilder, PromptContext
+
+        # Determine agent type from existing signals
+        agent_type = "general"
+        if existing_signals:
+            signal_names = [s.strategy_name.lower() for s in existing_signals]
+            if any("momentum" in name for name in signal_names):
+                agent_type = "momentum"
+            elif any("reversion" in name or "mean" in name for name in signal_names):
+                agent_type = "mean_reversion"
+            elif any("sentiment" in name for name in signal_names):
+                agent_type = "sentiment"
+            elif any("volatility" in name or "vpin" in name for name in signal_names):
+                agent_type = "volatility"
+
+        # Build prompt using PromptBuilder
+        logger.debug(f"Building prompt for {symbol} with agent type: {agent_type}")
+        prompt_builder = PromptBuilder(prompt_version=self.settings.prompt_version)
+        context = PromptContext(
+            symbol=symbol,
+            market_data=market_data,
+            historical_data=historical_data,
+            technical_signals=[
+                {
+                    "strategy_name": s.strategy_name,
+                    "direction": s.direction,
+                    "confidence": s.confidence,
+                    "reasoning": s.reasoning,
+                }
+                for s in existing_signals
+            ],
+            agent_type=agent_type,
+        )
+        # Quantized into the inference cache key, so small ticks reuse the last answer. The
+        # key masks the prompt's numbers, so every number the prompt renders belongs here
+        market_state = {
+            "symbol": symbol,
+            "agent_type": agent_type,
+            "price": market_data.price,
+            "volume": market_data.volume,
+            "volume_24h": getattr(market_data, "volume_24h", None),
+            "change_24h": market_data.change_24h,
+            "atr": getattr(market_data, "atr", None),
+            "sma_20": getattr(market_data, "sma_20", None),
+            "rsi": getattr(market_data, "rsi", None),
+            "min_confidence": self.settings.min_llm_confidence,
+            "signals": {
+                s.strategy_name: {
+                    "direction": s.direction,
+                    "confidence": s.confidence,
+                    "reasoning": s.reasoning,
+                }
+                for s in existing_signals
+            },
+        }
+        return prompt_builder.build_prompt(context), market_state
+
+    async def prefetch_ai_analysis(
+        self,
+        ranked: List[Tuple[str, MarketSnapshot]],
+        historical: Optional[Dict[str, pd.DataFrame]] = None,
+        limit: Optional[int] = None,
+    ) -> int:
+        """
+        Speculatively warm the AI analysis of the top-ranked symbols.
+
+        Builds the same prompt ``select_best_strategy`` will send, so when the
+        trading tick reaches these symbols the answer is already in the Vertex
+        response cache. ``limit`` defaults to ``llm_prefetch_max_inflight``.
+        Returns how many prefetches were started.
+        """
+        from .vertex_ai_client import get_vertex_client
+
+        vertex_client = get_vertex_client()
+        if not vertex_client:
+            return 0
+        if limit is None:
+            limit = self.settings.llm_prefetch_max_inflight
+
+        started = 0
+        for symbol, market_data in ranked[:limit]:
+            history = (historical or {}).get(symbol)
+            signals = await self.evaluate_all_strategies(symbol, market_data, history)
+            prompt, market_state = self._ai_analysis_request(symbol, market_data, history, signals)
+            if await vertex_client.prefetch(
+                "market-analysis", prompt, market_state=market_state, max_tokens=512
+            ):
+                started += 1
+        return started
+
     async def _get_ai_analysis_signal(
         self,
         symbol: str,
@@ -633,7 +731,7 @@ class StrategySelector:
         """Get AI-powered analysis signal using Vertex AI with prompt engineering."""
         try:
             # Import here to avoid circular imports
-            from .prompt_engineer import PromptBuilder, PromptContext, ResponseValidator
+            from .prompt_engineer import ResponseValidator
             from .vertex_ai_client import get_vertex_client
 
             logger.info(f"🤖 Starting AI analysis for {symbol}")
@@ -646,38 +744,9 @@ class StrategySelector:
                 f"Vertex AI client obtained for {symbol}, existing signals: {len(existing_signals)}"
             )
 
-            # Determine agent type from existing signals
-            agent_type = "general"
-            if existing_signals:
-                signal_names = [s.strategy_name.lower() for s in existing_signals]
-                if any("momentum" in name for name in signal_names):
-                    agent_type = "momentum"
-                elif any("reversion" in name or "mean" in name for name in signal_names):
-                    agent_type = "mean_reversion"
-                elif any("sentiment" in name for name in signal_names):
-                    agent_type = "sentiment"
-                elif any("volatility" in name or "vpin" in name for name in signal_names):
-                    agent_type = "volatility"
-
-            # Build prompt using PromptBuilder
-            logger.debug(f"Building prompt for {symbol} with agent type: {agent_type}")
-            prompt_builder = PromptBuilder(prompt_version=self.settings.prompt_version)
-            context = PromptContext(
-                symbol=symbol,
-                market_data=market_data,
-                historical_data=historical_data,
-                technical_signals=[
-                    {
-                        "strategy_name": s.strategy_name,
-                        "direction": s.direction,
-                        "confidence": s.confidence,
-                        "reasoning": s.reasoning,
-                    }
-                    for s in existing_signals
-                ],
-                agent_type=agent_type,
+            prompt, market_state = self._ai_analysis_request(
+                symbol, market_data, historical_data, existing_signals
             )
-            prompt = prompt_builder.build_prompt(context)
             logger.debug(f"Prompt built for {symbol}, length: {len(prompt)} chars")
 
             # Call Vertex AI
@@ -686,6 +755,7 @@ class StrategySelector:
                 agent_id="market-analysis",
                 prompt=prompt,
                 max_tokens=512,  # Increased for better responses
+                market_state=market_state,
             )
             logger.debug(f"📥 Received Vertex AI response for {symbol}")
 
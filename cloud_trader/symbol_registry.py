@@ -0,0 +1,371 @@
+"""
+Symbol metadata registry built from a single ``exchangeInfo`` response.
+
+Every symbol's ``PRICE_FILTER`` / ``LOT_SIZE`` / ``MIN_NOTIONAL`` filters are
+compiled once into a ``SymbolSpec`` holding integer scales: a price is stored
+as a count of ``1 / 10**price_decimals`` units and must be a multiple of
+``tick_units`` (likewise for quantities and ``step_units``). Rounding is then
+one float multiply plus integer floor, and formatting splits the integer into
+whole and fractional parts with a cached format string, with no ``Decimal``
+and no network call on the order path.
+
+``refresh`` re-reads ``exchangeInfo`` but only rebuilds specs whose filters or
+status actually changed. Callers that get a filter rejection from the exchange
+(-1111 precision, -1013 filter failure, -4014/-4023 tick/step mismatch) call
+``request_refresh`` so the next refresh happens now instead of on the hourly
+schedule. A symbol missing from the registry (``exchangeInfo`` failed at
+startup, or the contract is new) has no rounding at all: the order path calls
+``ensure`` to fetch that one symbol, and skips the order if it is still unknown.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FILTER_ERROR_CODES = ("-1111", "-1013", "-4014", "-4023")
+
+
+def _decimals(value: str) -> int:
+    exponent = Decimal(value).normalize().as_tuple().exponent
+    return max(0, -int(exponent))
+
+
+def _units(value: str, decimals: int) -> int:
+    return int(Decimal(value).scaleb(decimals).to_integral_value())
+
+
+class SymbolSpec:
+    """Precompiled filters for one symbol; all rounding is integer arithmetic."""
+
+    __slots__ = (
+        "symbol",
+        "status",
+        "price_decimals",
+        "qty_decimals",
+        "price_scale",
+        "qty_scale",
+        "tick_units",
+        "step_units",
+        "min_price_units",
+        "max_price_units",
+        "min_qty_units",
+        "max_qty_units",
+        "min_notional",
+        "_ticks_per_price",
+        "_steps_per_qty",
+        "_price_fmt",
+        "_qty_fmt",
+        "signature",
+    )
+
+    def __init__(self, info: Dict[str, Any]):
+        filters = {f.get("filterType"): f for f in info.get("filters", [])}
+        price_filter = filters.get("PRICE_FILTER", {})
+        lot_filter = filters.get("LOT_SIZE", {})
+        notional_filter = filters.get("MIN_NOTIONAL", {})
+
+        tick = price_filter.get("tickSize") or "0.01"
+        step = lot_filter.get("stepSize") or "1"
+        self.symbol: str = info["symbol"]
+        self.status: str = info.get("status", "TRADING")
+        self.price_decimals = _decimals(tick)
+        self.qty_decimals = _decimals(step)
+        self.price_scale = 10**self.price_decimals
+        self.qty_scale = 10**self.qty_decimals
+        self.tick_units = max(1, _units(tick, self.price_decimals))
+        self.step_units = max(1, _units(step, self.qty_decimals))
+        self.min_price_units = _units(price_filter.get("minPrice") or "0", self.price_decimals)
+        self.max_price_units = _units(price_filter.get("maxPrice") or "0", self.price_decimals)
+        self.min_qty_units = _units(lot_filter.get("minQty") or "0", self.qty_decimals)
+        self.max_qty_units = _units(lot_filter.get("maxQty") or "0", self.qty_decimals)
+        self.min_notional = float(
+            notional_filter.get("notional") or notional_filter.get("minNotional") or 0
+        )
+
+        self._ticks_per_price = self.price_scale / self.tick_units
+        self._steps_per_qty = self.qty_scale / self.step_units
+        self._price_fmt = f"{{}}.{{:0{self.price_decimals}d}}" if self.price_decimals else "{}"
+        self._qty_fmt = f"{{}}.{{:0{self.qty_decimals}d}}" if self.qty_decimals else "{}"
+        self.signature = (
+            self.status,
+            tick,
+            step,
+            self.min_price_units,
+            self.max_price_units,
+            self.min_qty_units,
+            self.max_qty_units,
+            self.min_notional,
+        )
+
+    @property
+    def is_trading(self) -> bool:
+        return self.status == "TRADING"
+
+    # --- Integer quantizers -------------------------------------------------------
+
+    def price_units(self, price: float) -> int:
+        """Price floored to the tick, in ``1 / price_scale`` units."""
+        # round() absorbs float noise such as 12.999999999 for an exact 13 ticks
+        return math.floor(round(price * self._ticks_per_price, 6)) * self.tick_units
+
+    def qty_units(self, quantity: float) -> int:
+        """Quantity floored to the step (raised to minQty when positive), in units."""
+        units = math.floor(round(quantity * self._steps_per_qty, 6)) * self.step_units
+        if units < self.min_qty_units and quantity > 0:
+            units = self.min_qty_units
+        return units
+
+    def format_price_units(self, units: int) -> str:
+        if not self.price_decimals:
+            return str(units)
+        return self._price_fmt.format(*divmod(units, self.price_scale))
+
+    def format_qty_units(self, units: int) -> str:
+        if not self.qty_decimals:
+            return str(units)
+        return self._qty_fmt.format(*divmod(units, self.qty_scale))
+
+    def round_price(self, price: float) -> str:
+        return self.format_price_units(self.price_units(price))
+
+    def round_quantity(self, quantity: float) -> str:
+        return self.format_qty_units(self.qty_units(quantity))
+
+    # --- Batches ------------------------------------------------------------------
+
+    def price_units_array(self, prices: Sequence[float]) -> np.ndarray:
+        ticks = np.floor(np.round(np.asarray(prices, dtype=np.float64) * self._ticks_per_price, 6))
+        return ticks.astype(np.int64) * self.tick_units
+
+    def qty_units_array(self, quantities: Sequence[float]) -> np.ndarray:
+        qty = np.asarray(quantities, dtype=np.float64)
+        units = np.floor(np.round(qty * self._steps_per_qty, 6)).astype(np.int64) * self.step_units
+        return np.where((units < self.min_qty_units) & (qty > 0), self.min_qty_units, units)
+
+    def round_prices(self, prices: Sequence[float]) -> List[str]:
+        return [self.format_price_units(u) for u in self.price_units_array(prices).tolist()]
+
+    def round_quantities(self, quantities: Sequence[float]) -> List[str]:
+        return [self.format_qty_units(u) for u in self.qty_units_array(quantities).tolist()]
+
+    # --- Validation ---------------------------------------------------------------
+
+    def validate(self, price: Optional[float], quantity: float) -> Optional[str]:
+        """Why the exchange would reject this (already rounded) order, or None."""
+        if not self.is_trading:
+            return f"{self.symbol} is {self.status}"
+        qty = math.floor(round(quantity * self._steps_per_qty, 6)) * self.step_units
+        if abs(qty - quantity * self.qty_scale) > 1e-6 * self.qty_scale * max(1.0, quantity):
+            return f"quantity {quantity} is not a multiple of the step"
+        if qty < self.min_qty_units:
+            return f"quantity {quantity} below minQty"
+        if self.max_qty_units and qty > self.max_qty_units:
+            return f"quantity {quantity} above maxQty"
+        if price is not None:
+            units = self.price_units(price)
+            if units < self.min_price_units or (
+                self.max_price_units and units > self.max_price_units
+            ):
+                return f"price {price} outside the price filter"
+            notional = (units / self.price_scale) * (qty / self.qty_scale)
+            if notional < self.min_notional:
+                return f"notional {notional:.4f} below minimum {self.min_notional}"
+        return None
+
+    def as_structure(self) -> Dict[str, Any]:
+        """Legacy ``market_structure`` entry (precision / min_qty / step_size floats)."""
+        return {
+            "precision": self.qty_decimals,
+            "price_precision": self.price_decimals,
+            "min_qty": self.min_qty_units / self.qty_scale,
+            "step_size": self.step_units / self.qty_scale,
+            "tick_size": self.tick_units / self.price_scale,
+            "min_notional": self.min_notional,
+        }
+
+
+class SymbolRegistry:
+    """All ``SymbolSpec`` objects, refreshed from one ``exchangeInfo`` call."""
+
+    def __init__(self, quote_asset: str = "USDT", min_refresh_interval_seconds: float = 30.0):
+        self.quote_asset = quote_asset
+        self.min_refresh_interval_seconds = min_refresh_interval_seconds
+        self._specs: Dict[str, SymbolSpec] = {}
+        self._structure: Dict[str, Dict[str, Any]] = {}
+        self._refresh_listeners: List[Callable[[], None]] = []
+        self._last_refresh: float = 0.0
+        self._last_symbol_fetch: Dict[str, float] = {}
+        self.refresh_requested = False
+        self.stats = {"refreshes": 0, "changed": 0, "unknown_lookups": 0, "symbol_fetches": 0}
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._specs
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def get(self, symbol: str) -> Optional[SymbolSpec]:
+        return self._specs.get(symbol)
+
+    @property
+    def market_structure(self) -> Dict[str, Dict[str, Any]]:
+        return self._structure
+
+    # --- Loading ------------------------------------------------------------------
+
+    def load(self, exchange_info: Dict[str, Any]) -> int:
+        """Apply an ``exchangeInfo`` payload; returns how many symbols were added/changed."""
+        specs = dict(self._specs)
+        seen = set()
+        changed = 0
+        for info in exchange_info.get("symbols", []):
+            symbol = info.get("symbol")
+            if not symbol or not symbol.endswith(self.quote_asset):
+                continue
+            seen.add(symbol)
+            try:
+                spec = SymbolSpec(info)
+            except Exception as e:
+                logger.warning(f"Skipping unparseable filters for {symbol}: {e}")
+                continue
+            current = specs.get(symbol)
+            if current is None or current.signature != spec.signature:
+                specs[symbol] = spec
+                changed += 1
+        removed = set(specs) - seen
+        for symbol in removed:
+            del specs[symbol]
+
+        if changed or removed:
+            # Swap whole dicts so concurrent readers never see a half-built registry
+            self._specs = specs
+            self._structure = {symbol: spec.as_structure() for symbol, spec in specs.items()}
+        self.stats["changed"] += changed + len(removed)
+        return changed + len(removed)
+
+    async def refresh(self, exchange_client: Any) -> int:
+        self._last_refresh = time.monotonic()
+        self.refresh_requested = False
+        info = await exchange_client.get_exchange_info()
+        self.stats["refreshes"] += 1
+        return self.load(info or {})
+
+    def add_symbol(self, info: Dict[str, Any]) -> Optional[SymbolSpec]:
+        """Compile one ``exchangeInfo`` symbol entry without touching the other specs."""
+        try:
+            spec = SymbolSpec(info)
+        except Exception as e:
+            logger.warning(f"Skipping unparseable filters for {info.get('symbol')}: {e}")
+            return None
+        specs = dict(self._specs)
+        specs[spec.symbol] = spec
+        structure = dict(self._structure)
+        structure[spec.symbol] = spec.as_structure()
+        self._specs = specs
+        self._structure = structure
+        self.stats["changed"] += 1
+        return spec
+
+    async def ensure(self, exchange_client: Any, symbol: str) -> Optional[SymbolSpec]:
+        """
+        The spec for ``symbol``, fetching that one symbol's filters on a miss.
+
+        A symbol is fetched at most once per ``min_refresh_interval_seconds``, so an
+        unknown or delisted symbol cannot turn every order into a REST call.
+        """
+        spec = self._specs.get(symbol)
+        if spec is not None or exchange_client is None:
+            return spec
+        now = time.monotonic()
+        if now - self._last_symbol_fetch.get(symbol, -math.inf) < self.min_refresh_interval_seconds:
+            return None
+        self._last_symbol_fetch[symbol] = now
+        try:
+            info = await exchange_client.get_symbol_info(symbol)
+            self.stats["symbol_fetches"] += 1
+        except Exception as e:
+            logger.warning(f"Failed to fetch exchange filters for {symbol}: {e}")
+            return None
+        return self.add_symbol(info) if info else None
+
+    def add_refresh_listener(self, listener: Callable[[], None]) -> None:
+        """``listener()`` is called when a refresh is requested ahead of schedule."""
+        self._refresh_listeners.append(listener)
+
+    def request_refresh(self, reason: str = "") -> bool:
+        """Ask for an early refresh (rate-limited); returns True if one was requested."""
+        if self.refresh_requested:
+            return False
+        if time.monotonic() - self._last_refresh < self.min_refresh_interval_seconds:
+            return False
+        self.refresh_requested = True
+        logger.info(f"Symbol metadata refresh requested: {reason}")
+        for listener in self._refresh_listeners:
+            listener()
+        return True
+
+    def report_order_error(self, symbol: str, error: Any) -> bool:
+        """Request a refresh if ``error`` looks like a precision / filter rejection."""
+        message = str(error)
+        if any(code in message for code in FILTER_ERROR_CODES):
+            return self.request_refresh(f"{symbol}: {message}")
+        return False
+
+    # --- Order-path helpers (synchronous) ---------------------------------------
+
+    def _spec(self, symbol: str) -> Optional[SymbolSpec]:
+        spec = self._specs.get(symbol)
+        if spec is None:
+            self.stats["unknown_lookups"] += 1
+            self.request_refresh(f"unknown symbol {symbol}")
+        return spec
+
+    def round_price(self, symbol: str, price: float) -> Optional[str]:
+        """Price rounded to the tick, or None when ``symbol`` has no filters loaded."""
+        spec = self._spec(symbol)
+        return spec.round_price(price) if spec is not None else None
+
+    def round_quantity(self, symbol: str, quantity: float) -> Optional[str]:
+        """Quantity rounded to the step, or None when ``symbol`` has no filters loaded."""
+        spec = self._spec(symbol)
+        return spec.round_quantity(quantity) if spec is not None else None
+
+    def validate(self, symbol: str, price: Optional[float], quantity: float) -> Optional[str]:
+        spec = self._spec(symbol)
+        if spec is None:
+            return f"no exchange filters loaded for {symbol}"
+        return spec.validate(price, quantity)
+
+    def round_orders(
+        self, orders: Iterable[Tuple[str, Optional[float], float]]
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """Round many ``(symbol, price, quantity)`` orders, vectorized per symbol.
+
+        Orders for symbols without loaded filters come back as ``(None, None)``.
+        """
+        orders = list(orders)
+        results: List[Tuple[Optional[str], Optional[str]]] = [(None, None)] * len(orders)
+        by_symbol: Dict[str, List[int]] = {}
+        for i, (symbol, _, _) in enumerate(orders):
+            by_symbol.setdefault(symbol, []).append(i)
+
+        for symbol, indexes in by_symbol.items():
+            spec = self._spec(symbol)
+            prices = [orders[i][1] for i in indexes]
+            quantities = [orders[i][2] for i in indexes]
+            if spec is None:
+                continue
+            qty_strs = spec.round_quantities(quantities)
+            priced = [p if p is not None else 0.0 for p in prices]
+            price_strs = spec.round_prices(priced)
+            for i, p, price_str, qty_str in zip(indexes, prices, price_strs, qty_strs):
+                results[i] = (price_str if p is not None else None, qty_str)
+        return results
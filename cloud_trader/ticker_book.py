@@ -0,0 +1,360 @@
+"""
+Live ticker book fed by the Aster all-market websocket streams.
+
+The trading loop used to fire one ``get_ticker`` REST call per symbol on every
+tick. ``TickerBook`` keeps the latest 24h ticker and best bid/ask for every
+symbol in memory, updated continuously from ``!ticker@arr`` and ``!bookTicker``.
+Readers receive plain dicts in the same shape as ``/fapi/v1/ticker/24hr`` so
+``ticker_map`` consumers do not need to change.
+
+Writes happen only from the event loop and always replace a symbol's entry with
+a new dict, so readers never observe a half-updated ticker and no lock is needed.
+When the stream is stale the book falls back to a single bulk ``get_all_tickers``
+REST call instead of per-symbol polling.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from .exchange import MAX_STREAMS_PER_CONNECTION, AsterWebSocketClient
+
+logger = logging.getLogger(__name__)
+
+# Stream payload keys -> REST /ticker/24hr field names
+_TICKER_FIELDS = {
+    "p": "priceChange",
+    "P": "priceChangePercent",
+    "w": "weightedAvgPrice",
+    "c": "lastPrice",
+    "Q": "lastQty",
+    "o": "openPrice",
+    "h": "highPrice",
+    "l": "lowPrice",
+    "v": "volume",
+    "q": "quoteVolume",
+    "O": "openTime",
+    "C": "closeTime",
+    "F": "firstId",
+    "L": "lastId",
+    "n": "count",
+}
+
+_BOOK_FIELDS = {
+    "b": "bidPrice",
+    "B": "bidQty",
+    "a": "askPrice",
+    "A": "askQty",
+}
+
+
+class TickerBook:
+    """In-memory ticker book exposing REST-shaped ``ticker_map`` snapshots."""
+
+    def __init__(
+        self,
+        exchange_client: Any = None,
+        stale_after_seconds: float = 10.0,
+    ):
+        self.exchange_client = exchange_client
+        self.stale_after_seconds = stale_after_seconds
+        self._tickers: Dict[str, Dict[str, Any]] = {}
+        self._last_stream_update: float = 0.0
+        self._last_rest_refresh: float = 0.0
+        self._rest_refresh: Optional[asyncio.Task] = None
+        self._update_listeners: List[Callable[[Set[str]], None]] = []
+        self.stream_updates = 0
+        self.rest_fallbacks = 0
+
+    # ------------------------------------------------------------------
+    # Writers (event loop only)
+    # ------------------------------------------------------------------
+    def apply_ticker_event(self, event: Dict[str, Any]) -> None:
+        """Apply a single ``24hrTicker`` stream event."""
+        symbol = event.get("s")
+        if not symbol:
+            return
+        ticker = dict(self._tickers.get(symbol, ()))
+        ticker["symbol"] = symbol
+        for src, dst in _TICKER_FIELDS.items():
+            if src in event:
+                ticker[dst] = event[src]
+        self._tickers[symbol] = ticker
+
+    def apply_book_ticker_event(self, event: Dict[str, Any]) -> None:
+        """Apply a single ``bookTicker`` stream event."""
+        symbol = event.get("s")
+        if not symbol:
+            return
+        ticker = dict(self._tickers.get(symbol, ()))
+        ticker["symbol"] = symbol
+        for src, dst in _BOOK_FIELDS.items():
+            if src in event:
+                ticker[dst] = event[src]
+        self._tickers[symbol] = ticker
+
+    def add_update_listener(self, listener: Callable[[Set[str]], None]) -> None:
+        """Call ``listener(symbols)`` after each stream message that changed prices.
+
+        Listeners run inline on the event loop and must only do cheap work
+        (e.g. set an event), never I/O.
+        """
+        self._update_listeners.append(listener)
+
+    async def handle_stream_message(self, message: Any) -> None:
+        """Callback for ``AsterWebSocketClient.listen``."""
+        # Combined-stream payloads wrap the event in {"stream": ..., "data": ...}
+        if isinstance(message, dict) and "data" in message:
+            message = message["data"]
+
+        events: Iterable[Any] = message if isinstance(message, list) else (message,)
+        updated: Set[str] = set()
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            event_type = event.get("e")
+            if event_type == "24hrTicker":
+                self.apply_ticker_event(event)
+                updated.add(event.get("s"))
+            elif event_type == "bookTicker":
+                self.apply_book_ticker_event(event)
+                updated.add(event.get("s"))
+
+        if updated:
+            self._last_stream_update = time.time()
+            self.stream_updates += 1
+            for listener in self._update_listeners:
+                try:
+                    listener(updated)
+                except Exception as e:
+                    logger.warning(f"Ticker update listener failed: {e}")
+
+    def apply_rest_snapshot(self, tickers: List[Dict[str, Any]]) -> None:
+        """Merge a bulk ``/ticker/24hr`` response into the book."""
+        now = time.time()
+        for raw in tickers or []:
+            symbol = raw.get("symbol") if isinstance(raw, dict) else None
+            if not symbol:
+                continue
+            ticker = dict(self._tickers.get(symbol, ()))
+            ticker.update(raw)
+            self._tickers[symbol] = ticker
+        self._last_rest_refresh = now
+
+    # ------------------------------------------------------------------
+    # Readers
+    # ------------------------------------------------------------------
+    @property
+    def is_stale(self) -> bool:
+        return (time.time() - self._last_stream_update) > self.stale_after_seconds
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Return the latest ticker for ``symbol`` without any network call."""
+        return self._tickers.get(symbol)
+
+    def snapshot(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Return a ``ticker_map`` for ``symbols`` (all symbols when omitted)."""
+        tickers = self._tickers
+        if symbols is None:
+            return dict(tickers)
+        return {sym: tickers[sym] for sym in symbols if sym in tickers}
+
+    async def get_ticker_map(
+        self, symbols: Optional[Iterable[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Return a ``ticker_map``, refreshing via one bulk REST call when the
+        stream has gone stale.
+        """
+        if self.is_stale:
+            await self.refresh_from_rest()
+        return self.snapshot(symbols)
+
+    async def refresh_from_rest(self) -> None:
+        """Refresh every ticker with a single ``get_all_tickers`` call.
+
+        Concurrent callers share the same in-flight request, and refreshes are
+        throttled to once per staleness window.
+        """
+        if self.exchange_client is None:
+            return
+        if (time.time() - self._last_rest_refresh) < self.stale_after_seconds:
+            return
+
+        if self._rest_refresh is None or self._rest_refresh.done():
+            self._rest_refresh = asyncio.create_task(self._fetch_rest_snapshot())
+        await asyncio.shield(self._rest_refresh)
+
+    async def _fetch_rest_snapshot(self) -> None:
+        try:
+            tickers = await self.exchange_client.get_all_tickers()
+            self.apply_rest_snapshot(tickers if isinstance(tickers, list) else [])
+            self.rest_fallbacks += 1
+        except Exception as e:
+            logger.warning(f"Ticker book REST fallback failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "symbols": len(self._tickers),
+            "stream_updates": self.stream_updates,
+            "rest_fallbacks": self.rest_fallbacks,
+            "stream_age_seconds": (
+                now - self._last_stream_update if self._last_stream_update else None
+            ),
+            "stale": self.is_stale,
+        }
+
+
+class TickerStreamService:
+    """
+    Keeps a ``TickerBook`` fed from the all-market ticker websocket streams.
+
+    When a ``candle_store`` is given, kline streams for ``kline_symbols`` ride on
+    the same connection and are forwarded to ``CandleStore.apply_kline_event``;
+    likewise diff-depth streams for ``depth_symbols`` feed ``order_books``.
+    ``set_symbols`` swaps either set at runtime and reconnects with the new streams.
+    Everything shares one connection, so at most ``max_streams`` are subscribed;
+    ``symbol_capacity`` is how many symbols fit.
+    """
+
+    def __init__(
+        self,
+        book: TickerBook,
+        ws_base_url: str = "wss://fstream.asterdex.com",
+        include_book_ticker: bool = True,
+        ws_client_factory: Any = AsterWebSocketClient,
+        candle_store: Any = None,
+        kline_symbols: Optional[List[str]] = None,
+        kline_interval: str = "1h",
+        order_books: Any = None,
+        depth_symbols: Optional[List[str]] = None,
+        max_streams: int = MAX_STREAMS_PER_CONNECTION,
+    ):
+        self.book = book
+        self.ws_base_url = ws_base_url
+        self.include_book_ticker = include_book_ticker
+        self.candle_store = candle_store
+        self.kline_symbols = list(kline_symbols or [])
+        self.kline_interval = kline_interval
+        self.order_books = order_books
+        self.depth_symbols = list(depth_symbols or [])
+        self.max_streams = max_streams
+        self._ws_client_factory = ws_client_factory
+        self._ws: Optional[Any] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+        self._resubscribe = False
+
+    @property
+    def streams(self) -> List[str]:
+        streams = [AsterWebSocketClient.all_ticker_stream()]
+        if self.include_book_ticker:
+            streams.append(AsterWebSocketClient.all_book_ticker_stream())
+        if self.candle_store is not None:
+            streams.extend(
+                AsterWebSocketClient.kline_stream(sym, self.kline_interval)
+                for sym in self.kline_symbols
+            )
+        if self.order_books is not None:
+            streams.extend(self.order_books.streams(self.depth_symbols))
+        if len(streams) > self.max_streams:
+            logger.warning(
+                f"{len(streams)} streams exceed the {self.max_streams} per connection; "
+                f"dropping {len(streams) - self.max_streams}"
+            )
+            del streams[self.max_streams :]
+        return streams
+
+    @property
+    def symbol_capacity(self) -> int:
+        """Symbols that fit on the connection with a kline and a depth stream each."""
+        fixed = 2 if self.include_book_ticker else 1
+        per_symbol = (self.candle_store is not None) + (self.order_books is not None)
+        return (self.max_streams - fixed) // max(per_symbol, 1)
+
+    async def set_symbols(
+        self,
+        kline_symbols: Optional[List[str]] = None,
+        depth_symbols: Optional[List[str]] = None,
+    ) -> bool:
+        """Replace the kline and/or depth symbols; returns True if the stream set changed."""
+        before = set(self.streams)
+        if kline_symbols is not None:
+            self.kline_symbols = list(kline_symbols)
+        if depth_symbols is not None:
+            self.depth_symbols = list(depth_symbols)
+        if set(self.streams) == before:
+            return False
+        if self._ws is not None:
+            # SUBSCRIBE waits for its reply, which would race the listener for recv();
+            # dropping the connection lets ``run`` reconnect with the new stream set
+            self._resubscribe = True
+            await self._close_ws()
+        return True
+
+    async def _dispatch(self, message: Any) -> None:
+        payload = message.get("data", message) if isinstance(message, dict) else message
+        if isinstance(payload, dict) and payload.get("e") == "kline":
+            if self.candle_store is not None:
+                self.candle_store.apply_kline_event(payload)
+            return
+        if isinstance(payload, dict) and payload.get("e") == "depthUpdate":
+            if self.order_books is not None:
+                self.order_books.apply_event(payload)
+            return
+        await self.book.handle_stream_message(payload)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._stop_event.clear()
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self) -> None:
+        backoff_time = 1.0
+        while not self._stop_event.is_set():
+            try:
+                self._ws = self._ws_client_factory(self.ws_base_url)
+                await self._ws.connect()
+                await self._ws.subscribe(self.streams)
+                logger.info(f"📡 Ticker stream connected ({len(self.streams)} streams)")
+                backoff_time = 1.0
+                await self._ws.listen(self._dispatch)
+            except asyncio.CancelledError:
+                raise
+            except RuntimeError as e:
+                # websockets missing or subscription refused - REST fallback still works
+                logger.warning(f"Ticker stream unavailable: {e}")
+            except Exception as e:
+                logger.warning(f"Ticker stream error: {e}")
+            finally:
+                await self._close_ws()
+
+            if self._resubscribe:
+                self._resubscribe = False
+            elif not self._stop_event.is_set():
+                await asyncio.sleep(backoff_time)
+                backoff_time = min(backoff_time * 2, 60.0)
+
+    async def _close_ws(self) -> None:
+        if self._ws is not None:
+            try:
+                await self._ws.disconnect()
+            except Exception:
+                pass
+            self._ws = None
+
+    async def stop(self) -> None:
+        self._stop_event.set()
+        await self._close_ws()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
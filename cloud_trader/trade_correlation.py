@@ -4,10 +4,12 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import statistics
+import math
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import Deque, Dict, List, Optional, Set, Tuple
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
 
 from .time_sync import get_timestamp_us
 
@@ -16,54 +18,74 @@ logger = logging.getLogger(__name__)
 
 @dataclass
 class CorrelationMatrix:
-    """Correlation matrix between trading symbols."""
+    """Correlation matrix between trading symbols (dense, indexed by ``symbols``)."""
 
     symbols: List[str]
-    correlations: Dict[Tuple[str, str], float]
+    values: np.ndarray
     timestamp_us: int
     sample_size: int
 
+    def __post_init__(self) -> None:
+        self.index: Dict[str, int] = {s: i for i, s in enumerate(self.symbols)}
+        self._pairs: Optional[Dict[Tuple[str, str], float]] = None
+
+    @property
+    def correlations(self) -> Dict[Tuple[str, str], float]:
+        """Pairwise view keyed by sorted symbol tuples (built lazily)."""
+        if self._pairs is None:
+            rows, cols = np.triu_indices(len(self.symbols), k=1)
+            values = self.values[rows, cols]
+            self._pairs = {
+                tuple(sorted((self.symbols[i], self.symbols[j]))): float(v)
+                for i, j, v in zip(rows.tolist(), cols.tolist(), values.tolist())
+                if not math.isnan(v)
+            }
+        return self._pairs
+
     def get_correlation(self, symbol1: str, symbol2: str) -> float:
         """Get correlation between two symbols."""
         if symbol1 == symbol2:
             return 1.0
-        key = tuple(sorted([symbol1, symbol2]))
-        return self.correlations.get(key, 0.0)
+        i, j = self.index.get(symbol1), self.index.get(symbol2)
+        if i is None or j is None:
+            return 0.0
+        value = float(self.values[i, j])
+        return 0.0 if math.isnan(value) else value
+
+    def abs_row(self, symbol: str) -> Optional[np.ndarray]:
+        """|correlation| of ``symbol`` with every symbol (self and undefined pairs as 0)."""
+        i = self.index.get(symbol)
+        if i is None:
+            return None
+        row = np.abs(np.nan_to_num(self.values[i]))
+        row[i] = 0.0
+        return row
 
     def get_symbol_correlations(self, symbol: str) -> Dict[str, float]:
         """Get all correlations for a specific symbol."""
         return {s: self.get_correlation(symbol, s) for s in self.symbols if s != symbol}
 
     def get_highly_correlated_groups(self, threshold: float = 0.7) -> List[Set[str]]:
-        """Find groups of highly correlated symbols."""
-        visited = set()
+        """Find groups of highly correlated symbols (linked by |corr| >= threshold)."""
+        with np.errstate(invalid="ignore"):
+            adjacency = np.abs(self.values) >= threshold  # NaN compares False
+        np.fill_diagonal(adjacency, False)
+        visited = np.zeros(len(self.symbols), dtype=bool)
         groups = []
 
-        for symbol in self.symbols:
-            if symbol in visited:
+        for start in range(len(self.symbols)):
+            if visited[start]:
                 continue
-
-            # Find all symbols correlated with this one above threshold
-            group = {symbol}
-            stack = [symbol]
-
-            while stack:
-                current = stack.pop()
-                if current in visited:
-                    continue
-                visited.add(current)
-
-                for other_symbol in self.symbols:
-                    if (
-                        other_symbol not in visited
-                        and other_symbol not in group
-                        and abs(self.get_correlation(current, other_symbol)) >= threshold
-                    ):
-                        group.add(other_symbol)
-                        stack.append(other_symbol)
-
-            if len(group) > 1:
-                groups.append(group)
+            member = np.zeros(len(self.symbols), dtype=bool)
+            member[start] = True
+            frontier = member.copy()
+            while frontier.any():
+                # Expand the whole frontier in one pass over the adjacency rows
+                frontier = adjacency[frontier].any(axis=0) & ~member
+                member |= frontier
+            visited |= member
+            if member.sum() > 1:
+                groups.append({self.symbols[i] for i in np.flatnonzero(member)})
 
         return groups
 
@@ -102,25 +124,40 @@ class TradeCorrelationAnalyzer:
     Implements multiple correlation measures and risk concentration analysis.
     """
 
-    def __init__(self, window_size: int = 1000, correlation_window: int = 500):
+    def __init__(
+        self,
+        window_size: int = 1000,
+        correlation_window: int = 500,
+        update_interval: int = 100,
+        min_samples: int = 30,
+    ):
         # Price data storage
         self.price_history: Dict[str, Deque[float]] = defaultdict(lambda: Deque(maxlen=window_size))
-        self.return_history: Dict[str, Deque[float]] = defaultdict(
-            lambda: Deque(maxlen=correlation_window)
-        )
+
+        # Returns live in a preallocated (symbols x window) ring buffer; each row has its
+        # own write head because symbols tick independently
+        self.correlation_window = correlation_window
+        self.update_interval = update_interval
+        self.min_samples = min_samples
+        self.symbols: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._returns = np.zeros((8, correlation_window), dtype=np.float64)
+        self._heads = np.zeros(8, dtype=np.int64)
+        self._counts = np.zeros(8, dtype=np.int64)
+        self._pending_returns = 0
+        self._generation = 0
+        self._recommendations: Optional[Tuple[int, Dict[str, Any]]] = None
 
         # Correlation tracking
         self.correlation_matrices: Deque[CorrelationMatrix] = Deque(
             maxlen=10
         )  # Keep last 10 matrices
-        self.correlation_cache: Dict[Tuple[str, str], float] = {}
 
         # Risk analysis
         self.position_history: Deque[Dict] = Deque(maxlen=1000)
         self.portfolio_exposures: Dict[str, PositionExposure] = {}
 
         # Market beta calculations
-        self.market_returns: Deque[float] = Deque(maxlen=correlation_window)
         self.symbol_betas: Dict[str, float] = {}
 
         # Risk thresholds
@@ -128,27 +165,59 @@ class TradeCorrelationAnalyzer:
         self.min_diversification_ratio = 0.7  # Minimum diversification score
         self.max_concentration_score = 0.8  # Maximum concentration risk
 
+    @property
+    def correlation_cache(self) -> Dict[Tuple[str, str], float]:
+        matrix = self.get_correlation_matrix()
+        return matrix.correlations if matrix else {}
+
     def add_price_data(self, symbol: str, price: float, volume: Optional[float] = None) -> None:
         """
         Add price data for correlation analysis.
         Calculates returns and updates correlation matrices.
         """
-        self.price_history[symbol].append(price)
-
-        # Calculate returns if we have enough price data
-        prices = list(self.price_history[symbol])
-        if len(prices) >= 2:
-            ret = (prices[-1] - prices[-2]) / prices[-2] if prices[-2] != 0 else 0
-            self.return_history[symbol].append(ret)
-
-            # Update market returns (simple average for now)
-            if len(self.return_history[symbol]) >= 10:
-                self.market_returns.append(statistics.mean(list(self.return_history[symbol])[-10:]))
+        history = self.price_history[symbol]
+        history.append(price)
+        if len(history) < 2:
+            return
 
-        # Update correlations periodically
-        if len(self.return_history[symbol]) % 100 == 0:  # Every 100 data points
+        prev = history[-2]
+        ret = (price - prev) / prev if prev != 0 else 0.0
+        row = self._row(symbol)
+        head = self._heads[row]
+        self._returns[row, head] = ret
+        self._heads[row] = (head + 1) % self.correlation_window
+        if self._counts[row] < self.correlation_window:
+            self._counts[row] += 1
+
+        # Recompute once every symbol has, on average, update_interval new returns
+        self._pending_returns += 1
+        if self._pending_returns >= self.update_interval * len(self.symbols):
             self._update_correlations()
 
+    def get_returns(self, symbol: str) -> np.ndarray:
+        """Return history of ``symbol``, oldest first."""
+        row = self._rows.get(symbol)
+        if row is None:
+            return np.empty(0)
+        count = int(self._counts[row])
+        cols = (self._heads[row] + np.arange(-count, 0)) % self.correlation_window
+        return self._returns[row, cols]
+
+    def _row(self, symbol: str) -> int:
+        row = self._rows.get(symbol)
+        if row is not None:
+            return row
+        row = len(self.symbols)
+        if row == len(self._returns):
+            # Grow capacity geometrically so adding symbols stays amortized O(1)
+            grow = len(self._returns)
+            self._returns = np.vstack([self._returns, np.zeros_like(self._returns)])
+            self._heads = np.concatenate([self._heads, np.zeros(grow, dtype=np.int64)])
+            self._counts = np.concatenate([self._counts, np.zeros(grow, dtype=np.int64)])
+        self.symbols.append(symbol)
+        self._rows[symbol] = row
+        return row
+
     def add_position_update(
         self, symbol: str, position_size: float, market_value: float, entry_price: float
     ) -> None:
@@ -177,15 +246,14 @@ class TradeCorrelationAnalyzer:
         if not matrix:
             return {"correlation_risk": 0.0, "recommended_limit": 1.0}
 
-        correlations = matrix.get_symbol_correlations(symbol)
+        row = matrix.abs_row(symbol)
+        if row is None:
+            return {"correlation_risk": 0.0, "recommended_limit": 1.0}
 
         # Calculate weighted correlation risk
-        high_corr_symbols = [s for s, corr in correlations.items() if abs(corr) > 0.5]
-        avg_high_corr = (
-            statistics.mean([abs(correlations[s]) for s in high_corr_symbols])
-            if high_corr_symbols
-            else 0
-        )
+        high_corr = row > 0.5
+        high_corr_symbols = [matrix.symbols[i] for i in np.flatnonzero(high_corr)]
+        avg_high_corr = float(row[high_corr].mean()) if high_corr_symbols else 0
 
         # Risk score based on correlation concentration
         correlation_risk = min(avg_high_corr * len(high_corr_symbols) / 5.0, 1.0)
@@ -308,69 +376,70 @@ class TradeCorrelationAnalyzer:
 
         return sorted(clusters, key=lambda x: x["risk_score"], reverse=True)
 
-    def _update_correlations(self) -> None:
-        """Update correlation matrices for all symbol pairs."""
-        symbols = list(self.return_history.keys())
-        if len(symbols) < 2:
-            return
+    def _aligned_returns(self) -> Tuple[List[str], np.ndarray]:
+        """Returns of every symbol with at least ``min_samples``, right-aligned on the newest.
 
-        # Ensure all symbols have the same return history length
-        min_length = min(len(self.return_history[s]) for s in symbols)
-        if min_length < 30:  # Need minimum sample size
-            return
-
-        # Calculate correlation matrix
-        correlations = {}
-        sample_size = min_length
-
-        for i, symbol1 in enumerate(symbols):
-            for symbol2 in symbols[i + 1 :]:
-                returns1 = list(self.return_history[symbol1])[-sample_size:]
-                returns2 = list(self.return_history[symbol2])[-sample_size:]
-
-                try:
-                    correlation = statistics.correlation(returns1, returns2)
-                    key = tuple(sorted([symbol1, symbol2]))
-                    correlations[key] = correlation
-                except (statistics.StatisticsError, ZeroDivisionError):
-                    continue
-
-        if correlations:
-            matrix = CorrelationMatrix(
-                symbols=symbols,
-                correlations=correlations,
-                timestamp_us=get_timestamp_us(),
-                sample_size=sample_size,
-            )
-            self.correlation_matrices.append(matrix)
-
-            # Update cache
-            self.correlation_cache.update(correlations)
+        Rows keep their own history length: columns before a symbol's first return are NaN,
+        so a newly listed symbol does not shorten the window of the others.
+        """
+        counts = self._counts[: len(self.symbols)]
+        eligible = np.flatnonzero(counts >= self.min_samples)
+        if len(eligible) == 0:
+            return [], np.empty((0, 0))
+        n = int(counts[eligible].max())
+        cols = (self._heads[eligible, None] + np.arange(-n, 0)) % self.correlation_window
+        returns = self._returns[eligible[:, None], cols]
+        returns[np.arange(n) < (n - counts[eligible])[:, None]] = np.nan
+        return [self.symbols[i] for i in eligible], returns
 
-            # Update betas
-            self._update_symbol_betas()
+    def _update_correlations(self) -> None:
+        """Recompute the correlation matrix and betas in one vectorized pass.
 
-    def _update_symbol_betas(self) -> None:
-        """Update beta calculations for all symbols."""
-        if not self.market_returns or len(self.market_returns) < 30:
+        Each pair is correlated over the returns both symbols have (their overlapping,
+        most recent window), using masked sums so no pair is cut to the shortest history.
+        """
+        self._pending_returns = 0
+        symbols, returns = self._aligned_returns()
+        if len(symbols) < 2:
             return
 
-        market_returns_list = list(self.market_returns)
-
-        for symbol, returns in self.return_history.items():
-            if len(returns) < 30:
-                continue
-
-            symbol_returns = list(returns)[-len(market_returns_list) :]
-
-            if len(symbol_returns) != len(market_returns_list):
-                continue
-
-            try:
-                beta = statistics.linear_regression(market_returns_list, symbol_returns).slope
-                self.symbol_betas[symbol] = max(0.1, min(3.0, beta))  # Bound beta
-            except (statistics.StatisticsError, ZeroDivisionError):
-                self.symbol_betas[symbol] = 1.0  # Default beta
+        mask = np.isfinite(returns).astype(np.float64)
+        # Centring each row on its own mean first keeps the masked sums well conditioned
+        x = np.nan_to_num(returns - np.nanmean(returns, axis=1, keepdims=True))
+        overlap = mask @ mask.T
+        sums = x @ mask.T  # sums[i, j]: sum of i's returns where j also has one
+        squares = (x * x) @ mask.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = x @ x.T - sums * sums.T / overlap
+            var_i = squares - sums * sums / overlap
+            values = cov / np.sqrt(var_i * var_i.T)
+        values[~np.isfinite(values)] = np.nan  # Flat series have no defined correlation
+        np.clip(values, -1.0, 1.0, out=values)
+        np.fill_diagonal(values, 1.0)
+
+        matrix = CorrelationMatrix(
+            symbols=symbols,
+            values=values,
+            timestamp_us=get_timestamp_us(),
+            sample_size=int(overlap.min()),  # The shortest pairwise window
+        )
+        self.correlation_matrices.append(matrix)
+        self._generation += 1
+
+        # Update betas
+        self._update_symbol_betas(symbols, x, mask)
+
+    def _update_symbol_betas(self, symbols: List[str], x: np.ndarray, mask: np.ndarray) -> None:
+        """Beta of each symbol against the equal-weighted market over its own history."""
+        market = (x * mask).sum(axis=0) / np.maximum(mask.sum(axis=0), 1.0)
+        n = mask.sum(axis=1)
+        market_sum = mask @ market
+        cov = x @ market - x.sum(axis=1) * market_sum / n
+        variance = mask @ (market * market) - market_sum * market_sum / n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            betas = np.where(variance > 0, cov / variance, 1.0)  # Default beta
+        betas = np.clip(np.nan_to_num(betas, nan=1.0), 0.1, 3.0)  # Bound beta
+        self.symbol_betas.update(zip(symbols, betas.tolist()))
 
     def _update_portfolio_exposures(self) -> None:
         """Update portfolio exposure calculations."""
@@ -411,21 +480,23 @@ class TradeCorrelationAnalyzer:
         self, cluster: Set[str], matrix: CorrelationMatrix
     ) -> float:
         """Calculate average correlation within a cluster."""
-        if len(cluster) < 2:
+        indexes = [matrix.index[s] for s in cluster if s in matrix.index]
+        if len(indexes) < 2:
             return 0.0
 
-        correlations = []
-        cluster_list = list(cluster)
+        block = np.abs(np.nan_to_num(matrix.values[np.ix_(indexes, indexes)]))
+        upper = np.triu_indices(len(indexes), k=1)
+        return float(block[upper].mean())
 
-        for i in range(len(cluster_list)):
-            for j in range(i + 1, len(cluster_list)):
-                corr = matrix.get_correlation(cluster_list[i], cluster_list[j])
-                correlations.append(abs(corr))
+    def get_risk_management_recommendations(self) -> Dict[str, any]:
+        """
+        Get comprehensive risk management recommendations.
 
-        return statistics.mean(correlations) if correlations else 0.0
+        Cached per correlation matrix, so repeated API reads don't recompute anything.
+        """
+        if self._recommendations and self._recommendations[0] == self._generation:
+            return self._recommendations[1]
 
-    def get_risk_management_recommendations(self) -> Dict[str, any]:
-        """Get comprehensive risk management recommendations."""
         matrix = self.get_correlation_matrix()
 
         recommendations = {
@@ -451,10 +522,10 @@ class TradeCorrelationAnalyzer:
                     )
 
             # Find diversification opportunities (low correlation symbols)
-            avg_correlations = {}
-            for symbol in matrix.symbols:
-                corr_values = [abs(c) for c in matrix.get_symbol_correlations(symbol).values()]
-                avg_correlations[symbol] = statistics.mean(corr_values) if corr_values else 0
+            abs_values = np.abs(np.nan_to_num(matrix.values))
+            np.fill_diagonal(abs_values, 0.0)
+            peers = max(len(matrix.symbols) - 1, 1)
+            avg_correlations = dict(zip(matrix.symbols, (abs_values.sum(axis=1) / peers).tolist()))
 
             # Symbols with low average correlation are diversification opportunities
             low_corr_symbols = sorted(avg_correlations.items(), key=lambda x: x[1])[:5]
@@ -462,6 +533,7 @@ class TradeCorrelationAnalyzer:
                 {"symbol": s, "avg_correlation": c} for s, c in low_corr_symbols if c < 0.3
             ]
 
+        self._recommendations = (self._generation, recommendations)
         return recommendations
 
 
@@ -13,7 +13,7 @@ import time
 from collections import defaultdict, deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import aiohttp
 
@@ -22,18 +22,29 @@ from .analysis_engine import AnalysisEngine
 from .analytics.performance import PerformanceTracker
 from .config import Settings, get_settings
 from .credentials import CredentialManager
+from .dashboard_view import DashboardView
+from .data.candle_store import CandleStore
 from .data.feature_pipeline import FeaturePipeline
 from .definitions import AGENT_DEFINITIONS, SYMBOL_CONFIG, HealthStatus, MinimalAgentState
 from .enhanced_telegram import EnhancedTelegramService, NotificationPriority
 from .enums import OrderType
 from .exchange import AsterClient
+from .journal import AppendOnlyJournal
 from .market_data import MarketDataManager
+from .market_regime import get_regime_engine
+from .order_book import OrderBookManager
 from .partial_exits import PartialExitStrategy
 from .position_manager import PositionManager
+from .rate_limit_manager import WeightedRateLimiter
 from .reentry_queue import ReEntryQueue, get_reentry_queue
 from .risk import PortfolioState, RiskManager
 from .self_healing import SelfHealingWatchdog
+from .stage_scheduler import Stage, StageScheduler
+from .strategies import StrategySelector
+from .strategy import MarketSnapshot
 from .swarm import SwarmManager
+from .ticker_book import TickerBook, TickerStreamService
+from .user_data_stream import UserDataStream
 from .websocket_manager import broadcast_market_regime
 
 # Adaptive TP/SL Calculator
@@ -54,16 +65,6 @@ except ImportError as e:
     print(f"⚠️ RiskGuard not available: {e}")
     RISK_GUARD_AVAILABLE = False
 
-# TAIndicators - optional, may fail due to pandas_ta numba cache issues
-try:
-    from .ta_indicators import TAIndicators
-
-    TA_AVAILABLE = True
-except Exception as ta_err:
-    print(f"⚠️ TAIndicators not available: {ta_err}")
-    TAIndicators = None
-    TA_AVAILABLE = False
-
 # PvP Adversarial Strategies
 try:
     from .pvp_strategies import (
@@ -90,27 +91,33 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Caps on the ATR-based stop and target in _manage_positions (as AdaptiveTPSLCalculator)
+MAX_SL_CAP = 0.04
+MAX_TP_CAP = 0.08
+
 
 class SimpleMCP:
     """Simple in-memory MCP manager to simulate agent collaboration."""
 
     def __init__(self):
         self.messages = deque(maxlen=100)
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
 
     async def get_recent_messages(self, limit: int = 50) -> List[Dict[str, Any]]:
         return list(self.messages)[-limit:]
 
     def add_message(self, msg_type: str, sender: str, content: str, context: str = ""):
-        self.messages.append(
-            {
-                "id": f"msg_{int(time.time()*1000)}_{random.randint(1000,9999)}",
-                "type": msg_type,
-                "sender": sender,
-                "timestamp": str(time.time()),
-                "content": content,
-                "context": context,
-            }
-        )
+        message = {
+            "id": f"msg_{int(time.time()*1000)}_{random.randint(1000,9999)}",
+            "type": msg_type,
+            "sender": sender,
+            "timestamp": str(time.time()),
+            "content": content,
+            "context": context,
+        }
+        self.messages.append(message)
+        for listener in self.listeners:
+            listener(message)
 
 
 class MinimalTradingService:
@@ -127,6 +134,8 @@ class MinimalTradingService:
         # Runtime State
         self._stop_event = asyncio.Event()
         self._task: Optional[asyncio.Task[None]] = None
+        self._scheduler: Optional[StageScheduler] = None
+        self._latest_ticker_map: Dict[str, Any] = {}
         self._loop = None
         self._health = HealthStatus(running=False, paper_trading=False, last_error=None)
 
@@ -135,11 +144,16 @@ class MinimalTradingService:
         self._paper_exchange = None
         self._spot_exchange = None
         self._vertex_client = None
+        self._strategy_selector: Optional[StrategySelector] = None  # Built on first prefetch
+        self._prefetch_task: Optional[asyncio.Task] = None
         self.symphony = None
 
         # Data & Portfolio
         self._portfolio = PortfolioState(balance=0.0, equity=0.0)
         self._recent_trades = deque(maxlen=200)
+        self._state_journal: Optional[AppendOnlyJournal] = None
+        self._journal_replay: Optional[Tuple[Any, List[Dict]]] = None
+        self._persisted_positions: Dict[str, str] = {}  # symbol -> last journaled encoding
         self._pending_orders: Dict[str, Dict] = {}
         self._closing_positions: Set[str] = (
             set()
@@ -166,6 +180,12 @@ class MinimalTradingService:
         # Managers (Initialized with None client first)
         self.market_data_manager = None
         self.position_manager = None
+        self._ticker_book: Optional[TickerBook] = None
+        self._ticker_stream: Optional[TickerStreamService] = None
+        self._candle_store: Optional[CandleStore] = None
+        self._order_books: Optional[OrderBookManager] = None
+        self._user_stream: Optional[UserDataStream] = None
+        self._regime_interval = "1h"  # Kline stream interval that feeds the regime engine
         self._risk_manager = None
         self._watchdog = SelfHealingWatchdog()
         self._performance_tracker = PerformanceTracker()
@@ -184,6 +204,9 @@ class MinimalTradingService:
         # Telegram
         self._telegram = None
 
+        # Dashboard: materialized once, refreshed from fills/positions/messages
+        self._dashboard = self._build_dashboard_view()
+
         # Legacy State (To be deprecated - kept minimal for compatibility)
         self._last_day_check = datetime.now().day
 
@@ -204,7 +227,9 @@ class MinimalTradingService:
             # We initialize them with None to avoid attribute errors,
             # they will be updated in start() with real clients.
             self.market_data_manager = MarketDataManager(None)
-            self.position_manager = PositionManager(None, self._agent_states)
+            self.position_manager = PositionManager(
+                None, self._agent_states, symbols=self.market_data_manager.symbols
+            )
 
             # Partial Exit Strategy for multi-target profit taking
             self.partial_exit_strategy = PartialExitStrategy()
@@ -230,8 +255,25 @@ class MinimalTradingService:
     def _load_persistent_data(self):
         """Load trades and positions from disk."""
         logger.debug("Loading persistent data...")
+        try:
+            self._state_journal = AppendOnlyJournal(self._settings.state_journal_path)
+            state, records = self._state_journal.replay()
+            if state is not None or records:
+                self._journal_replay = (state, records)
+        except Exception as e:
+            print(f"⚠️ Failed to open state journal: {e}")
+            self._state_journal = None
+
         self._load_trades()
         self._load_positions()
+        self._persisted_positions = {
+            symbol: self._encode_position(pos) for symbol, pos in self._open_positions.items()
+        }
+
+        if self._state_journal and self._journal_replay is None:
+            # First run on the journal: fold in whatever the legacy JSON files held
+            self._compact_state_journal()
+        self._journal_replay = None
 
     @property
     def _market_structure(self) -> Dict[str, Dict[str, Any]]:
@@ -371,7 +413,13 @@ class MinimalTradingService:
 
         # Init Clients
         credentials = await loop.run_in_executor(None, self._credential_manager.get_credentials)
-        self._exchange = AsterClient(credentials=credentials)
+        self._exchange = AsterClient(
+            credentials=credentials,
+            get_cache_ttl=self._settings.aster_get_cache_ttl_seconds,
+            rate_limiter=WeightedRateLimiter(
+                weight_per_minute=self._settings.aster_request_weight_per_minute
+            ),
+        )
         from .exchange import AsterSpotClient
 
         self._spot_exchange = AsterSpotClient(credentials=credentials)
@@ -380,6 +428,35 @@ class MinimalTradingService:
         self.market_data_manager.exchange_client = self._exchange_client
         self.position_manager.exchange_client = self._exchange_client
 
+        # Live ticker book (websocket-fed, bulk REST fallback when stale)
+        self._ticker_book = TickerBook(
+            self._exchange_client, stale_after_seconds=self._settings.ticker_stale_seconds
+        )
+        self.position_manager.ticker_book = self._ticker_book
+        self._ticker_book.add_update_listener(self._on_ticker_update)
+        self._candle_store = CandleStore(self._exchange_client)
+        self._candle_store.add_bar_close_listener(self._on_bar_close)
+        if self._settings.enable_ticker_stream:
+            if self._settings.enable_depth_stream:
+                self._order_books = OrderBookManager(self._exchange_client)
+            self._ticker_stream = TickerStreamService(
+                self._ticker_book,
+                ws_base_url=self._settings.ws_base_url,
+                candle_store=self._candle_store,
+                kline_interval=self._regime_interval,
+                order_books=self._order_books,
+            )
+
+        # Orders, balances and positions pushed over the listenKey stream (live only)
+        if self._settings.enable_user_data_stream and not self._settings.enable_paper_trading:
+            self._user_stream = UserDataStream(
+                self._exchange_client,
+                ws_base_url=self._settings.ws_base_url,
+                reconcile_seconds=self._settings.user_stream_reconcile_seconds,
+            )
+            self._user_stream.state.add_listener(self._on_user_data_event)
+            self._user_stream.start()
+
         # Init Risk Manager
         self._risk_manager = RiskManager(self._settings)
 
@@ -392,15 +469,20 @@ class MinimalTradingService:
 
         # Core Data
         logger.debug("Fetching market structure...")
-        await self._fetch_market_structure()
+        await self._fetch_market_structure()  # Also picks the kline/depth stream symbols
+        if self._ticker_stream:
+            self._ticker_stream.start()
 
         # AI Components
         logger.debug("Initializing AI components...")
-        self._feature_pipeline = FeaturePipeline(self._exchange_client)
+        self._feature_pipeline = FeaturePipeline(
+            self._exchange_client, self._candle_store, order_books=self._order_books
+        )
         self._analysis_engine = AnalysisEngine(
             self._exchange_client,
             self._feature_pipeline,
             self._swarm_manager,
+            ticker_book=self._ticker_book,
         )
         await self._initialize_basic_agents()
 
@@ -417,10 +499,57 @@ class MinimalTradingService:
     async def _fetch_market_structure(self):
         """Fetch all available symbols and their precision/filters from exchange."""
         await self.market_data_manager.fetch_structure()
+        await self._sync_stream_symbols()
+
+    async def _stream_symbols(self) -> List[str]:
+        """Most traded symbols of the market structure that fit on the stream connection."""
+        registry = self.market_data_manager.symbols
+        symbols = [
+            symbol
+            for symbol in self._market_structure
+            if registry.get(symbol) is None or registry.get(symbol).is_trading
+        ] or list(SYMBOL_CONFIG.keys())
+        tickers = await self._ticker_book.get_ticker_map(symbols) if self._ticker_book else {}
+        symbols.sort(
+            key=lambda s: float(tickers.get(s, {}).get("quoteVolume") or 0.0), reverse=True
+        )
+        limit = min(self._settings.stream_symbols_max, self._ticker_stream.symbol_capacity)
+        return sorted(symbols[:limit])
+
+    async def _sync_stream_symbols(self) -> None:
+        """Point the kline/depth streams at the current universe; resubscribes on change."""
+        if self._ticker_stream is None:
+            return
+        symbols = await self._stream_symbols()
+        added = set(symbols) - set(self._ticker_stream.kline_symbols)
+        # Seed from REST first: an earlier stream bar would make the history look out of
+        # order, and the seeded bar closes warm the regime engine
+        seeding = asyncio.Semaphore(self._settings.stream_seed_concurrency)
+
+        async def seed(symbol: str) -> None:
+            async with seeding:
+                await self._candle_store.get_series(symbol, self._regime_interval)
+
+        await asyncio.gather(*(seed(s) for s in sorted(added)))
+        # Shielded: a deadline cancel must not leave the new symbols set on the old connection
+        changed = await asyncio.shield(
+            self._ticker_stream.set_symbols(kline_symbols=symbols, depth_symbols=symbols)
+        )
+        if changed:
+            logger.info(f"Streams now cover {len(symbols)} symbols ({len(added)} new)")
 
     def _load_trades(self):
-        """Load recent trades from JSON file."""
+        """Load recent trades by replaying the state journal (legacy JSON as fallback)."""
         try:
+            if self._journal_replay is not None:
+                state, records = self._journal_replay
+                self._recent_trades = deque((state or {}).get("trades", []), maxlen=200)
+                for record in records:
+                    if record.get("t") == "trade":
+                        self._recent_trades.appendleft(record["trade"])
+                print(f"✅ Loaded {len(self._recent_trades)} historical trades")
+                return
+
             file_path = os.path.join("/tmp", "logs", "trades.json")
             if os.path.exists(file_path):
                 with open(file_path, "r") as f:
@@ -435,54 +564,99 @@ class MinimalTradingService:
         try:
             # Add to in-memory deque
             self._recent_trades.appendleft(trade_data)
+            self._dashboard.invalidate("trades", "agents")
 
-            # Persist to disk
-            os.makedirs("/tmp/logs", exist_ok=True)
-            file_path = os.path.join("/tmp", "logs", "trades.json")
-            with open(file_path, "w") as f:
-                json.dump(list(self._recent_trades), f, default=str)
+            # Persist only the new trade; replay rebuilds the deque
+            self._journal_append({"t": "trade", "trade": trade_data})
         except Exception as e:
             print(f"⚠️ Failed to save trade history: {e}")
 
     def _load_positions(self):
-        """Load open positions from JSON file."""
+        """Load open positions by replaying the state journal (legacy JSON as fallback)."""
         try:
+            if self._journal_replay is not None:
+                state, records = self._journal_replay
+                positions_data = dict((state or {}).get("positions", {}))
+                for record in records:
+                    if record.get("t") == "pos":
+                        positions_data[record["symbol"]] = record["position"]
+                    elif record.get("t") == "pos_del":
+                        positions_data.pop(record["symbol"], None)
+                # Agent objects are relinked from "agent_id" once agents are initialized
+                self._open_positions = positions_data
+                print(f"✅ Loaded {len(self._open_positions)} open positions")
+                return
+
             file_path = os.path.join("/tmp", "positions.json")
             if os.path.exists(file_path):
                 with open(file_path, "r") as f:
                     positions_data = json.load(f)
-                    # Reconstruct agent references from IDs
-                    for symbol, pos in positions_data.items():
-                        agent_id = pos.get("agent_id")
-                        # Need to find the agent object. We can do this after agent init or assume agent_states is populated
-                        # Since this runs in __init__ but _initialize_basic_agents runs in start(), we have a timing issue.
-                        # We will just store the data and link agents later or store enough data to not need the object immediately.
-                        pass
-
                     self._open_positions = positions_data
                 print(f"✅ Loaded {len(self._open_positions)} open positions")
         except Exception as e:
             print(f"⚠️ Failed to load open positions: {e}")
 
+    @staticmethod
+    def _serializable_position(pos: Dict[str, Any]) -> Dict[str, Any]:
+        serializable_pos = pos.copy()
+        if "agent" in serializable_pos:
+            serializable_pos["agent_id"] = serializable_pos["agent"].id
+            del serializable_pos["agent"]  # Remove object
+        return serializable_pos
+
+    def _encode_position(self, pos: Dict[str, Any]) -> str:
+        return json.dumps(self._serializable_position(pos), default=str, sort_keys=True)
+
     def _save_positions(self):
-        """Save open positions to JSON file."""
+        """Journal the positions that changed since the last save."""
         try:
-            file_path = os.path.join("/tmp", "positions.json")
-
-            # Create a serializable version of positions (remove agent objects)
-            serializable_positions = {}
-            for symbol, pos in self._open_positions.items():
-                serializable_pos = pos.copy()
-                if "agent" in serializable_pos:
-                    serializable_pos["agent_id"] = serializable_pos["agent"].id
-                    del serializable_pos["agent"]  # Remove object
-                serializable_positions[symbol] = serializable_pos
-
-            with open(file_path, "w") as f:
-                json.dump(serializable_positions, f, default=str)
+            current = {
+                symbol: self._encode_position(pos) for symbol, pos in self._open_positions.items()
+            }
+            for symbol, encoded in current.items():
+                if self._persisted_positions.get(symbol) != encoded:
+                    self._journal_append(
+                        {"t": "pos", "symbol": symbol, "position": json.loads(encoded)},
+                        compact=False,
+                    )
+            for symbol in self._persisted_positions.keys() - current.keys():
+                self._journal_append({"t": "pos_del", "symbol": symbol}, compact=False)
+            # Snapshot only once the whole save is journaled and reflected in the snapshot
+            # source, or records appended earlier in this loop would be truncated away
+            self._persisted_positions = current
+            self._maybe_compact_state_journal()
+            self._dashboard.invalidate("positions")
         except Exception as e:
             print(f"⚠️ Failed to save open positions: {e}")
 
+    def _journal_append(self, record: Dict[str, Any], compact: bool = True) -> None:
+        if self._state_journal is None:
+            return
+        self._state_journal.append(record)
+        if compact:
+            self._maybe_compact_state_journal()
+
+    def _maybe_compact_state_journal(self) -> None:
+        if self._state_journal is not None and self._state_journal.needs_compaction:
+            self._compact_state_journal()
+
+    def _compact_state_journal(self) -> None:
+        """Snapshot trades + positions so replay stays bounded."""
+        if self._state_journal is None:
+            return
+        try:
+            self._state_journal.write_snapshot(
+                {
+                    "trades": list(self._recent_trades),
+                    "positions": {
+                        symbol: json.loads(encoded)
+                        for symbol, encoded in self._persisted_positions.items()
+                    },
+                }
+            )
+        except Exception as e:
+            print(f"⚠️ Failed to compact state journal: {e}")
+
     async def _initialize_basic_agents(self):
         """Initialize advanced AI agents from AGENT_DEFINITIONS."""
         # Try to get real exchange balance
@@ -700,9 +874,9 @@ class MinimalTradingService:
 
             try:
                 # Check order status
-                order_status = await self._exchange_client.get_order(
-                    symbol=symbol, order_id=order_id
-                )
+                order_status = await self._get_order_status(symbol, order_id)
+                if order_status is None:
+                    continue  # Not reported by the user stream yet
 
                 status = order_status.get("status")
                 executed_qty = float(order_status.get("executedQty", 0))
@@ -910,10 +1084,12 @@ class MinimalTradingService:
 
                     # Remove from pending
                     del self._pending_orders[order_id]
+                    self._closing_positions.discard(symbol)
 
                 elif status in ["CANCELED", "EXPIRED", "REJECTED"]:
                     print(f"❌ Pending order {status}: {order_id}")
                     del self._pending_orders[order_id]
+                    self._closing_positions.discard(symbol)
 
             except Exception as e:
                 print(f"⚠️ Error checking pending order {order_id}: {e}")
@@ -1038,6 +1214,8 @@ class MinimalTradingService:
             # Future improvement: Filter universe for high volatility or volume here
 
         # Check if we have an open position to manage (PRIORITY)
+        if symbol in self._closing_positions:
+            return  # The protect stage is already closing it
         if symbol in self._open_positions:
             # Manage existing position (Close it)
             pos = self._open_positions[symbol]
@@ -1059,14 +1237,8 @@ class MinimalTradingService:
                     if should_close_hard:
                         print(f"💰 Profit/Stop Triggered for {symbol}: {hard_reason}")
                         # Execute immediately
-                        trade_side = "SELL" if pos["side"] == "BUY" else "BUY"
-                        await self._execute_trade_order(
-                            agent,
-                            symbol,
-                            trade_side,
-                            quantity_float,
-                            is_closing=True,
-                            reason=hard_reason,
+                        await self._close_position(
+                            agent, symbol, pos["side"], quantity_float, hard_reason
                         )
                         return  # Exit loop for this tick
             except Exception as e:
@@ -1205,9 +1377,7 @@ class MinimalTradingService:
                 )
 
                 # Execute Close
-                await self._execute_trade_order(
-                    agent, symbol, side, quantity_float, thesis, is_closing=True
-                )
+                await self._close_position(agent, symbol, pos["side"], quantity_float, thesis)
 
             return  # Done for this tick (whether closed or held)
 
@@ -1485,7 +1655,9 @@ class MinimalTradingService:
                     target_notional = max_allowed_notional
 
                 # 2. Get Market Context
-                ticker = await self._exchange_client.get_ticker(symbol)
+                ticker = self._ticker_book.get(symbol) if self._ticker_book else None
+                if ticker is None or self._ticker_book.is_stale:
+                    ticker = await self._exchange_client.get_ticker(symbol)
                 current_price = float(ticker.get("lastPrice", 0))
                 if current_price <= 0:
                     continue
@@ -1551,6 +1723,28 @@ class MinimalTradingService:
         except Exception as e:
             print(f"⚠️ Failed to update account info: {e}")
 
+    async def _close_position(self, agent, symbol, side, quantity_float, thesis) -> bool:
+        """
+        Close (part of) ``symbol`` unless another stage is already closing it.
+
+        The protect, trading_cycle and liquidation stages run concurrently and
+        all close positions. The symbol is marked in ``_closing_positions`` before the
+        first await, so only one of them sends the (non reduce-only) market
+        order; the mark is kept while the close is pending a fill. Returns
+        False when the close was skipped.
+        """
+        if symbol in self._closing_positions or symbol not in self._open_positions:
+            return False
+        self._closing_positions.add(symbol)
+        try:
+            await self._execute_trade_order(
+                agent, symbol, side, quantity_float, thesis, is_closing=True
+            )
+        finally:
+            if not any(o["symbol"] == symbol for o in self._pending_orders.values()):
+                self._closing_positions.discard(symbol)
+        return True
+
     async def _execute_trade_order(
         self, agent, symbol, side, quantity_float, thesis, is_closing=False
     ):
@@ -1618,9 +1812,9 @@ class MinimalTradingService:
             final_quantity_float = float(quantity_float) * quantity_fuzz
 
             # Format quantity with precision using central PositionManager logic
-            formatted_quantity = await self.position_manager._round_quantity(
-                symbol, final_quantity_float
-            )
+            if not await self.position_manager.ensure_symbol(symbol):
+                raise ValueError(f"No exchange filters loaded for {symbol}")
+            formatted_quantity = self.position_manager.round_quantity(symbol, final_quantity_float)
 
             print(
                 f"🚀 ATTEMPTING TRADE: {agent.emoji} {agent.name} - {trade_side} {formatted_quantity} {symbol}{'(CLOSING)' if is_closing else ''}"
@@ -1630,7 +1824,7 @@ class MinimalTradingService:
             if not is_closing:
                 print(f"🔍 DEBUG: Performing risk cushion check...")
                 try:
-                    account_info = await self._exchange_client.get_account_info()
+                    account_info = await self._get_account_info()
                     # Assuming 'totalWalletBalance' or similar exists in Aster API response
                     # If not, we might need to sum assets.
                     # For now, let's try to find a "USDT" or "USDC" balance to check against.
@@ -1688,9 +1882,7 @@ class MinimalTradingService:
                             print(f"✅ Leverage adjusted to 1x for {symbol}")
 
                             # Retry Order with properly rounded quantity
-                            retry_qty = await self.position_manager._round_quantity(
-                                symbol, quantity_float
-                            )
+                            retry_qty = self.position_manager.round_quantity(symbol, quantity_float)
                             order_result = await self._exchange_client.place_order(
                                 symbol=symbol,
                                 side=trade_side,
@@ -1831,9 +2023,9 @@ class MinimalTradingService:
                         # Native Order Placement
                         try:
                             # Centralized rounding for TP/SL to avoid -1111 errors
-                            rounded_tp = await self.position_manager._round_price(symbol, tp_price)
-                            rounded_sl = await self.position_manager._round_price(symbol, sl_price)
-                            rounded_qty = await self.position_manager._round_quantity(
+                            rounded_tp = self.position_manager.round_price(symbol, tp_price)
+                            rounded_sl = self.position_manager.round_price(symbol, sl_price)
+                            rounded_qty = self.position_manager.round_quantity(
                                 symbol, float(formatted_quantity)
                             )
 
@@ -1866,6 +2058,7 @@ class MinimalTradingService:
                             )
                         except Exception as e:
                             logger.warning(f"⚠️ Failed to place Native TP/SL orders: {e}")
+                            self.market_data_manager.symbols.report_order_error(symbol, e)
 
                         # Track Position Internally
                         self._open_positions[symbol] = {
@@ -1996,6 +2189,8 @@ class MinimalTradingService:
 
         except Exception as e:
             print(f"❌ EXECUTION ERROR: {e}")
+            # Precision / filter rejections mean our cached exchange filters are stale
+            self.market_data_manager.symbols.report_order_error(symbol, e)
             # Log but don't stop the service
 
     async def _send_trade_notification(
@@ -2112,6 +2307,7 @@ SOURCE: *Source:* Sapphire Duality System"""
 
     async def _update_performance_metrics(self):
         """Update agent performance metrics and check circuit breakers."""
+        self._dashboard.invalidate("agents")
         # Enhanced performance scoring based on activity and win rate
         for agent in self._agent_states.values():
             if agent.last_active:
@@ -2256,7 +2452,9 @@ SOURCE: *Source:* Sapphire Duality System"""
 
         # Snapshot keys
         for symbol in list(self._open_positions.keys()):
-            pos = self._open_positions[symbol]
+            pos = self._open_positions.get(symbol)
+            if pos is None:
+                continue  # Closed by another stage since the snapshot
             agent_id = pos.get("agent_id")
             agent = self._agent_states.get(agent_id)
 
@@ -2322,14 +2520,10 @@ SOURCE: *Source:* Sapphire Duality System"""
                         )
 
                         # Execute partial exit
-                        await self._execute_trade_order(
-                            agent,
-                            symbol,
-                            side,
-                            partial_qty,
-                            f"Partial Exit: {exit_signal.reason}",
-                            is_closing=True,
-                        )
+                        if not await self._close_position(
+                            agent, symbol, side, partial_qty, f"Partial Exit: {exit_signal.reason}"
+                        ):
+                            break
 
                         # Telegram notification for partial exit
                         try:
@@ -2354,22 +2548,14 @@ SOURCE: *Source:* Sapphire Duality System"""
             # Tight stops (1.2x ATR) to minimize losses, wider TP for asymmetric R:R
             # ═══════════════════════════════════════════════════════════════
 
-            # Get ATR for dynamic thresholds
+            # Get ATR for dynamic thresholds: the candle store's streaming Wilder ATR14,
+            # kline-stream fed and only topped up over REST once a minute when unstreamed
             atr = None
             try:
-                klines = await self._exchange_client.get_klines(symbol, interval="1h", limit=20)
-                if klines and len(klines) >= 14:
-                    highs = [float(k[2]) for k in klines]
-                    lows = [float(k[3]) for k in klines]
-                    closes = [float(k[4]) for k in klines]
-
-                    # Use TAIndicators if available, otherwise fallback
-                    if TA_AVAILABLE and TAIndicators:
-                        atr = TAIndicators.calculate_atr(highs, lows, closes, period=14)
-                    else:
-                        # Fallback: Simple ATR calculation (average of H-L)
-                        true_ranges = [highs[i] - lows[i] for i in range(len(highs))]
-                        atr = sum(true_ranges[-14:]) / 14 if len(true_ranges) >= 14 else None
+                if self._candle_store is not None:
+                    candles = await self._candle_store.get_snapshot(symbol, "1h")
+                    if candles.get("bars", 0) >= 14:
+                        atr = candles["atr"]
             except Exception as atr_err:
                 print(f"⚠️ ATR calculation failed for {symbol}: {atr_err}")
                 atr = None
@@ -2457,13 +2643,9 @@ SOURCE: *Source:* Sapphire Duality System"""
                 # Note: side passed to _execute_trade_order is the CURRENT position side.
                 # is_closing=True tells it to close.
 
-                # Mark as closing IMMEDIATELY to prevent duplicate notifications
-                self._closing_positions.add(symbol)
-
                 try:
-                    await self._execute_trade_order(
-                        agent, symbol, side, abs_quantity, thesis, is_closing=True
-                    )
+                    if not await self._close_position(agent, symbol, side, abs_quantity, thesis):
+                        continue  # Already being closed by the trading cycle
 
                     # Only send Telegram notification AFTER successful execution
                     try:
@@ -2519,7 +2701,7 @@ SOURCE: *Source:* Sapphire Duality System"""
                 except Exception as close_err:
                     print(f"⚠️ Failed to close {symbol}: {close_err}")
 
-    async def _execute_trading_cycle(self):
+    async def _execute_trading_cycle(self, ticker_map: Dict[str, Any] = None):
         """
         Orchestrate the full trading cycle:
         1. Manage existing positions via _execute_agent_trading
@@ -2530,7 +2712,7 @@ SOURCE: *Source:* Sapphire Duality System"""
         This method is called by the main trading loop.
         """
         # 1. Manage existing positions (TP/SL, closes, adds)
-        await self._execute_agent_trading()
+        await self._execute_agent_trading(ticker_map)
 
         # 2. Execute new trades using consensus engine
         # This calls the full consensus-based logic defined earlier
@@ -2560,8 +2742,11 @@ SOURCE: *Source:* Sapphire Duality System"""
             # Get current prices
             ticker_map = {}
             try:
-                tickers = await self._exchange_client.get_all_tickers()
-                ticker_map = {t["symbol"]: t for t in tickers}
+                if self._ticker_book is not None:
+                    ticker_map = await self._ticker_book.get_ticker_map()
+                else:
+                    tickers = await self._exchange_client.get_all_tickers()
+                    ticker_map = {t["symbol"]: t for t in tickers}
             except Exception as e:
                 logger.error(f"⚠️ Failed to fetch tickers for re-entry check: {e}")
                 return
@@ -2752,6 +2937,13 @@ SOURCE: *Source:* Sapphire Duality System"""
             import time
 
             current_time = time.time()
+            if self._user_stream is not None and self._user_stream.healthy:
+                wallet = self._user_stream.state.wallet_balance("USDT")
+                if wallet is not None:
+                    self._account_balance = wallet
+                    self._last_balance_fetch = current_time
+                    return
+
             if self._account_balance > 0 and (current_time - self._last_balance_fetch) < 60:
                 return  # Use cached value
 
@@ -2843,62 +3035,161 @@ SOURCE: *Source:* Sapphire Duality System"""
                 )
 
     async def _run_trading_loop(self):
-        """Main trading loop with performance monitoring."""
-        print("🔄 Starting simplified trading loop...")
-
-        consecutive_errors = 0
-        max_consecutive_errors = 5
-        last_position_sync = 0
-
-        while not self._stop_event.is_set():
-            try:
-                start_time = time.time()
-
-                # Update agent activity timestamps
-                await self._update_agent_activity()
-
-                # Check pending orders
-                await self._check_pending_orders()
-
-                # Portfolio Guard (TP/SL)
-                # await self._manage_positions()
-
-                # Monitor open positions (TP/SL) and get cached tickers
-                ticker_map = await self._monitor_positions()
+        """Run every trading-loop stage as its own scheduled task until stopped."""
+        print("🔄 Starting staged trading loop...")
+        self._scheduler = self._build_stage_scheduler()
+        await self._scheduler.run()
 
-                # Periodic Position Sync (Every 60s)
-                # Reconcile internal state with exchange reality to catch external closures/liquidations
-                if time.time() - last_position_sync > 60:
-                    await self._sync_exchange_positions()
-
-                # 1. Update Market Data
-                await self._fetch_market_structure()
-
-                # 2. Sync Positions (Periodic)
-                if time.time() - last_position_sync > 60:
-                    await self._sync_positions_from_exchange()
-                    last_position_sync = time.time()
-
-                # 3. LIQUIDATION PREVENTION MONITOR
-                await self._check_liquidation_risk()
+    def _build_stage_scheduler(self) -> StageScheduler:
+        """
+        Stage cadences:
+        - orders: pending order checks + agent heartbeat every 5s
+        - protect: TP/SL monitoring, woken by price updates on held symbols
+        - liquidation: margin ratio guard every 5s
+        - position_sync: exchange reconciliation every 60s
+        - market_structure: exchangeInfo refresh hourly
+        - trading_cycle: agent entries/adds/re-entries
+        """
+        settings = self._settings
+        scheduler = StageScheduler(self._stop_event)
+        self.market_data_manager.symbols.add_refresh_listener(
+            lambda: scheduler.trigger("market_structure")
+        )
+        scheduler.add(Stage("orders", self._stage_orders, 5.0, deadline_seconds=15.0))
+        scheduler.add(
+            Stage(
+                "protect",
+                self._stage_protect,
+                5.0,
+                deadline_seconds=10.0,
+                min_interval_seconds=1.0,
+            )
+        )
+        scheduler.add(
+            Stage("liquidation", self._check_liquidation_risk, 5.0, deadline_seconds=15.0)
+        )
+        scheduler.add(
+            Stage(
+                "position_sync",
+                self._stage_position_sync,
+                settings.position_sync_interval_seconds,
+                deadline_seconds=30.0,
+            )
+        )
+        scheduler.add(
+            Stage(
+                "market_structure",
+                self._fetch_market_structure,
+                settings.market_structure_refresh_seconds,
+                deadline_seconds=60.0,
+                # Safe to abort: the previous structure stays valid, unseeded symbols are
+                # retried on the next run and the stream resubscribe is shielded
+                cancel_on_deadline=True,
+                run_on_start=False,  # Already fetched by _init_online_components
+            )
+        )
+        scheduler.add(
+            Stage(
+                "trading_cycle",
+                self._stage_trading_cycle,
+                settings.trading_cycle_interval_seconds,
+                deadline_seconds=120.0,
+            )
+        )
+        return scheduler
 
-                # 4. Manage Open Positions (TP/SL)
-                await self._manage_positions()
+    def _on_bar_close(self, symbol: str, interval: str, row) -> None:
+        """Candle store listener: queue closed stream bars for the multi-symbol regime engine."""
+        if interval == self._regime_interval:
+            # row = (open_time, open, high, low, close, volume)
+            get_regime_engine().queue_bar(symbol, row[4], row[2], row[3], row[5])
 
-                # 5. Execute Trading Cycle (Position Management + New Entries)
-                await self._execute_trading_cycle()
+    def _on_ticker_update(self, symbols) -> None:
+        """Ticker book listener: wake TP/SL protection when a held symbol moves."""
+        if symbols.isdisjoint(self._open_positions):
+            return
+        self._dashboard.invalidate("positions")
+        if self._scheduler is not None:
+            self._scheduler.trigger("protect")
+
+    def _on_user_data_event(self, event_type: str, payload: Dict[str, Any]) -> None:
+        """User stream listener: process fills of pending orders without waiting a cycle."""
+        if (
+            event_type == "ORDER_TRADE_UPDATE"
+            and self._scheduler is not None
+            and payload.get("orderId") in self._pending_orders
+        ):
+            self._scheduler.trigger("orders")
+
+    async def _get_order_status(self, symbol: str, order_id: str) -> Optional[Dict[str, Any]]:
+        if self._user_stream is not None:
+            return await self._user_stream.get_order(symbol, order_id)
+        return await self._exchange_client.get_order(symbol=symbol, order_id=order_id)
+
+    async def _get_account_info(self) -> Dict[str, Any]:
+        if self._user_stream is not None:
+            return await self._user_stream.get_account_info()
+        return await self._exchange_client.get_account_info()
+
+    async def _stage_orders(self):
+        await self._update_agent_activity()
+        await self._check_pending_orders()
+
+    async def _stage_protect(self):
+        # Monitor open positions (trailing stops) and apply TP/SL on fresh prices
+        ticker_map = await self._monitor_positions()
+        self._latest_ticker_map = ticker_map
+        await self._manage_positions(ticker_map)
+
+    async def _stage_position_sync(self):
+        # Reconcile internal state with exchange reality to catch external closures/liquidations
+        await self._sync_exchange_positions()
+        await self._sync_positions_from_exchange()
+
+    async def _stage_trading_cycle(self):
+        ticker_map = await self.position_manager.get_ticker_map() or self._latest_ticker_map
+        self._prefetch_ai_analysis(ticker_map)
+        await self._execute_trading_cycle(ticker_map)
+
+    def _prefetch_ai_analysis(self, ticker_map: Dict[str, Any]) -> None:
+        """Warm the AI analysis of the most traded symbols in the background."""
+        limit = self._settings.llm_prefetch_max_inflight
+        if not self._settings.enable_vertex_ai or limit <= 0 or not ticker_map:
+            return
+        if self._prefetch_task is not None and not self._prefetch_task.done():
+            return  # Still warming the previous cycle's symbols
+
+        symbols = [s for s in ticker_map if s in self._market_structure]
+        symbols.sort(key=lambda s: float(ticker_map[s].get("quoteVolume") or 0), reverse=True)
+        ranked = [
+            (
+                symbol,
+                MarketSnapshot(
+                    price=float(ticker_map[symbol].get("lastPrice") or 0),
+                    volume=float(ticker_map[symbol].get("volume") or 0),
+                    change_24h=float(ticker_map[symbol].get("priceChangePercent") or 0),
+                ),
+            )
+            for symbol in symbols[:limit]
+        ]
+        if not ranked:
+            return
+        if self._strategy_selector is None:
+            self._strategy_selector = StrategySelector(enable_rl=False)
+        self._prefetch_task = asyncio.ensure_future(self._run_prefetch(ranked, limit))
 
-                consecutive_errors = 0
-                await asyncio.sleep(5)  # 5s loop
+    async def _run_prefetch(self, ranked: List[Tuple[str, MarketSnapshot]], limit: int) -> None:
+        try:
+            started = await self._strategy_selector.prefetch_ai_analysis(ranked, limit=limit)
+            logger.debug(f"AI analysis prefetch started for {started}/{len(ranked)} symbols")
+        except Exception as e:
+            logger.warning(f"AI analysis prefetch failed: {e}")
 
-            except Exception as e:
-                consecutive_errors += 1
-                print(f"⚠️ Error in trading loop: {e}")
-                if consecutive_errors >= max_consecutive_errors:
-                    print("❌ Too many consecutive errors. Restarting loop...")
-                    await asyncio.sleep(30)
-                    consecutive_errors = 0
-                await asyncio.sleep(5)
+    def get_stage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage run counts, overruns and latencies of the trading loop."""
+        if self._scheduler is None:
+            return {}
+        return self._scheduler.get_stats()
 
     async def _check_liquidation_risk(self):
         """Monitor account health and prevent liquidation."""
@@ -2907,7 +3198,7 @@ SOURCE: *Source:* Sapphire Duality System"""
             if self._settings.enable_paper_trading:
                 return
 
-            account_info = await self._exchange_client.get_account_info()
+            account_info = await self._get_account_info()
 
             # Aster Futures Account Info Structure (Hypothetical)
             # { "totalMarginBalance": "...", "totalMaintMargin": "...", ... }
@@ -2949,9 +3240,10 @@ SOURCE: *Source:* Sapphire Duality System"""
                 )
 
                 # Emergency Reduce: Close largest positions first
-                # Sort positions by notional value (approx quantity * entry_price)
+                # Sort positions by notional value (approx quantity * entry_price); sort a
+                # snapshot, position_sync may replace entries while the closes await
                 sorted_positions = sorted(
-                    self._open_positions.values(),
+                    list(self._open_positions.values()),
                     key=lambda p: p["quantity"] * p["entry_price"],
                     reverse=True,
                 )
@@ -2971,13 +3263,13 @@ SOURCE: *Source:* Sapphire Duality System"""
                             symbols=[symbol],
                         )
 
-                    await self._execute_trade_order(
+                    # Through the guard: protect / trading_cycle may be closing it already
+                    await self._close_position(
                         agent,
                         symbol,
                         pos["side"],  # Pass current side
                         pos["quantity"],
                         "Emergency Margin Reduction",
-                        is_closing=True,
                     )
 
         except Exception as e:
@@ -3048,6 +3340,12 @@ SOURCE: *Source:* Sapphire Duality System"""
         print("🛑 Stopping trading service...")
         self._stop_event.set()
 
+        if self._ticker_stream:
+            await self._ticker_stream.stop()
+
+        if self._user_stream:
+            await self._user_stream.stop()
+
         if self._task:
             self._task.cancel()
             try:
@@ -3070,7 +3368,9 @@ SOURCE: *Source:* Sapphire Duality System"""
                 print(f"   Closing {symbol} ({side} {qty})...")
 
                 # Round quantity for shutdown closure
-                rounded_qty = await self.position_manager._round_quantity(symbol, abs(qty))
+                if not await self.position_manager.ensure_symbol(symbol):
+                    raise ValueError(f"No exchange filters loaded for {symbol}")
+                rounded_qty = self.position_manager.round_quantity(symbol, abs(qty))
 
                 # Attempt to close via exchange client
                 await self._exchange_client.place_order(
@@ -3086,6 +3386,9 @@ SOURCE: *Source:* Sapphire Duality System"""
             except Exception as e:
                 print(f"   ❌ Failed to close {symbol}: {e}")
 
+        if self._state_journal:
+            self._state_journal.close()
+
         self._health.running = False
         print("✅ Trading service stopped and positions closed.")
 
@@ -3126,44 +3429,50 @@ SOURCE: *Source:* Sapphire Duality System"""
             "timestamp": datetime.now().isoformat(),
         }
 
-    async def dashboard_snapshot(self) -> Dict[str, Any]:
-        """Provide snapshot for dashboard."""
-        messages = []
-        frontend_messages = []
+    def _build_dashboard_view(self) -> DashboardView:
+        view = DashboardView(max_age=1.0)
+        view.register(
+            "messages",  # Backfill once; the MCP listener appends from then on
+            lambda: {"messages": [self._format_mcp_message(m) for m in self._mcp.messages]},
+            max_age=math.inf,
+        )
+        view.register("positions", self._dashboard_positions)  # Prices move: 1s max age
+        view.register("trades", self._dashboard_trades, max_age=math.inf)
+        view.register("agents", lambda: {"agents": self.get_agents()}, max_age=5.0)
+        view.register("summary", self._dashboard_summary, depends_on=("positions", "trades"))
+        self._mcp.listeners.append(
+            lambda msg: view.append("messages", self._format_mcp_message(msg), maxlen=100)
+        )
+        return view
+
+    @staticmethod
+    def _format_mcp_message(msg: Dict[str, Any]) -> Dict[str, Any]:
+        """Transform an MCP message for the frontend."""
+        # Determine Agent ID
+        sender = msg.get("sender", "System")
+        agent_id = "system"
+        if sender not in ["System", "Grok CIO", "Execution Algo", "Risk Manager"]:
+            agent_id = sender.lower().replace(" ", "-")
+
+        # Format Timestamp
+        ts = msg.get("timestamp")
         try:
-            messages = list(self._mcp.messages)
-
-            # Transform for frontend
-            for msg in messages:
-                # Determine Agent ID
-                sender = msg.get("sender", "System")
-                agent_id = "system"
-                if sender not in ["System", "Grok CIO", "Execution Algo", "Risk Manager"]:
-                    agent_id = sender.lower().replace(" ", "-")
-
-                # Format Timestamp
-                ts = msg.get("timestamp")
-                try:
-                    iso_time = datetime.fromtimestamp(float(ts)).isoformat()
-                except:
-                    iso_time = datetime.now().isoformat()
-
-                frontend_messages.append(
-                    {
-                        "id": msg.get("id"),
-                        "agentId": agent_id,
-                        "agentName": sender,
-                        "role": msg.get("type", "info").upper(),
-                        "content": msg.get("content", ""),
-                        "timestamp": iso_time,
-                        "relatedSymbol": None,  # specific parsing if needed later
-                    }
-                )
+            iso_time = datetime.fromtimestamp(float(ts)).isoformat()
+        except (TypeError, ValueError):
+            iso_time = datetime.now().isoformat()
 
-        except Exception as e:
-            print(f"⚠️ Failed to get MCP messages: {e}")
+        return {
+            "id": msg.get("id"),
+            "agentId": agent_id,
+            "agentName": sender,
+            "role": msg.get("type", "info").upper(),
+            "content": msg.get("content", ""),
+            "timestamp": iso_time,
+            "relatedSymbol": None,  # specific parsing if needed later
+        }
 
-        # Merge Positions (Aster + Hyperliquid)
+    def _dashboard_positions(self) -> Dict[str, Any]:
+        """Merge Aster and Hyperliquid positions with their unrealized PnL."""
         all_positions = []
 
         # Aster Positions
@@ -3216,6 +3525,20 @@ SOURCE: *Source:* Sapphire Duality System"""
                 }
             )
 
+        return {
+            "open_positions": all_positions,
+            # Calculate unrealized PnL from all open positions
+            "unrealized_pnl": sum(p.get("pnl", 0.0) for p in all_positions),
+            "total_exposure": sum(
+                p.get("quantity", 0) * p.get("current_price", 0) for p in all_positions
+            ),
+        }
+
+    def _dashboard_trades(self) -> Dict[str, Any]:
+        return {"recentTrades": list(self._recent_trades)[:20]}
+
+    def _dashboard_summary(self) -> Dict[str, Any]:
+        """PnL totals and the per-system split, on top of the positions section."""
         # Prepare System Split Data
         aster_pnl = sum(t.get("pnl", 0.0) for t in self._recent_trades)
         aster_volume = sum(t.get("value", 0.0) for t in self._recent_trades)
@@ -3256,8 +3579,7 @@ SOURCE: *Source:* Sapphire Duality System"""
             },
         }
 
-        # Calculate unrealized PnL from all open positions
-        unrealized_pnl = sum(p.get("pnl", 0.0) for p in all_positions)
+        unrealized_pnl = self._dashboard.get("unrealized_pnl", 0.0)
 
         # Total PnL = Realized (from trades) + Unrealized (from open positions)
         total_pnl_combined = aster_pnl + hl_pnl + unrealized_pnl
@@ -3273,25 +3595,25 @@ SOURCE: *Source:* Sapphire Duality System"""
         return {
             "status": "active",
             "running": self._health.running,
-            "agents": self.get_agents(),
-            "open_positions": all_positions,
-            "recentTrades": list(self._recent_trades)[:20],
-            "messages": frontend_messages,
             "total_pnl": total_pnl_combined,
             "total_pnl_percent": total_pnl_percent,
             "realized_pnl": aster_pnl + hl_pnl,
-            "unrealized_pnl": unrealized_pnl,
             "portfolio_value": initial_basis + total_pnl_combined,  # Equity
             "portfolio_balance": initial_basis + aster_pnl + hl_pnl,  # Cash Balance
             "aster_pnl_percent": aster_pnl_percent,
             "hl_pnl_percent": hl_pnl_percent,
-            "total_exposure": sum(
-                p.get("quantity", 0) * p.get("current_price", 0) for p in all_positions
-            ),
             "systems": systems_data,
-            "timestamp": time.time(),
         }
 
+    def dashboard_view(self) -> DashboardView:
+        """The materialized dashboard, for conditional (ETag / JSON-patch) responses."""
+        return self._dashboard
+
+    async def dashboard_snapshot(self) -> Dict[str, Any]:
+        """Provide snapshot for dashboard."""
+        self._dashboard.refresh()
+        return self._dashboard.snapshot()
+
     def get_agents(self) -> List[Dict[str, Any]]:
         """Get agent information with performance metrics."""
         return [
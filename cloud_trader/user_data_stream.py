@@ -0,0 +1,397 @@
+"""
+listenKey user data stream: orders, balances and positions pushed by the exchange.
+
+``AccountState`` applies ``ORDER_TRADE_UPDATE`` and ``ACCOUNT_UPDATE`` events
+to in-memory order / balance / position tables and exposes them in the same
+shapes as the REST endpoints (``/fapi/v1/order``, ``/fapi/v4/account``), so
+call sites only swap where they read from.
+
+``UserDataStream`` owns the listenKey lifecycle (create, keepalive, reconnect
+on ``listenKeyExpired``) and falls back to REST only as a safety net: the
+account snapshot and every open order are reconciled on each (re)connect, the
+account is refreshed every ``reconcile_seconds``, and an order the stream has
+not reported (or has left open) for that long is fetched once over REST.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from .exchange import AsterWebSocketClient
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_ORDER_STATUSES = {"FILLED", "CANCELED", "EXPIRED", "REJECTED"}
+
+
+class AccountState:
+    """In-memory orders, balances and positions maintained from user data events."""
+
+    def __init__(self, max_orders: int = 1000):
+        self.max_orders = max_orders
+        self.orders: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.balances: Dict[str, Dict[str, float]] = {}
+        self.positions: Dict[str, Dict[str, Any]] = {}
+        self._account: Optional[Dict[str, Any]] = None
+        self.account_updated_at: float = 0.0
+        self.last_event_time: int = 0
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        """``listener(event_type, payload)`` runs inline after each applied event."""
+        self._listeners.append(listener)
+
+    # --- Stream events ------------------------------------------------------------
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        event_type = event.get("e")
+        if event_type == "ORDER_TRADE_UPDATE":
+            payload = self._apply_order_update(event)
+        elif event_type == "ACCOUNT_UPDATE":
+            payload = self._apply_account_update(event)
+        else:
+            return
+        self.last_event_time = max(self.last_event_time, int(event.get("E", 0)))
+        if payload is None:
+            return
+        for listener in self._listeners:
+            try:
+                listener(event_type, payload)
+            except Exception as e:
+                logger.warning(f"User data listener failed: {e}")
+
+    def _apply_order_update(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        o = event.get("o", {})
+        order_id = str(o.get("i"))
+        update_time = int(o.get("T") or event.get("T") or event.get("E", 0))
+        current = self.orders.get(order_id)
+        if current is not None and update_time < current["updateTime"]:
+            return None  # Out-of-order delivery; keep the newer state
+
+        order = {
+            "orderId": order_id,
+            "symbol": o.get("s"),
+            "clientOrderId": o.get("c"),
+            "side": o.get("S"),
+            "type": o.get("o"),
+            "status": o.get("X"),
+            "origQty": o.get("q"),
+            "price": o.get("p"),
+            "executedQty": o.get("z", "0"),
+            "avgPrice": o.get("ap", "0"),
+            "reduceOnly": o.get("R", False),
+            "positionSide": o.get("ps"),
+            "realizedProfit": o.get("rp"),
+            "updateTime": update_time,
+        }
+        self._store_order(order)
+        return order
+
+    def _apply_account_update(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        data = event.get("a", {})
+        for b in data.get("B", []):
+            asset = b.get("a")
+            wallet = float(b.get("wb", 0))
+            previous = self.balances.get(asset, {}).get("walletBalance")
+            self.balances[asset] = {
+                "walletBalance": wallet,
+                "crossWalletBalance": float(b.get("cw", 0)),
+                "balanceChange": float(b.get("bc", 0)),
+            }
+            if asset == "USDT" and self._account is not None and previous is not None:
+                self._patch_account_wallet(wallet - previous)
+
+        for p in data.get("P", []):
+            key = f"{p.get('s')}:{p.get('ps', 'BOTH')}"
+            amount = float(p.get("pa", 0))
+            if amount == 0:
+                self.positions.pop(key, None)
+                continue
+            self.positions[key] = {
+                "symbol": p.get("s"),
+                "positionSide": p.get("ps", "BOTH"),
+                "positionAmt": amount,
+                "entryPrice": float(p.get("ep", 0)),
+                "unrealizedProfit": float(p.get("up", 0)),
+                "marginType": p.get("mt"),
+            }
+        return {
+            "reason": data.get("m"),
+            "balances": data.get("B", []),
+            "positions": data.get("P", []),
+        }
+
+    def _patch_account_wallet(self, delta: float) -> None:
+        # Wallet moves (fills, fees, funding) pass straight through to margin and
+        # available balance until the next REST reconciliation refines them
+        for field in ("totalWalletBalance", "totalMarginBalance", "availableBalance"):
+            if field in self._account:
+                self._account[field] = str(float(self._account[field]) + delta)
+
+    def _store_order(self, order: Dict[str, Any]) -> None:
+        order_id = order["orderId"]
+        self.orders[order_id] = order
+        self.orders.move_to_end(order_id)
+        while len(self.orders) > self.max_orders:
+            self.orders.popitem(last=False)
+
+    # --- REST snapshots -----------------------------------------------------------
+
+    def apply_order_snapshot(self, order: Dict[str, Any]) -> None:
+        if not order or "orderId" not in order:
+            return
+        snapshot = dict(order)
+        snapshot["orderId"] = str(order["orderId"])
+        snapshot["updateTime"] = int(order.get("updateTime") or order.get("time") or 0)
+        current = self.orders.get(snapshot["orderId"])
+        if (
+            current is None
+            or snapshot["updateTime"] >= current["updateTime"]
+            # A terminal REST status always wins: orders never reopen
+            or (
+                snapshot.get("status") in TERMINAL_ORDER_STATUSES
+                and current.get("status") not in TERMINAL_ORDER_STATUSES
+            )
+        ):
+            self._store_order(snapshot)
+
+    def apply_account_snapshot(self, account: Dict[str, Any]) -> None:
+        self._account = dict(account)
+        self.account_updated_at = time.time()
+        for asset in account.get("assets", []) or []:
+            self.balances[asset.get("asset")] = {
+                "walletBalance": float(asset.get("walletBalance", 0)),
+                "crossWalletBalance": float(asset.get("crossWalletBalance", 0)),
+                "balanceChange": 0.0,
+            }
+
+    # --- Readers ------------------------------------------------------------------
+
+    def get_order(self, order_id: Any) -> Optional[Dict[str, Any]]:
+        order = self.orders.get(str(order_id))
+        return dict(order) if order is not None else None
+
+    def account_info(self) -> Optional[Dict[str, Any]]:
+        return dict(self._account) if self._account is not None else None
+
+    def wallet_balance(self, asset: str = "USDT") -> Optional[float]:
+        balance = self.balances.get(asset)
+        return balance["walletBalance"] if balance else None
+
+
+class UserDataStream:
+    """Keeps an ``AccountState`` fed from the listenKey stream, with REST as a safety net."""
+
+    def __init__(
+        self,
+        exchange_client: Any,
+        state: Optional[AccountState] = None,
+        ws_base_url: str = "wss://fstream.asterdex.com",
+        ws_client_factory: Any = AsterWebSocketClient,
+        keepalive_seconds: float = 30 * 60,
+        reconcile_seconds: float = 30.0,
+        reconnect_backoff_seconds: float = 1.0,
+    ):
+        self.exchange_client = exchange_client
+        self.state = state or AccountState()
+        self.ws_base_url = ws_base_url
+        self.keepalive_seconds = keepalive_seconds
+        self.reconcile_seconds = reconcile_seconds
+        self.reconnect_backoff_seconds = reconnect_backoff_seconds
+        self._ws_client_factory = ws_client_factory
+        self._ws: Optional[Any] = None
+        self._listen_key: Optional[str] = None
+        self._connected = False
+        self._task: Optional[asyncio.Task] = None
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+        self._order_first_seen: Dict[str, float] = {}
+        self._order_checked_at: Dict[str, float] = {}
+        self.state.add_listener(self._on_state_event)
+        self.stats = {"events": 0, "reconnects": 0, "rest_orders": 0, "rest_accounts": 0}
+
+    @property
+    def healthy(self) -> bool:
+        return self._connected
+
+    # --- Lifecycle ----------------------------------------------------------------
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._stop_event.clear()
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self) -> None:
+        backoff_time = self.reconnect_backoff_seconds
+        while not self._stop_event.is_set():
+            try:
+                self._listen_key = await self.exchange_client.start_user_stream()
+                self._ws = self._ws_client_factory(self.ws_base_url)
+                await self._ws.connect(f"/ws/{self._listen_key}")
+                self._connected = True
+                logger.info("📡 User data stream connected")
+                backoff_time = self.reconnect_backoff_seconds
+                # Anything that happened while we were disconnected only exists in REST
+                await self.reconcile()
+                await self.reconcile_orders()
+                self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+                await self._ws.listen(self._dispatch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"User data stream error: {e}")
+            finally:
+                self._connected = False
+                await self._teardown()
+
+            if not self._stop_event.is_set():
+                self.stats["reconnects"] += 1
+                await asyncio.sleep(backoff_time)
+                backoff_time = min(backoff_time * 2, 60.0)
+
+    async def _dispatch(self, message: Any) -> None:
+        event = message.get("data", message) if isinstance(message, dict) else message
+        if not isinstance(event, dict):
+            return
+        if event.get("e") == "listenKeyExpired":
+            logger.warning("User data listenKey expired; reconnecting")
+            await self._ws.disconnect()  # Ends listen(); run() creates a new key
+            return
+        self.stats["events"] += 1
+        self.state.apply_event(event)
+
+    def _on_state_event(self, event_type: str, payload: Dict[str, Any]) -> None:
+        if event_type == "ORDER_TRADE_UPDATE":
+            key = payload["orderId"]
+            self._order_first_seen.pop(key, None)
+            self._order_checked_at.pop(key, None)
+
+    async def _keepalive_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.keepalive_seconds)
+            try:
+                await self.exchange_client.keepalive_user_stream()
+            except Exception as e:
+                logger.warning(f"listenKey keepalive failed: {e}")
+
+    async def _teardown(self) -> None:
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        if self._ws is not None:
+            try:
+                await self._ws.disconnect()
+            except Exception:
+                pass
+            self._ws = None
+
+    async def stop(self) -> None:
+        self._stop_event.set()
+        await self._teardown()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._listen_key:
+            try:
+                await self.exchange_client.close_user_stream()
+            except Exception:
+                pass
+            self._listen_key = None
+
+    # --- Reads with REST safety net ---------------------------------------------
+
+    async def reconcile(self) -> None:
+        """Refresh the account snapshot from REST."""
+        try:
+            account = await self.exchange_client.get_account_info()
+            self.stats["rest_accounts"] += 1
+            if isinstance(account, dict):
+                self.state.apply_account_snapshot(account)
+        except Exception as e:
+            logger.warning(f"User data REST reconciliation failed: {e}")
+
+    async def reconcile_orders(self) -> None:
+        """Re-fetch every tracked open order; fills missed while disconnected only exist in REST."""
+        open_orders = [
+            order
+            for order in list(self.state.orders.values())
+            if order.get("status") not in TERMINAL_ORDER_STATUSES and order.get("symbol")
+        ]
+        for order in open_orders:
+            try:
+                await self._fetch_order(order["symbol"], order["orderId"])
+            except Exception as e:
+                logger.warning(f"Order {order['orderId']} REST reconciliation failed: {e}")
+
+    async def get_account_info(self) -> Dict[str, Any]:
+        """Account in ``/fapi/v4/account`` shape, from the stream-patched snapshot."""
+        age = time.time() - self.state.account_updated_at
+        if not self.healthy or age > self.reconcile_seconds:
+            await self.reconcile()
+        return self.state.account_info() or {}
+
+    async def get_order(self, symbol: str, order_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        Order status in ``/fapi/v1/order`` shape.
+
+        Returns None while a healthy stream simply has not reported the order yet.
+        After ``reconcile_seconds`` of silence (or with the stream down), or once a
+        still-open order has gone that long without an update, the order is
+        fetched over REST once per window.
+        """
+        key = str(order_id)
+        order = self.state.get_order(key)
+        now = time.monotonic()
+        if self.healthy:
+            if order is not None:
+                if order.get("status") in TERMINAL_ORDER_STATUSES or not self._order_stale(
+                    key, order, now
+                ):
+                    return order
+            else:
+                first_seen = self._order_first_seen.setdefault(key, now)
+                if now - first_seen < self.reconcile_seconds:
+                    return None
+
+        return await self._fetch_order(symbol, order_id)
+
+    def _order_stale(self, key: str, order: Dict[str, Any], now: float) -> bool:
+        age = time.time() - order.get("updateTime", 0) / 1000.0
+        if age <= self.reconcile_seconds:
+            return False
+        # A resting order legitimately keeps an old updateTime; re-check it once per window
+        checked_at = self._order_checked_at.get(key)
+        return checked_at is None or now - checked_at >= self.reconcile_seconds
+
+    async def _fetch_order(self, symbol: str, order_id: Any) -> Optional[Dict[str, Any]]:
+        key = str(order_id)
+        order = await self.exchange_client.get_order(symbol=symbol, order_id=order_id)
+        self.stats["rest_orders"] += 1
+        now = time.monotonic()
+        self.state.apply_order_snapshot(order)
+        if not order:
+            self._order_first_seen[key] = now  # Still unknown; retry after another window
+        elif order.get("status") in TERMINAL_ORDER_STATUSES:
+            self._order_first_seen.pop(key, None)
+            self._order_checked_at.pop(key, None)
+        else:
+            self._order_first_seen.pop(key, None)
+            self._order_checked_at[key] = now
+        return order
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "connected": self._connected,
+            "orders_tracked": len(self.state.orders),
+            "positions": len(self.state.positions),
+        }
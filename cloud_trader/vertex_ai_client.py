@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import copy
 import json
 import logging
 import time
-from typing import Any, Dict, Optional, Union
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Set, Union
 
 import httpx
 
@@ -35,14 +38,69 @@ except ImportError:
     HAS_GENAI = False
 
 from .config import get_settings
+from .llm_cache import InferenceCache
 
 logger = logging.getLogger(__name__)
 
+ModelBackend = Callable[..., Awaitable[Dict[str, Any]]]
+
+# Response cache lifetime per agent: fast microstructure agents go stale quickly
+DEFAULT_CACHE_TTLS: Dict[str, float] = {
+    "vpin-hft": 15.0,
+    "volume-microstructure-agent": 30.0,
+    "trend-momentum-agent": 120.0,
+    "market-prediction-agent": 120.0,
+    "market-analysis": 120.0,
+    "financial-sentiment-agent": 300.0,
+    "strategy-optimization-agent": 600.0,
+}
+
+
+class LocalStubModel:
+    """
+    Offline stand-in for Gemini/Vertex, for tests and local runs.
+
+    Returns ``response`` (a string, or a callable of the prompt) after
+    ``latency`` seconds and records every call.
+    """
+
+    def __init__(
+        self,
+        response: Union[str, Callable[[str], str]] = "HOLD - no clear edge",
+        latency: float = 0.0,
+        confidence: float = 0.9,
+    ):
+        self.response = response
+        self.latency = latency
+        self.confidence = confidence
+        self.calls: List[Dict[str, Any]] = []
+
+    async def __call__(self, agent_id: str, prompt: str, **kwargs) -> Dict[str, Any]:
+        self.calls.append({"agent_id": agent_id, "prompt": prompt, **kwargs})
+        start = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        text = self.response(prompt) if callable(self.response) else self.response
+        return {
+            "response": text,
+            "confidence": self.confidence,
+            "metadata": {
+                "inference_time": time.perf_counter() - start,
+                "model": "local-stub",
+                "mode": "stub",
+                "circuit_breaker": "healthy",
+            },
+        }
+
 
 class VertexAIClient:
     """Client for interacting with Vertex AI endpoints and models."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        model_backend: Optional[ModelBackend] = None,
+        fallback_backend: Optional[ModelBackend] = None,
+    ):
         self._settings = get_settings()
         self._project_id = self._settings.vertex_ai_project or self._settings.gcp_project_id
         self._region = self._settings.vertex_ai_region
@@ -61,7 +119,29 @@ class VertexAIClient:
         self._performance_metrics: Dict[str, List[float]] = {}
         self._max_metrics_history = 100
 
+        # Response cache, in-flight dedupe and per-model concurrency limits
+        self._inference_cache = InferenceCache(
+            price_resolution=self._settings.llm_cache_price_resolution
+        )
+        self._cache_ttls: Dict[str, float] = dict(DEFAULT_CACHE_TTLS)
+        self._model_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._models_in_use: Dict[str, int] = defaultdict(int)
+
+        # Hedged fallback calls, late primaries and speculative prefetches
+        self._fallback_backend = fallback_backend  # Replaces the LLM endpoint when set
+        self._background: Set[asyncio.Task] = set()
+        self._prefetching: Set[str] = set()
+        self._hedge_stats: Dict[str, int] = {
+            "hedged": 0,
+            "fallback_wins": 0,
+            "deadline_misses": 0,
+            "late_results": 0,
+            "prefetched": 0,
+            "prefetch_skipped": 0,
+        }
+
         # Mode detection
+        self._model_backend = model_backend  # Pluggable model, e.g. LocalStubModel
         self._use_api_key = False
 
         if self._settings.gemini_api_key:
@@ -118,24 +198,104 @@ class VertexAIClient:
         # In a real Vertex AI setup, we would fetch these or load from config
         # For now, if using API key, we rely on _model_map
 
-    async def predict(self, agent_id: str, prompt: str, **kwargs) -> Dict[str, Any]:
-        """Make prediction using specified agent model with circuit breaker protection."""
-        if not self._initialized:
-            await self.initialize()
+    async def predict(
+        self,
+        agent_id: str,
+        prompt: str,
+        market_state: Optional[Mapping[str, Any]] = None,
+        cache_ttl: Optional[float] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """
+        Make prediction using specified agent model with circuit breaker protection.
+
+        Responses are cached per agent: pass the numeric inputs behind the prompt
+        as ``market_state`` so that small ticks (quantized) still hit the cache.
+        ``cache_ttl`` overrides the agent's TTL; 0 bypasses the cache.
+        """
+        if self._model_backend is None:
+            if not self._initialized:
+                await self.initialize()
+
+            if not self._settings.enable_vertex_ai and not self._use_api_key:
+                raise ValueError("Both Vertex AI and Gemini API Key modes are disabled")
+
+        ttl = self._cache_ttl(agent_id) if cache_ttl is None else cache_ttl
+        if not self._settings.llm_cache_enabled or ttl <= 0:
+            return await self._predict_uncached(agent_id, prompt, **kwargs)
+
+        key = self._cache_key(agent_id, prompt, market_state, kwargs)
+        result, source = await self._inference_cache.get_or_compute(
+            agent_id, key, ttl, lambda: self._predict_uncached(agent_id, prompt, **kwargs)
+        )
+        # Callers may annotate the dict they get back (misses and joins share the cached
+        # object); keep the cached copy intact
+        result = copy.deepcopy(result)
+        if source != "miss":
+            result["metadata"] = {**result.get("metadata", {}), "cache": source}
+        return result
+
+    def _cache_key(
+        self,
+        agent_id: str,
+        prompt: str,
+        market_state: Optional[Mapping[str, Any]],
+        params: Mapping[str, Any],
+    ) -> str:
+        return self._inference_cache.make_key(
+            agent_id, self._model_name(agent_id), prompt, params, market_state
+        )
 
-        if not self._settings.enable_vertex_ai and not self._use_api_key:
-            raise ValueError("Both Vertex AI and Gemini API Key modes are disabled")
+    def _cache_ttl(self, agent_id: str) -> float:
+        return self._cache_ttls.get(agent_id, self._settings.llm_cache_ttl_seconds)
 
+    def set_cache_ttl(self, agent_id: str, ttl: float) -> None:
+        """Override the response cache TTL for one agent (0 disables caching)."""
+        self._cache_ttls[agent_id] = ttl
+
+    def _model_name(self, agent_id: str) -> str:
+        if self._model_backend is not None:
+            return getattr(self._model_backend, "model_name", "local-stub")
+        if self._use_api_key:
+            return self._model_map.get(agent_id, "gemini-flash-latest")
+        return self._model_map.get(agent_id) or f"endpoint:{agent_id}"
+
+    def _model_semaphore(self, model: str) -> asyncio.Semaphore:
+        semaphore = self._model_semaphores.get(model)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._settings.llm_max_concurrency_per_model)
+            self._model_semaphores[model] = semaphore
+        return semaphore
+
+    @contextlib.asynccontextmanager
+    async def _model_slot(self, model: str):
+        """Hold one of ``model``'s concurrency slots, counted for the metrics."""
+        async with self._model_semaphore(model):
+            self._models_in_use[model] += 1
+            try:
+                yield
+            finally:
+                self._models_in_use[model] -= 1
+
+    async def _predict_uncached(self, agent_id: str, prompt: str, **kwargs) -> Dict[str, Any]:
         # Check circuit breaker
         if self._is_circuit_open(agent_id):
             raise RuntimeError(f"Circuit breaker open for {agent_id} - too many failures")
 
-        # Dispatch based on mode
+        # Dispatch based on mode, at most N requests in flight per model
         try:
-            if self._use_api_key:
-                return await self._predict_with_api_key(agent_id, prompt, **kwargs)
-            else:
-                return await self._predict_with_vertex(agent_id, prompt, **kwargs)
+            async with self._model_slot(self._model_name(agent_id)):
+                if self._model_backend is not None:
+                    result = await self._model_backend(agent_id, prompt, **kwargs)
+                    self._record_success(agent_id)
+                    self._record_performance_metric(
+                        agent_id, result.get("metadata", {}).get("inference_time", 0.0)
+                    )
+                    return result
+                if self._use_api_key:
+                    return await self._predict_with_api_key(agent_id, prompt, **kwargs)
+                else:
+                    return await self._predict_with_vertex(agent_id, prompt, **kwargs)
 
         except Exception as e:
             # Detailed error logging
@@ -314,18 +474,139 @@ class VertexAIClient:
 
         return {"response": "", "confidence": 0.0, "metadata": {"error": "No predictions"}}
 
-    async def predict_with_fallback(self, agent_id: str, prompt: str, **kwargs) -> Dict[str, Any]:
-        """Make prediction with LLM fallback if Vertex AI/Gemini fails."""
+    async def predict_with_fallback(
+        self, agent_id: str, prompt: str, budget: Optional[float] = None, **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Make prediction within a latency budget, hedging to the LLM fallback.
+
+        The primary call gets until the agent's p95 latency (``hedge_delay``);
+        if it has not answered by then the fallback model is asked too and the
+        first good answer wins. A failed primary falls back immediately. If
+        nothing answers within ``budget`` seconds, ``asyncio.TimeoutError`` is
+        raised; the primary keeps running so its late answer still lands in the
+        response cache for the next decision.
+        """
+        budget = self._settings.llm_decision_budget_seconds if budget is None else budget
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget
+        hedge_at = loop.time() + self.hedge_delay(agent_id)
+
+        primary = asyncio.ensure_future(self.predict(agent_id, prompt, **kwargs))
+        hedge: Optional[asyncio.Future] = None
+        pending = {primary}
+        error: Optional[BaseException] = None
         try:
-            return await self.predict(agent_id, prompt, **kwargs)
-        except Exception as e:
-            logger.warning(f"Primary inference failed for {agent_id}, falling back to LLM: {e}")
+            while pending:
+                can_hedge = hedge is None and self._has_fallback()
+                wake = min(deadline, hedge_at) if can_hedge else deadline
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(wake - loop.time(), 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return self._hedge_winner(task.result(), fallback=task is hedge)
+                    error = task.exception()
+                    source = "Fallback" if task is hedge else "Primary"
+                    logger.warning(f"{source} inference failed for {agent_id}: {error}")
+
+                if can_hedge and (done or loop.time() >= hedge_at):
+                    if not done:
+                        self._hedge_stats["hedged"] += 1
+                        logger.info(f"Hedging {agent_id} to the LLM fallback after p95")
+                    hedge = asyncio.ensure_future(self._fallback(prompt, **kwargs))
+                    pending.add(hedge)
+                elif not done and loop.time() >= deadline:
+                    break
+
+            if error is not None and not pending:
+                raise error
+            self._hedge_stats["deadline_misses"] += 1
+            raise asyncio.TimeoutError(f"No answer from {agent_id} within {budget:.1f}s budget")
+        finally:
+            for task in pending:
+                if task is primary:
+                    self._keep_in_background(task, late=True)
+                else:
+                    task.cancel()
+
+    def hedge_delay(self, agent_id: str) -> float:
+        """The agent's p95 inference latency, or the configured delay until it is known."""
+        samples = self._performance_metrics.get(agent_id, [])
+        if len(samples) < self._settings.llm_hedge_min_samples:
+            return self._settings.llm_hedge_delay_seconds
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def _has_fallback(self) -> bool:
+        if self._fallback_backend is not None:
+            return True
+        return bool(self._settings.llm_endpoint and self._settings.enable_llm_trading)
+
+    async def _fallback(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        if self._fallback_backend is not None:
+            return await self._fallback_backend("llm-fallback", prompt, **kwargs)
+        return await self._predict_llm_fallback(prompt, **kwargs)
+
+    def _hedge_winner(self, result: Dict[str, Any], fallback: bool) -> Dict[str, Any]:
+        if not fallback:
+            return result
+        self._hedge_stats["fallback_wins"] += 1
+        return {**result, "metadata": {**result.get("metadata", {}), "fallback": True}}
+
+    def _keep_in_background(self, task: asyncio.Future, late: bool = False) -> None:
+        """Let ``task`` finish on its own; late primaries still warm the response cache."""
+        self._background.add(task)
+
+        def _done(finished: asyncio.Future) -> None:
+            self._background.discard(finished)
+            if finished.cancelled():
+                return
+            if finished.exception() is not None:
+                logger.debug(f"Background inference failed: {finished.exception()}")
+            elif late:
+                self._hedge_stats["late_results"] += 1
+
+        task.add_done_callback(_done)
+
+    async def prefetch(
+        self,
+        agent_id: str,
+        prompt: str,
+        market_state: Optional[Mapping[str, Any]] = None,
+        **kwargs,
+    ) -> bool:
+        """
+        Speculatively warm the response cache for a decision that is likely next.
+
+        Runs ``predict`` in the background and returns at once. Skipped (False)
+        when the answer is already cached or in flight, caching is off, or
+        ``llm_prefetch_max_inflight`` prefetches are already running, so
+        speculation never crowds out decisions for the model semaphore.
+        """
+        if not self._settings.llm_cache_enabled or self._cache_ttl(agent_id) <= 0:
+            return False
+        key = self._cache_key(agent_id, prompt, market_state, kwargs)
+        if (
+            key in self._prefetching
+            or len(self._prefetching) >= self._settings.llm_prefetch_max_inflight
+            or await self._inference_cache.contains(key)
+        ):
+            self._hedge_stats["prefetch_skipped"] += 1
+            return False
 
-            # Fallback to LLM endpoint if configured
-            if self._settings.llm_endpoint and self._settings.enable_llm_trading:
-                return await self._predict_llm_fallback(prompt, **kwargs)
+        self._prefetching.add(key)
+        self._hedge_stats["prefetched"] += 1
+        task = asyncio.ensure_future(
+            self.predict(agent_id, prompt, market_state=market_state, **kwargs)
+        )
+        task.add_done_callback(lambda _: self._prefetching.discard(key))
+        self._keep_in_background(task)
+        return True
 
-            raise e
+    def get_hedging_metrics(self) -> Dict[str, Any]:
+        """Hedge, deadline and prefetch counters plus the background tasks still running."""
+        return {**self._hedge_stats, "background_tasks": len(self._background)}
 
     async def _predict_llm_fallback(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """Fallback prediction using LLM endpoint."""
@@ -575,14 +856,16 @@ class VertexAIClient:
     def get_performance_metrics(self, agent_id: str) -> Dict[str, Any]:
         """Get performance metrics for an agent."""
         metrics = self._performance_metrics.get(agent_id, [])
+        cache = self._inference_cache.get_stats(agent_id)
 
         if not metrics:
-            return {"agent_id": agent_id, "metrics": "no_data"}
+            return {"agent_id": agent_id, "metrics": "no_data", "cache": cache}
 
         import statistics
 
         return {
             "agent_id": agent_id,
+            "cache": cache,
             "count": len(metrics),
             "mean": statistics.mean(metrics),
             "median": statistics.median(metrics),
@@ -627,6 +910,14 @@ class VertexAIClient:
                 result[agent_id] = self.get_performance_metrics(agent_id)
         return result
 
+    def get_inference_cache_metrics(self) -> Dict[str, Any]:
+        """Response cache totals across agents: hits, joins, misses, latency saved."""
+        return {
+            **self._inference_cache.get_stats(),
+            "max_concurrency_per_model": self._settings.llm_max_concurrency_per_model,
+            "models_in_use": dict(self._models_in_use),
+        }
+
 
 # Global client instance
 _vertex_client: Optional[VertexAIClient] = None
@@ -1,44 +1,148 @@
+"""
+aggTrade ingestion for VPIN across the whole TRADING universe.
+
+Symbols are sharded over several combined-stream websocket connections, each under
+the exchange's per-connection stream limit, and every shard reconnects on its own.
+Messages are decoded with orjson straight into preallocated ``TRADE_DTYPE``
+buffers (one per symbol); a full buffer is handed off as one batch through a
+bounded queue without awaiting, so a slow consumer never stalls a socket. When the
+queue is full the overflow policy decides what happens:
+
+- ``"coalesce"``: the batch is held and merged into that symbol's next batch (capped
+  at ``max_pending_trades``, oldest trades dropped beyond that)
+- ``"drop"``: the batch is discarded
+
+Quiet symbols may take a long time to fill a batch, so partial buffers older than
+``flush_interval_seconds`` and held-back batches are flushed periodically, and
+everything is flushed on shutdown.
+
+Per-shard message rate, receive lag and aggTrade id gaps are kept in
+``shard_stats`` and exported as Prometheus metrics.
+"""
+
 import asyncio
-import json
 import time
-from typing import Any, Dict, List
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
 
+import numpy as np
+import orjson
 import websockets
 
-# Handle websockets exceptions import - version compatibility
-try:
-    from websockets.exceptions import ConnectionClosedError, InvalidURI
-except (ImportError, AttributeError):
-    # Fallback for newer websockets versions
-    try:
-        ConnectionClosedError = websockets.exceptions.ConnectionClosedError
-        InvalidURI = websockets.exceptions.InvalidURI
-    except AttributeError:
-        # If exceptions don't exist, use base Exception
-        ConnectionClosedError = Exception
-        InvalidURI = Exception
+from .exchange import MAX_STREAMS_PER_CONNECTION, AsterClient
+from .metrics import (
+    TRADE_STREAM_DROPPED,
+    TRADE_STREAM_GAPS,
+    TRADE_STREAM_LAG,
+    TRADE_STREAM_MESSAGES,
+    TRADE_STREAM_RECONNECTS,
+)
+from .vpin_engine import TRADE_DTYPE
+
+OVERFLOW_POLICIES = ("coalesce", "drop")
+
+
+@dataclass
+class ShardStats:
+    """Health of one websocket shard."""
+
+    shard: int
+    symbols: int
+    messages: int = 0
+    gaps: int = 0
+    duplicates: int = 0
+    reconnects: int = 0
+    lag_ms: float = 0.0  # Smoothed exchange event time -> receipt delay
+    connected: bool = False
+    connected_at: Optional[float] = None
+    connection_messages: int = 0
+    last_message_at: Optional[float] = None
+    _published: Dict[str, int] = field(default_factory=dict, repr=False)
 
-from .exchange import AsterClient
+    @property
+    def message_rate(self) -> float:
+        """Messages per second on the current connection."""
+        if not self.connected or self.connected_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.connected_at
+        return self.connection_messages / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "shard": self.shard,
+            "symbols": self.symbols,
+            "connected": self.connected,
+            "messages": self.messages,
+            "message_rate": self.message_rate,
+            "lag_ms": self.lag_ms,
+            "gaps": self.gaps,
+            "duplicates": self.duplicates,
+            "reconnects": self.reconnects,
+        }
+
+
+class _TradeBuffer:
+    __slots__ = ("trades", "count", "last_id", "started_at")
+
+    def __init__(self, size: int):
+        self.trades = np.empty(size, dtype=TRADE_DTYPE)
+        self.count = 0
+        self.last_id = -1
+        self.started_at = 0.0  # Monotonic time of the oldest buffered trade
 
 
 class VPINDataStreamer:
-    def __init__(self, output_queue: asyncio.Queue, batch_size: int = 50):
-        self.output_queue = output_queue
+    """
+    Streams aggTrades for every TRADING symbol and emits ``{"symbol", "batch"}`` items,
+    where ``batch`` is a ``TRADE_DTYPE`` array of ``batch_size`` trades.
+    """
+
+    def __init__(
+        self,
+        output_queue: Optional[asyncio.Queue] = None,
+        batch_size: int = 50,
+        max_streams_per_connection: int = MAX_STREAMS_PER_CONNECTION,
+        queue_size: int = 1000,
+        overflow_policy: str = "coalesce",
+        max_pending_trades: int = 5000,
+        rest_client: Any = None,
+        ws_connect: Optional[Callable[[str], Any]] = None,
+        base_url: str = "wss://fstream.asterdex.com",
+        reconnect_backoff_seconds: float = 1.0,
+        flush_interval_seconds: float = 1.0,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}")
+        self.output_queue = (
+            output_queue if output_queue is not None else asyncio.Queue(maxsize=queue_size)
+        )
         self.batch_size = batch_size
-        self.base_url = "wss://fstream.asterdex.com"
-        self.rest_client = AsterClient()
-        self.tick_buffer: Dict[str, List[Dict[str, Any]]] = {}
+        self.max_streams_per_connection = max_streams_per_connection
+        self.overflow_policy = overflow_policy
+        self.max_pending_trades = max_pending_trades
+        self.base_url = base_url
+        self.reconnect_backoff_seconds = reconnect_backoff_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+        self.rest_client = rest_client if rest_client is not None else AsterClient()
+        self._ws_connect = ws_connect or websockets.connect
+        self._buffers: Dict[str, _TradeBuffer] = {}
+        self._pending: Dict[str, np.ndarray] = {}  # Coalesced batches waiting for queue space
+        self.shards: List[List[str]] = []
+        self.shard_stats: Dict[int, ShardStats] = {}
+        self._shard_tasks: Dict[int, asyncio.Task] = {}
+        self.batches_sent = 0
+        self.dropped_trades = 0
         self._stop_event = asyncio.Event()
 
     async def _get_all_symbols(self) -> List[str]:
         try:
             # Add timeout to prevent hanging during startup
             symbols_info = await asyncio.wait_for(self.rest_client.get_all_symbols(), timeout=10.0)
-            return [
+            return sorted(
                 info["symbol"]
                 for info in symbols_info
                 if info.get("symbol") and info.get("status") == "TRADING"
-            ]
+            )
         except asyncio.TimeoutError:
             print("Timeout fetching symbols for VPIN streamer, using empty list")
             return []
@@ -46,64 +150,199 @@ class VPINDataStreamer:
             print(f"Error fetching symbols: {e}")
             return []
 
-    async def _handle_message(self, message: str):
-        data = json.loads(message)
-        stream_data = data.get("data", {})
+    # --- Sharding -----------------------------------------------------------------
+
+    def build_shards(self, symbols: List[str]) -> List[List[str]]:
+        size = self.max_streams_per_connection
+        self.shards = [symbols[i : i + size] for i in range(0, len(symbols), size)]
+        self.shard_stats = {
+            index: ShardStats(shard=index, symbols=len(shard))
+            for index, shard in enumerate(self.shards)
+        }
+        return self.shards
+
+    def shard_url(self, index: int) -> str:
+        streams = "/".join(f"{symbol.lower()}@aggTrade" for symbol in self.shards[index])
+        return f"{self.base_url}/stream?streams={streams}"
+
+    # --- Parsing ------------------------------------------------------------------
 
-        if stream_data.get("e") == "aggTrade":
-            symbol = stream_data.get("s")
-            if not symbol:
+    def _handle_message(self, message: Any, stats: ShardStats) -> None:
+        data = orjson.loads(message)
+        trade = data.get("data", data)
+        if trade.get("e") != "aggTrade":
+            return
+        symbol = trade.get("s")
+        if not symbol:
+            return
+
+        stats.messages += 1
+        stats.connection_messages += 1
+        stats.last_message_at = time.monotonic()
+        event_ms = trade.get("E") or trade.get("T")
+        if event_ms:
+            lag = time.time() * 1000 - event_ms
+            if stats.messages == 1:
+                stats.lag_ms = lag
+            else:
+                stats.lag_ms += 0.05 * (lag - stats.lag_ms)
+
+        buffer = self._buffers.get(symbol)
+        if buffer is None:
+            buffer = self._buffers[symbol] = _TradeBuffer(self.batch_size)
+        agg_id = trade.get("a")
+        if agg_id is not None:
+            if agg_id <= buffer.last_id:
+                stats.duplicates += 1  # Replayed after a reconnect
                 return
+            if buffer.last_id >= 0 and agg_id > buffer.last_id + 1:
+                stats.gaps += agg_id - buffer.last_id - 1
+            buffer.last_id = agg_id
 
-            tick = {
-                "price": float(stream_data.get("p", 0.0)),
-                "volume": float(stream_data.get("q", 0.0)),
-                "timestamp": stream_data.get("T"),
-            }
+        if buffer.count == 0:
+            buffer.started_at = stats.last_message_at
+        buffer.trades[buffer.count] = (trade.get("T") or 0, float(trade["p"]), float(trade["q"]))
+        buffer.count += 1
+        if buffer.count == self.batch_size:
+            batch = buffer.trades
+            buffer.trades = np.empty(self.batch_size, dtype=TRADE_DTYPE)
+            buffer.count = 0
+            self._deliver(symbol, batch)
 
-            if symbol not in self.tick_buffer:
-                self.tick_buffer[symbol] = []
+    # --- Hand-off -----------------------------------------------------------------
 
-            self.tick_buffer[symbol].append(tick)
+    def _deliver(self, symbol: str, batch: np.ndarray) -> None:
+        pending = self._pending.pop(symbol, None)
+        if pending is not None:
+            batch = np.concatenate([pending, batch])
+        try:
+            self.output_queue.put_nowait({"symbol": symbol, "batch": batch})
+            self.batches_sent += 1
+            return
+        except asyncio.QueueFull:
+            pass
 
-            if len(self.tick_buffer[symbol]) >= self.batch_size:
-                batch = self.tick_buffer[symbol]
-                self.tick_buffer[symbol] = []
-                await self.output_queue.put({"symbol": symbol, "batch": batch})
+        if self.overflow_policy == "coalesce":
+            kept = batch[-self.max_pending_trades :]
+            self._pending[symbol] = kept
+            dropped = len(batch) - len(kept)
+        else:
+            dropped = len(batch)
+        if dropped:
+            self.dropped_trades += dropped
+            TRADE_STREAM_DROPPED.labels(policy=self.overflow_policy).inc(dropped)
 
-    async def run(self):
-        backoff_time = 5
+    def flush(self, max_age: Optional[float] = None) -> None:
+        """
+        Hand off partial buffers (all, or those holding trades older than
+        ``max_age`` seconds) and retry the coalesced backlog.
+        """
+        cutoff = None if max_age is None else time.monotonic() - max_age
+        for symbol, buffer in self._buffers.items():
+            if buffer.count and (cutoff is None or buffer.started_at <= cutoff):
+                batch = buffer.trades[: buffer.count].copy()
+                buffer.count = 0
+                self._deliver(symbol, batch)
+        for symbol in list(self._pending):
+            self._deliver(symbol, np.empty(0, dtype=TRADE_DTYPE))
+
+    async def _flush_loop(self) -> None:
+        while not self._stop_event.is_set():
+            await asyncio.sleep(self.flush_interval_seconds)
+            self.flush(max_age=self.flush_interval_seconds)
+
+    # --- Connections --------------------------------------------------------------
+
+    def _publish_metrics(self, stats: ShardStats) -> None:
+        label = str(stats.shard)
+        for name, counter in (
+            ("messages", TRADE_STREAM_MESSAGES),
+            ("gaps", TRADE_STREAM_GAPS),
+            ("reconnects", TRADE_STREAM_RECONNECTS),
+        ):
+            value = getattr(stats, name)
+            delta = value - stats._published.get(name, 0)
+            if delta:
+                counter.labels(shard=label).inc(delta)
+                stats._published[name] = value
+        TRADE_STREAM_LAG.labels(shard=label).set(stats.lag_ms / 1000)
+
+    async def _run_shard(self, index: int) -> None:
+        stats = self.shard_stats[index]
+        url = self.shard_url(index)
+        backoff_time = self.reconnect_backoff_seconds
         while not self._stop_event.is_set():
             try:
-                symbols = await self._get_all_symbols()
-                if not symbols:
-                    print("No symbols found to subscribe. Retrying in 60s.")
-                    await asyncio.sleep(60)
-                    continue
-
-                streams = [f"{symbol.lower()}@aggTrade" for symbol in symbols]
-                # Limit streams to avoid overwhelming the connection, e.g., 100 at a time
-                stream_url = f"{self.base_url}/stream?streams={'/'.join(streams[:100])}"
-
-                async with websockets.connect(stream_url) as websocket:
-                    print(f"Connected to WebSocket stream for {len(streams[:100])} symbols.")
-                    backoff_time = 5  # Reset backoff time on successful connection
+                async with self._ws_connect(url) as websocket:
+                    stats.connected = True
+                    stats.connected_at = time.monotonic()
+                    stats.connection_messages = 0
+                    backoff_time = self.reconnect_backoff_seconds
+                    print(f"Shard {index} connected for {stats.symbols} symbols.")
+                    published = time.monotonic()
                     while not self._stop_event.is_set():
                         message = await websocket.recv()
-                        await self._handle_message(message)
-
-            except (ConnectionClosedError, InvalidURI) as e:
-                print(f"WebSocket connection error: {e}")
+                        self._handle_message(message, stats)
+                        now = time.monotonic()
+                        if now - published >= 1.0:
+                            self._publish_metrics(stats)
+                            published = now
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"An unexpected error occurred in data streamer: {e}")
+                print(f"Shard {index} websocket error: {e}")
+            finally:
+                stats.connected = False
 
             if not self._stop_event.is_set():
-                print(f"Disconnected. Reconnecting in {backoff_time} seconds...")
+                # Only this shard resubscribes; the others keep streaming
+                stats.reconnects += 1
+                self._publish_metrics(stats)
+                print(f"Shard {index} disconnected. Reconnecting in {backoff_time} seconds...")
                 await asyncio.sleep(backoff_time)
                 backoff_time = min(backoff_time * 2, 60)  # Exponential backoff
 
+    async def run(self):
+        while not self._stop_event.is_set():
+            symbols = await self._get_all_symbols()
+            if symbols:
+                break
+            print("No symbols found to subscribe. Retrying in 60s.")
+            await asyncio.sleep(60)
+        if self._stop_event.is_set():
+            return
+
+        self.build_shards(symbols)
+        print(f"Streaming aggTrades for {len(symbols)} symbols over {len(self.shards)} shards.")
+        self._shard_tasks = {
+            index: asyncio.create_task(self._run_shard(index)) for index in self.shard_stats
+        }
+        flush_task = asyncio.create_task(self._flush_loop())
+        try:
+            await asyncio.gather(*self._shard_tasks.values())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            flush_task.cancel()
+            for task in self._shard_tasks.values():
+                task.cancel()
+            self.flush()  # Nothing buffered is lost on shutdown
+
     def stop(self):
         self._stop_event.set()
+        for task in self._shard_tasks.values():
+            task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": sum(len(shard) for shard in self.shards),
+            "shards": [stats.to_dict() for stats in self.shard_stats.values()],
+            "queue_depth": self.output_queue.qsize(),
+            "batches_sent": self.batches_sent,
+            "pending_trades": sum(len(batch) for batch in self._pending.values()),
+            "dropped_trades": self.dropped_trades,
+            "overflow_policy": self.overflow_policy,
+        }
 
 
 if __name__ == "__main__":
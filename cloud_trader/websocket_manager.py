@@ -5,11 +5,12 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
-from collections import defaultdict
+from collections import defaultdict, deque
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Set
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Set
 
+import orjson
 import structlog
 from fastapi import WebSocket, WebSocketDisconnect
 
@@ -47,6 +48,25 @@ class SubscriptionType(Enum):
     MARKET_REGIME = "market_regime"
 
 
+# Snapshot-style updates: a client only needs the newest one, so a pending copy is
+# replaced in its send queue instead of queuing behind it.
+COALESCED_MESSAGE_TYPES = {
+    MessageType.PORTFOLIO_UPDATE,
+    MessageType.MARKET_DATA,
+    MessageType.MARKET_REGIME,
+    MessageType.PERFORMANCE_METRICS,
+}
+
+
+def encode_frame(payload: Dict[str, Any]) -> str:
+    """
+    JSON text frame, wire-compatible with the former ``send_json``: non-str dict
+    keys are allowed and numpy scalars/arrays stay numbers.
+    """
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    return orjson.dumps(payload, default=str, option=options).decode()
+
+
 @dataclass
 class WebSocketClient:
     """A connected WebSocket client."""
@@ -57,26 +77,61 @@ class WebSocketClient:
     connected_at: int = field(default_factory=get_timestamp_us)
     last_activity: int = field(default_factory=get_timestamp_us)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    max_pending: int = 256
+
+    # Outbound frames waiting for this client's sender task: [coalesce_key, frame]
+    pending: Deque[List[Any]] = field(default_factory=deque, repr=False)
+    _latest: Dict[Hashable, List[Any]] = field(default_factory=dict, repr=False)
+    _ready: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    sender_task: Optional[asyncio.Task[None]] = field(default=None, repr=False)
+
+    def enqueue(self, frame: str, coalesce_key: Optional[Hashable] = None) -> Optional[bool]:
+        """
+        Queue an encoded frame without awaiting the socket.
+
+        Returns True if queued, None if it replaced a pending frame with the same
+        ``coalesce_key``, and False if the client is too far behind to accept it.
+        """
+        if coalesce_key is not None:
+            entry = self._latest.get(coalesce_key)
+            if entry is not None:
+                entry[1] = frame
+                return None
+        if len(self.pending) >= self.max_pending:
+            return False
+        entry = [coalesce_key, frame]
+        self.pending.append(entry)
+        if coalesce_key is not None:
+            self._latest[coalesce_key] = entry
+        self._ready.set()
+        return True
+
+    async def next_frame(self) -> str:
+        """Wait for and pop the oldest pending frame."""
+        while not self.pending:
+            self._ready.clear()
+            await self._ready.wait()
+        entry = self.pending.popleft()
+        if entry[0] is not None and self._latest.get(entry[0]) is entry:
+            del self._latest[entry[0]]
+        return entry[1]
 
     async def send_message(self, message_type: MessageType, data: Dict[str, Any]) -> bool:
-        """Send a message to this client."""
+        """Queue a message for this client's sender task; False if it is too far behind."""
         try:
             message = {"type": message_type.value, "timestamp_us": get_timestamp_us(), "data": data}
-            await self.websocket.send_json(message)
-            self.last_activity = get_timestamp_us()
-            return True
+            return self.enqueue(encode_frame(message)) is not False
         except Exception as e:
             logger.error(f"Failed to send message to client {self.client_id}: {e}")
             return False
 
     async def ping(self) -> bool:
-        """Send a ping to check if client is still connected."""
-        try:
-            await self.websocket.send_json({"type": "ping", "timestamp_us": get_timestamp_us()})
-            self.last_activity = get_timestamp_us()
-            return True
-        except Exception:
-            return False
+        """
+        Queue a ping. Dead sockets are dropped by the sender task when the write
+        fails; a False here means the client's queue is full.
+        """
+        frame = encode_frame({"type": "ping", "timestamp_us": get_timestamp_us()})
+        return self.enqueue(frame) is not False
 
 
 @dataclass
@@ -101,26 +156,32 @@ class WebSocketManager:
     - Message prioritization and queuing
     - Heartbeat monitoring
     - Performance metrics
+
+    The broadcast loop sleeps until a message is queued, encodes it once, and hands
+    the frame to each subscriber's bounded send queue; a per-client sender task
+    writes to the socket. Snapshot updates coalesce in those queues, and a client
+    whose queue overflows anyway is evicted rather than slowing everyone else.
     """
 
-    def __init__(self):
+    def __init__(self, queue_size: int = 1000, client_queue_size: int = 256):
         self.clients: Dict[str, WebSocketClient] = {}
         self.subscriptions: Dict[SubscriptionType, Set[str]] = defaultdict(
             set
         )  # subscription_type -> client_ids
 
-        # Message queues by priority
-        self.message_queues: Dict[int, asyncio.Queue] = {
-            1: asyncio.Queue(maxsize=1000),  # Low
-            2: asyncio.Queue(maxsize=1000),  # Normal
-            3: asyncio.Queue(maxsize=1000),  # High
-            4: asyncio.Queue(maxsize=1000),  # Critical
+        # Message queues by priority: 1=low, 2=normal, 3=high, 4=critical
+        self.queue_size = queue_size
+        self.client_queue_size = client_queue_size
+        self.message_queues: Dict[int, Deque[WebSocketMessage]] = {
+            priority: deque() for priority in (1, 2, 3, 4)
         }
+        self._message_ready = asyncio.Event()
 
         # Background tasks
         self._broadcast_task: Optional[asyncio.Task[None]] = None
         self._heartbeat_task: Optional[asyncio.Task[None]] = None
         self._cleanup_task: Optional[asyncio.Task[None]] = None
+        self._closing_tasks: Set[asyncio.Task[None]] = set()
 
         # Statistics
         self.stats = {
@@ -129,6 +190,8 @@ class WebSocketManager:
             "messages_sent": 0,
             "messages_failed": 0,
             "bytes_sent": 0,
+            "messages_coalesced": 0,
+            "clients_evicted": 0,
             "uptime_seconds": 0,
         }
 
@@ -155,6 +218,7 @@ class WebSocketManager:
     async def stop(self) -> None:
         """Stop the WebSocket manager."""
         self._shutdown_event.set()
+        self._message_ready.set()  # Wake the broadcast loop so it can exit
 
         # Disconnect all clients
         disconnect_tasks = []
@@ -186,12 +250,16 @@ class WebSocketManager:
             await websocket.accept()
 
             client = WebSocketClient(
-                websocket=websocket, client_id=client_id, metadata=metadata or {}
+                websocket=websocket,
+                client_id=client_id,
+                metadata=metadata or {},
+                max_pending=self.client_queue_size,
             )
 
             self.clients[client_id] = client
             self.stats["total_clients"] += 1
             self.stats["active_clients"] += 1
+            client.sender_task = asyncio.create_task(self._client_sender(client))
 
             # Send welcome message
             await client.send_message(
@@ -216,26 +284,33 @@ class WebSocketManager:
 
     async def _disconnect_client(self, client_id: str, reason: str) -> None:
         """Disconnect a client."""
-        if client_id not in self.clients:
+        client = self._unregister_client(client_id)
+        if client is None:
             return
+        await self._close_client(client, reason)
 
-        client = self.clients[client_id]
+    def _unregister_client(self, client_id: str) -> Optional[WebSocketClient]:
+        """Remove a client from the registry and subscriptions without awaiting."""
+        client = self.clients.pop(client_id, None)
+        if client is None:
+            return None
 
-        # Remove from subscriptions
         for subscription_type in list(client.subscriptions):
             self.subscriptions[subscription_type].discard(client_id)
+        self.stats["active_clients"] -= 1
+
+        task = client.sender_task
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        return client
 
-        # Close WebSocket
+    async def _close_client(self, client: WebSocketClient, reason: str) -> None:
         try:
             await client.websocket.close(code=1000, reason=reason)
         except Exception as e:
-            logger.debug(f"Error closing WebSocket for client {client_id}: {e}")
-
-        # Remove client
-        del self.clients[client_id]
-        self.stats["active_clients"] -= 1
+            logger.debug(f"Error closing WebSocket for client {client.client_id}: {e}")
 
-        logger.info(f"WebSocket client disconnected: {client_id} (reason: {reason})")
+        logger.info(f"WebSocket client disconnected: {client.client_id} (reason: {reason})")
 
     async def subscribe_client(self, client_id: str, subscription_type: SubscriptionType) -> bool:
         """Subscribe a client to a message type."""
@@ -263,11 +338,12 @@ class WebSocketManager:
 
     async def broadcast_message(self, message: WebSocketMessage) -> None:
         """Broadcast a message to subscribed clients."""
-        try:
-            # Add to appropriate priority queue
-            await self.message_queues[message.priority].put(message)
-        except asyncio.QueueFull:
+        queue = self.message_queues[message.priority]
+        if len(queue) >= self.queue_size:
             logger.warning(f"Message queue full for priority {message.priority}, dropping message")
+            return
+        queue.append(message)
+        self._message_ready.set()
 
     async def send_to_client(
         self, client_id: str, message_type: MessageType, data: Dict[str, Any]
@@ -285,29 +361,49 @@ class WebSocketManager:
         """Add a callback for a specific message type."""
         self.message_callbacks[message_type].append(callback)
 
+    def _next_message(self) -> Optional[WebSocketMessage]:
+        """Pop the oldest message of the highest non-empty priority."""
+        for priority in (4, 3, 2, 1):
+            queue = self.message_queues[priority]
+            if queue:
+                return queue.popleft()
+        return None
+
     async def _broadcast_loop(self) -> None:
         """Main broadcast loop processing messages from all priority queues."""
         while not self._shutdown_event.is_set():
-            try:
-                # Process messages in priority order (highest first)
-                message = None
+            message = self._next_message()
+            if message is None:
+                # Block until broadcast_message (or stop) signals; no polling
+                self._message_ready.clear()
+                await self._message_ready.wait()
+                continue
 
-                for priority in range(4, 0, -1):  # 4, 3, 2, 1
-                    try:
-                        message = self.message_queues[priority].get_nowait()
-                        self.message_queues[priority].task_done()
-                        break
-                    except asyncio.QueueEmpty:
-                        continue
+            try:
+                await self._process_message(message)
+            except Exception as e:
+                logger.error(f"Error in broadcast loop: {e}")
 
-                if message:
-                    await self._process_message(message)
+            # Fan-out never awaits a socket, so yield between messages under load
+            await asyncio.sleep(0)
 
-                # Small delay to prevent busy waiting
-                await asyncio.sleep(0.01)
+    @staticmethod
+    def _encode(message: WebSocketMessage) -> str:
+        """Serialize a message once for every recipient."""
+        payload = {
+            "type": message.message_type.value,
+            "timestamp_us": get_timestamp_us(),
+            "data": message.data,
+        }
+        # Text frames, since the dashboard parses ``event.data`` as a string
+        return encode_frame(payload)
 
-            except Exception as e:
-                logger.error(f"Error in broadcast loop: {e}")
+    @staticmethod
+    def _coalesce_key(message: WebSocketMessage) -> Optional[Hashable]:
+        if message.message_type not in COALESCED_MESSAGE_TYPES:
+            return None
+        symbol = message.data.get("symbol") if isinstance(message.data, dict) else None
+        return (message.message_type, symbol)
 
     async def _process_message(self, message: WebSocketMessage) -> None:
         """Process a single message."""
@@ -327,41 +423,52 @@ class WebSocketManager:
         if not target_client_ids:
             return  # No subscribers
 
-        # Send to all target clients
-        send_tasks = []
+        frame = self._encode(message)
+        coalesce_key = self._coalesce_key(message)
+        evicted = []
         for client_id in target_client_ids:
-            if client_id in self.clients:
-                client = self.clients[client_id]
-                send_tasks.append(client.send_message(message.message_type, message.data))
-
-        if send_tasks:
-            results = await asyncio.gather(*send_tasks, return_exceptions=True)
-
-            success_count = sum(1 for r in results if r is True)
-            self.stats["messages_sent"] += success_count
-            self.stats["messages_failed"] += len(results) - success_count
+            client = self.clients.get(client_id)
+            if client is None:
+                continue
+            queued = client.enqueue(frame, coalesce_key)
+            if queued is None:
+                self.stats["messages_coalesced"] += 1
+            elif not queued:
+                evicted.append(client)
+
+        for client in evicted:
+            # Slow consumer: drop it now, close the socket off the broadcast path
+            self._unregister_client(client.client_id)
+            self.stats["clients_evicted"] += 1
+            self.stats["messages_failed"] += len(client.pending) + 1
+            task = asyncio.create_task(self._close_client(client, "slow_consumer"))
+            self._closing_tasks.add(task)
+            task.add_done_callback(self._closing_tasks.discard)
+
+    async def _client_sender(self, client: WebSocketClient) -> None:
+        """Drain one client's send queue onto its socket."""
+        while True:
+            frame = await client.next_frame()
+            try:
+                await client.websocket.send_text(frame)
+            except Exception as e:
+                logger.error(f"Failed to send message to client {client.client_id}: {e}")
+                self.stats["messages_failed"] += 1
+                await self._disconnect_client(client.client_id, "send_failed")
+                return
+            client.last_activity = get_timestamp_us()
+            self.stats["messages_sent"] += 1
+            self.stats["bytes_sent"] += len(frame)
 
     async def _heartbeat_loop(self) -> None:
         """Send periodic heartbeats to clients."""
         while not self._shutdown_event.is_set():
             try:
-                # Ping all clients
-                ping_tasks = []
+                # Queue a ping for every client; its sender task writes it, and a
+                # client whose queue is still full since the last round is dropped
                 for client in list(self.clients.values()):
-                    ping_tasks.append(client.ping())
-
-                if ping_tasks:
-                    results = await asyncio.gather(*ping_tasks, return_exceptions=True)
-
-                    # Disconnect unresponsive clients
-                    disconnected = []
-                    for i, result in enumerate(results):
-                        if isinstance(result, Exception) or result is False:
-                            client_id = list(self.clients.keys())[i]
-                            disconnected.append(client_id)
-
-                    for client_id in disconnected:
-                        await self._disconnect_client(client_id, "ping_timeout")
+                    if not await client.ping():
+                        await self._disconnect_client(client.client_id, "ping_timeout")
 
                 # Wait 30 seconds between heartbeats
                 await asyncio.sleep(30)
@@ -405,7 +512,8 @@ class WebSocketManager:
             "stats": self.stats.copy(),
             "active_clients": len(self.clients),
             "subscription_counts": subscription_counts,
-            "queue_sizes": {f"priority_{p}": q.qsize() for p, q in self.message_queues.items()},
+            "queue_sizes": {f"priority_{p}": len(q) for p, q in self.message_queues.items()},
+            "client_backlog": sum(len(client.pending) for client in self.clients.values()),
             "timestamp_us": get_timestamp_us(),
         }
 
@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.fixture
+def bare_trading_service():
+    """Build a MinimalTradingService without running __init__, carrying only the given state."""
+    trading_service = pytest.importorskip("cloud_trader.trading_service")
+
+    def build(**attributes):
+        service = trading_service.MinimalTradingService.__new__(
+            trading_service.MinimalTradingService
+        )
+        for name, value in attributes.items():
+            setattr(service, name, value)
+        return service
+
+    return build
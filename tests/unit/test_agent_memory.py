@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+from cloud_trader.agent_memory import AgentMemory, AgentMemoryManager, MemoryImportance, MemoryType
+from cloud_trader.cache import InMemoryCache
+
+TAGS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "trending", "volatile", "shared"]
+
+
+def make_memory(i, agent_id="agent-a", rng=random, **overrides):
+    fields = dict(
+        memory_id=f"m{i}",
+        agent_id=agent_id,
+        memory_type=rng.choice(list(MemoryType)),
+        content={"i": i},
+        importance=rng.choice(list(MemoryImportance)),
+        confidence=0.5,
+        timestamp_us=1_000_000 + rng.randrange(10_000),
+        tags=set(rng.sample(TAGS, rng.randint(0, 2))),
+    )
+    fields.update(overrides)
+    return AgentMemory(**fields)
+
+
+def brute_force(memories, tags, memory_types, min_importance, limit):
+    matches = [
+        m
+        for m in memories
+        if (not tags or m.tags & set(tags))
+        and (not memory_types or m.memory_type in memory_types)
+        and m.importance.value >= min_importance.value
+    ]
+    matches.sort(key=lambda m: (-m.importance.value, -m.timestamp_us, m.memory_id))
+    return [m.memory_id for m in matches[:limit]]
+
+
+@pytest.mark.asyncio
+async def test_indexed_retrieval_matches_a_full_scan():
+    rng = random.Random(7)
+    manager = AgentMemoryManager(max_memories_per_agent=10_000)
+    memories = [make_memory(i, rng=rng) for i in range(2000)]
+    for memory in memories:
+        await manager.store_memory(memory)
+
+    high = MemoryImportance.HIGH
+    queries = [
+        (None, None, MemoryImportance.LOW, 50),
+        (["BTCUSDT"], None, MemoryImportance.MEDIUM, 20),
+        (["ETHUSDT", "volatile"], [MemoryType.TRADE_OUTCOME], MemoryImportance.LOW, 10),
+        (None, [MemoryType.REGIME_TRANSITION, MemoryType.ANOMALY_DETECTION], high, 5),
+        (["no-such-tag"], None, MemoryImportance.LOW, 10),
+    ]
+    for tags, memory_types, min_importance, limit in queries:
+        found = await manager.retrieve_memories(
+            "agent-a", tags, memory_types, min_importance, limit=limit
+        )
+        expected = brute_force(memories, tags, memory_types, min_importance, limit)
+        assert [m.memory_id for m in found] == expected
+
+    assert await manager.retrieve_memories("unknown-agent") == []
+
+
+@pytest.mark.asyncio
+async def test_limits_and_consolidation_evict_through_the_index():
+    manager = AgentMemoryManager(max_memories_per_agent=3)
+    low = MemoryImportance.LOW
+    await manager.store_memory(make_memory(0, importance=low, tags={"old"}, timestamp_us=1))
+    await manager.store_memory(make_memory(1, importance=low, tags={"BTCUSDT"}))
+    await manager.store_memory(make_memory(2, importance=MemoryImportance.HIGH, tags={"BTCUSDT"}))
+    await manager.retrieve_memories("agent-a", tags=["BTCUSDT"])  # m1 gets accessed
+
+    await manager.store_memory(make_memory(3, importance=MemoryImportance.MEDIUM))
+
+    assert set(manager.agent_memories["agent-a"]) == {"m1", "m2", "m3"}
+    assert "m0" not in manager.memory_index["old"]
+    index = manager._indexes["agent-a"]
+    assert sorted(entry[2] for entry in index.ranked) == ["m1", "m2", "m3"]
+
+    manager.agent_memories["agent-a"]["m1"].timestamp_us = 1  # Edited in place: still removable
+    await manager._perform_consolidation()
+    assert set(manager.agent_memories["agent-a"]) == {"m2", "m3"}
+    assert "m1" not in manager.memory_index["BTCUSDT"]
+    assert MemoryImportance.LOW.value not in index.by_importance
+    assert len(index) == 2
+
+
+@pytest.mark.asyncio
+async def test_memories_from_other_replicas_are_batch_loaded(monkeypatch):
+    cache = InMemoryCache()
+    writer, reader = AgentMemoryManager(), AgentMemoryManager(cache_refresh_seconds=3600)
+    for manager in (writer, reader):
+        manager._cache, manager._cache_ready = cache, True
+
+    for i in range(20):
+        await writer.store_memory(make_memory(i, tags={"BTCUSDT"}))
+    await reader.store_memory(make_memory(0, tags={"BTCUSDT"}))  # Already known locally
+
+    batches = []
+    original_get_many = cache.get_many
+
+    async def get_many(keys):
+        batches.append(list(keys))
+        return await original_get_many(keys)
+
+    async def no_single_gets(key):
+        raise AssertionError(f"unbatched read of {key}")
+
+    monkeypatch.setattr(cache, "get_many", get_many)
+    monkeypatch.setattr(cache, "get", no_single_gets)
+
+    found = await reader.retrieve_memories("agent-a", tags=["BTCUSDT"], limit=100)
+    assert len(found) == 20
+    assert len(batches) == 1 and len(batches[0]) == 19
+    assert reader.stats["memories_loaded_from_cache"] == 19
+
+    await writer.store_memory(make_memory(99, tags={"BTCUSDT"}))
+    await reader.retrieve_memories("agent-a", tags=["BTCUSDT"], limit=100)
+    assert len(batches) == 1  # Within cache_refresh_seconds: served from the index
@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from cloud_trader.bigquery_streaming import BatchedRowWriter, BigQueryStreamer
+from cloud_trader.config import Settings
+
+
+class FakeBigQueryClient:
+    def __init__(self, fail: bool = False, delay: float = 0.0):
+        self.fail = fail
+        self.delay = delay
+        self.get_table_calls = 0
+        self.inserts = []
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def get_table(self, table_id):
+        self.get_table_calls += 1
+        return table_id
+
+    def insert_rows_json(self, table, rows):
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("bigquery unavailable")
+        with self.lock:
+            self.inserts.append((table, list(rows)))
+        return []
+
+    def close(self):
+        self.closed = True
+
+    def rows(self, table):
+        return [row for t, batch in self.inserts if t == table for row in batch]
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_size_triggered_flush_batches_rows_and_caches_table_ref():
+    client = FakeBigQueryClient()
+    writer = BatchedRowWriter(
+        client, {"trades": "p.d.trades"}, max_batch_rows=10, flush_interval_seconds=60
+    )
+    writer.start()
+    for i in range(25):
+        assert writer.enqueue("trades", {"i": i})
+
+    assert wait_for(lambda: len(client.rows("p.d.trades")) == 20)
+    writer.close()
+
+    assert [len(batch) for _, batch in client.inserts] == [10, 10, 5]
+    assert [r["i"] for r in client.rows("p.d.trades")] == list(range(25))
+    assert client.get_table_calls == 1
+
+
+def test_enqueue_does_not_wait_for_slow_inserts():
+    client = FakeBigQueryClient(delay=0.2)
+    writer = BatchedRowWriter(client, {"t": "p.d.t"}, max_batch_rows=1, flush_interval_seconds=60)
+    writer.start()
+
+    started = time.perf_counter()
+    for i in range(50):
+        writer.enqueue("t", {"i": i})
+    elapsed = time.perf_counter() - started
+    writer.close()
+
+    assert elapsed < 0.1
+    assert len(client.rows("p.d.t")) == 50
+
+
+def test_overflow_and_failed_flushes_spill_then_replay(tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    down = FakeBigQueryClient(fail=True)
+    writer = BatchedRowWriter(
+        down, {"t": "p.d.t"}, max_batch_rows=100, max_queue_rows=3, spill_path=str(spill)
+    )
+    for i in range(5):
+        assert writer.enqueue("t", {"i": i})
+    assert writer.stats["spilled"] == 2  # Queue full: rows 3 and 4 went straight to disk
+
+    writer.close()  # Flush fails, remaining rows spill too
+    assert writer.stats["spilled"] == 5
+    assert len(spill.read_text().splitlines()) == 5
+
+    up = FakeBigQueryClient()
+    restarted = BatchedRowWriter(up, {"t": "p.d.t"}, spill_path=str(spill))
+    restarted.start()
+    restarted.close()
+
+    assert sorted(r["i"] for r in up.rows("p.d.t")) == [0, 1, 2, 3, 4]
+    assert not spill.exists()
+
+
+def test_without_spill_path_overflow_is_dropped():
+    writer = BatchedRowWriter(FakeBigQueryClient(), {"t": "p.d.t"}, max_queue_rows=1)
+    assert writer.enqueue("t", {"i": 0})
+    assert not writer.enqueue("t", {"i": 1})
+    assert writer.stats["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_streamer_enqueues_serialized_rows(tmp_path):
+    settings = Settings(
+        GCP_PROJECT_ID="proj",
+        BIGQUERY_SPILL_PATH=str(tmp_path / "spill.jsonl"),
+        BIGQUERY_FLUSH_INTERVAL_SECONDS=60,
+    )
+    client = FakeBigQueryClient()
+    streamer = BigQueryStreamer(settings, client=client)
+    await streamer.initialize()
+    assert streamer.is_ready()
+
+    ts = datetime(2024, 1, 1, 12, 0, 0)
+    assert await streamer.stream_trade("btcusdt", "buy", 100.0, 1.0, 100.0, timestamp=ts)
+    assert await streamer.stream_trade_thesis(ts, "BTCUSDT", "agent", "breakout")
+    assert client.inserts == []  # Nothing sent on the caller's path
+    assert streamer.get_stats()["queued"] == 2
+
+    await streamer.close()
+
+    trade = client.rows("proj.trading_analytics.trades_stream")[0]
+    thesis = client.rows("proj.trading_analytics.trade_theses_stream")[0]
+    assert trade["symbol"] == "BTCUSDT"
+    assert thesis["timestamp"] == ts.isoformat()
+    json.dumps(thesis)
+    assert client.closed
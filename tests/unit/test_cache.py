@@ -0,0 +1,89 @@
+import pytest
+
+from cloud_trader import cache as cache_module
+from cloud_trader.cache import InMemoryCache
+from cloud_trader.strategy import MarketSnapshot
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock.monotonic)
+    return clock
+
+
+@pytest.mark.asyncio
+async def test_lru_bound_evicts_least_recently_used():
+    cache = InMemoryCache(max_entries=3)
+    for key in ("a", "b", "c"):
+        await cache.set(key, key.upper())
+    assert await cache.get("a") == "A"  # "a" is now the most recent
+
+    await cache.set("d", "D")
+
+    assert await cache.get_many(["a", "b", "c", "d"]) == {"a": "A", "c": "C", "d": "D"}
+    stats = await cache.get_stats()
+    assert stats["entries"] == 3 and stats["evictions"] == 1
+    assert (stats["hits"], stats["misses"]) == (4, 1)
+
+
+@pytest.mark.asyncio
+async def test_byte_bound_evicts_and_rejects_oversized_values():
+    cache = InMemoryCache(max_bytes=4000, sizeof=len)
+    for i in range(5):
+        await cache.set(f"k{i}", "x" * 900)
+    stats = await cache.get_stats()
+    assert stats["bytes"] <= 4000 and stats["evictions"] >= 1
+    assert await cache.get("k4") is not None
+
+    assert await cache.set("huge", "x" * 5000) is False
+    assert await cache.get("huge") is None
+
+
+@pytest.mark.asyncio
+async def test_expiry_is_lazy_on_read_and_heap_driven_on_write(clock):
+    cache = InMemoryCache()
+    await cache.set("short", 1, ttl=5)
+    await cache.set("long", 2, ttl=60)
+    await cache.set("forever", 3)
+    await cache.set("short", 4, ttl=30)  # Overwrite leaves a stale heap deadline behind
+
+    clock.now += 10
+    assert await cache.get("short") == 4
+    clock.now += 25
+    assert await cache.get("short") is None  # Expired entry is dropped on read
+
+    clock.now += 30
+    await cache.set("other", 5)  # Writes drain due deadlines without a scan
+    stats = await cache.get_stats()
+    assert stats["entries"] == 2  # forever, other
+    assert stats["expirations"] == 2
+
+
+@pytest.mark.asyncio
+async def test_rewritten_keys_do_not_grow_the_expiry_heap(clock):
+    cache = InMemoryCache()
+    for i in range(10_000):
+        await cache.set(f"book:{i % 10}", i, ttl=3600)
+    assert len(cache._expiry_heap) <= 2 * 10 + 64
+
+
+@pytest.mark.asyncio
+async def test_batch_paths_and_snapshot_helpers():
+    cache = InMemoryCache()
+    snapshots = {s: MarketSnapshot(price=1.0, volume=2.0, change_24h=0.1) for s in "AB"}
+    assert await cache.set_many({"x": 1, "y": 2}, ttl=10)
+    assert await cache.set_market_snapshots(snapshots)
+
+    assert await cache.get_many(["x", "missing", "y"]) == {"x": 1, "y": 2}
+    found = await cache.get_market_snapshots(["A", "B", "C"])
+    assert set(found) == {"A", "B"} and found["A"].price == 1.0
+    assert await cache.clear_pattern("market:*") == 2
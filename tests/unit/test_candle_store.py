@@ -0,0 +1,139 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cloud_trader.data.candle_store import CandleSeries, CandleStore
+from cloud_trader.data.feature_pipeline import FeaturePipeline
+
+HOUR_MS = 3_600_000
+
+
+def make_klines(n: int, end_ms: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    closes = 100 + np.cumsum(rng.normal(0, 1, n))
+    start = end_ms - (n - 1) * HOUR_MS
+    rows = []
+    for i, close in enumerate(closes):
+        rows.append([start + i * HOUR_MS, close - 0.2, close + 1.0, close - 1.0, close, 10.0])
+    return rows
+
+
+def current_hour_ms() -> int:
+    now = int(time.time() * 1000)
+    return now - now % HOUR_MS
+
+
+def test_streaming_ema_matches_pandas():
+    rows = make_klines(120, current_hour_ms())
+    series = CandleSeries("BTCUSDT", "1h", capacity=64)
+    series.extend(rows)
+
+    closes = pd.Series([r[4] for r in rows])
+    snap = series.snapshot()
+
+    assert snap["ema_20"] == pytest.approx(closes.ewm(span=20, adjust=False).mean().iloc[-1])
+    assert snap["ema_50"] == pytest.approx(closes.ewm(span=50, adjust=False).mean().iloc[-1])
+    assert 0.0 <= snap["rsi"] <= 100.0
+    assert len(series) == 64
+    assert series.to_array()[-1, 4] == pytest.approx(rows[-1][4])
+
+
+def test_live_bar_updates_do_not_commit_state():
+    series = CandleSeries("BTCUSDT", "1h")
+    series.extend(make_klines(30, current_hour_ms()))
+    committed = series.state
+
+    last = series.to_array()[-1]
+    series.upsert(int(last[0]), last[1], last[2] + 5, last[3], last[4] + 5, 20.0)
+
+    assert series.state is committed
+    assert series.snapshot()["close"] == pytest.approx(last[4] + 5)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_analyses_share_one_seed_download():
+    client = AsyncMock()
+    client.get_historical_klines.return_value = make_klines(100, current_hour_ms())
+    client.get_order_book.return_value = {"bids": [["99", "2"]], "asks": [["101", "1"]]}
+    pipeline = FeaturePipeline(client)
+
+    results = await asyncio.gather(*(pipeline.get_market_analysis("BTCUSDT") for _ in range(5)))
+    await pipeline.get_market_analysis("BTCUSDT")
+
+    assert client.get_historical_klines.await_count == 1
+    assert all(r["rsi"] == results[0]["rsi"] for r in results)
+    assert results[0]["bid_pressure"] == pytest.approx(2 / 3)
+
+
+@pytest.mark.asyncio
+async def test_kline_events_keep_series_fresh_without_rest():
+    client = AsyncMock()
+    store = CandleStore(client)
+    hour = current_hour_ms()
+    store.append_klines("ETHUSDT", "1h", make_klines(60, hour - HOUR_MS))
+
+    store.apply_kline_event(
+        {
+            "e": "kline",
+            "s": "ETHUSDT",
+            "k": {
+                "t": hour,
+                "s": "ETHUSDT",
+                "i": "1h",
+                "o": "1",
+                "h": "3",
+                "l": "1",
+                "c": "2",
+                "v": "5",
+            },
+        }
+    )
+    snap = await store.get_snapshot("ETHUSDT", "1h")
+
+    assert snap["close"] == 2.0
+    client.get_historical_klines.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_refresh_fetches_every_missed_interval_up_to_the_seed_limit():
+    client = AsyncMock()
+    store = CandleStore(client, seed_limit=100, refresh_after_seconds=0)
+    hour = current_hour_ms()
+    store.append_klines("BTCUSDT", "1h", make_klines(60, hour - 5 * HOUR_MS))
+    store.append_klines("ETHUSDT", "1h", make_klines(60, hour - 500 * HOUR_MS))
+    store.append_klines("SOLUSDT", "1h", make_klines(60, hour))
+
+    for symbol in ("BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT"):
+        await store.get_series(symbol, "1h")
+
+    limits = [call.args[2] for call in client.get_historical_klines.await_args_list]
+    assert limits == [6, 100, 2, 100]  # 5 missed bars + the last stored one; capped; seed
+
+
+@pytest.mark.asyncio
+async def test_position_protection_reads_atr_from_the_store(bare_trading_service):
+    client = AsyncMock()
+    client.get_historical_klines.return_value = make_klines(100, current_hour_ms())
+    service = bare_trading_service(
+        position_manager=None,
+        _settings=MagicMock(enable_paper_trading=False),
+        _exchange=client,
+        _candle_store=CandleStore(client),
+        _open_positions={
+            "BTCUSDT": {"agent_id": "a", "side": "BUY", "entry_price": 100.0, "quantity": 1.0}
+        },
+        _closing_positions=set(),
+        _agent_states={"a": MagicMock(leverage=1)},
+        partial_exit_strategy=MagicMock(),
+    )
+    service.partial_exit_strategy.update_position_price.return_value = []
+
+    for _ in range(5):  # Protect runs on every price update of a held symbol
+        await service._manage_positions({"BTCUSDT": {"lastPrice": "100.1"}})
+
+    assert service._candle_store.rest_fetches == 1
+    client.get_klines.assert_not_called()
@@ -0,0 +1,128 @@
+import copy
+import math
+
+import orjson
+
+from cloud_trader.dashboard_view import PATCH_MEDIA_TYPE, DashboardView
+
+
+def apply_patch(document, ops):
+    """Minimal RFC 6902 add/replace/remove for top-level keys and list items."""
+    document = copy.deepcopy(document)
+    for op in ops:
+        parts = op["path"].lstrip("/").split("/")
+        target = document
+        for part in parts[:-1]:
+            target = target[part]
+        last = parts[-1]
+        if isinstance(target, list):
+            if op["op"] == "add":
+                target.insert(len(target) if last == "-" else int(last), op["value"])
+            elif op["op"] == "remove":
+                target.pop(int(last))
+            else:
+                target[int(last)] = op["value"]
+        elif op["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = op["value"]
+    return document
+
+
+class FakeService:
+    def __init__(self):
+        self.positions = {"BTCUSDT": 1.0}
+        self.calls = {"positions": 0, "summary": 0}
+        self.view = DashboardView(max_age=math.inf, history=4)
+        self.view.register("positions", self.build_positions)
+        self.view.register("summary", self.build_summary, depends_on=("positions",))
+
+    def build_positions(self):
+        self.calls["positions"] += 1
+        return {"open_positions": [{"symbol": s, "pnl": p} for s, p in self.positions.items()]}
+
+    def build_summary(self):
+        self.calls["summary"] += 1
+        return {"total_pnl": sum(p["pnl"] for p in self.view.get("open_positions"))}
+
+
+def test_sections_rebuild_only_when_invalidated():
+    service = FakeService()
+    view = service.view
+    assert view.refresh() == 1
+    assert view.refresh() == 1
+    assert service.calls == {"positions": 1, "summary": 1}
+
+    view.invalidate("positions")  # Rebuilt, but nothing changed: no new version
+    assert view.refresh() == 1
+    assert service.calls == {"positions": 2, "summary": 1}
+
+    service.positions["ETHUSDT"] = 2.5
+    view.invalidate("positions")
+    assert view.refresh() == 2
+    assert service.calls == {"positions": 3, "summary": 2}  # Dependent followed the change
+    assert view.snapshot()["total_pnl"] == 3.5
+
+
+def test_etag_answers_304_until_the_view_changes():
+    service = FakeService()
+    view = service.view
+
+    status, body, media_type = view.respond()
+    assert status == 200 and media_type == "application/json"
+    assert orjson.loads(body)["version"] == 1
+    assert view.encoded() is body  # Serialized once per version
+
+    etag = view.etag
+    assert view.respond(if_none_match=etag)[:2] == (304, b"")
+    assert view.respond(if_none_match=f"W/{etag}")[0] == 304
+
+    view.append("messages", {"id": 1})
+    assert view.respond(if_none_match=etag)[0] == 200
+    assert view.stats["not_modified"] == 2
+
+
+def test_patches_replay_onto_any_retained_version():
+    service = FakeService()
+    view = service.view
+    view.refresh()
+    documents = {view.etag: orjson.loads(view.encoded())}
+
+    for i in range(3):
+        view.append("messages", {"id": i}, maxlen=2)
+        service.positions[f"S{i}USDT"] = float(i)
+        view.invalidate("positions")
+        view.refresh()
+        documents[view.etag] = orjson.loads(view.encoded())
+
+    current = documents[view.etag]
+    assert [m["id"] for m in current["messages"]] == [1, 2]
+    for etag, document in documents.items():
+        status, body, media_type = view.respond(since=etag)
+        assert media_type == PATCH_MEDIA_TYPE
+        assert apply_patch(document, orjson.loads(body)) == current
+
+    # Older than the retained history (or from the future): full document instead
+    for _ in range(4):
+        view.append("messages", {"id": "x"})
+        view.refresh()
+    assert view.patch_since(1) is None
+    assert view.respond(since=next(iter(documents)))[2] == "application/json"
+    assert view.patch_since(view.version + 5) is None
+    assert view.patch_since(view.version) == []
+
+
+def test_since_from_before_a_restart_gets_the_full_document():
+    before = FakeService().view
+    before.refresh()
+    stale_etag = before.etag
+
+    restarted = FakeService().view  # Same version numbers, different document
+    restarted.refresh()
+    assert restarted.version == before.version
+
+    for since in (stale_etag, str(before.version), "garbage"):
+        status, body, media_type = restarted.respond(since=since)
+        assert media_type == "application/json"
+        assert orjson.loads(body) == orjson.loads(restarted.encoded())
+    assert restarted.respond(since=f"W/{restarted.etag}")[1] == b"[]"
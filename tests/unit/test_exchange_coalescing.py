@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from cloud_trader.exchange import AsterClient
+
+
+class CountingSender:
+    def __init__(self, delay: float = 0.01):
+        self.calls = []
+        self.delay = delay
+
+    async def __call__(self, method, endpoint, params=None, signed=False):
+        self.calls.append((method, endpoint, dict(params or {}), signed))
+        await asyncio.sleep(self.delay)
+        return {"symbol": (params or {}).get("symbol"), "lastPrice": "100", "levels": [[1, 2]]}
+
+
+@pytest.fixture
+async def client():
+    c = AsterClient(get_cache_ttl=0.0)
+    yield c
+    await c.close()
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_gets_share_one_call(client):
+    sender = CountingSender()
+    client._send_request = sender
+
+    results = await asyncio.gather(*(client.get_ticker("BTCUSDT") for _ in range(5)))
+
+    assert len(sender.calls) == 1
+    assert all(r["lastPrice"] == "100" for r in results)
+    assert client.coalesce_stats["sent"] == 1
+    assert client.coalesce_stats["merged"] == 4
+
+
+@pytest.mark.asyncio
+async def test_different_params_are_not_merged(client):
+    sender = CountingSender()
+    client._send_request = sender
+
+    await asyncio.gather(client.get_ticker("BTCUSDT"), client.get_ticker("ETHUSDT"))
+
+    assert len(sender.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_signed_requests_bypass_single_flight(client):
+    sender = CountingSender()
+    client._send_request = sender
+
+    await asyncio.gather(*(client.get_account_info() for _ in range(3)))
+
+    assert len(sender.calls) == 3
+    assert client.coalesce_stats["merged"] == 0
+
+
+@pytest.mark.asyncio
+async def test_micro_ttl_serves_repeats_with_isolated_copies():
+    client = AsterClient(get_cache_ttl=5.0)
+    sender = CountingSender(delay=0)
+    client._send_request = sender
+
+    first = await client.get_order_book("BTCUSDT", limit=20)
+    first["levels"].append([9, 9])
+    second = await client.get_order_book("BTCUSDT", limit=20)
+
+    assert len(sender.calls) == 1
+    assert client.coalesce_stats["cached"] == 1
+    assert second["levels"] == [[1, 2]]
+    await client.close()
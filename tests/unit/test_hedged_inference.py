@@ -0,0 +1,207 @@
+import asyncio
+
+import pytest
+
+from cloud_trader import vertex_ai_client
+from cloud_trader.config import Settings
+from cloud_trader.mcp import MCPClient
+from cloud_trader.strategies import StrategySelector
+from cloud_trader.strategy import MarketSnapshot
+from cloud_trader.vertex_ai_client import VertexAIClient
+
+
+class FakeModelServer:
+    """Model backend with injected per-agent latency and failures."""
+
+    def __init__(self, name, latency=0.0, **latencies):
+        self.name = name
+        self.latency = latency
+        self.latencies = latencies
+        self.failing = set()
+        self.calls = []
+        self.prompts = []
+        self.completed = []
+
+    async def __call__(self, agent_id, prompt, **kwargs):
+        self.calls.append(agent_id)
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.latencies.get(agent_id.replace("-", "_"), self.latency))
+        if agent_id in self.failing:
+            raise RuntimeError(f"{self.name} unavailable")
+        self.completed.append(agent_id)
+        return {
+            "response": f"{self.name}:{prompt}",
+            "confidence": 0.8,
+            "metadata": {"inference_time": self.latency, "model": self.name},
+        }
+
+
+@pytest.fixture(autouse=True)
+def fast_hedging(monkeypatch):
+    client = VertexAIClient()
+    for name, value in {
+        "llm_hedge_delay_seconds": 0.05,
+        "llm_hedge_min_samples": 5,
+        "llm_decision_budget_seconds": 1.0,
+        "llm_prefetch_max_inflight": 2,
+    }.items():
+        monkeypatch.setattr(client._settings, name, value)
+
+
+def make_client(primary, fallback=None):
+    return VertexAIClient(model_backend=primary, fallback_backend=fallback)
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_its_late_answer_is_cached():
+    primary, fallback = FakeModelServer("gemini", latency=0.3), FakeModelServer("llm")
+    client = make_client(primary, fallback)
+
+    started = asyncio.get_running_loop().time()
+    result = await client.predict_with_fallback("trend-momentum-agent", "BTC?")
+    assert asyncio.get_running_loop().time() - started < 0.2
+    assert result["response"] == "llm:BTC?" and result["metadata"]["fallback"] is True
+
+    await asyncio.sleep(0.35)  # Late primary finishes in the background
+    assert client.get_hedging_metrics() == {
+        "hedged": 1,
+        "fallback_wins": 1,
+        "deadline_misses": 0,
+        "late_results": 1,
+        "prefetched": 0,
+        "prefetch_skipped": 0,
+        "background_tasks": 0,
+    }
+    again = await client.predict_with_fallback("trend-momentum-agent", "BTC?")
+    assert again["response"] == "gemini:BTC?" and again["metadata"]["cache"] == "hit"
+    assert len(primary.calls) == 1 and len(fallback.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_wins_and_failures_fall_back_at_once():
+    primary, fallback = FakeModelServer("gemini", latency=0.01), FakeModelServer("llm")
+    client = make_client(primary, fallback)
+
+    assert (await client.predict_with_fallback("vpin-hft", "a"))["response"] == "gemini:a"
+    assert fallback.calls == []
+
+    primary.failing.add("vpin-hft")
+    result = await client.predict_with_fallback("vpin-hft", "b")
+    assert result["response"] == "llm:b"
+    assert client.get_hedging_metrics()["hedged"] == 0  # A fallback, not a hedge
+
+    no_fallback = make_client(primary)
+    with pytest.raises(RuntimeError, match="gemini unavailable"):
+        await no_fallback.predict_with_fallback("vpin-hft", "c")
+
+
+@pytest.mark.asyncio
+async def test_hedge_delay_tracks_p95_and_budget_is_enforced():
+    primary, fallback = FakeModelServer("gemini", latency=0.5), FakeModelServer("llm", 0.5)
+    client = make_client(primary, fallback)
+    assert client.hedge_delay("market-analysis") == 0.05  # Too few samples yet
+
+    for sample in [0.1] * 18 + [0.4, 0.9]:
+        client._record_performance_metric("market-analysis", sample)
+    assert client.hedge_delay("market-analysis") == 0.9
+
+    started = asyncio.get_running_loop().time()
+    with pytest.raises(asyncio.TimeoutError):
+        await client.predict_with_fallback("market-analysis", "slow", budget=0.1)
+    assert asyncio.get_running_loop().time() - started < 0.3
+    assert client.get_hedging_metrics()["deadline_misses"] == 1
+    assert fallback.calls == []  # The p95 lies beyond the budget: no point hedging
+
+    await asyncio.sleep(0.5)
+    assert primary.completed == ["market-analysis"]
+    assert client.get_hedging_metrics()["late_results"] == 1
+
+
+@pytest.mark.asyncio
+async def test_consensus_does_not_wait_for_slow_agents(monkeypatch):
+    server = FakeModelServer("gemini", latency=0.01, financial_sentiment_agent=0.5)
+    mcp = MCPClient("http://mcp.invalid")
+    mcp._vertex_client = make_client(server)
+
+    async def publish(message):
+        pass
+
+    monkeypatch.setattr(mcp, "publish", publish)
+
+    agents = ["trend-momentum-agent", "financial-sentiment-agent", "vpin-hft"]
+    consensus = await mcp.query_multiple_agents(agents, "ETH?", budget=0.1)
+
+    assert consensus["late_agents"] == 1 and consensus["successful_responses"] == 2
+    assert consensus["responses"]["financial-sentiment-agent"]["late"] is True
+    assert consensus["consensus_confidence"] == 0.8
+    await mcp.close()
+
+
+@pytest.mark.asyncio
+async def test_prefetch_warms_the_cache_within_its_inflight_limit():
+    server = FakeModelServer("gemini", latency=0.05)
+    client = make_client(server)
+    state = {"symbol": "SOLUSDT", "price": 150.0}
+
+    assert await client.prefetch("market-analysis", "SOL?", market_state=state)
+    assert not await client.prefetch("market-analysis", "SOL?", market_state=state)
+    assert await client.prefetch("market-analysis", "ADA?")
+    assert not await client.prefetch("market-analysis", "XRP?")  # Two already in flight
+
+    result = await client.predict_with_fallback("market-analysis", "SOL?", market_state=state)
+    assert result["metadata"]["cache"] == "joined"
+    await asyncio.sleep(0.06)
+    assert not await client.prefetch("market-analysis", "SOL?", market_state=state)
+    assert server.calls == ["market-analysis"] * 2
+    assert client.get_hedging_metrics()["prefetched"] == 2
+
+
+@pytest.mark.asyncio
+async def test_strategy_prefetch_warms_the_next_decision(monkeypatch):
+    server = FakeModelServer("gemini", latency=0.05)
+    monkeypatch.setattr(vertex_ai_client, "_vertex_client", make_client(server))
+    selector = StrategySelector(enable_rl=False)
+    del selector.strategies["arbitrage"]  # Draws a random mock funding rate per evaluation
+    ranked = [
+        (symbol, MarketSnapshot(price=price, volume=1e6, change_24h=2.5))
+        for symbol, price in [("SOLUSDT", 150.0), ("ADAUSDT", 0.45), ("XRPUSDT", 0.6)]
+    ]
+
+    assert await selector.prefetch_ai_analysis(ranked) == 2  # llm_prefetch_max_inflight
+    await asyncio.sleep(0.1)
+    await selector.select_best_strategy("SOLUSDT", ranked[0][1])
+
+    assert server.calls == ["market-analysis"] * 2
+    metrics = vertex_ai_client._vertex_client.get_inference_cache_metrics()
+    assert metrics["hits"] == 1 and metrics["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_trading_cycle_prefetches_the_most_traded_symbols(monkeypatch, bare_trading_service):
+    server = FakeModelServer("gemini", latency=0.05)
+    monkeypatch.setattr(vertex_ai_client, "_vertex_client", make_client(server))
+
+    service = bare_trading_service(
+        _settings=Settings(_env_file=None, llm_prefetch_max_inflight=2),
+        market_data_manager=None,
+        _market_structure={"BTCUSDT": {}, "ETHUSDT": {}, "DOGEUSDT": {}},
+        _strategy_selector=None,
+        _prefetch_task=None,
+    )
+    ticker_map = {
+        symbol: {"lastPrice": "1.0", "volume": "10", "quoteVolume": quote}
+        for symbol, quote in [
+            ("BTCUSDT", "9e9"),
+            ("ETHUSDT", "5e9"),
+            ("DOGEUSDT", "1e8"),
+            ("DELISTEDUSDT", "9e10"),  # Not in the market structure
+        ]
+    }
+
+    service._prefetch_ai_analysis(ticker_map)
+    service._prefetch_ai_analysis(ticker_map)  # Skipped while the first is still warming
+    await service._prefetch_task
+    await asyncio.sleep(0.1)
+
+    warmed = {s for s in ticker_map for prompt in server.prompts if s in prompt}
+    assert len(server.calls) == 2 and warmed == {"BTCUSDT", "ETHUSDT"}
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from cloud_trader.backtest import data_loader  # noqa: E402
+from cloud_trader.backtest.data_loader import BacktestDataLoader  # noqa: E402
+from cloud_trader.data.feature_pipeline import FeaturePipeline  # noqa: E402
+from cloud_trader.data.history_store import HistoryBackfiller, HistoryStore  # noqa: E402
+
+HOUR_MS = 3_600_000
+START = datetime(2024, 3, 1, 20, tzinfo=timezone.utc)
+START_MS = int(START.timestamp() * 1000)
+
+
+def kline(open_ms: int, close: float):
+    return [open_ms, close, close + 1, close - 1, close, 10.0, open_ms + HOUR_MS - 1]
+
+
+class FakeKlineClient:
+    """Serves 1h klines from START for ``bars`` hours, honouring startTime/limit paging."""
+
+    def __init__(self, bars: int):
+        self.rows = [kline(START_MS + i * HOUR_MS, 100.0 + i) for i in range(bars)]
+        self.calls = []
+
+    async def get_klines(self, symbol, interval, limit=100, start_time=None, end_time=None):
+        self.calls.append((start_time, end_time, limit))
+        rows = [r for r in self.rows if start_time <= r[0] <= end_time]
+        return rows[:limit]
+
+
+def test_write_merges_day_partitions_and_reads_ranges(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.write_klines("BTCUSDT", "1h", [kline(START_MS + i * HOUR_MS, 100 + i) for i in range(6)])
+    store.write_klines("BTCUSDT", "1h", [kline(START_MS + 2 * HOUR_MS, 999.0)])
+
+    assert [d.isoformat() for d in store.days("BTCUSDT", "1h")] == ["2024-03-01", "2024-03-02"]
+    df = store.read_frame("BTCUSDT", "1h", START_MS + HOUR_MS, START_MS + 4 * HOUR_MS)
+    assert list(df["close"]) == [101.0, 999.0, 103.0]
+    assert df.index[0] == datetime(2024, 3, 1, 21)
+    assert store.tail("BTCUSDT", "1h", 2)[-1][4] == 105.0
+
+
+@pytest.mark.asyncio
+async def test_backfill_pages_and_only_fetches_missing_ranges(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    client = FakeKlineClient(bars=48)
+    backfiller = HistoryBackfiller(client, store, page_limit=10)
+    end_ms = START_MS + 48 * HOUR_MS
+
+    assert await backfiller.backfill("ETHUSDT", "1h", START_MS, end_ms) == 48
+    assert len(client.calls) == 5  # 10-bar pages
+
+    store_rows = store.read_table("ETHUSDT", "1h", START_MS + 20 * HOUR_MS, START_MS + 23 * HOUR_MS)
+    assert store_rows.num_rows == 3
+    client.calls.clear()
+    assert await backfiller.backfill("ETHUSDT", "1h", START_MS, end_ms) == 0
+    assert client.calls == []
+    assert store.missing_ranges("ETHUSDT", "1h", START_MS, end_ms + 2 * HOUR_MS) == [
+        (end_ms, end_ms + 2 * HOUR_MS)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_loaders_read_local_history_offline(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.write_klines("SOLUSDT", "1h", [kline(START_MS + i * HOUR_MS, 50 + i) for i in range(60)])
+
+    loader = BacktestDataLoader(history_store=store, allow_synthetic_data=False)
+    start = START.replace(tzinfo=None)
+    df = await loader.load_market_data("SOLUSDT", start, start + timedelta(hours=59))
+    assert len(df) == 60
+    assert df["close"].iloc[-1] == 109.0
+
+    missing = await loader.load_market_data("XRPUSDT", start, start + timedelta(hours=5))
+    assert missing.empty
+
+    pipeline = FeaturePipeline(None, history_store=store)
+    analysis = await pipeline.get_market_analysis("SOLUSDT")
+    assert analysis["close"] == 109.0
+    assert analysis["bars"] == 60
+
+
+class FakeBigQuery:
+    """market_data_stream rows every 15 minutes: stream snapshots, not 1h bars."""
+
+    def __init__(self, snapshots: int):
+        self.queries = []
+        self.rows = [
+            SimpleNamespace(
+                timestamp=START + timedelta(minutes=15 * i),
+                symbol="BTCUSDT",
+                open=100.0 + i,
+                high=101.0 + i,
+                low=99.0 + i,
+                close=100.5 + i,
+                volume=1.0,
+            )
+            for i in range(snapshots)
+        ]
+
+    def query(self, query, job_config=None):
+        self.queries.append(job_config)
+        return SimpleNamespace(result=lambda: self.rows)
+
+
+@pytest.mark.asyncio
+async def test_stream_rows_are_rolled_up_into_interval_bars(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        data_loader,
+        "bigquery",
+        SimpleNamespace(
+            QueryJobConfig=lambda query_parameters: query_parameters,
+            ScalarQueryParameter=lambda *args: args,
+        ),
+    )
+    store = HistoryStore(str(tmp_path))
+    loader = BacktestDataLoader(history_store=store, allow_synthetic_data=False)
+    loader._bq_client = FakeBigQuery(snapshots=10)  # Two full hours and half of a third
+    start = START.replace(tzinfo=None)
+
+    df = await loader.load_market_data("BTCUSDT", start, start + timedelta(hours=2))
+
+    assert list(df.index) == [start, start + timedelta(hours=1)]
+    assert list(df["open"]) == [100.0, 104.0]
+    assert list(df["high"]) == [104.0, 108.0]
+    assert list(df["low"]) == [99.0, 103.0]
+    assert list(df["close"]) == [103.5, 107.5]
+    assert list(df["volume"]) == [4.0, 4.0]
+    assert store.read_frame("BTCUSDT", "1h").equals(df)
+    # The half-covered third hour is not stored, so the range still goes to BigQuery
+    assert not store.is_complete("BTCUSDT", "1h", start, start + timedelta(hours=3))
+    await loader.load_market_data("BTCUSDT", start, start + timedelta(hours=1))
+    assert len(loader._bq_client.queries) == 1
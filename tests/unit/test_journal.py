@@ -0,0 +1,109 @@
+import os
+from collections import deque
+
+from cloud_trader.agent_performance import PerformanceTracker
+from cloud_trader.journal import AppendOnlyJournal
+
+
+def test_replay_returns_records_in_order(tmp_path):
+    path = str(tmp_path / "state.journal")
+    journal = AppendOnlyJournal(path, fsync_interval_seconds=0)
+    for i in range(5):
+        journal.append({"t": "trade", "i": i})
+    journal.close()
+
+    reopened = AppendOnlyJournal(path)
+    state, records = reopened.replay()
+    reopened.close()
+
+    assert state is None
+    assert [r["i"] for r in records] == [0, 1, 2, 3, 4]
+
+
+def test_torn_tail_is_cut_and_appends_continue(tmp_path):
+    path = str(tmp_path / "state.journal")
+    journal = AppendOnlyJournal(path, fsync_interval_seconds=0)
+    journal.append({"i": 0})
+    journal.append({"i": 1})
+    journal.close()
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 3)  # Crash mid-write of the last record
+
+    recovered = AppendOnlyJournal(path, fsync_interval_seconds=0)
+    assert [r["i"] for r in recovered.replay()[1]] == [0]
+    recovered.append({"i": 2})
+    recovered.close()
+
+    _, records = AppendOnlyJournal(path).replay()
+    assert [r["i"] for r in records] == [0, 2]
+
+
+def test_snapshot_truncates_and_skips_superseded_records(tmp_path):
+    path = str(tmp_path / "state.journal")
+    journal = AppendOnlyJournal(path, fsync_interval_seconds=0, compact_after_records=3)
+    for i in range(3):
+        journal.append({"i": i})
+    assert journal.needs_compaction
+
+    journal.write_snapshot({"upto": 2})
+    assert os.path.getsize(path) == 0
+    journal.append({"i": 3})
+    journal.close()
+
+    state, records = AppendOnlyJournal(path).replay()
+    assert state == {"upto": 2}
+    assert [r["i"] for r in records] == [3]
+
+
+def test_background_fsync_batches_appends(tmp_path):
+    journal = AppendOnlyJournal(str(tmp_path / "j"), fsync_interval_seconds=0.05)
+    for i in range(100):
+        journal.append({"i": i})
+    journal.close()
+
+    assert journal.stats["appended"] == 100
+    assert 1 <= journal.stats["fsyncs"] < 10
+
+
+def test_performance_tracker_replays_deltas(tmp_path):
+    tracker = PerformanceTracker(use_gcs=False, cache_dir=str(tmp_path))
+    tracker.record_trade("agent-a", "BTCUSDT", 5.0)
+    tracker.record_trade("agent-a", "BTCUSDT", -2.0)
+    tracker.record_trade("agent-b", "ETHUSDT", 1.0)
+    tracker._journal.close()
+
+    restored = PerformanceTracker(use_gcs=False, cache_dir=str(tmp_path))
+
+    assert restored.get_symbol_stats("agent-a", "BTCUSDT")["trade_count"] == 2
+    assert restored.get_symbol_stats("agent-a", "BTCUSDT")["total_pnl"] == 3.0
+    assert restored.get_symbol_win_rate("agent-b", "ETHUSDT") == 1.0
+
+
+class _Dashboard:
+    def invalidate(self, *sections):
+        pass
+
+
+def test_compaction_during_a_position_save_keeps_every_record(tmp_path, bare_trading_service):
+    path = str(tmp_path / "state.journal")
+
+    service = bare_trading_service(
+        position_manager=None,
+        _open_positions={s: {"size": 1.0} for s in ("A", "B", "C", "D")},
+        _persisted_positions={},
+        _recent_trades=deque(maxlen=200),
+        _dashboard=_Dashboard(),
+        _state_journal=AppendOnlyJournal(path, fsync_interval_seconds=0, compact_after_records=2),
+    )
+    service._save_positions()  # Four records: compaction is due after the second
+
+    del service._open_positions["B"]
+    service._open_positions["C"]["size"] = 2.0
+    service._save_positions()
+    service._state_journal.close()
+
+    replayed = bare_trading_service(
+        position_manager=None, _journal_replay=AppendOnlyJournal(path).replay()
+    )
+    replayed._load_positions()
+    assert replayed._open_positions == service._open_positions
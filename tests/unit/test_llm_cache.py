@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from cloud_trader.llm_cache import InferenceCache, canonicalize_prompt, price_tick, quantize
+from cloud_trader.vertex_ai_client import LocalStubModel, VertexAIClient
+
+
+def prompt_for(price, volume):
+    return f"Analyze BTCUSDT.\n  Price: ${price:,.2f}   Volume: {volume:,.0f}\nReply BUY/SELL/HOLD."
+
+
+def test_keys_ignore_small_ticks_but_not_material_moves():
+    cache = InferenceCache(significant_digits=3)
+    assert quantize(67_210.5) == 67_000.0 and quantize(0.012345, step=0.005) == 0.01
+    assert canonicalize_prompt("a  b\n c 1.5%", mask_numbers=True) == "a b c #"
+    assert price_tick(67_123.0) == 10.0 and price_tick(0.25) == 0.0001
+
+    def key(price, volume=1_000_000, **params):
+        state = {"symbol": "BTCUSDT", "price": price, "volume": volume}
+        return cache.make_key("market-analysis", "gemini", prompt_for(price, volume), params, state)
+
+    assert key(67_210.5) == key(67_213.0)  # Same price tick of 10
+    assert key(67_123.0) != key(67_499.0)
+    assert key(67_210.5, volume=1_001_000) == key(67_210.5)  # Same 3 significant digits
+    assert key(67_210.5) != key(67_210.5, volume=2_500_000)
+    assert key(67_210.5) != key(67_210.5, max_tokens=128)
+    # Without a market state the prompt numbers are part of the key
+    assert cache.make_key("a", "gemini", "last 4h") != cache.make_key("a", "gemini", "last 24h")
+    assert cache.make_key("a", "gemini", "BTC?") != cache.make_key("b", "gemini", "BTC?")
+
+
+def test_every_feature_the_prompt_renders_is_in_the_key():
+    cache = InferenceCache()
+    state = {
+        "symbol": "BTCUSDT",
+        "price": 67_210.5,
+        "rsi": 55.2,
+        "atr": 812.0,
+        "signals": {"momentum": {"direction": "BUY", "confidence": 0.62}},
+    }
+
+    def key(steps=None, **changes):
+        prompt, merged = "RSI # conf #", {**state, **changes}
+        return cache.make_key("market-analysis", "gemini", prompt, None, merged, steps)
+
+    def signals(confidence):
+        return {"momentum": {"direction": "BUY", "confidence": confidence}}
+
+    assert key(rsi=55.4) == key()
+    assert key(rsi=71.0) != key()
+    assert key(signals=signals(0.61)) == key()
+    assert key(signals=signals(0.9)) != key()
+    assert key(atr=950.0) != key()
+    assert key(steps={"rsi": 100.0}, rsi=71.0) == key(steps={"rsi": 100.0})  # Override
+
+
+@pytest.mark.asyncio
+async def test_predict_serves_nearby_states_from_cache():
+    stub = LocalStubModel(response="HOLD", latency=0.02)
+    client = VertexAIClient(model_backend=stub)
+
+    async def ask(price, volume):
+        state = {"price": price, "volume": volume}
+        prompt = prompt_for(price, volume)
+        return await client.predict("market-analysis", prompt, market_state=state)
+
+    first = await ask(67_210.5, 1e6)
+    second = await ask(67_212.0, 1.01e6)
+    await ask(70_000.0, 1e6)
+
+    assert first["response"] == second["response"] == "HOLD"
+    assert second["metadata"]["cache"] == "hit" and "cache" not in first["metadata"]
+    assert len(stub.calls) == 2
+
+    stats = client.get_performance_metrics("market-analysis")["cache"]
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+    assert stats["saved_latency_seconds"] >= 0.02
+
+    # A TTL of 0 always goes to the model
+    await client.predict("market-analysis", prompt_for(67_210.5, 1e6), cache_ttl=0)
+    assert len(stub.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_prompts_share_one_call():
+    stub = LocalStubModel(response="BUY", latency=0.05)
+    client = VertexAIClient(model_backend=stub)
+    state = {"symbol": "ETHUSDT", "price": 3_100.0}
+
+    results = await asyncio.gather(
+        *(client.predict("trend-momentum-agent", "ETH?", market_state=state) for _ in range(8))
+    )
+
+    assert len(stub.calls) == 1
+    assert all(result["response"] == "BUY" for result in results)
+    assert client.get_inference_cache_metrics()["joined"] == 7
+
+
+@pytest.mark.asyncio
+async def test_model_concurrency_is_bounded_and_empty_answers_not_cached(monkeypatch):
+    client = VertexAIClient(model_backend=LocalStubModel(latency=0.02))
+    monkeypatch.setattr(client._settings, "llm_max_concurrency_per_model", 2)
+    active, peak = 0, 0
+
+    async def backend(agent_id, prompt, **kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        assert client.get_inference_cache_metrics()["models_in_use"]["local-stub"] <= 2
+        await asyncio.sleep(0.02)
+        active -= 1
+        return {"response": "", "confidence": 0.0, "metadata": {"inference_time": 0.02}}
+
+    client._model_backend = backend
+    await asyncio.gather(*(client.predict("vpin-hft", f"q{i}") for i in range(6)))
+    assert peak == 2
+    assert client.get_inference_cache_metrics()["models_in_use"] == {"local-stub": 0}
+
+    await client.predict("vpin-hft", "q0")
+    assert client.get_inference_cache_metrics()["misses"] == 7
+
+
+@pytest.mark.asyncio
+async def test_callers_cannot_mutate_the_cached_response():
+    client = VertexAIClient(model_backend=LocalStubModel(response="HOLD"))
+    state = {"symbol": "SOLUSDT", "price": 150.0}
+
+    first = await client.predict("market-analysis", "SOL?", market_state=state)
+    first["response"] = "BUY"
+    first["metadata"]["annotated"] = True
+
+    again = await client.predict("market-analysis", "SOL?", market_state=state)
+    assert again["response"] == "HOLD" and "annotated" not in again["metadata"]
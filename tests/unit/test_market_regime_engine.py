@@ -0,0 +1,180 @@
+import asyncio
+import statistics
+import time
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+
+from cloud_trader import market_regime
+from cloud_trader.config import Settings
+from cloud_trader.data.candle_store import CandleStore
+from cloud_trader.market_data import MarketDataManager
+from cloud_trader.market_regime import MarketRegime, MarketRegimeDetector, RegimeEngine
+from cloud_trader.ticker_book import TickerBook, TickerStreamService
+
+HOUR_MS = 3_600_000
+
+
+def bars(seed=3, steps=300, drift=0.0005):
+    rng = np.random.default_rng(seed)
+    close = 60000 * np.cumprod(1 + rng.normal(drift, 0.003, steps))
+    high = close * (1 + np.abs(rng.normal(0, 0.001, steps)))
+    low = close * (1 - np.abs(rng.normal(0, 0.001, steps)))
+    volume = rng.uniform(10, 20, steps) + np.arange(steps) * 0.05
+    return close, high, low, volume
+
+
+def wilder(values, period=14):
+    avg = values[:period].mean()
+    for value in values[period:]:
+        avg += (value - avg) / period
+    return avg
+
+
+def test_streaming_indicators_match_batch_reference():
+    close, high, low, volume = bars()
+    engine = RegimeEngine()
+    for t in range(len(close)):
+        engine.update({"BTCUSDT": (close[t], high[t], low[t], volume[t])})
+    row = engine.row("BTCUSDT")
+
+    window = close[-20:]
+    assert abs(engine.sum20[row] / 20 + engine.anchor[row] - window.mean()) < 1e-6
+    variance = (engine.sumsq20[row] - 20 * (engine.sum20[row] / 20) ** 2) / 19
+    assert abs(np.sqrt(variance) - statistics.stdev(window.tolist())) < 1e-6
+
+    changes = np.diff(close)
+    avg_gain = wilder(np.maximum(changes, 0))
+    avg_loss = wilder(np.maximum(-changes, 0))
+    assert abs(engine.rsi[row] - (100 - 100 / (1 + avg_gain / avg_loss))) < 1e-9
+
+    ema = close[:12].mean()
+    for price in close[12:]:
+        ema += (price - ema) * 2 / 13
+    assert abs(engine.ema12[row] - ema) < 1e-6
+
+    recent = volume[-20:]
+    slope = statistics.linear_regression(list(range(20)), recent.tolist()).slope
+    assert abs(engine.volume_trend[row] - slope / recent.mean()) < 1e-9
+
+
+def test_batch_update_matches_independent_single_symbol_engines():
+    series = {f"S{i}USDT": bars(seed=i, drift=0.002 * (i - 2)) for i in range(5)}
+    batch = RegimeEngine()
+    singles = {symbol: RegimeEngine() for symbol in series}
+
+    for t in range(200):
+        batch.update({s: (c[t], h[t], l[t], v[t]) for s, (c, h, l, v) in series.items()})
+        for symbol, (c, h, l, v) in series.items():
+            singles[symbol].update({symbol: (c[t], h[t], l[t], v[t])})
+
+    for symbol, single in singles.items():
+        expected = single.get_metrics(symbol).to_dict()
+        actual = batch.get_metrics(symbol).to_dict()
+        expected.pop("timestamp_us")
+        actual.pop("timestamp_us")
+        assert actual == expected
+    assert batch.get_regimes()["S4USDT"] == MarketRegime.TRENDING_UP.value
+    assert batch.get_regimes()["S0USDT"] == MarketRegime.TRENDING_DOWN.value
+
+
+def test_warm_up_and_queued_bars_flush_on_read():
+    close, high, low, volume = bars(steps=30)
+    engine = RegimeEngine(min_periods=20)
+    for t in range(19):
+        engine.queue_bar("ETHUSDT", close[t], high[t], low[t], volume[t])
+    assert engine.get_metrics("ETHUSDT") is None  # 19 bars: still warming up
+
+    engine.queue_bar("ETHUSDT", close[19], high[19], low[19], volume[19])
+    assert engine.get_metrics("ETHUSDT") is not None
+    assert engine.get_stats("ETHUSDT")["total_regimes"] == 1
+    assert engine.get_metrics("UNKNOWNUSDT") is None
+
+
+@pytest.mark.asyncio
+async def test_queued_bars_flush_without_a_reader():
+    close, high, low, volume = bars(steps=30)
+    engine = RegimeEngine(min_periods=20, flush_delay_seconds=0.01)
+    for t in range(25):  # A seed's worth of bar closes from the candle store
+        for symbol in ("BTCUSDT", "ETHUSDT"):
+            engine.queue_bar(symbol, close[t], high[t], low[t], volume[t])
+    assert sum(len(b) for b in engine._pending.values()) == 50
+
+    await asyncio.sleep(0.05)
+
+    assert engine._pending == {}
+    assert engine.count[[engine.row("BTCUSDT"), engine.row("ETHUSDT")]].tolist() == [25, 25]
+
+
+def test_detector_keeps_single_series_api():
+    close, high, low, volume = bars()
+    detector = MarketRegimeDetector()
+    results = [
+        detector.add_price_data(close[t], volume[t], high[t], low[t]) for t in range(len(close))
+    ]
+
+    assert results[18] is None and results[19] is not None
+    stats = detector.get_market_regime_stats()
+    assert stats["total_regimes"] == len(close) - 19
+    assert stats["current_regime"] == results[-1].regime.value
+
+
+def test_candle_store_bar_closes_feed_listeners():
+    store = CandleStore()
+    closed = []
+    store.add_bar_close_listener(lambda symbol, interval, row: closed.append((symbol, row[4])))
+
+    store.append_klines("BTCUSDT", "1h", [[0, 1, 2, 0.5, 1.5, 10], [3_600_000, 1.5, 2, 1, 1.8, 5]])
+    store.append_klines("BTCUSDT", "1h", [[3_600_000, 1.5, 2, 1, 1.9, 6]])  # Live bar update
+
+    assert closed == [("BTCUSDT", 1.5)]
+
+
+def exchange_symbol(symbol, status="TRADING"):
+    return {"symbol": symbol, "status": status, "filters": []}
+
+
+@pytest.mark.asyncio
+async def test_market_structure_symbols_reach_the_regime_endpoint(
+    monkeypatch, bare_trading_service
+):
+    api = pytest.importorskip("cloud_trader.api")
+    monkeypatch.setattr(market_regime, "_regime_engine", None)
+
+    close, high, low, volume = bars(steps=100)
+    hour = int(time.time() * 1000) // HOUR_MS * HOUR_MS
+    klines = [
+        [hour - (99 - t) * HOUR_MS, close[t], high[t], low[t], close[t], volume[t]]
+        for t in range(100)
+    ]
+    client = AsyncMock()
+    client.get_exchange_info.return_value = {
+        "symbols": [
+            exchange_symbol("BTCUSDT"),
+            exchange_symbol("ETHUSDT"),
+            exchange_symbol("OLDUSDT", status="SETTLING"),
+        ]
+    }
+    client.get_all_tickers.return_value = []
+    client.get_historical_klines.return_value = klines
+
+    # Only the pieces _init_online_components wires between the structure and the engine
+    service = bare_trading_service(
+        _settings=Settings(_env_file=None),
+        _regime_interval="1h",
+        market_data_manager=MarketDataManager(client),
+        _ticker_book=TickerBook(client),
+        _candle_store=CandleStore(client),
+    )
+    service._candle_store.add_bar_close_listener(service._on_bar_close)
+    service._ticker_stream = TickerStreamService(
+        service._ticker_book, candle_store=service._candle_store, kline_interval="1h"
+    )
+
+    await service._fetch_market_structure()
+
+    assert service._ticker_stream.kline_symbols == ["BTCUSDT", "ETHUSDT"]
+    response = await api.get_market_regime()
+    assert set(response["symbol_regimes"]) == {"BTCUSDT", "ETHUSDT"}
+    assert (await api.get_market_regime("BTCUSDT"))["status"] == "active"
@@ -0,0 +1,173 @@
+import statistics
+
+import numpy as np
+import pytest
+
+from cloud_trader.multi_timeframe import (
+    AnalysisType,
+    MultiTimeframeAnalyzer,
+    Timeframe,
+    TimeframeData,
+)
+
+DAY_MS = 86_400_000
+
+
+def minute_bars(seed=5, steps=600, start_ms=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0.0003, 0.002, steps))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.0005, steps)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.0005, steps)))
+    volume = rng.uniform(1, 5, steps)
+    times = start_ms + np.arange(steps) * 60_000
+    return list(zip(times.tolist(), open_, high, low, close, volume))
+
+
+def wilder_rsi(closes, period=14):
+    changes = np.diff(closes)
+    gains, losses = np.maximum(changes, 0), np.maximum(-changes, 0)
+    avg_gain, avg_loss = gains[:period].mean(), losses[:period].mean()
+    for gain, loss in zip(gains[period:], losses[period:]):
+        avg_gain += (gain - avg_gain) / period
+        avg_loss += (loss - avg_loss) / period
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def test_rollups_match_resampled_base_stream():
+    analyzer = MultiTimeframeAnalyzer()
+    bars = minute_bars()
+    for bar in bars:
+        analyzer.aggregator.add_bar("BTCUSDT", *bar)
+
+    data = analyzer.market_data["BTCUSDT"]
+    assert len(data[Timeframe.ONE_MINUTE]) == 600
+    assert len(data[Timeframe.FIVE_MINUTES]) == 120
+    assert len(data[Timeframe.ONE_HOUR]) == 10
+    assert len(data[Timeframe.FOUR_HOURS]) == 2  # Hours 0-4 and 4-8; 8-10 still forming
+    assert Timeframe.ONE_DAY not in data
+
+    for i, bar in enumerate(data[Timeframe.FIFTEEN_MINUTES]):
+        chunk = bars[i * 15 : (i + 1) * 15]
+        assert bar.timestamp_us == chunk[0][0] * 1000
+        assert bar.open_price == chunk[0][1]
+        assert bar.high_price == max(b[2] for b in chunk)
+        assert bar.low_price == min(b[3] for b in chunk)
+        assert bar.close_price == chunk[-1][4]
+        assert bar.volume == pytest.approx(sum(b[5] for b in chunk))
+
+
+def test_gaps_close_partial_buckets_and_stale_bars_are_dropped():
+    analyzer = MultiTimeframeAnalyzer()
+    aggregator = analyzer.aggregator
+    aggregator.add_bar("ETHUSDT", 0, 10, 11, 9, 10.5, 1)
+    aggregator.add_bar("ETHUSDT", 60_000, 10.5, 12, 10, 11, 2)
+
+    closed = aggregator.add_bar("ETHUSDT", 7 * 60_000, 11, 11, 10, 10, 3)  # Minutes 2-6 missing
+    five = [bar for bar in closed if bar.timeframe == Timeframe.FIVE_MINUTES]
+    assert [(b.timestamp_us, b.high_price, b.volume) for b in five] == [(0, 12, 3)]
+
+    assert aggregator.add_bar("ETHUSDT", 60_000, 1, 1, 1, 1, 1) == []
+    assert aggregator.stats["stale"] == 1
+
+
+def test_trades_build_minute_bars_and_weekly_buckets_start_monday():
+    analyzer = MultiTimeframeAnalyzer()
+    aggregator = analyzer.aggregator
+    monday = 4 * DAY_MS  # 1970-01-05
+    aggregator.add_trade("BTCUSDT", monday + 1_000, 100.0, 1.0)
+    aggregator.add_trade("BTCUSDT", monday + 30_000, 103.0, 0.5)
+    aggregator.add_trade("BTCUSDT", monday + 59_000, 101.0, 0.5)
+    assert "BTCUSDT" not in analyzer.stats  # The minute is still open
+
+    closed = aggregator.add_trade("BTCUSDT", monday + 61_000, 102.0, 1.0)
+    minute = closed[0]
+    assert minute.timeframe == Timeframe.ONE_MINUTE
+    assert (minute.open_price, minute.high_price, minute.close_price) == (100.0, 103.0, 101.0)
+    assert minute.volume == 2.0
+
+    aggregator.add_bar("BTCUSDT", monday + 7 * DAY_MS - 60_000, 1, 1, 1, 1, 1)  # Sunday 23:59
+    weekly = analyzer.market_data["BTCUSDT"][Timeframe.ONE_WEEK]
+    assert [bar.timestamp_us for bar in weekly] == [monday * 1000]
+
+
+def test_streaming_stats_match_batch_reference():
+    analyzer = MultiTimeframeAnalyzer()
+    bars = minute_bars(steps=300)
+    for bar in bars:
+        analyzer.aggregator.add_bar("BTCUSDT", *bar)
+
+    stats = analyzer.stats["BTCUSDT"][Timeframe.ONE_MINUTE]
+    closes = np.array([b[4] for b in bars])
+    volumes = [b[5] for b in bars]
+
+    expected = statistics.linear_regression(range(10), closes[-10:].tolist()).slope
+    assert stats.trend.slope == pytest.approx(expected, rel=1e-9)
+    expected = statistics.linear_regression(range(15), volumes[-15:]).slope
+    assert stats.volume.slope == pytest.approx(expected, rel=1e-9, abs=1e-12)
+    assert stats.volume.mean == pytest.approx(statistics.fmean(volumes[-15:]))
+    assert stats.rsi == pytest.approx(wilder_rsi(closes), abs=1e-9)
+    assert stats.prev_rsi == pytest.approx(wilder_rsi(closes[:-1]), abs=1e-9)
+
+    returns = np.diff(closes[-30:]) / closes[-30:-1]
+    assert stats.volatility == pytest.approx(np.sqrt(np.mean(returns**2)), rel=1e-9)
+
+
+@pytest.mark.asyncio
+async def test_analyze_all_runs_every_symbol_from_streaming_stats():
+    analyzer = MultiTimeframeAnalyzer()
+    for seed, symbol in enumerate(["BTCUSDT", "ETHUSDT", "SOLUSDT"]):
+        for bar in minute_bars(seed=seed, steps=400):
+            analyzer.aggregator.add_bar(symbol, *bar)
+
+    results = await analyzer.analyze_all(Timeframe.FIVE_MINUTES)
+
+    assert set(results) == {"BTCUSDT", "ETHUSDT", "SOLUSDT"}
+    for symbol, signals in results.items():
+        single = await analyzer.analyze_symbol(symbol, Timeframe.FIVE_MINUTES)
+        assert [(s.analysis_type, s.signal_type, s.overall_score) for s in signals] == [
+            (s.analysis_type, s.signal_type, s.overall_score) for s in single
+        ]
+        types = {signal.analysis_type for signal in signals}
+        assert AnalysisType.TREND_ALIGNMENT in types
+        assert AnalysisType.VOLATILITY_REGIME in types
+
+
+class RecordingCache:
+    def __init__(self):
+        self.batches = []
+
+    def is_connected(self):
+        return True
+
+    async def set_many(self, data, ttl=None):
+        self.batches.append((dict(data), ttl))
+        return True
+
+
+@pytest.mark.asyncio
+async def test_cache_writes_are_coalesced_per_flush_interval():
+    analyzer = MultiTimeframeAnalyzer(cache_flush_interval=0.01)
+    analyzer._cache = RecordingCache()
+    analyzer._cache_ready = True
+
+    for bar in minute_bars(steps=10):
+        analyzer.aggregator.add_bar("BTCUSDT", *bar)
+    assert analyzer.get_analysis_stats()["pending_cache_writes"] == 12  # 10 x 1m, 2 x 5m
+
+    await analyzer._flush_task
+    batches = analyzer._cache.batches
+    assert len(batches) == 1
+    keys, ttl = batches[0]
+    assert ttl == 3600 and len(keys) == 12
+    assert "mtf_data:BTCUSDT:5m:0" in keys
+    assert await analyzer.flush_cache() == 0
+
+
+def test_direct_bars_still_feed_the_analyzer():
+    analyzer = MultiTimeframeAnalyzer()
+    data = TimeframeData(Timeframe.ONE_HOUR, "BTCUSDT", 0, 1.0, 2.0, 0.5, 1.5, 10.0)
+    analyzer.add_market_data(data)
+
+    assert analyzer.stats["BTCUSDT"][Timeframe.ONE_HOUR].last is data
+    assert analyzer.get_analysis_stats()["total_data_points"] == 1
@@ -0,0 +1,116 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from cloud_trader.agents.vpin_hft_agent import VpinHFTAgent
+from cloud_trader.data.feature_pipeline import FeaturePipeline
+from cloud_trader.order_book import LocalOrderBook, OrderBookManager
+
+SNAPSHOT = {
+    "lastUpdateId": 100,
+    "bids": [["99.0", "2"], ["98.0", "3"], ["97.0", "5"]],
+    "asks": [["101.0", "1"], ["102.0", "4"], ["103.0", "5"]],
+}
+
+
+def diff(U, u, pu, bids=(), asks=()):
+    return {
+        "e": "depthUpdate",
+        "s": "BTCUSDT",
+        "E": u,
+        "U": U,
+        "u": u,
+        "pu": pu,
+        "b": [list(b) for b in bids],
+        "a": [list(a) for a in asks],
+    }
+
+
+def test_diff_merge_keeps_sides_sorted_and_removes_zero_levels():
+    book = LocalOrderBook("BTCUSDT")
+    book.apply_snapshot(SNAPSHOT)
+    book.apply_diff(diff(101, 101, 100, bids=[("99.5", "1"), ("98.0", "0")], asks=[("101.0", "2")]))
+
+    assert book.bid_prices.tolist() == [99.5, 99.0, 97.0]
+    assert book.ask_sizes.tolist() == [2.0, 4.0, 5.0]
+    f = book.features
+    assert f["best_bid"] == 99.5 and f["best_ask"] == 101.0
+    assert f["spread_pct"] == pytest.approx(1.5 / 101.0)
+    # Microprice: (99.5 * 2 + 101 * 1) / 3
+    assert f["microprice"] == pytest.approx((99.5 * 2 + 101.0) / 3)
+    assert f["book_imbalance"] == pytest.approx((8 - 11) / 19)
+
+
+@pytest.mark.asyncio
+async def test_manager_syncs_from_snapshot_and_resyncs_on_gap():
+    client = AsyncMock()
+    client.get_order_book.return_value = SNAPSHOT
+    manager = OrderBookManager(client, resync_backoff_seconds=0, snapshot_interval_seconds=0)
+
+    manager.apply_event(diff(95, 99, 94))  # Older than the snapshot: dropped on replay
+    manager.apply_event(diff(100, 102, 99, bids=[("99.0", "7")]))
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert manager.get_book("BTCUSDT").bid_sizes[0] == 7.0
+
+    manager.apply_event(diff(103, 103, 102, asks=[("101.0", "0")]))
+    assert manager.get_features("BTCUSDT")["best_ask"] == 102.0
+
+    manager.apply_event(diff(110, 110, 108))  # Missed 104..108
+    assert manager.get_book("BTCUSDT").last_update_id == 103  # Last good book meanwhile
+    client.get_order_book.return_value = {**SNAPSHOT, "lastUpdateId": 109}
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert manager.stats["gaps"] == 1
+    assert client.get_order_book.await_count == 2
+    assert manager.get_book("BTCUSDT").last_update_id == 110
+    assert client.get_order_book.await_args.kwargs["limit"] == 100
+
+
+@pytest.mark.asyncio
+async def test_reconnect_resyncs_are_spread_out():
+    client = AsyncMock()
+    client.get_order_book.return_value = SNAPSHOT
+    manager = OrderBookManager(client, snapshot_interval_seconds=0.02)
+    requested = []
+    client.get_order_book.side_effect = lambda symbol, limit: (
+        requested.append(asyncio.get_running_loop().time()) or SNAPSHOT
+    )
+
+    for symbol in ["BTCUSDT", "ETHUSDT", "SOLUSDT", "ADAUSDT"]:
+        manager.apply_event({**diff(100, 101, 99), "s": symbol})
+    await asyncio.sleep(0.1)
+
+    assert manager.get_stats()["synced"] == 4
+    gaps = [later - earlier for earlier, later in zip(requested, requested[1:])]
+    assert len(requested) == 4 and min(gaps) >= 0.015
+
+
+@pytest.mark.asyncio
+async def test_feature_pipeline_prefers_local_book_over_rest():
+    client = AsyncMock()
+    client.get_historical_klines.return_value = []
+    manager = OrderBookManager(client)
+    book = LocalOrderBook("BTCUSDT")
+    book.apply_snapshot(SNAPSHOT)
+    manager._books["BTCUSDT"] = book
+    manager._synced["BTCUSDT"] = True
+
+    analysis = await FeaturePipeline(client, order_books=manager).get_market_analysis("BTCUSDT")
+
+    client.get_order_book.assert_not_called()
+    assert analysis["bid_pressure"] == pytest.approx(10 / 20)
+    assert "microprice" in analysis
+
+
+def test_vpin_quote_imbalance_accepts_local_book():
+    book = LocalOrderBook("BTCUSDT")
+    book.apply_snapshot(SNAPSHOT)
+    agent = VpinHFTAgent(None, None, "risk")
+
+    result = agent.calculate_quote_imbalance(book)
+
+    assert result["bid_volume"] == 10.0 and result["ask_volume"] == 10.0
+    assert result["quote_imbalance"] == 0.0
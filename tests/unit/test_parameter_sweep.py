@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cloud_trader.backtest.vectorized import MarketArrays
+from cloud_trader.optimization import optuna_runner
+from cloud_trader.optimization.sweep import (
+    ParameterSweepRunner,
+    SharedMarketData,
+    evaluate_params,
+    walk_forward_windows,
+)
+
+
+def make_frame(seed: int, bars: int = 400) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, bars)
+    shocks = rng.random(bars) < 0.03
+    returns[shocks] += rng.choice([-0.45, 0.6], shocks.sum())
+    close = 100 * np.exp(np.cumsum(returns))
+    index = pd.DatetimeIndex([datetime(2024, 1, 1) + timedelta(hours=i) for i in range(bars)])
+    return pd.DataFrame(
+        {"open": close, "high": close, "low": close, "close": close, "volume": 1e5},
+        index=index,
+    )
+
+
+@pytest.fixture
+def arrays():
+    return MarketArrays.from_frames({"BTCUSDT": make_frame(1), "ETHUSDT": make_frame(2)})
+
+
+GRID = {"bb_period": [15, 20], "take_profit_pct": [0.02, 0.05]}
+
+
+def test_memory_mapped_data_round_trips(arrays, tmp_path):
+    shared = SharedMarketData.create(arrays, str(tmp_path))
+    loaded = shared.load()
+
+    assert isinstance(loaded.close, np.memmap)
+    assert loaded.timestamps.equals(arrays.timestamps)
+    assert evaluate_params(loaded, {"bb_period": 20}, (0, 200)) == evaluate_params(
+        arrays, {"bb_period": 20}, (0, 200)
+    )
+
+
+def test_walk_forward_windows_roll_forward():
+    windows = walk_forward_windows(400, train_bars=200, test_bars=50)
+
+    assert [(w.train_start, w.test_end) for w in windows] == [
+        (0, 250),
+        (50, 300),
+        (100, 350),
+        (150, 400),
+    ]
+    assert all(w.train_end == w.test_start for w in windows)
+
+
+def test_grid_results_are_cached_and_resume(arrays, tmp_path):
+    cache_path = str(tmp_path / "sweep.jsonl")
+    with ParameterSweepRunner(arrays, cache_path=cache_path, max_workers=2) as runner:
+        first = runner.run_grid(GRID)
+    assert len(first) == 4
+    assert not any(r.cached for r in first)
+
+    with ParameterSweepRunner(arrays, cache_path=cache_path, max_workers=2) as runner:
+        second = runner.run_grid(GRID)
+        assert runner._pool is None  # nothing left to compute
+    assert all(r.cached for r in second)
+    assert [r.metrics for r in second] == [r.metrics for r in first]
+
+
+def test_walk_forward_scores_best_train_params_out_of_sample(arrays, tmp_path):
+    windows = walk_forward_windows(len(arrays.timestamps), train_bars=200, test_bars=100)
+    with ParameterSweepRunner(arrays, max_workers=2) as runner:
+        report = runner.walk_forward(GRID, windows)
+
+    assert len(report) == len(windows)
+    for row in report:
+        assert row["params"]["bb_period"] in GRID["bb_period"]
+        assert row["params"]["take_profit_pct"] in GRID["take_profit_pct"]
+        assert "sharpe_ratio" in row["test"]
+
+
+def test_pnl_cache_reloads_changed_files(tmp_path):
+    csv = tmp_path / "pnl.csv"
+    csv.write_text("pnl\n1.0\n2.0\n")
+    assert optuna_runner.load_pnl(csv).sum() == 3.0
+    assert optuna_runner.load_pnl(csv) is optuna_runner.load_pnl(csv)
+
+    csv.write_text("pnl\n1.0\n2.0\n4.0\n")
+    assert optuna_runner.load_pnl(csv).sum() == 7.0
+    assert len(optuna_runner._PNL_CACHE) == 1
+
+    optuna_runner.clear_pnl_cache()
+    assert optuna_runner._PNL_CACHE == {}
@@ -0,0 +1,163 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from cloud_trader.stage_scheduler import Stage, StageScheduler
+from cloud_trader.ticker_book import TickerBook
+
+
+async def run_for(scheduler: StageScheduler, seconds: float) -> None:
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(seconds)
+    scheduler.stop()
+    await task
+
+
+@pytest.mark.asyncio
+async def test_slow_stage_does_not_delay_fast_stage():
+    calls = {"fast": 0}
+
+    async def slow():
+        await asyncio.sleep(1.0)
+
+    async def fast():
+        calls["fast"] += 1
+
+    scheduler = StageScheduler()
+    scheduler.add(Stage("slow", slow, 0.01, deadline_seconds=5.0, jitter_fraction=0))
+    scheduler.add(Stage("fast", fast, 0.02, deadline_seconds=1.0, jitter_fraction=0))
+    await run_for(scheduler, 0.3)
+
+    assert calls["fast"] >= 8
+    assert scheduler.stages["slow"].runs == 1  # Its first run was cut short by stop
+
+
+@pytest.mark.asyncio
+async def test_deadline_overrun_is_counted_and_optionally_cancelled():
+    async def hang():
+        await asyncio.sleep(10)
+
+    scheduler = StageScheduler()
+    scheduler.add(
+        Stage("hang", hang, 0.01, deadline_seconds=0.03, cancel_on_deadline=True, jitter_fraction=0)
+    )
+    await run_for(scheduler, 0.2)
+
+    stage = scheduler.stages["hang"]
+    assert stage.deadline_overruns >= 2
+    # The run in flight when the scheduler stops is cut short before its deadline
+    assert stage.runs - 1 <= stage.deadline_overruns <= stage.runs
+    assert stage.max_duration < 0.2
+
+
+@pytest.mark.asyncio
+async def test_trigger_wakes_stage_before_its_interval():
+    ran = asyncio.Event()
+
+    async def protect():
+        ran.set()
+
+    scheduler = StageScheduler()
+    scheduler.add(Stage("protect", protect, 60.0, deadline_seconds=1.0, run_on_start=False))
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.01)
+
+    scheduler.trigger("protect")
+    await asyncio.wait_for(ran.wait(), timeout=0.5)
+    scheduler.stop()
+    await task
+
+    assert scheduler.stages["protect"].triggered_runs == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_are_isolated_per_stage():
+    async def broken():
+        raise RuntimeError("exchange down")
+
+    scheduler = StageScheduler()
+    scheduler.add(Stage("broken", broken, 0.01, deadline_seconds=1.0, jitter_fraction=0))
+    await run_for(scheduler, 0.1)
+
+    stats = scheduler.get_stats()["broken"]
+    assert stats["errors"] == stats["runs"] >= 3
+
+
+@pytest.mark.asyncio
+async def test_ticker_book_notifies_listeners_with_updated_symbols():
+    book = TickerBook()
+    seen = []
+    book.add_update_listener(seen.append)
+
+    await book.handle_stream_message(
+        [{"e": "24hrTicker", "s": "BTCUSDT", "c": "100"}, {"e": "bookTicker", "s": "ETHUSDT"}]
+    )
+    await book.handle_stream_message({"e": "unknown"})
+
+    assert seen == [{"BTCUSDT", "ETHUSDT"}]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_stages_close_a_position_once(bare_trading_service):
+    service = bare_trading_service(
+        position_manager=None,
+        _open_positions={"BTCUSDT": {"side": "BUY", "quantity": 1.0}},
+        _closing_positions=set(),
+        _pending_orders={},
+    )
+    orders = []
+
+    async def execute_trade_order(agent, symbol, side, quantity, thesis, is_closing=False):
+        orders.append((symbol, side, is_closing))
+        await asyncio.sleep(0.02)  # Execution jitter
+        if thesis == "fails":
+            raise RuntimeError("rejected")
+        del service._open_positions[symbol]
+
+    service._execute_trade_order = execute_trade_order
+
+    with pytest.raises(RuntimeError):
+        await service._close_position(None, "BTCUSDT", "BUY", 1.0, "fails")
+    assert service._closing_positions == set()  # A failed close can be retried
+
+    protect, trading_cycle = await asyncio.gather(
+        service._close_position(None, "BTCUSDT", "BUY", 1.0, "Take Profit"),
+        service._close_position(None, "BTCUSDT", "BUY", 1.0, "Signal Flip"),
+    )
+    assert (protect, trading_cycle) == (True, False)
+    assert orders == [("BTCUSDT", "BUY", True)] * 2  # The failed attempt and one close
+    assert service._closing_positions == set() and service._open_positions == {}
+
+
+@pytest.mark.asyncio
+async def test_liquidation_and_protect_close_a_position_once(bare_trading_service):
+    exchange = AsyncMock()
+    exchange.get_account_info.return_value = {"totalMarginBalance": "100", "totalMaintMargin": "90"}
+    position = {"symbol": "BTCUSDT", "side": "BUY", "quantity": 1.0, "entry_price": 100.0}
+    service = bare_trading_service(
+        position_manager=None,
+        _settings=MagicMock(enable_paper_trading=False),
+        _exchange=exchange,
+        _user_stream=None,
+        _telegram=AsyncMock(),
+        _agent_states={},
+        _open_positions={"BTCUSDT": position},
+        _closing_positions=set(),
+        _pending_orders={},
+    )
+    orders = []
+
+    async def execute_trade_order(agent, symbol, side, quantity, thesis, is_closing=False):
+        orders.append((symbol, thesis))
+        await asyncio.sleep(0.02)  # Execution jitter
+        service._open_positions.pop(symbol, None)
+
+    service._execute_trade_order = execute_trade_order
+
+    await asyncio.gather(
+        service._check_liquidation_risk(),
+        service._close_position(None, "BTCUSDT", "BUY", 1.0, "Stop Loss"),
+    )
+    assert orders == [("BTCUSDT", "Emergency Margin Reduction")]
+    assert service._closing_positions == set() and service._open_positions == {}
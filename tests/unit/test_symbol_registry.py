@@ -0,0 +1,151 @@
+from decimal import ROUND_DOWN, Decimal
+from unittest.mock import AsyncMock
+
+import pytest
+
+from cloud_trader.market_data import MarketDataManager
+from cloud_trader.position_manager import PositionManager
+from cloud_trader.symbol_registry import SymbolRegistry
+
+
+def symbol_info(symbol, tick="0.10", step="0.001", min_qty="0.001", status="TRADING"):
+    return {
+        "symbol": symbol,
+        "status": status,
+        "filters": [
+            {"filterType": "PRICE_FILTER", "tickSize": tick, "minPrice": "0.1", "maxPrice": "1e6"},
+            {"filterType": "LOT_SIZE", "stepSize": step, "minQty": min_qty, "maxQty": "1000"},
+            {"filterType": "MIN_NOTIONAL", "notional": "5"},
+        ],
+    }
+
+
+EXCHANGE_INFO = {
+    "symbols": [
+        symbol_info("BTCUSDT"),
+        symbol_info("DOGEUSDT", tick="0.00001", step="1", min_qty="1"),
+        symbol_info("PEPEUSDT", tick="0.0000001", step="100", min_qty="100"),
+        symbol_info("ETHBTC"),
+    ]
+}
+
+
+def decimal_floor(value: float, increment: str) -> Decimal:
+    inc = Decimal(increment)
+    return (Decimal(str(value)) / inc).quantize(Decimal("1"), rounding=ROUND_DOWN) * inc
+
+
+def test_rounding_matches_decimal_reference():
+    registry = SymbolRegistry()
+    assert registry.load(EXCHANGE_INFO) == 3  # Non-USDT pairs are ignored
+
+    for price in [64123.456, 0.3, 1.1, 100.0, 12345.67]:
+        expected = decimal_floor(price, "0.10")
+        assert Decimal(registry.round_price("BTCUSDT", price)) == expected
+        assert registry.round_price("BTCUSDT", price).count(".") == 1
+    assert registry.round_price("BTCUSDT", 1.3) == "1.3"  # 1.3 / 0.1 = 12.999... in float
+    assert registry.round_price("DOGEUSDT", 0.123456789) == "0.12345"
+    assert registry.round_price("PEPEUSDT", 0.00001234567) == "0.0000123"
+
+    assert registry.round_quantity("BTCUSDT", 0.0123456) == "0.012"
+    assert registry.round_quantity("BTCUSDT", 0.0001) == "0.001"  # Raised to minQty
+    assert registry.round_quantity("DOGEUSDT", 1234.9) == "1234"
+    assert registry.round_quantity("PEPEUSDT", 123456) == "123400"
+
+
+def test_batch_rounding_matches_scalar():
+    registry = SymbolRegistry()
+    registry.load(EXCHANGE_INFO)
+    orders = [("BTCUSDT", 64000.07, 0.0127), ("DOGEUSDT", 0.2, 55.5), ("BTCUSDT", None, 1.0)]
+
+    rounded = registry.round_orders(orders)
+
+    assert rounded == [
+        (registry.round_price(s, p) if p is not None else None, registry.round_quantity(s, q))
+        for s, p, q in orders
+    ]
+
+
+def test_validate_reports_filter_violations():
+    registry = SymbolRegistry()
+    registry.load(EXCHANGE_INFO)
+
+    assert registry.validate("BTCUSDT", 60000.0, 0.01) is None
+    assert "step" in registry.validate("BTCUSDT", 60000.0, 0.0105)
+    assert "notional" in registry.validate("DOGEUSDT", 0.1, 10)
+    assert "above maxQty" in registry.validate("BTCUSDT", 1.0, 5000)
+    assert "no exchange filters" in registry.validate("XRPUSDT", 1.0, 10)
+
+
+def test_reload_only_rebuilds_changed_symbols():
+    registry = SymbolRegistry()
+    registry.load(EXCHANGE_INFO)
+    btc = registry.get("BTCUSDT")
+
+    assert registry.load(EXCHANGE_INFO) == 0
+    assert registry.get("BTCUSDT") is btc
+
+    changed = {"symbols": [symbol_info("BTCUSDT", tick="0.5"), EXCHANGE_INFO["symbols"][1]]}
+    assert registry.load(changed) == 2  # BTC tick changed, PEPE delisted
+    assert registry.round_price("BTCUSDT", 100.7) == "100.5"
+    assert "PEPEUSDT" not in registry
+
+
+def test_filter_rejection_requests_a_rate_limited_refresh():
+    registry = SymbolRegistry(min_refresh_interval_seconds=0)
+    calls = []
+    registry.add_refresh_listener(lambda: calls.append(1))
+
+    assert not registry.report_order_error("BTCUSDT", "APIError(code=-2019): Margin")
+    assert registry.report_order_error("BTCUSDT", "APIError(code=-1111): Precision")
+    assert not registry.report_order_error("BTCUSDT", "APIError(code=-1111): Precision")
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_market_data_and_position_manager_share_registry():
+    client = AsyncMock()
+    client.get_exchange_info.return_value = EXCHANGE_INFO
+    market_data = MarketDataManager(client)
+    positions = PositionManager(client, {}, symbols=market_data.symbols)
+
+    await market_data.fetch_structure()
+
+    assert client.get_exchange_info.await_count == 1
+    assert set(market_data.market_structure) == {"BTCUSDT", "DOGEUSDT", "PEPEUSDT"}
+    assert market_data.market_structure["DOGEUSDT"]["precision"] == 0
+    assert positions.round_price("BTCUSDT", 100.77) == "100.7"
+    client.get_symbol_filters.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_unknown_symbol_is_fetched_once_instead_of_guessing_precision():
+    registry = SymbolRegistry(min_refresh_interval_seconds=60)
+    client = AsyncMock()
+    client.get_symbol_info.side_effect = [
+        symbol_info("NEWUSDT", tick="0.000001", step="1", min_qty="1"),
+        RuntimeError("unreachable"),
+    ]
+
+    assert registry.round_price("NEWUSDT", 0.0123456) is None
+    assert registry.round_orders([("NEWUSDT", 0.0123456, 10.0)]) == [(None, None)]
+
+    assert (await registry.ensure(client, "NEWUSDT")).symbol == "NEWUSDT"
+    assert registry.round_price("NEWUSDT", 0.0123456) == "0.012345"
+    assert await registry.ensure(client, "NEWUSDT") is not None  # Served from the registry
+
+    assert await registry.ensure(client, "OLDUSDT") is None  # Fetch fails
+    assert await registry.ensure(client, "OLDUSDT") is None  # Not retried within the window
+    assert client.get_symbol_info.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_position_manager_skips_stops_for_symbols_without_filters():
+    client = AsyncMock()
+    client.get_symbol_info.side_effect = RuntimeError("exchangeInfo down")
+    positions = PositionManager(client, {}, symbols=SymbolRegistry())
+
+    await positions.update_sl_on_exchange("PEPEUSDT", 0.00001234, "BUY", 1000.0)
+    await positions.update_tp_on_exchange("PEPEUSDT", 0.00001434, "BUY", 1000.0)
+
+    client.place_order.assert_not_called()
@@ -0,0 +1,176 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from cloud_trader.config import Settings
+from cloud_trader.market_data import MarketDataManager
+from cloud_trader.order_book import OrderBookManager
+from cloud_trader.ticker_book import TickerBook, TickerStreamService
+
+
+def ticker_event(symbol: str, last: str) -> dict:
+    return {
+        "e": "24hrTicker",
+        "s": symbol,
+        "c": last,
+        "P": "1.5",
+        "h": "110",
+        "l": "90",
+        "v": "1000",
+    }
+
+
+@pytest.mark.asyncio
+async def test_stream_events_produce_rest_shaped_tickers():
+    book = TickerBook(AsyncMock(), stale_after_seconds=30)
+    await book.handle_stream_message([ticker_event("BTCUSDT", "100"), ticker_event("ETHUSDT", "5")])
+    await book.handle_stream_message(
+        {"e": "bookTicker", "s": "BTCUSDT", "b": "99.9", "B": "2", "a": "100.1", "A": "3"}
+    )
+
+    ticker_map = await book.get_ticker_map(["BTCUSDT", "SOLUSDT"])
+
+    assert list(ticker_map) == ["BTCUSDT"]
+    btc = ticker_map["BTCUSDT"]
+    assert btc["lastPrice"] == "100"
+    assert btc["priceChangePercent"] == "1.5"
+    assert btc["highPrice"] == "110"
+    assert btc["bidPrice"] == "99.9"
+    assert btc["askPrice"] == "100.1"
+    book.exchange_client.get_all_tickers.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stale_stream_falls_back_to_single_bulk_call():
+    client = AsyncMock()
+    client.get_all_tickers.return_value = [
+        {"symbol": "BTCUSDT", "lastPrice": "101"},
+        {"symbol": "ETHUSDT", "lastPrice": "6"},
+    ]
+    book = TickerBook(client, stale_after_seconds=30)
+
+    first = await book.get_ticker_map(["BTCUSDT", "ETHUSDT"])
+    second = await book.get_ticker_map(["BTCUSDT"])
+
+    assert first["ETHUSDT"]["lastPrice"] == "6"
+    assert second["BTCUSDT"]["lastPrice"] == "101"
+    client.get_all_tickers.assert_awaited_once()
+    client.get_ticker.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_isolated_from_later_updates():
+    book = TickerBook(stale_after_seconds=30)
+    await book.handle_stream_message(ticker_event("BTCUSDT", "100"))
+    snapshot = book.snapshot()
+
+    await book.handle_stream_message(ticker_event("BTCUSDT", "105"))
+
+    assert snapshot["BTCUSDT"]["lastPrice"] == "100"
+    assert book.get("BTCUSDT")["lastPrice"] == "105"
+
+
+class FakeStreamSocket:
+    """Websocket that records subscriptions and blocks in ``listen`` until disconnected."""
+
+    connections = []
+
+    def __init__(self, base_url):
+        self.subscribed = []
+        self._closed = asyncio.Event()
+        FakeStreamSocket.connections.append(self)
+
+    async def connect(self):
+        pass
+
+    async def subscribe(self, streams):
+        self.subscribed = list(streams)
+
+    async def listen(self, callback):
+        await self._closed.wait()
+
+    async def disconnect(self):
+        self._closed.set()
+
+
+@pytest.mark.asyncio
+async def test_changing_symbols_reconnects_with_the_new_streams():
+    FakeStreamSocket.connections = []
+    stream = TickerStreamService(
+        TickerBook(),
+        include_book_ticker=False,
+        ws_client_factory=FakeStreamSocket,
+        candle_store=object(),
+        kline_symbols=["BTCUSDT"],
+        order_books=OrderBookManager(None),
+    )
+    stream.start()
+    await asyncio.sleep(0)
+
+    assert not await stream.set_symbols(kline_symbols=["BTCUSDT"])
+    assert await stream.set_symbols(depth_symbols=["BTCUSDT"])
+    await asyncio.sleep(0.01)  # Reconnects without the error backoff
+    assert await stream.set_symbols(kline_symbols=["BTCUSDT", "ETHUSDT"])
+    await asyncio.sleep(0.01)
+
+    first, second, third = FakeStreamSocket.connections
+    assert "btcusdt@depth@100ms" not in first.subscribed
+    assert "btcusdt@depth@100ms" in second.subscribed
+    assert "ethusdt@kline_1h" not in second.subscribed
+    assert {"btcusdt@kline_1h", "ethusdt@kline_1h"} <= set(third.subscribed)
+    await stream.stop()
+
+
+class SeedingCandleStore:
+    """Candle store that records how many seeds run at once."""
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self.seeded = []
+
+    async def get_series(self, symbol, interval):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.001)
+        self.seeded.append(symbol)
+        self.running -= 1
+
+
+@pytest.mark.asyncio
+async def test_stream_universe_fits_one_connection_and_seeds_in_bounded_batches(
+    bare_trading_service,
+):
+    symbols = [f"S{i:03d}USDT" for i in range(150)]
+    candle_store = SeedingCandleStore()
+    service = bare_trading_service(
+        _settings=Settings(_env_file=None, stream_symbols_max=150),
+        _regime_interval="1h",
+        market_data_manager=MarketDataManager(None),
+        _market_structure={symbol: {} for symbol in symbols},
+        _ticker_book=None,
+        _candle_store=candle_store,
+        _ticker_stream=TickerStreamService(
+            TickerBook(), candle_store=candle_store, order_books=OrderBookManager(None)
+        ),
+    )
+
+    await service._sync_stream_symbols()
+
+    stream = service._ticker_stream
+    assert stream.symbol_capacity == 99  # Two all-market streams plus kline and depth each
+    assert len(stream.kline_symbols) == 99 and len(stream.streams) == 200
+    assert len(service._candle_store.seeded) == 99
+    assert service._candle_store.peak == service._settings.stream_seed_concurrency
+
+
+def test_streams_are_capped_at_the_connection_limit():
+    stream = TickerStreamService(
+        TickerBook(),
+        candle_store=object(),
+        kline_symbols=[f"S{i:03d}USDT" for i in range(150)],
+        order_books=OrderBookManager(None),
+        depth_symbols=[f"S{i:03d}USDT" for i in range(150)],
+    )
+    assert len(stream.streams) == 200
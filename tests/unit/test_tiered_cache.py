@@ -0,0 +1,180 @@
+import asyncio
+import json
+import math
+import pickle
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from enum import Enum
+
+import pytest
+
+from cloud_trader.cache import RedisCache, TieredCache, decode_value, encode_value
+
+fakeredis = pytest.importorskip("fakeredis")  # Not a declared dependency
+
+
+class Side(Enum):
+    BUY = "BUY"
+
+
+@dataclass
+class Fill:
+    price: float
+    at: datetime
+
+
+async def replica(server, **kwargs):
+    client = fakeredis.FakeAsyncRedis(server=server)
+    cache = TieredCache(RedisCache(client=client), l1_ttl=30, **kwargs)
+    await cache.connect()
+    return cache
+
+
+async def eventually(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def test_serializer_is_tagged_and_reads_legacy_values():
+    for value in ({"price": 1.5, "tags": ["a"]}, [1, 2], "text", 3):
+        assert encode_value(value)[:1] == b"\x01"
+        assert decode_value(encode_value(value)) == value
+
+    odd = {(1, 2): {"x"}}  # Not JSON: falls back to pickle
+    assert encode_value(odd)[:1] == b"\x02"
+    assert decode_value(encode_value(odd)) == odd
+
+    # Values the old json encoder rejected still round-trip exactly through pickle
+    exact = [
+        datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        {"day": date(2024, 1, 2)},
+        Fill(101.5, datetime(2024, 1, 2)),
+        [uuid.UUID(int=7)],
+        {"side": Side.BUY},
+    ]
+    for value in exact:
+        assert encode_value(value)[:1] == b"\x02"
+        restored = decode_value(encode_value(value))
+        assert restored == value and type(restored) is type(value)
+
+    # orjson writes NaN/Infinity as null; they are pickled so they come back as floats
+    special = {"a": math.nan, "b": [math.inf, -math.inf]}
+    assert encode_value(special)[:1] == b"\x02"
+    restored = decode_value(encode_value(special))
+    assert math.isnan(restored["a"]) and restored["b"] == [math.inf, -math.inf]
+
+    assert decode_value(json.dumps({"old": True}).encode()) == {"old": True}
+    assert decode_value(pickle.dumps({"old": {1}})) == {"old": {1}}
+
+
+@pytest.mark.asyncio
+async def test_batch_writes_and_reads_are_single_round_trips():
+    server = fakeredis.FakeServer()
+    cache = await replica(server)
+    l2 = cache.l2
+
+    assert await cache.set_many({f"symbol:info:S{i}": {"i": i} for i in range(50)}, ttl=60)
+    assert 0 < await l2.client.ttl("symbol:info:S7") <= 60
+    assert await l2.get_many(["symbol:info:S3", "nope"]) == {"symbol:info:S3": {"i": 3}}
+    assert len(await cache.scan_keys("symbol:info:S4*")) == 11  # S4, S40..S49
+
+    await cache.l1.clear_pattern("*")
+    keys = [f"symbol:info:S{i}" for i in range(0, 50, 5)] + ["missing"]
+    found = await cache.get_many(keys)
+    assert len(found) == 10
+    stats = await cache.get_stats()
+    assert (stats["l2_hits"], stats["misses"]) == (10, 1)
+
+    await cache.get_many(keys[:-1])  # Now served from L1
+    assert (await cache.get_stats())["l1_hits"] == 10
+    await cache.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_other_replicas_l1():
+    server = fakeredis.FakeServer()
+    a, b = await replica(server), await replica(server)
+
+    await a.set("market:snapshot:BTCUSDT", {"price": 100})
+    assert await b.get("market:snapshot:BTCUSDT") == {"price": 100}  # Now in B's L1
+
+    await a.set("market:snapshot:BTCUSDT", {"price": 101})
+    await eventually(lambda: b._stats["invalidations_received"] >= 2)
+    assert await b.get("market:snapshot:BTCUSDT") == {"price": 101}
+
+    await b.get("market:snapshot:BTCUSDT")
+    await a.clear_pattern("market:*")
+    await eventually(lambda: b._stats["invalidations_received"] >= 3)
+    assert await b.get("market:snapshot:BTCUSDT") is None
+    assert a._stats["invalidations_received"] == 0  # Own messages are ignored
+
+    await a.disconnect()
+    await b.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_hot_key_is_computed_once_across_callers_and_replicas():
+    server = fakeredis.FakeServer()
+    a, b = await replica(server), await replica(server)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"atr": 42.0}
+
+    results = await asyncio.gather(
+        *(cache.get_or_set("atr:BTCUSDT:14", loader, ttl=300) for cache in [a, b] * 10)
+    )
+
+    assert all(result == {"atr": 42.0} for result in results)
+    assert len(calls) == 1
+    # Per replica: 9 reads joined the first L2 miss, 9 loads joined the first loader
+    assert a._flight.coalesced == b._flight.coalesced == 18
+    assert await a.l2.client.get("lock:atr:BTCUSDT:14") is None
+
+    await a.disconnect()
+    await b.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_readers_get_their_own_copy_with_the_types_l2_returns():
+    server = fakeredis.FakeServer()
+    a, b = await replica(server), await replica(server)
+    value = {"levels": (1, 2), "fills": [{"qty": 1}]}
+
+    await a.set("book:BTCUSDT", value)
+    value["fills"].append({"qty": 2})  # The writer keeps mutating its object
+    first, second = await asyncio.gather(a.get("book:BTCUSDT"), a.get("book:BTCUSDT"))
+    first["fills"].clear()
+
+    expected = {"levels": [1, 2], "fills": [{"qty": 1}]}
+    assert second == expected and await a.get("book:BTCUSDT") == expected
+    assert await b.get("book:BTCUSDT") == expected  # Same types as the L1 reads
+    assert await a.get_or_set("book:BTCUSDT", None) is not await a.get("book:BTCUSDT")
+
+    await a.disconnect()
+    await b.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_slow_loader_does_not_release_another_replicas_lease():
+    server = fakeredis.FakeServer()
+    a = await replica(server, lock_timeout=0.05)
+    b = await replica(server, lock_timeout=0.05)
+    lock_key = "lock:atr:ETHUSDT:14"
+
+    async def slow_loader():
+        await asyncio.sleep(0.1)  # Outlives a's lease
+        # a's lease expired meanwhile and b took the key
+        assert await b.l2.client.set(lock_key, b.instance_id, nx=True, px=10_000)
+        return {"atr": 7.0}
+
+    assert await a.get_or_set("atr:ETHUSDT:14", slow_loader, ttl=300) == {"atr": 7.0}
+    assert await a.l2.client.get(lock_key) == b.instance_id.encode()
+
+    await a.disconnect()
+    await b.disconnect()
@@ -0,0 +1,103 @@
+import statistics
+
+import numpy as np
+import pytest
+
+from cloud_trader.trade_correlation import TradeCorrelationAnalyzer
+
+
+def feed(analyzer, prices_by_symbol):
+    steps = len(next(iter(prices_by_symbol.values())))
+    for t in range(steps):
+        for symbol, prices in prices_by_symbol.items():
+            analyzer.add_price_data(symbol, float(prices[t]))
+
+
+def random_walks(seed=7, steps=400):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.01, steps)
+    returns = {
+        "BTCUSDT": market + rng.normal(0, 0.002, steps),
+        "ETHUSDT": market + rng.normal(0, 0.002, steps),
+        "SOLUSDT": 1.5 * market + rng.normal(0, 0.003, steps),
+        "XAUUSDT": rng.normal(0, 0.01, steps),
+    }
+    return {s: 100 * np.cumprod(1 + r) for s, r in returns.items()}
+
+
+def test_matrix_matches_pairwise_reference_after_ring_wraps():
+    analyzer = TradeCorrelationAnalyzer(correlation_window=120, update_interval=10)
+    walks = random_walks(steps=401)  # 400 returns each: the last tick triggers a recompute
+    feed(analyzer, walks)
+
+    matrix = analyzer.get_correlation_matrix()
+    assert matrix is not None and matrix.sample_size == 120
+    for a in matrix.symbols:
+        for b in matrix.symbols:
+            if a == b:
+                continue
+            expected = statistics.correlation(
+                analyzer.get_returns(a).tolist(), analyzer.get_returns(b).tolist()
+            )
+            assert matrix.get_correlation(a, b) == pytest.approx(expected, abs=1e-9)
+
+    # The ring buffer returns exactly the last window of returns, oldest first
+    prices = walks["BTCUSDT"]
+    expected_returns = np.diff(prices) / prices[:-1]
+    np.testing.assert_allclose(analyzer.get_returns("BTCUSDT"), expected_returns[-120:])
+
+
+def test_groups_and_betas_come_from_the_matrix():
+    analyzer = TradeCorrelationAnalyzer(correlation_window=200, update_interval=10)
+    feed(analyzer, random_walks())
+
+    groups = analyzer.get_correlation_matrix().get_highly_correlated_groups(0.8)
+    assert groups == [{"BTCUSDT", "ETHUSDT", "SOLUSDT"}]
+    assert analyzer.symbol_betas["SOLUSDT"] > analyzer.symbol_betas["BTCUSDT"]
+    assert analyzer.symbol_betas["XAUUSDT"] < 0.5
+
+    risk = analyzer.get_symbol_correlation_risk("BTCUSDT")
+    assert set(risk["highly_correlated_symbols"]) == {"ETHUSDT", "SOLUSDT"}
+    assert analyzer.get_symbol_correlation_risk("DOGEUSDT")["recommended_limit"] == 1.0
+
+
+def test_flat_series_has_undefined_correlation():
+    analyzer = TradeCorrelationAnalyzer(correlation_window=50, update_interval=5)
+    walks = random_walks(steps=60)
+    walks["FLATUSDT"] = np.full(60, 10.0)
+    feed(analyzer, walks)
+
+    matrix = analyzer.get_correlation_matrix()
+    assert matrix.get_correlation("FLATUSDT", "BTCUSDT") == 0.0
+    assert ("BTCUSDT", "FLATUSDT") not in matrix.correlations
+
+
+def test_recommendations_are_cached_until_the_matrix_changes():
+    analyzer = TradeCorrelationAnalyzer(correlation_window=100, update_interval=10)
+    walks = random_walks(steps=200)
+    feed(analyzer, {s: p[:150] for s, p in walks.items()})
+
+    first = analyzer.get_risk_management_recommendations()
+    assert analyzer.get_risk_management_recommendations() is first
+    assert first["correlation_clusters"]
+
+    feed(analyzer, {s: p[150:] for s, p in walks.items()})
+    assert analyzer.get_risk_management_recommendations() is not first
+
+
+def test_new_listing_does_not_shorten_the_window_of_older_pairs():
+    analyzer = TradeCorrelationAnalyzer(correlation_window=200, update_interval=10)
+    walks = random_walks(steps=401)
+    feed(analyzer, {s: p[:361] for s, p in walks.items() if s != "XAUUSDT"})
+    feed(analyzer, {s: p[361:] for s, p in walks.items()})  # XAU lists with 39 returns
+    analyzer._update_correlations()
+
+    matrix = analyzer.get_correlation_matrix()
+    assert set(matrix.symbols) == set(walks) and matrix.sample_size == 39
+    btc, eth, xau = (analyzer.get_returns(s) for s in ("BTCUSDT", "ETHUSDT", "XAUUSDT"))
+    assert len(btc) == 200 and len(xau) == 39
+    expected = statistics.correlation(btc.tolist(), eth.tolist())
+    assert matrix.get_correlation("BTCUSDT", "ETHUSDT") == pytest.approx(expected, abs=1e-9)
+    expected = statistics.correlation(btc[-39:].tolist(), xau.tolist())
+    assert matrix.get_correlation("BTCUSDT", "XAUUSDT") == pytest.approx(expected, abs=1e-9)
+    assert analyzer.symbol_betas["XAUUSDT"] < 0.5 < analyzer.symbol_betas["BTCUSDT"]
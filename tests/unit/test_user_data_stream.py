@@ -0,0 +1,220 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from cloud_trader.user_data_stream import AccountState, UserDataStream
+
+
+def order_update(order_id, status, filled="0", avg="0", t=1):
+    return {
+        "e": "ORDER_TRADE_UPDATE",
+        "E": t,
+        "T": t,
+        "o": {
+            "s": "BTCUSDT",
+            "i": order_id,
+            "S": "BUY",
+            "X": status,
+            "z": filled,
+            "ap": avg,
+            "T": t,
+        },
+    }
+
+
+def account_update(wallet, t=1):
+    return {
+        "e": "ACCOUNT_UPDATE",
+        "E": t,
+        "a": {
+            "m": "ORDER",
+            "B": [{"a": "USDT", "wb": str(wallet), "cw": str(wallet), "bc": "0"}],
+            "P": [{"s": "BTCUSDT", "pa": "0.01", "ep": "50000", "up": "1.5", "ps": "BOTH"}],
+        },
+    }
+
+
+class FakeUserStreamWebSocket:
+    """Feeds queued events to the listener, then stays open until disconnected."""
+
+    instances = []
+
+    def __init__(self, base_url):
+        self.paths = []
+        self.events = asyncio.Queue()
+        self._closed = asyncio.Event()
+        FakeUserStreamWebSocket.instances.append(self)
+
+    async def connect(self, path="/ws/"):
+        self.paths.append(path)
+
+    async def listen(self, callback):
+        while not self._closed.is_set():
+            get = asyncio.ensure_future(self.events.get())
+            closed = asyncio.ensure_future(self._closed.wait())
+            done, pending = await asyncio.wait({get, closed}, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            if get in done:
+                await callback(get.result())
+
+    async def disconnect(self):
+        self._closed.set()
+
+
+def fake_client():
+    client = AsyncMock()
+    client.start_user_stream.side_effect = ["key-1", "key-2", "key-3"]
+    client.get_account_info.return_value = {
+        "totalWalletBalance": "1000",
+        "availableBalance": "800",
+        "totalMarginBalance": "1000",
+        "totalMaintMargin": "10",
+        "assets": [{"asset": "USDT", "walletBalance": "1000", "crossWalletBalance": "1000"}],
+    }
+    client.get_order.return_value = {"orderId": 7, "status": "FILLED", "executedQty": "1"}
+    return client
+
+
+async def wait_for(predicate, timeout=1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.005)
+
+
+def test_account_state_tracks_orders_and_patches_balances():
+    state = AccountState()
+    state.apply_account_snapshot(fake_client().get_account_info.return_value)
+    events = []
+    state.add_listener(lambda kind, payload: events.append(kind))
+
+    state.apply_event(order_update(1, "NEW", t=1))
+    state.apply_event(order_update(1, "FILLED", filled="0.5", avg="100", t=3))
+    state.apply_event(order_update(1, "PARTIALLY_FILLED", filled="0.2", t=2))  # Late delivery
+    state.apply_event(account_update(990.0, t=4))
+
+    order = state.get_order("1")
+    assert order["status"] == "FILLED"
+    assert order["executedQty"] == "0.5"
+    assert order["avgPrice"] == "100"
+    assert state.wallet_balance() == 990.0
+    account = state.account_info()
+    assert float(account["totalWalletBalance"]) == 990.0
+    assert float(account["availableBalance"]) == 790.0
+    assert state.positions["BTCUSDT:BOTH"]["positionAmt"] == 0.01
+    assert events == ["ORDER_TRADE_UPDATE", "ORDER_TRADE_UPDATE", "ACCOUNT_UPDATE"]
+
+
+@pytest.mark.asyncio
+async def test_stream_serves_orders_and_account_without_rest():
+    FakeUserStreamWebSocket.instances = []
+    client = fake_client()
+    stream = UserDataStream(client, ws_client_factory=FakeUserStreamWebSocket)
+    stream.start()
+    await wait_for(lambda: stream.healthy)
+
+    ws = FakeUserStreamWebSocket.instances[0]
+    assert ws.paths == ["/ws/key-1"]
+    await ws.events.put(order_update(42, "FILLED", filled="2", avg="10"))
+    await wait_for(lambda: stream.state.get_order(42) is not None)
+
+    assert (await stream.get_order("BTCUSDT", "42"))["status"] == "FILLED"
+    assert (await stream.get_account_info())["totalMaintMargin"] == "10"
+    client.get_order.assert_not_called()
+    assert client.get_account_info.await_count == 1  # Only the on-connect reconciliation
+
+    await stream.stop()
+    client.close_user_stream.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_unreported_order_falls_back_to_rest_after_window():
+    FakeUserStreamWebSocket.instances = []
+    client = fake_client()
+    stream = UserDataStream(
+        client, ws_client_factory=FakeUserStreamWebSocket, reconcile_seconds=0.05
+    )
+    stream.start()
+    await wait_for(lambda: stream.healthy)
+
+    assert await stream.get_order("BTCUSDT", 7) is None
+    client.get_order.assert_not_called()
+    await asyncio.sleep(0.06)
+    assert (await stream.get_order("BTCUSDT", 7))["status"] == "FILLED"
+    assert client.get_order.await_count == 1
+
+    await stream.stop()
+
+
+@pytest.mark.asyncio
+async def test_expired_listen_key_reconnects_with_new_key():
+    FakeUserStreamWebSocket.instances = []
+    client = fake_client()
+    stream = UserDataStream(
+        client, ws_client_factory=FakeUserStreamWebSocket, reconnect_backoff_seconds=0.01
+    )
+    stream.start()
+    await wait_for(lambda: stream.healthy)
+
+    await FakeUserStreamWebSocket.instances[0].events.put({"e": "listenKeyExpired"})
+    await wait_for(lambda: len(FakeUserStreamWebSocket.instances) == 2 and stream.healthy)
+
+    assert FakeUserStreamWebSocket.instances[1].paths == ["/ws/key-2"]
+    assert stream.stats["reconnects"] == 1
+    await stream.stop()
+
+
+@pytest.mark.asyncio
+async def test_reconnect_refetches_open_orders_missed_while_down():
+    FakeUserStreamWebSocket.instances = []
+    client = fake_client()
+    stream = UserDataStream(
+        client, ws_client_factory=FakeUserStreamWebSocket, reconnect_backoff_seconds=0.01
+    )
+    stream.start()
+    await wait_for(lambda: stream.healthy)
+
+    now_ms = int(time.time() * 1000)
+    await FakeUserStreamWebSocket.instances[0].events.put(order_update(7, "NEW", t=now_ms))
+    await wait_for(lambda: stream.state.get_order(7) is not None)
+    assert (await stream.get_order("BTCUSDT", 7))["status"] == "NEW"
+    client.get_order.assert_not_called()
+
+    # The fill lands while the socket is down; only REST knows about it
+    await FakeUserStreamWebSocket.instances[0].disconnect()
+    await wait_for(lambda: client.get_order.await_count == 1)
+
+    client.get_order.assert_awaited_once_with(symbol="BTCUSDT", order_id="7")
+    assert (await stream.get_order("BTCUSDT", 7))["status"] == "FILLED"
+    assert client.get_order.await_count == 1
+    await stream.stop()
+
+
+@pytest.mark.asyncio
+async def test_stale_open_order_falls_back_to_rest_once_per_window():
+    FakeUserStreamWebSocket.instances = []
+    client = fake_client()
+    client.get_order.return_value = {"orderId": 7, "status": "NEW", "updateTime": 1}
+    stream = UserDataStream(
+        client, ws_client_factory=FakeUserStreamWebSocket, reconcile_seconds=0.05
+    )
+    stream.start()
+    await wait_for(lambda: stream.healthy)
+
+    assert await stream.get_order("BTCUSDT", 7) is None
+    await FakeUserStreamWebSocket.instances[0].events.put(order_update(7, "NEW", t=1))
+    await wait_for(lambda: stream.state.get_order(7) is not None)
+    assert stream._order_first_seen == {}
+
+    # Open since t=1: one REST check, then the stream copy until the window passes
+    for _ in range(3):
+        assert (await stream.get_order("BTCUSDT", 7))["status"] == "NEW"
+    assert client.get_order.await_count == 1
+    await asyncio.sleep(0.06)
+    await stream.get_order("BTCUSDT", 7)
+    assert client.get_order.await_count == 2
+
+    await stream.stop()
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cloud_trader.backtest import BacktestEngine, VectorizedBacktestEngine
+from cloud_trader.backtest.vectorized import BollingerReversionRule, MomentumRule
+
+START = datetime(2024, 1, 1)
+
+
+def make_frame(seed: int, bars: int = 400, drop_every: int = 0) -> pd.DataFrame:
+    """Random walk with occasional large shocks so reversion/momentum rules fire."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, bars)
+    shocks = rng.random(bars) < 0.03
+    returns[shocks] += rng.choice([-0.45, 0.6], shocks.sum())
+    close = 100 * np.exp(np.cumsum(returns))
+    volume = rng.uniform(1e5, 2e5, bars)
+    volume[shocks] *= 4
+    index = pd.DatetimeIndex([START + timedelta(hours=i) for i in range(bars)])
+    df = pd.DataFrame(
+        {
+            "open": close,
+            "high": close * 1.01,
+            "low": close * 0.99,
+            "close": close,
+            "volume": volume,
+        },
+        index=index,
+    )
+    if drop_every:
+        df = df.iloc[[i for i in range(bars) if i % drop_every]]
+    return df
+
+
+class FrameLoader:
+    def __init__(self, frames):
+        self.frames = frames
+
+    async def load_market_data(self, symbol, start_date, end_date, interval="1h"):
+        return self.frames.get(symbol)
+
+
+@pytest.fixture
+def frames():
+    return {
+        "BTCUSDT": make_frame(1),
+        "ETHUSDT": make_frame(2, drop_every=7),
+        "SOLUSDT": make_frame(3),
+    }
+
+
+@pytest.mark.asyncio
+async def test_vectorized_engine_matches_loop_reference(frames):
+    loader = FrameLoader(frames)
+    rules = [BollingerReversionRule(period=20), MomentumRule(threshold=0.3, volume_window=24)]
+    end = START + timedelta(hours=400)
+
+    vectorized = VectorizedBacktestEngine(data_loader=loader, rules=rules)
+    reference = BacktestEngine(data_loader=loader)
+    reference.agents = vectorized.create_reference_agents()
+
+    expected = await reference.run_backtest(list(frames), START, end)
+    actual = await vectorized.run_backtest(list(frames), START, end)
+
+    assert expected.total_trades > 5
+    assert actual.total_trades == expected.total_trades
+    for got, want in zip(actual.trades, expected.trades):
+        assert got["symbol"] == want["symbol"]
+        assert got["side"] == want["side"]
+        assert got["entry_time"] == want["entry_time"]
+        assert got["exit_time"] == want["exit_time"]
+        assert got["exit_reason"] == want["exit_reason"]
+        assert got["agent_id"] == want["agent_id"]
+        assert got["pnl_abs"] == pytest.approx(want["pnl_abs"])
+    assert actual.final_capital == pytest.approx(expected.final_capital)
+    assert actual.equity_curve == pytest.approx(expected.equity_curve)
+    assert actual.sharpe_ratio == pytest.approx(expected.sharpe_ratio)
+    assert actual.agent_performance == expected.agent_performance
+
+
+@pytest.mark.asyncio
+async def test_no_data_returns_empty_results():
+    engine = VectorizedBacktestEngine(data_loader=FrameLoader({}))
+    results = await engine.run_backtest(["BTCUSDT"], START, START + timedelta(days=1))
+
+    assert results.total_trades == 0
+    assert results.final_capital == engine.initial_capital
+
+
+@pytest.mark.asyncio
+async def test_time_exits_match_loop_reference(frames):
+    loader = FrameLoader(frames)
+    end = START + timedelta(hours=400)
+    vectorized = VectorizedBacktestEngine(data_loader=loader)
+    for config in vectorized.agent_configs.values():
+        config["profit_target"] = config["stop_loss"] = 5.0  # only the 24h exit can fire
+    reference = BacktestEngine(data_loader=loader)
+    reference.agents = vectorized.create_reference_agents()
+
+    expected = await reference.run_backtest(list(frames), START, end)
+    actual = await vectorized.run_backtest(list(frames), START, end)
+
+    assert any(t["exit_reason"] == "time_exit" for t in expected.trades)
+    assert [t["exit_time"] for t in actual.trades] == [t["exit_time"] for t in expected.trades]
+    assert actual.final_capital == pytest.approx(expected.final_capital)
@@ -0,0 +1,164 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import numpy as np
+import orjson
+import pytest
+
+from cloud_trader.vpin_data_streamer import VPINDataStreamer
+
+
+def agg_trade(symbol, agg_id, price=100.0, qty=1.0):
+    now = int(time.time() * 1000)
+    return orjson.dumps(
+        {
+            "stream": f"{symbol.lower()}@aggTrade",
+            "data": {
+                "e": "aggTrade",
+                "E": now,
+                "s": symbol,
+                "a": agg_id,
+                "p": str(price),
+                "q": str(qty),
+                "T": now,
+            },
+        }
+    )
+
+
+class FakeSocket:
+    def __init__(self, messages, fail_after=False):
+        self.messages = list(messages)
+        self.fail_after = fail_after
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def recv(self):
+        if self.messages:
+            return self.messages.pop(0)
+        if self.fail_after:
+            self.fail_after = False
+            raise ConnectionError("socket closed")
+        await asyncio.Event().wait()  # Idle connection
+
+
+class FakeConnector:
+    """Hands out scripted sockets per URL and records every connect."""
+
+    def __init__(self):
+        self.scripts = {}
+        self.connects = []
+
+    def __call__(self, url):
+        self.connects.append(url)
+        script = self.scripts.get(url, [])
+        return script.pop(0) if script else FakeSocket([])
+
+
+def make_streamer(symbols, connector=None, **kwargs):
+    rest = AsyncMock()
+    rest.get_all_symbols.return_value = [{"symbol": s, "status": "TRADING"} for s in symbols] + [
+        {"symbol": "OLDUSDT", "status": "SETTLING"}
+    ]
+    return VPINDataStreamer(rest_client=rest, ws_connect=connector, **kwargs)
+
+
+def test_full_universe_is_sharded_under_the_stream_limit():
+    streamer = make_streamer([])
+    symbols = [f"S{i:03d}USDT" for i in range(450)]
+
+    shards = streamer.build_shards(symbols)
+
+    assert [len(shard) for shard in shards] == [200, 200, 50]
+    assert sum(shards, []) == symbols
+    assert streamer.shard_url(2).count("@aggTrade") == 50
+
+
+def test_trades_parse_into_columnar_batches_with_gap_tracking():
+    streamer = make_streamer([], batch_size=4)
+    streamer.build_shards(["BTCUSDT"])
+    stats = streamer.shard_stats[0]
+
+    for agg_id in (1, 2, 2, 3, 7):  # 2 is replayed, 4-6 were missed
+        streamer._handle_message(agg_trade("BTCUSDT", agg_id, price=100 + agg_id), stats)
+
+    item = streamer.output_queue.get_nowait()
+    assert item["symbol"] == "BTCUSDT"
+    np.testing.assert_allclose(item["batch"]["price"], [101, 102, 103, 107])
+    assert (stats.messages, stats.duplicates, stats.gaps) == (5, 1, 3)
+    assert stats.lag_ms < 1000
+
+
+def test_full_queue_coalesces_or_drops_without_blocking():
+    coalescing = make_streamer([], batch_size=2, queue_size=1, max_pending_trades=3)
+    coalescing.build_shards(["BTCUSDT"])
+    stats = coalescing.shard_stats[0]
+    for agg_id in range(1, 9):
+        coalescing._handle_message(agg_trade("BTCUSDT", agg_id, price=agg_id), stats)
+
+    # One batch queued; the next three were merged, keeping only the newest 3 trades
+    assert coalescing.output_queue.qsize() == 1
+    assert coalescing.dropped_trades == 3
+    coalescing.output_queue.get_nowait()
+    coalescing.flush()
+    np.testing.assert_allclose(coalescing.output_queue.get_nowait()["batch"]["price"], [6, 7, 8])
+
+    dropping = make_streamer([], batch_size=2, queue_size=1, overflow_policy="drop")
+    dropping.build_shards(["BTCUSDT"])
+    for agg_id in range(1, 9):
+        dropping._handle_message(agg_trade("BTCUSDT", agg_id), dropping.shard_stats[0])
+    assert dropping.dropped_trades == 6
+    assert dropping.get_stats()["pending_trades"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reconnect_resubscribes_only_the_failed_shard():
+    connector = FakeConnector()
+    streamer = make_streamer(
+        ["AUSDT", "BUSDT", "CUSDT"],
+        connector,
+        max_streams_per_connection=2,
+        reconnect_backoff_seconds=0,
+    )
+    streamer.build_shards(["AUSDT", "BUSDT", "CUSDT"])
+    failing_url, healthy_url = streamer.shard_url(1), streamer.shard_url(0)
+    connector.scripts[failing_url] = [
+        FakeSocket([agg_trade("CUSDT", 1)], fail_after=True),
+        FakeSocket([agg_trade("CUSDT", 5)]),
+    ]
+    connector.scripts[healthy_url] = [FakeSocket([agg_trade("AUSDT", 1)])]
+
+    task = asyncio.create_task(streamer.run())
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+    assert connector.connects.count(failing_url) == 2
+    assert connector.connects.count(healthy_url) == 1
+    stats = streamer.get_stats()["shards"]
+    assert stats[1]["reconnects"] == 1 and stats[1]["gaps"] == 3
+    assert stats[0]["reconnects"] == 0 and stats[0]["connected"]
+
+    streamer.stop()
+    await task
+
+
+@pytest.mark.asyncio
+async def test_quiet_symbols_are_flushed_periodically_and_on_shutdown():
+    connector = FakeConnector()
+    streamer = make_streamer(["AUSDT"], connector, batch_size=50, flush_interval_seconds=0.05)
+    streamer.build_shards(["AUSDT"])
+    connector.scripts[streamer.shard_url(0)] = [FakeSocket([agg_trade("AUSDT", 1)])]
+
+    task = asyncio.create_task(streamer.run())
+    item = await asyncio.wait_for(streamer.output_queue.get(), timeout=1.0)
+    assert item["symbol"] == "AUSDT" and len(item["batch"]) == 1  # Never filled 50
+
+    streamer._handle_message(agg_trade("AUSDT", 2), streamer.shard_stats[0])
+    streamer.stop()
+    await task
+    assert len(streamer.output_queue.get_nowait()["batch"]) == 1  # Flushed on shutdown
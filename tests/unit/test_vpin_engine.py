@@ -0,0 +1,127 @@
+import math
+
+import numpy as np
+import pytest
+
+from cloud_trader.agents.vpin_hft_agent import VpinHFTAgent
+from cloud_trader.vpin_engine import TRADE_DTYPE, VPINEngine, normal_cdf, trades_from_ticks
+
+
+def trade_batch(seed, n=50, drift=0.0, scale=1.0):
+    rng = np.random.default_rng(seed)
+    trades = np.zeros(n, dtype=TRADE_DTYPE)
+    trades["ts"] = np.arange(n) * 1000
+    trades["price"] = 100 + np.cumsum(rng.normal(drift, 0.01, n))
+    trades["qty"] = rng.uniform(0.1, 5, n) * scale
+    return trades
+
+
+def reference_buckets(qty, buy_qty, bucket_volume):
+    """Walk trades one by one, splitting each across bucket boundaries."""
+    buckets, filled, filled_buy = [], 0.0, 0.0
+    for q, b in zip(qty, buy_qty):
+        share = b / q if q else 0.5
+        while q > 1e-12:
+            take = min(q, bucket_volume - filled)
+            filled += take
+            filled_buy += take * share
+            q -= take
+            if filled >= bucket_volume - 1e-9:
+                buckets.append(filled_buy)
+                filled = filled_buy = 0.0
+    return buckets
+
+
+def test_normal_cdf_matches_erf():
+    x = np.linspace(-5, 5, 41)
+    expected = [0.5 * (1 + math.erf(v / math.sqrt(2))) for v in x]
+    np.testing.assert_allclose(normal_cdf(x), expected, atol=2e-7)
+
+
+def test_buckets_match_trade_by_trade_reference_across_batches():
+    engine = VPINEngine(bucket_volume=7.3, window=1000, sigma_alpha=0.0)
+    batches = [trade_batch(seed) for seed in range(4)]
+    for trades in batches:
+        engine.update("BTCUSDT", trades)
+
+    # Re-derive every trade's buy share exactly as the engine classified it
+    sigma = math.sqrt(engine.sigma_var[engine.row("BTCUSDT")])
+    prices = np.concatenate([b["price"] for b in batches])
+    qty = np.concatenate([b["qty"] for b in batches])
+    changes = np.diff(prices, prepend=prices[0])
+    buckets = reference_buckets(qty, qty * normal_cdf(changes / sigma), 7.3)
+
+    row = engine.row("BTCUSDT")
+    assert engine.bucket_count[row] == len(buckets)
+    imbalances = [abs(2 * b / 7.3 - 1) for b in buckets]
+    assert engine.get_vpin("BTCUSDT") == pytest.approx(np.mean(imbalances), rel=1e-9)
+    assert engine.carry[row] * 7.3 == pytest.approx(qty.sum() - 7.3 * len(buckets))
+
+
+def test_update_many_matches_per_symbol_updates():
+    sizes = {"BTCUSDT": 0.5, "ETHUSDT": 20.0, "PEPEUSDT": 5e7}
+    scales = {"BTCUSDT": 0.05, "ETHUSDT": 2.0, "PEPEUSDT": 1e7}
+    batch_engine = VPINEngine(bucket_volumes=sizes, window=10)
+    singles = {s: VPINEngine(bucket_volumes=sizes, window=10) for s in sizes}
+
+    for step in range(20):
+        batches = {
+            s: trade_batch(step * 10 + i, drift=0.002 * (i - 1), scale=scales[s])
+            for i, s in enumerate(sizes)
+        }
+        batch_results = batch_engine.update_many(batches)
+        for symbol, trades in batches.items():
+            expected = singles[symbol].update(symbol, trades)
+            actual = batch_results[symbol]
+            assert actual.new_buckets == expected.new_buckets
+            assert actual.vpin == pytest.approx(expected.vpin, rel=1e-9)
+            assert actual.cdf == expected.cdf
+
+    vpins = batch_engine.get_vpins()
+    assert set(vpins) == set(sizes)
+    assert all(0.0 <= v <= 1.0 for v in vpins.values())
+
+
+def test_one_sided_flow_scores_high_and_ranks_at_the_top():
+    engine = VPINEngine(bucket_volume=10, window=20)
+    for seed in range(30):
+        engine.update("SOLUSDT", trade_batch(seed))
+    calm = engine.get_vpin("SOLUSDT")
+
+    trades = trade_batch(99)
+    trades["price"] = 101 + np.arange(50) * 0.05  # Every trade lifts the offer
+    for _ in range(3):
+        result = engine.update("SOLUSDT", trades)
+        trades["price"] += 2.5
+    assert result.vpin > calm
+    assert result.cdf == 1.0
+
+
+def test_calibration_and_tick_dicts():
+    engine = VPINEngine(calibration_buckets=4)
+    ticks = [{"price": 100 + i * 0.01, "volume": 2.0, "timestamp": i} for i in range(20)]
+
+    result = engine.update("XRPUSDT", ticks)
+
+    assert result.bucket_volume == pytest.approx(10.0)
+    assert result.new_buckets == 4
+    assert engine.update("NEWUSDT", trades_from_ticks([])).vpin is None
+
+
+def test_agent_batches_classification_and_vpin():
+    agent = VpinHFTAgent(None, None, "topic")
+    ticks = [
+        {"price": 100.0, "prev_price": 99.0, "volume": 1.0},
+        {"price": 100.0, "prev_price": 100.0, "volume": 1.0},
+        {"price": 99.0, "prev_price": 100.0, "volume": 1.0},
+    ]
+    directions = agent.ml_classify_trade_directions(ticks, {})
+    assert directions.tolist() == [1, 0, -1]
+    assert agent.ml_classify_trade_direction(ticks[2], {}) == -1
+
+    result = agent.calculate_vpin(ticks * 4)
+    assert result["buy_volume"] == result["sell_volume"] == 6.0
+
+    results = agent.process_trade_batches({"BTCUSDT": trade_batch(1), "ETHUSDT": trade_batch(2)})
+    assert set(results) == {"BTCUSDT", "ETHUSDT"}
+    assert results["BTCUSDT"]["buckets"] == 5  # First batch calibrates 5 buckets
@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from cloud_trader.websocket_manager import (
+    MessageType,
+    SubscriptionType,
+    WebSocketManager,
+    WebSocketMessage,
+)
+
+
+class FakeWebSocket:
+    def __init__(self, blocked=False):
+        self.frames = []
+        self.closed = None
+        self.unblock = asyncio.Event()
+        if not blocked:
+            self.unblock.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame):
+        await self.unblock.wait()
+        self.frames.append(json.loads(frame))
+
+    @property
+    def updates(self):
+        """Frames other than the welcome message and pings."""
+        return [f for f in self.frames if f["type"] not in ("system_health", "ping")]
+
+    async def close(self, code=1000, reason=""):
+        self.closed = reason
+
+
+async def connect(manager, client_id, subscription, blocked=False):
+    websocket = FakeWebSocket(blocked)
+    await manager.add_client(websocket, client_id)
+    await manager.subscribe_client(client_id, subscription)
+    return websocket
+
+
+def message(message_type, subscription, data, priority=2):
+    return WebSocketMessage(message_type, subscription, data, priority=priority)
+
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_loop_sleeps_until_signalled_and_drains_by_priority():
+    manager = WebSocketManager()
+    socket = await connect(manager, "a", SubscriptionType.ALL_TRADES)
+    encoded = []
+    original = manager._encode
+    manager._encode = lambda msg: encoded.append(msg) or original(msg)
+
+    for i in range(3):
+        await manager.broadcast_message(
+            message(MessageType.TRADE_UPDATE, SubscriptionType.ALL_TRADES, {"n": i}, priority=1)
+        )
+    await manager.broadcast_message(
+        message(MessageType.TRADE_UPDATE, SubscriptionType.ALL_TRADES, {"n": "urgent"}, 4)
+    )
+    loop_task = asyncio.create_task(manager._broadcast_loop())
+    await settle()
+
+    assert [frame["data"]["n"] for frame in socket.updates] == ["urgent", 0, 1, 2]
+    assert len(encoded) == 4
+    assert not manager._message_ready.is_set()  # Idle: parked on the event, not polling
+
+    await manager.stop()
+    await loop_task
+
+
+@pytest.mark.asyncio
+async def test_frames_are_encoded_once_per_message_for_all_clients():
+    manager = WebSocketManager()
+    sockets = [await connect(manager, f"c{i}", SubscriptionType.CONSENSUS_VOTES) for i in range(50)]
+    calls = []
+    original = manager._encode
+    manager._encode = lambda msg: calls.append(msg) or original(msg)
+
+    await manager._process_message(
+        message(MessageType.CONSENSUS_DECISION, SubscriptionType.CONSENSUS_VOTES, {"side": "BUY"})
+    )
+    await settle()
+
+    assert len(calls) == 1
+    assert all(s.updates[0]["data"] == {"side": "BUY"} for s in sockets)
+    assert manager.stats["messages_sent"] == 100  # Welcome + update per client
+
+
+@pytest.mark.asyncio
+async def test_snapshot_updates_coalesce_for_a_lagging_client():
+    manager = WebSocketManager()
+    socket = await connect(manager, "slow", SubscriptionType.PORTFOLIO_CHANGES, blocked=True)
+
+    for equity in range(1, 6):
+        await manager._process_message(
+            message(
+                MessageType.PORTFOLIO_UPDATE, SubscriptionType.PORTFOLIO_CHANGES, {"eq": equity}
+            )
+        )
+        await settle()  # The sender is stuck writing the welcome message
+    socket.unblock.set()
+    await settle()
+
+    # All five updates waited behind the welcome and collapsed into the newest
+    assert [frame["data"]["eq"] for frame in socket.updates] == [5]
+    assert manager.stats["messages_coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_evicted_without_stalling_others():
+    manager = WebSocketManager(client_queue_size=2)
+    slow = await connect(manager, "slow", SubscriptionType.ALL_TRADES, blocked=True)
+    fast = await connect(manager, "fast", SubscriptionType.ALL_TRADES)
+
+    for i in range(5):
+        await manager._process_message(
+            message(MessageType.TRADE_UPDATE, SubscriptionType.ALL_TRADES, {"n": i})
+        )
+        await settle()
+
+    assert [frame["data"]["n"] for frame in fast.updates] == list(range(5))
+    assert "slow" not in manager.clients
+    assert "slow" not in manager.subscriptions[SubscriptionType.ALL_TRADES]
+    assert slow.closed == "slow_consumer"
+    assert manager.stats["clients_evicted"] == 1
+    assert manager.get_stats()["active_clients"] == 1
+
+
+@pytest.mark.asyncio
+async def test_direct_sends_and_pings_share_the_client_queue_and_wire_format():
+    manager = WebSocketManager(client_queue_size=2)
+    socket = await connect(manager, "a", SubscriptionType.ALL_TRADES)
+    await settle()
+
+    data = {1: "int key", "value": np.float64(0.5), "series": np.arange(3)}
+    assert await manager.send_to_client("a", MessageType.TRADE_UPDATE, data)
+    assert await manager.clients["a"].ping()
+    await settle()
+
+    update = socket.updates[0]["data"]
+    assert update == {"1": "int key", "value": 0.5, "series": [0, 1, 2]}
+    assert [frame["type"] for frame in socket.frames][-1] == "ping"
+
+    socket.unblock.clear()  # Stalled socket: one ping in flight, two queued, then refused
+    client = manager.clients["a"]
+    results = []
+    for _ in range(4):
+        results.append(await client.ping())
+        await settle()
+    assert results == [True, True, True, False]
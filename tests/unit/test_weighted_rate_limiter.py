@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+import pytest
+
+from cloud_trader.rate_limit_manager import TokenBucket, WeightedRateLimiter
+
+
+def test_token_bucket_refills_lazily():
+    bucket = TokenBucket(capacity=10, refill_per_second=100)
+    assert bucket.try_consume(10)
+    assert not bucket.try_consume(1)
+
+    bucket._last_refill -= 0.05  # 5 tokens worth of elapsed time
+    assert bucket.available() == pytest.approx(5, abs=0.5)
+
+
+def test_weights_depend_on_endpoint_and_params():
+    assert WeightedRateLimiter.weight_for("/fapi/v1/ticker/24hr", {}) == 40
+    assert WeightedRateLimiter.weight_for("/fapi/v1/ticker/24hr", {"symbol": "BTCUSDT"}) == 1
+    assert WeightedRateLimiter.weight_for("/fapi/v1/depth", {"limit": 1000}) == 20
+    assert WeightedRateLimiter.weight_for("/fapi/v1/unknown", {}) == 1
+    assert WeightedRateLimiter.classify("POST", "/fapi/v1/order", True) == "order"
+    assert WeightedRateLimiter.classify("GET", "/fapi/v4/account", True) == "account"
+    assert WeightedRateLimiter.classify("GET", "/fapi/v1/klines", False) == "market"
+
+
+def test_used_weight_header_tightens_bucket():
+    limiter = WeightedRateLimiter(weight_per_minute=1200)
+    limiter.update_from_headers({"X-MBX-USED-WEIGHT-1M": "1000"})
+    assert limiter.weight_bucket.available() == pytest.approx(200, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_market_data_cannot_use_order_reserve():
+    limiter = WeightedRateLimiter(weight_per_minute=600, market_reserve_fraction=0.5)
+    limiter.weight_bucket.tokens = 300  # exactly the reserved slice
+
+    await limiter.acquire("POST", "/fapi/v1/order", {}, signed=True)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(limiter.acquire("GET", "/fapi/v1/klines", {}), timeout=0.05)
+
+
+@pytest.mark.asyncio
+async def test_orders_jump_ahead_of_queued_market_data():
+    limiter = WeightedRateLimiter(weight_per_minute=60, market_reserve_fraction=0.0)
+    limiter.weight_bucket.tokens = 0  # refills at 1 weight/second
+    order = []
+
+    async def call(method, endpoint, signed, label):
+        await limiter.acquire(method, endpoint, {}, signed)
+        order.append(label)
+
+    market = asyncio.create_task(call("GET", "/fapi/v1/exchangeInfo", False, "market"))
+    await asyncio.sleep(0.01)
+    orders = asyncio.create_task(call("POST", "/fapi/v1/order", True, "order"))
+    await asyncio.wait_for(asyncio.gather(market, orders), timeout=5)
+
+    assert order == ["order", "market"]
+
+
+@pytest.mark.asyncio
+async def test_penalty_blocks_all_lanes_until_retry_after():
+    limiter = WeightedRateLimiter()
+    limiter.penalize(0.1)
+    start = time.monotonic()
+    await limiter.acquire("POST", "/fapi/v1/order", {}, signed=True)
+    assert time.monotonic() - start >= 0.09